@@ -0,0 +1,112 @@
+"""
+Benchmark for enriching pending songs album by album, offline.
+
+Queues whole albums of songs for enrichment, as a library import would,
+then fetches their details from a StandInServer serving synthetic
+track.getInfo and album.getInfo fixtures with some latency: once looking
+every song up on its own, and once with one album.getInfo call per album.
+Reports the API calls and time each way.
+
+Usage:
+    python benchmarks/bench_album_enrichment.py [num_albums]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from controllers import song_controller  # noqa: E402
+from models.song import Song  # noqa: E402 - Import not at top of file
+from services import lastfm_api  # noqa: E402
+from services.rate_limiter import RateLimiter  # noqa: E402
+from services.standin_server import StandInServer  # noqa: E402
+from services.transport import Recording, request_key  # noqa: E402
+
+DEFAULT_SIZE = 40
+TRACKS_PER_ALBUM = 12
+RATE = 1000
+
+# The service modules log every request at DEBUG and every retry at WARNING
+logging.disable(logging.WARNING)
+
+
+def make_recording(num_albums, url):
+    recording = Recording()
+    songs = []
+    for i in range(num_albums):
+        artist, album = f"Artist {i % 15}", f"Album {i}"
+        tags = {"tag": [{"name": "rock", "count": 100}, {"name": f"tag{i % 7}"}]}
+        image = [{"#text": f"{url}/art/{i}.jpg"}]
+        tracks = []
+        for j in range(TRACKS_PER_ALBUM):
+            title = f"Track {i}-{j}"
+            recording.add_json(
+                request_key("/2.0/", {"method": "track.getInfo", "artist": artist,
+                                      "track": title, "format": "json"}),
+                {"track": {"name": title, "artist": {"name": artist},
+                           "album": {"title": album, "image": image},
+                           "duration": str(180000 + j * 1000), "toptags": tags}},
+            )
+            tracks.append({"name": title, "duration": 180 + j})
+            songs.append(Song(title, artist, album=album))
+        recording.add_json(
+            request_key("/2.0/", {"method": "album.getInfo", "artist": artist,
+                                  "album": album, "format": "json"}),
+            {"album": {"name": album, "artist": artist, "image": image,
+                       "tags": tags, "tracks": {"track": tracks}}},
+        )
+        recording.add(f"/art/{i}.jpg", 200, b"\xff\xd8\xff\xe0",
+                      {"Content-Type": "image/jpeg"})
+    return recording, songs
+
+
+def enrich(num_albums, batch_min):
+    """Queue the albums' songs in a fresh library and enrich them."""
+    with StandInServer(latency=0.02) as server, \
+            tempfile.TemporaryDirectory() as cache_dir, \
+            patch.dict(os.environ, {"API_KEY": "key", "API_SECRET": "secret",
+                                    "LASTFM_API_ROOT": server.api_root}), \
+            patch("controllers.song_controller.get_default_db_path",
+                  return_value=":memory:"), \
+            patch("controllers.song_controller.create_cache_directory",
+                  return_value=cache_dir), \
+            patch("services.lastfm_api.get_response_cache_path",
+                  return_value=":memory:"), \
+            patch.object(song_controller, "ALBUM_BATCH_MIN", batch_min):
+        server.recording, songs = make_recording(num_albums, server.url)
+        lastfm_api._client = None
+        lastfm_api._rate_limiter = RateLimiter(rate=RATE)
+        lastfm_api._track_infos.clear()
+        lastfm_api._album_infos.clear()
+        controller = song_controller.SongController()
+        for song in songs:
+            controller.save_song(song, enrich_later=True)
+
+        start = time.perf_counter()
+        enriched, pending = controller.enrich_pending_songs()
+        elapsed = time.perf_counter() - start
+        stats = server.get_stats()
+        controller.conn.close()
+        lastfm_api._client.close()
+        lastfm_api._client = None
+    assert (enriched, pending) == (len(songs), 0)
+    return stats["requests"], elapsed
+
+
+def main(num_albums):
+    print(f"{num_albums * TRACKS_PER_ALBUM:,} pending songs on {num_albums} "
+          f"albums of {TRACKS_PER_ALBUM}; 20 ms latency")
+    for label, batch_min in [("track by track", TRACKS_PER_ALBUM + 1),
+                             ("album by album", 2)]:
+        requests, elapsed = enrich(num_albums, batch_min)
+        print(f"{label:<18}{requests:>7,} requests{elapsed:>9.2f} s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
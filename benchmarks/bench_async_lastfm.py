@@ -0,0 +1,99 @@
+"""
+Benchmark for the asyncio Last.fm client.
+
+Serves track.getInfo responses with LATENCY seconds of delay, as a slow
+network would, and times looking up many tracks with LastFmClient from a
+pool of threads against AsyncLastFmClient from a single thread.
+
+Usage:
+    python benchmarks/bench_async_lastfm.py [num_lookups]
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.async_lastfm import AsyncLastFmClient  # noqa: E402
+from services.lastfm_api import LastFmClient  # noqa: E402
+
+DEFAULT_SIZE = 1000
+LATENCY = 0.05
+THREADS = 8
+CONCURRENCY = 64
+
+# The service modules log every request at DEBUG
+logging.disable(logging.WARNING)
+
+TRACK_INFO = json.dumps({"track": {
+    "name": "Lithium",
+    "album": {"title": "Nevermind", "image": [{"#text": "large.jpg"}]},
+    "duration": "257000",
+}}).encode()
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for every connection the client opens at once
+    request_queue_size = CONCURRENCY * 2
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(TRACK_INFO)))
+        self.end_headers()
+        self.wfile.write(TRACK_INFO)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def report(label, count, elapsed):
+    print(f"{label:<34}{elapsed:>8.2f} s{count / elapsed:>10.1f} lookups/s")
+
+
+def main(count):
+    server = StandInServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_root = f"http://127.0.0.1:{server.server_address[1]}/2.0/"
+    lookups = [("Nirvana", f"Lithium {i}") for i in range(count)]
+    print(f"{count:,} lookups, {LATENCY * 1000:.0f} ms server latency")
+
+    client = LastFmClient("key", api_root=api_root)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(lambda lookup: client.get_track_info(*lookup), lookups))
+    report(f"LastFmClient, {THREADS} threads", count, time.perf_counter() - start)
+    client.close()
+
+    async def run_async():
+        client = AsyncLastFmClient("key", api_root=api_root,
+                                   max_concurrency=CONCURRENCY)
+        start = time.perf_counter()
+        tracks = await client.get_tracks(lookups)
+        elapsed = time.perf_counter() - start
+        await client.close()
+        assert all(tracks)
+        return elapsed
+
+    report(f"AsyncLastFmClient, {CONCURRENCY} in flight", count,
+           asyncio.run(run_async()))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
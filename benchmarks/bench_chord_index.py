@@ -0,0 +1,79 @@
+"""
+Benchmark for the chord index.
+
+Fills a synthetic library with chord progressions in the notes, times the
+background analysis pass, and compares chord and progression lookups in the
+index with scanning every song's notes. Lookups resolve songs through the
+song cache, which the main window has loaded already.
+
+Usage:
+    python benchmarks/bench_chord_index.py [num_songs]
+"""
+
+import os
+import re
+import sys
+import time
+from unittest.mock import patch
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench_song_table import populate  # noqa: E402 - Import not at top of file
+from controllers.song_controller import SongController  # noqa: E402
+from models.chords import analyze_notes  # noqa: E402 - Import not at top of file
+
+DEFAULT_SIZE = 100_000
+PROGRESSIONS = [
+    "Verse: C G Am F\nChorus: F G C",
+    "Am F C G | Am F C G",
+    "Intro: Em7 G Dsus4 A7sus4",
+    "D A Bm G\nBridge: Em A",
+    "Verse: E A B7 E\nSolo: A E B7",
+    "Practice the riff slowly, then speed up",
+]
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<38}{(time.perf_counter() - start) * 1000:>10.1f} ms")
+    return result
+
+
+def main(count):
+    with patch("controllers.song_controller.get_default_db_path",
+               return_value=":memory:"):
+        controller = SongController()
+    populate(controller.cursor, count)
+    controller.cursor.execute(
+        "UPDATE songs SET notes = CASE rowid % 6 "
+        + " ".join(f"WHEN {i} THEN ?" for i in range(len(PROGRESSIONS)))
+        + " END",
+        PROGRESSIONS,
+    )
+    controller.conn.commit()
+    print(f"{count:,} songs")
+
+    timed("analyze all songs", lambda: controller.analyze_chords(limit=None))
+    timed("load song cache", controller.get_all_songs)
+    timed("chord Bm (index)", lambda: controller.find_songs_with_chord("Bm"))
+    timed("progression I-V-vi-IV (index)",
+          lambda: controller.find_songs_with_progression("I-V-vi-IV"))
+    timed("progression I-IV-V-I-IV-I (index)",
+          lambda: controller.find_songs_with_progression("I IV V I IV I"))
+
+    controller.cursor.execute("SELECT notes FROM songs")
+    notes = [row[0] for row in controller.cursor.fetchall()]
+    pattern = re.compile(r"(?<![\w#])Bm(?![\w#])")
+    timed("chord Bm (regex scan)",
+          lambda: [text for text in notes if pattern.search(text)])
+    timed("progression I-V-vi-IV (re-analyze)", lambda: [
+        text for text in notes
+        if ("I", "V", "vi", "IV") in analyze_notes(text).progressions
+    ])
+    controller.conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
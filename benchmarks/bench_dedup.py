@@ -0,0 +1,71 @@
+"""
+Benchmark for the near-duplicate finder.
+
+Builds a synthetic library in which a few percent of the songs were
+entered again with a version tag, different case or a typo, then times
+finding the duplicate groups and reports how many were recovered.
+
+Usage:
+    python benchmarks/bench_dedup.py [num_songs]
+"""
+
+import os
+import random
+import sys
+import time
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.dedup import find_duplicates  # noqa: E402 - Import not at top of file
+from models.song import Song  # noqa: E402 - Import not at top of file
+
+DEFAULT_SIZE = 100_000
+DUPLICATE_SHARE = 0.03
+SYLLABLES = ["ka", "ro", "mi", "zep", "lin", "sab", "bat", "dor", "ne", "vu", "tal"]
+TAGS = [" (Remastered 2011)", " - Live", " (feat. Someone)", ""]
+
+
+def make_word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def make_songs(count, rng):
+    artists = [f"{make_word(rng)} {make_word(rng)}" for _ in range(count // 20 + 1)]
+    return [
+        Song(" ".join(make_word(rng) for _ in range(rng.randint(2, 4))),
+             rng.choice(artists))
+        for _ in range(count)
+    ]
+
+
+def make_copy(song, rng):
+    """Enter a song again with a version tag, other case or a typo."""
+    title = song.title
+    if rng.random() < 0.5:
+        i = rng.randrange(1, len(title))
+        title = title[:i] + title[i + 1:]
+    return Song(rng.choice([title.upper(), title.title()]) + rng.choice(TAGS),
+                song.artist)
+
+
+def main(count):
+    rng = random.Random(0)
+    songs = make_songs(count, rng)
+    originals = rng.sample(songs, int(count * DUPLICATE_SHARE))
+    songs += [make_copy(song, rng) for song in originals]
+    print(f"{len(songs):,} songs, {len(originals):,} entered twice")
+
+    start = time.perf_counter()
+    groups = find_duplicates(songs)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{'find duplicates':<38}{elapsed:>10.1f} ms")
+
+    found = {id(song) for group in groups for song in group.songs}
+    recovered = sum(id(song) in found for song in originals)
+    print(f"{'groups':<38}{len(groups):>10,}")
+    print(f"{'originals recovered':<38}{recovered / len(originals):>10.0%}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
@@ -0,0 +1,65 @@
+"""
+Benchmark for the spaced-repetition due queue.
+
+Schedules every song of a synthetic library, with only a small share of
+them due, and times the due queue query. With the due_at index the time
+follows the number of due songs, not the library size.
+
+Usage:
+    python benchmarks/bench_due_queue.py [num_songs]
+"""
+
+import os
+import sys
+import time
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench_song_table import populate  # noqa: E402 - Import not at top of file
+from services.db import (  # noqa: E402 - Import not at top of file
+    count_due_songs,
+    get_due_songs,
+    initialize_db,
+)
+
+DEFAULT_SIZE = 1_000_000
+NOW = 1_000_000.0
+
+
+def schedule(cursor, due_every):
+    """Schedule every song, one in due_every of them already due."""
+    cursor.execute(
+        "INSERT INTO practice_schedule (title_key, artist_key, ease, interval_days, "
+        "repetitions, last_practiced, due_at) "
+        "SELECT title_key, artist_key, 2.5, 6, 2, 0, "
+        "CASE WHEN rowid % ? = 0 THEN ? - rowid ELSE ? + rowid END FROM songs",
+        (due_every, NOW, NOW),
+    )
+    cursor.connection.commit()
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<38}{(time.perf_counter() - start) * 1000:>10.1f} ms")
+    return result
+
+
+def main(count):
+    conn, cursor = initialize_db(":memory:")
+    populate(cursor, count)
+    print(f"{count:,} songs")
+    timed("full library load, for comparison", lambda: cursor.execute(
+        "SELECT * FROM songs").fetchall())
+    for due_every in (10_000, 1_000, 100):
+        cursor.execute("DELETE FROM practice_schedule")
+        schedule(cursor, due_every)
+        due = timed(f"due queue, 1 in {due_every:,} due",
+                    lambda: get_due_songs(cursor, NOW))
+        timed(f"count, {len(due):,} due", lambda: count_due_songs(cursor, NOW))
+    conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
@@ -0,0 +1,156 @@
+"""
+Benchmark for enriching songs from Last.fm, offline.
+
+Serves synthetic track.getInfo fixtures from a StandInServer with latency,
+jitter, server errors and 429 bursts, then enriches the tracks three ways
+while a Qt timer ticks every TICK_MS milliseconds:
+
+- one lookup after another on the Qt thread, as adding songs does;
+- from a pool of threads with LastFmClient;
+- with AsyncLastFmClient through an AsyncBridge.
+
+Reports lookups per second and the longest gap between timer ticks, which
+is how long the UI would have been frozen. The fault pattern is seeded,
+so runs are comparable.
+
+Usage:
+    python benchmarks/bench_enrichment.py [num_tracks]
+"""
+
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtCore import QCoreApplication, QEventLoop, QTimer
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.async_bridge import AsyncBridge  # noqa: E402
+from services.async_lastfm import AsyncLastFmClient  # noqa: E402
+from services.lastfm_api import LastFmClient  # noqa: E402
+from services.rate_limiter import RateLimiter  # noqa: E402
+from services.standin_server import StandInServer  # noqa: E402
+from services.transport import Recording, request_key  # noqa: E402
+
+DEFAULT_SIZE = 500
+UI_THREAD_SIZE = 50
+THREADS = 8
+CONCURRENCY = 32
+TICK_MS = 10
+RATE = 300
+
+# The service modules log every request at DEBUG and every retry at WARNING
+logging.disable(logging.WARNING)
+
+
+def make_recording(count):
+    recording = Recording()
+    lookups = []
+    for i in range(count):
+        artist, track = f"Artist {i % 50}", f"Track {i}"
+        recording.add_json(
+            request_key("/2.0/", {"method": "track.getInfo", "artist": artist,
+                                  "track": track, "format": "json"}),
+            {"track": {
+                "name": track,
+                "artist": {"name": artist},
+                "album": {"title": f"Album {i % 80}",
+                          "image": [{"#text": f"https://img/{i}.jpg"}]},
+                "duration": str(180000 + i),
+                "toptags": {"tag": [{"name": "rock"}, {"name": f"tag{i % 7}"}]},
+            }},
+        )
+        lookups.append((artist, track))
+    return recording, lookups
+
+
+class TickMonitor:
+    """Measures the longest gap between ticks of a Qt timer"""
+
+    def __init__(self):
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.tick)
+        self.last = None
+        self.longest = 0.0
+
+    def tick(self):
+        now = time.perf_counter()
+        if self.last is not None:
+            self.longest = max(self.longest, now - self.last)
+        self.last = now
+
+    def __enter__(self):
+        self.last = time.perf_counter()
+        self.timer.start(TICK_MS)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tick()
+        self.timer.stop()
+
+
+def report(label, count, elapsed, monitor):
+    print(f"{label:<28}{count / elapsed:>9.1f} lookups/s"
+          f"{monitor.longest * 1000:>10.0f} ms longest UI stall")
+
+
+def main(count):
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    recording, lookups = make_recording(count)
+    server = StandInServer(recording, latency=0.03, jitter=0.02, error_rate=0.02,
+                           burst_every=3.0, burst_length=0.3, seed=0).start()
+    print(f"{count:,} tracks; 30-50 ms latency, 2% errors, "
+          f"0.3 s of 429s every 3 s")
+
+    def drain():
+        # Let queued timer ticks run, so a blocked stretch shows as a gap
+        app.processEvents(QEventLoop.ProcessEventsFlag.AllEvents, 50)
+
+    client = LastFmClient("key", api_root=server.api_root,
+                          rate_limiter=RateLimiter(rate=RATE))
+    subset = lookups[:UI_THREAD_SIZE]
+    with TickMonitor() as monitor:
+        start = time.perf_counter()
+        for artist, track in subset:
+            client.get_track_info(artist, track)
+            drain()
+        elapsed = time.perf_counter() - start
+    report("on the Qt thread", len(subset), elapsed, monitor)
+
+    with TickMonitor() as monitor:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(THREADS) as pool:
+            futures = [pool.submit(client.get_track_info, *lookup)
+                       for lookup in lookups]
+            while not all(future.done() for future in futures):
+                drain()
+        elapsed = time.perf_counter() - start
+    report(f"{THREADS} threads", count, elapsed, monitor)
+    client.close()
+
+    bridge = AsyncBridge()
+    async_client = AsyncLastFmClient(
+        "key", api_root=server.api_root, max_concurrency=CONCURRENCY,
+        rate_limiter=RateLimiter(rate=RATE),
+    )
+    results = []
+    with TickMonitor() as monitor:
+        start = time.perf_counter()
+        bridge.submit(async_client.get_tracks(lookups), results.append)
+        while not results:
+            drain()
+        elapsed = time.perf_counter() - start
+    report(f"async, {CONCURRENCY} in flight", count, elapsed, monitor)
+    print(f"found {sum(1 for track in results[0] if track):,} of {count:,}; "
+          f"server: {server.get_stats()}")
+
+    bridge.submit(async_client.close()).result()
+    bridge.close()
+    server.stop()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
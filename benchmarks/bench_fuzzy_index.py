@@ -0,0 +1,81 @@
+"""
+Benchmark for the typo-tolerant song finder.
+
+Builds the BK-tree index over a synthetic library and times misspelled
+lookups, with and without the per-query time limit.
+
+Usage:
+    python benchmarks/bench_fuzzy_index.py [num_songs]
+"""
+
+import os
+import random
+import sys
+import time
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.fuzzy_index import FuzzySongIndex  # noqa: E402
+from models.song import Song  # noqa: E402 - Import not at top of file
+
+DEFAULT_SIZE = 50_000
+SYLLABLES = ["ka", "ro", "mi", "zep", "lin", "sab", "bat", "dor", "ne", "vu", "tal"]
+
+
+def make_word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def make_songs(count, rng):
+    artists = [f"{make_word(rng)} {make_word(rng)}" for _ in range(count // 20 + 1)]
+    return [
+        Song(" ".join(make_word(rng) for _ in range(rng.randint(1, 3))),
+             rng.choice(artists), library="main")
+        for _ in range(count)
+    ]
+
+
+def misspell(text, rng):
+    """Drop one character from the longest word."""
+    words = text.split()
+    longest = max(range(len(words)), key=lambda i: len(words[i]))
+    word = words[longest]
+    i = rng.randrange(len(word))
+    words[longest] = word[:i] + word[i + 1:]
+    return " ".join(words)
+
+
+def run_queries(index, queries, time_limit):
+    latencies = []
+    found = 0
+    for song, artist, title in queries:
+        start = time.perf_counter()
+        matches = index.search(artist=artist, title=title, time_limit=time_limit)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found += any(match is song for _, match in matches)
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[-1], found / len(queries)
+
+
+def main(count):
+    rng = random.Random(0)
+    songs = make_songs(count, rng)
+    print(f"{count:,} songs")
+
+    start = time.perf_counter()
+    index = FuzzySongIndex(songs)
+    print(f"{'build index':<38}{(time.perf_counter() - start) * 1000:>10.1f} ms")
+
+    queries = [
+        (song, misspell(song.artist_key, rng), misspell(song.title_key, rng))
+        for song in rng.sample(songs, 200)
+    ]
+    for time_limit in (10.0, 0.05, 0.01):
+        median, worst, recall = run_queries(index, queries, time_limit)
+        print(f"{f'limit {time_limit * 1000:g} ms: median / max':<38}"
+              f"{median:>10.1f} ms {worst:>8.1f} ms, found {recall:.0%} in top 5")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
@@ -0,0 +1,86 @@
+"""
+Benchmark for the pooled Last.fm client.
+
+Serves canned track.getInfo responses from a local HTTP/1.1 server that
+keeps connections alive, then times track lookups made with a new
+connection per request, as plain requests.get does, against lookups
+through LastFmClient's pooled session.
+
+Usage:
+    python benchmarks/bench_lastfm_client.py [num_requests]
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.lastfm_api import LastFmClient  # noqa: E402
+
+DEFAULT_SIZE = 500
+
+# The service module logs every request at DEBUG
+logging.disable(logging.WARNING)
+
+TRACK_INFO = json.dumps({"track": {
+    "name": "Lithium",
+    "album": {"title": "Nevermind", "image": [{"#text": "large.jpg"}]},
+    "duration": "257000",
+    "toptags": {"tag": [{"name": "grunge"}, {"name": "90s"}]},
+}}).encode()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes, which Nagle's algorithm
+    # would hold back for a delayed ACK on a kept-alive connection
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(TRACK_INFO)))
+        self.end_headers()
+        self.wfile.write(TRACK_INFO)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def timed(label, count, func):
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    per_request = (time.perf_counter() - start) * 1000 / count
+    print(f"{label:<38}{per_request:>10.3f} ms/request")
+    return per_request
+
+
+def main(count):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_root = f"http://127.0.0.1:{server.server_address[1]}/2.0/"
+    params = {"method": "track.getInfo", "artist": "Nirvana", "track": "Lithium",
+              "api_key": "key", "format": "json"}
+    print(f"{count:,} track.getInfo requests against {api_root}")
+
+    fresh = timed("new connection per request", count,
+                  lambda: requests.get(api_root, params=params, timeout=5).json())
+    client = LastFmClient("key", api_root=api_root)
+    pooled = timed("LastFmClient (pooled)", count,
+                   lambda: client.get_track_info("Nirvana", "Lithium"))
+    print(f"{'saved per request':<38}{fresh - pooled:>10.3f} ms")
+    client.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
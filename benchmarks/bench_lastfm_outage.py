@@ -0,0 +1,116 @@
+"""
+Benchmark for adding songs while Last.fm misbehaves, offline.
+
+Adds songs through SongController the way the add song dialog does, in
+two situations:
+
+- a misspelled song added again and again, against a StandInServer that
+  answers "not found";
+- a Last.fm outage, against a server that accepts connections but never
+  answers, so every request runs into the client timeout.
+
+Reports how long each add blocked and how many requests reached the
+server. "unbounded" is how adding songs behaved before: no lookup budget,
+no circuit breaker and no caching of "not found" answers.
+
+Usage:
+    python benchmarks/bench_lastfm_outage.py [num_adds]
+"""
+
+import logging
+import os
+import socket
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from unittest.mock import patch
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from controllers import song_controller  # noqa: E402
+from models.song import Song  # noqa: E402 - Import not at top of file
+from services import lastfm_api  # noqa: E402
+from services.circuit_breaker import CircuitBreaker  # noqa: E402
+from services.standin_server import StandInServer  # noqa: E402
+
+DEFAULT_SIZE = 20
+# Adds timed without the safeguards during the outage, each taking ~20 s
+UNBOUNDED_OUTAGE_ADDS = 1
+
+# The service modules log every request at DEBUG and every retry at WARNING
+logging.disable(logging.CRITICAL)
+
+
+def add_songs(api_root, songs, bounded, count_requests=None):
+    """
+    Add songs to a fresh library.
+
+    Returns:
+        tuple: (seconds each add took, requests the server received, or
+        None without count_requests).
+    """
+    with ExitStack() as stack:
+        cache_dir = stack.enter_context(tempfile.TemporaryDirectory())
+        stack.enter_context(patch.dict(os.environ, {
+            "API_KEY": "key", "API_SECRET": "secret", "LASTFM_API_ROOT": api_root,
+        }))
+        stack.enter_context(patch("controllers.song_controller.get_default_db_path",
+                                  return_value=":memory:"))
+        stack.enter_context(patch(
+            "controllers.song_controller.create_cache_directory",
+            return_value=cache_dir,
+        ))
+        stack.enter_context(patch("services.lastfm_api.get_response_cache_path",
+                                  return_value=":memory:"))
+        if not bounded:
+            stack.enter_context(patch.object(song_controller, "LOOKUP_BUDGET", 3600))
+            stack.enter_context(patch.object(lastfm_api, "NOT_FOUND_TTL", 0))
+        lastfm_api._client = None
+        lastfm_api._track_infos.clear()
+        lastfm_api._circuit_breaker = (
+            CircuitBreaker() if bounded else CircuitBreaker(failure_threshold=10**9)
+        )
+
+        before = count_requests() if count_requests else None
+        controller = song_controller.SongController()
+        latencies = []
+        for song in songs:
+            start = time.perf_counter()
+            controller.save_song(Song(song.title, song.artist))
+            latencies.append(time.perf_counter() - start)
+        requests = count_requests() - before if count_requests else None
+        controller.conn.close()
+        controller._lookups.shutdown(wait=False, cancel_futures=True)
+        lastfm_api._client = None
+    return latencies, requests
+
+
+def report(label, latencies, requests):
+    requests = "-" if requests is None else f"{requests:,}"
+    print(f"  {label:<12}{len(latencies):>4} adds{requests:>7} requests"
+          f"{max(latencies):>9.2f} s slowest{sum(latencies) / len(latencies):>9.2f}"
+          f" s mean")
+
+
+def main(count):
+    misspelled = [Song("Smells Like Teen Sprit", "Nirvana")] * count
+    print("Misspelled song, 20 ms latency")
+    with StandInServer(latency=0.02) as server:
+        for label, bounded in [("unbounded", False), ("bounded", True)]:
+            report(label, *add_songs(server.api_root, misspelled, bounded,
+                                     lambda: server.get_stats()["requests"]))
+
+    songs = [Song(f"Track {i}", f"Artist {i}") for i in range(count)]
+    silent = socket.create_server(("127.0.0.1", 0), backlog=128)
+    api_root = f"http://127.0.0.1:{silent.getsockname()[1]}/2.0/"
+    print("Last.fm not answering")
+    for label, bounded, adds in [("unbounded", False, UNBOUNDED_OUTAGE_ADDS),
+                                 ("bounded", True, count)]:
+        report(label, *add_songs(api_root, songs[:adds], bounded))
+    silent.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
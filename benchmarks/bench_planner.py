@@ -0,0 +1,61 @@
+"""
+Benchmark for the practice planner.
+
+Times planning a session over candidate pools of growing size, reporting
+whether the exact solver finished within its time limit and how the plan
+compares to the greedy one.
+
+Usage:
+    python benchmarks/bench_planner.py [minutes]
+"""
+
+import os
+import random
+import sys
+import time
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.planner import plan_practice, song_value  # noqa: E402
+from models.song import Song  # noqa: E402 - Import not at top of file
+
+DEFAULT_MINUTES = 45
+POOL_SIZES = [50, 200, 1000, 5000, 20000]
+TUNINGS = ["E Standard", "Drop D", "Eb Standard", "Open G", "DADGAD", "Drop C"]
+PROGRESS = ["Not Started", "Learning", "Mastered"]
+
+
+def make_pool(size, rng):
+    return [
+        Song(f"song {i}", f"artist {i % 300}", tuning=rng.choice(TUNINGS),
+             duration=str(rng.randint(120, 420) * 1000),
+             progress=rng.choice(PROGRESS))
+        for i in range(size)
+    ]
+
+
+def plan_value(plan, due):
+    return sum(song_value(s, (s.title_key, s.artist_key) in due) for s in plan.songs)
+
+
+def main(minutes):
+    rng = random.Random(0)
+    print(f"{minutes} minute sessions")
+    for size in POOL_SIZES:
+        pool = make_pool(size, rng)
+        due = {(s.title_key, s.artist_key) for s in rng.sample(pool, size // 10)}
+
+        start = time.perf_counter()
+        plan = plan_practice(pool, minutes * 60, due, time_limit=10.0)
+        elapsed = (time.perf_counter() - start) * 1000
+        greedy = plan_practice(pool, minutes * 60, due, time_limit=0)
+        print(f"{size:>6} candidates: {elapsed:>8.1f} ms "
+              f"{'exact ' if plan.optimal else 'greedy'} "
+              f"value {plan_value(plan, due):>5.1f} (greedy "
+              f"{plan_value(greedy, due):>5.1f}), {len(plan.songs)} songs, "
+              f"{plan.tuning_changes} retunes")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_MINUTES)
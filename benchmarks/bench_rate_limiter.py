@@ -0,0 +1,150 @@
+"""
+Benchmark for the Last.fm rate limiter.
+
+Runs a local stand-in for the API that allows SERVER_RATE requests per
+second and SERVER_CONCURRENCY at once, answering anything beyond that with
+a 429 and a Retry-After header, or with Last.fm's error 29 in the body.
+Many worker threads then look up tracks through LastFmClient, first with no
+rate limiting, relying on retries alone, then through a shared
+RateLimiter, and the throughput and pushback of both are compared.
+
+Usage:
+    python benchmarks/bench_rate_limiter.py [num_requests]
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.lastfm_api import LastFmClient  # noqa: E402
+from services.rate_limiter import RateLimiter  # noqa: E402
+
+DEFAULT_SIZE = 300
+WORKERS = 16
+SERVER_RATE = 100
+SERVER_CONCURRENCY = 6
+LATENCY = 0.02
+
+# The service module logs every request at DEBUG and every retry at WARNING
+logging.disable(logging.WARNING)
+
+TRACK_INFO = json.dumps({"track": {
+    "name": "Lithium",
+    "album": {"title": "Nevermind", "image": [{"#text": "large.jpg"}]},
+    "duration": "257000",
+}}).encode()
+RATE_LIMITED = json.dumps({"error": 29, "message": "Rate limit exceeded"}).encode()
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler):
+        super().__init__(address, handler)
+        self.lock = threading.Lock()
+        self.recent = deque()
+        self.in_flight = 0
+        self.rejected = 0
+
+    def admit(self):
+        """Count a request against the server's limits, False if over them."""
+        now = time.monotonic()
+        with self.lock:
+            while self.recent and now - self.recent[0] > 1.0:
+                self.recent.popleft()
+            if len(self.recent) >= SERVER_RATE or self.in_flight >= SERVER_CONCURRENCY:
+                self.rejected += 1
+                return False
+            self.recent.append(now)
+            self.in_flight += 1
+            return True
+
+    def done(self):
+        with self.lock:
+            self.in_flight -= 1
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if not self.server.admit():
+            # Alternate between the two ways Last.fm signals a rate limit
+            if self.server.rejected % 2:
+                self.reply(429, b"", {"Retry-After": "0.2"})
+            else:
+                self.reply(200, RATE_LIMITED)
+            return
+        time.sleep(LATENCY)
+        self.server.done()
+        self.reply(200, TRACK_INFO)
+
+    def reply(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run(label, count, server, rate_limiter):
+    api_root = f"http://127.0.0.1:{server.server_address[1]}/2.0/"
+    rejected = server.rejected
+    client = LastFmClient("key", api_root=api_root, max_retries=8,
+                          backoff=0.05, rate_limiter=rate_limiter)
+
+    def lookup(i):
+        try:
+            result = client.call("track.getInfo", artist="Nirvana",
+                                 track=f"Lithium {i}")
+        except requests.exceptions.RequestException:
+            return False
+        return "error" not in result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(WORKERS) as pool:
+        ok = sum(pool.map(lookup, range(count)))
+    elapsed = time.perf_counter() - start
+    client.close()
+    print(f"{label:<26}{ok / elapsed:>10.1f} req/s{ok:>8}/{count} ok"
+          f"{server.rejected - rejected:>8} rejected"
+          f"{client.retries:>8} retries")
+
+
+def main(count):
+    server = StandInServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"{count:,} lookups from {WORKERS} threads; server allows "
+          f"{SERVER_RATE} req/s, {SERVER_CONCURRENCY} at once")
+
+    run("retries only", count, server, None)
+    time.sleep(1.0)
+    limiter = RateLimiter(rate=SERVER_RATE * 0.9, burst=SERVER_CONCURRENCY)
+    run("shared rate limiter", count, server, limiter)
+    stats = limiter.get_stats()
+    print(f"limiter: concurrency limit {stats['concurrency_limit']}, "
+          f"peak in flight {stats['peak_in_flight']}, "
+          f"{stats['overloaded']} overloaded, "
+          f"{stats['wait_seconds']:.1f}s waited")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
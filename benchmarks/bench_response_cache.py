@@ -0,0 +1,67 @@
+"""
+Benchmark for the on-disk Last.fm response cache.
+
+Fills a cache file with synthetic track.getInfo responses and times
+lookups that hit, lookups that miss and inserts that evict.
+
+Usage:
+    python benchmarks/bench_response_cache.py [num_entries]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.response_cache import ResponseCache  # noqa: E402
+
+DEFAULT_SIZE = 10_000
+LOOKUPS = 5_000
+
+logging.disable(logging.WARNING)
+
+
+def track_info(i):
+    return {"track": {
+        "name": f"track {i}",
+        "album": {"title": f"album {i % 1000}",
+                  "image": [{"#text": f"https://img/{i}.jpg"}]},
+        "duration": str(200000 + i),
+        "toptags": {"tag": [{"name": f"tag {i % 50}"}, {"name": "rock"}]},
+    }}
+
+
+def per_call(label, count, func):
+    start = time.perf_counter()
+    for i in range(count):
+        func(i)
+    micros = (time.perf_counter() - start) * 1e6 / count
+    print(f"{label:<38}{micros:>10.1f} us/call")
+
+
+def main(count):
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResponseCache(os.path.join(directory, "cache.db"), max_entries=count)
+        start = time.perf_counter()
+        for i in range(count):
+            cache.put("track.getInfo", f"artist {i % 2000}", f"track {i}",
+                      track_info(i))
+        print(f"{count:,} cached responses, filled in "
+              f"{(time.perf_counter() - start) * 1000:.0f} ms")
+
+        per_call("hit", LOOKUPS, lambda i: cache.get(
+            "track.getInfo", f"Artist {i % 2000}", f"Track {i}"))
+        per_call("miss", LOOKUPS, lambda i: cache.get(
+            "track.getInfo", "nobody", f"track {i}"))
+        per_call("insert with eviction", LOOKUPS, lambda i: cache.put(
+            "track.getInfo", "new artist", f"track {i}", track_info(i)))
+        print(cache.get_stats())
+        cache.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
@@ -0,0 +1,58 @@
+"""
+Benchmark for picking random practice sets.
+
+Uses a controller over a synthetic library and times the first draw for a
+filter (filter mask and alias table) and the draws after it, which only
+cost the number of songs picked.
+
+Usage:
+    python benchmarks/bench_sampler.py [num_songs]
+"""
+
+import os
+import sys
+import time
+from unittest.mock import patch
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench_song_table import populate  # noqa: E402 - Import not at top of file
+from controllers.song_controller import SongController  # noqa: E402
+
+DEFAULT_SIZE = 1_000_000
+NUM_SONGS = 10
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<38}{(time.perf_counter() - start) * 1000:>10.1f} ms")
+    return result
+
+
+def main(count):
+    with patch("controllers.song_controller.get_default_db_path",
+               return_value=":memory:"):
+        controller = SongController()
+    populate(controller.cursor, count)
+    controller.set_random_seed(0)
+    print(f"{count:,} songs, {NUM_SONGS} per set")
+
+    timed("build song table", controller.get_song_table)
+    for weighting in ("uniform", "progress", "tuning"):
+        timed(f"{weighting}: first set", lambda: controller.sample_songs(
+            NUM_SONGS, weighting=weighting))
+        timed(f"{weighting}: next 100 sets", lambda: [
+            controller.sample_songs(NUM_SONGS, weighting=weighting)
+            for _ in range(100)])
+    timed("filtered (mastered out): first set", lambda: controller.sample_songs(
+        NUM_SONGS, exclude_mastered=True, tunings={"Drop D"}))
+    timed("filtered: next 100 sets", lambda: [
+        controller.sample_songs(NUM_SONGS, exclude_mastered=True, tunings={"Drop D"})
+        for _ in range(100)])
+    controller.conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
@@ -0,0 +1,98 @@
+"""
+Benchmark for coalescing identical Last.fm lookups.
+
+Looks up a few popular tracks many times at once, as the add dialog,
+prefetch and a bulk refresh would, against a stand-in server with LATENCY
+seconds of delay. Compares every lookup making its own request with
+lookups going through the client's single-flight layer, and reports the
+requests each made.
+
+Usage:
+    python benchmarks/bench_single_flight.py [num_lookups]
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.async_lastfm import AsyncLastFmClient  # noqa: E402
+
+DEFAULT_SIZE = 1000
+DISTINCT_TRACKS = 25
+LATENCY = 0.05
+CONCURRENCY = 32
+
+# The service modules log every request at DEBUG
+logging.disable(logging.WARNING)
+
+TRACK_INFO = json.dumps({"track": {
+    "name": "Lithium",
+    "album": {"title": "Nevermind", "image": [{"#text": "large.jpg"}]},
+    "duration": "257000",
+}}).encode()
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for every connection the client opens at once
+    request_queue_size = CONCURRENCY * 2
+    requests = 0
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.server.requests += 1
+        time.sleep(LATENCY)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(TRACK_INFO)))
+        self.end_headers()
+        self.wfile.write(TRACK_INFO)
+
+    def log_message(self, format, *args):
+        pass
+
+
+async def run(label, server, lookups, coalesce):
+    client = AsyncLastFmClient(
+        "key", api_root=f"http://127.0.0.1:{server.server_address[1]}/2.0/",
+        max_concurrency=CONCURRENCY,
+    )
+    # Without coalescing, each lookup fetches for itself
+    lookup = client.get_track_info if coalesce else client._fetch_track_info
+    requests_before = server.requests
+    start = time.perf_counter()
+    await asyncio.gather(*(lookup(artist, track) for artist, track in lookups))
+    elapsed = time.perf_counter() - start
+    await client.close()
+    print(f"{label:<20}{elapsed:>8.2f} s{server.requests - requests_before:>8} "
+          f"requests")
+    return client.single_flight.get_stats()
+
+
+def main(count):
+    server = StandInServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    lookups = [("Nirvana", f"Lithium {i % DISTINCT_TRACKS}") for i in range(count)]
+    print(f"{count:,} lookups of {DISTINCT_TRACKS} tracks, "
+          f"{LATENCY * 1000:.0f} ms server latency")
+
+    asyncio.run(run("request per lookup", server, lookups, coalesce=False))
+    stats = asyncio.run(run("single flight", server, lookups, coalesce=True))
+    print(f"calls saved: {stats['saved']:,} of {count:,}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
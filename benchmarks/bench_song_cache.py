@@ -0,0 +1,101 @@
+"""
+Benchmark for the SongController song cache.
+
+Replays typical UI action sequences (start up, add, edit and delete songs
+with a list refresh after each, type into the search box) against a
+synthetic library, once with the controller's write-through cache and once
+reloading every song from SQLite the way the controller used to.
+
+Usage:
+    python benchmarks/bench_song_cache.py [num_songs]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from controllers.song_controller import SongController  # noqa: E402
+from models.song import Song  # noqa: E402 - Import not at top of file
+from services.db import LIBRARY_VIEW, load_songs  # noqa: E402
+
+DEFAULT_SIZE = 20_000
+SEARCH_TEXT = "artist 12"
+
+
+def populate(cursor, count):
+    """Insert synthetic songs. Values are lowercase and double as keys."""
+    rows = []
+    for i in range(count):
+        title, artist, album = f"title {i}", f"artist {i % 500}", f"album {i % 2000}"
+        rows.append((title, artist, "E Standard", "", album, "200000", "rock",
+                     "Learning", title, artist, album, title, artist, album))
+    cursor.executemany(
+        "INSERT INTO songs (title, artist, tuning, notes, album, duration, genres, "
+        "progress, title_key, artist_key, album_key, display_title, display_artist, "
+        "display_album) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    cursor.connection.commit()
+
+
+def ui_session(controller, get_all_songs, search):
+    """One UI session: every action is followed by the list refresh it triggers."""
+    get_all_songs()
+    for i in range(10):
+        controller.save_song(Song(f"new song {i}", "new artist"), is_custom=True)
+        get_all_songs()
+    for i in range(10):
+        song = controller.get_song(f"title {i}", f"artist {i}")
+        song.notes = "practice slowly"
+        controller.update_song_info(song)
+        get_all_songs()
+    for i in range(10):
+        controller.delete_song(f"new song {i}", "new artist")
+        get_all_songs()
+    for end in range(1, len(SEARCH_TEXT) + 1):
+        search(SEARCH_TEXT[:end])
+    get_all_songs()
+
+
+def reload_and_search(cursor, search_text):
+    """Search by reloading every song, the way the controller used to."""
+    search_text = search_text.lower()
+    return [song for song in load_songs(cursor, LIBRARY_VIEW)
+            if search_text in song.title or search_text in song.artist]
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    func()
+    print(f"{label:<38}{(time.perf_counter() - start) * 1000:>10.1f} ms")
+
+
+def main(count):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "songs.db")
+        with patch("controllers.song_controller.get_default_db_path",
+                   return_value=db_path):
+            controller = SongController()
+        populate(controller.cursor, count)
+        print(f"{count:,} songs")
+
+        cursor = controller.cursor
+        timed("session, reload on every refresh", lambda: ui_session(
+            controller,
+            lambda: load_songs(cursor, LIBRARY_VIEW),
+            lambda text: reload_and_search(cursor, text),
+        ))
+        timed("session, write-through cache", lambda: ui_session(
+            controller, controller.get_all_songs, controller.search_songs))
+        stats = controller.get_cache_stats()
+        print(f"cache hits {stats['hits']}, misses {stats['misses']}")
+        controller.conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
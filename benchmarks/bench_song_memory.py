@@ -0,0 +1,108 @@
+"""
+Memory benchmark for the Song model.
+
+Compares the slotted Song (with lazily decoded genres) and its frozen variant
+against the previous dict-based Song class when building the list that
+load_songs returns.
+
+Usage:
+    python benchmarks/bench_song_memory.py [num_rows ...]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.song import Song  # noqa: E402 - Import not at top of file
+
+DEFAULT_SIZES = [10_000, 100_000]
+
+
+class LegacySong:
+    """The Song class as it was before __slots__ and lazy genres."""
+
+    PROGRESS_STATES = ["Not Started", "Learning", "Mastered"]
+
+    def __init__(self, title, artist, tuning=None, notes=None, album=None,
+                 duration=None, genres="", progress="Not Started", library=None):
+        self.title = title
+        self.artist = artist
+        self.tuning = tuning
+        self.notes = notes
+        self.album = album
+        self.duration = duration
+        self.genres = genres if genres is not None else []
+        if progress not in self.PROGRESS_STATES:
+            progress = "Not Started"
+        self.progress = progress
+        self.library = library
+
+
+def make_rows(count):
+    """Build rows shaped like the ones load_songs fetches."""
+    return [
+        (
+            f"title {i}",
+            f"artist {i % 5000}",
+            "E Standard" if i % 3 else "Drop D",
+            "Verse: Am F C G",
+            f"album {i % 20000}",
+            str(180000 + i % 60000),
+            "rock, classic rock, hard rock, blues rock, 70s",
+            Song.PROGRESS_STATES[i % 3],
+            "main",
+        )
+        for i in range(count)
+    ]
+
+
+def build_legacy(rows):
+    return [
+        LegacySong(r[0], r[1], r[2], r[3], r[4], r[5], r[6].split(", "), r[7], r[8])
+        for r in rows
+    ]
+
+
+def build_slotted(rows):
+    return [Song(r[0], r[1], r[2], r[3], r[4], r[5], r[6], r[7], r[8]) for r in rows]
+
+
+def build_frozen(rows):
+    return [song.freeze() for song in build_slotted(rows)]
+
+
+def measure(builder, rows):
+    """Return (retained bytes, peak bytes, seconds) for building the list."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    songs = builder(rows)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del songs
+    return current, peak, elapsed
+
+
+def main(sizes):
+    builders = [
+        ("legacy Song", build_legacy),
+        ("slotted Song", build_slotted),
+        ("FrozenSong", build_frozen),
+    ]
+    for count in sizes:
+        rows = make_rows(count)
+        print(f"\n{count:,} rows")
+        print(f"{'variant':<14}{'retained MiB':>14}{'peak MiB':>12}"
+              f"{'bytes/song':>12}{'seconds':>10}")
+        for name, builder in builders:
+            current, peak, elapsed = measure(builder, rows)
+            print(f"{name:<14}{current / 2**20:>14.2f}{peak / 2**20:>12.2f}"
+                  f"{current / count:>12.0f}{elapsed:>10.3f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,85 @@
+"""
+Benchmark for the columnar SongTable.
+
+Builds a synthetic library in an in-memory database and times building the
+table, the statistics used by the Statistics dialog and the filters used by
+the Select Songs dialog.
+
+Usage:
+    python benchmarks/bench_song_table.py [num_songs]
+"""
+
+import os
+import sys
+import time
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.song_table import SongTable  # noqa: E402 - Import not at top of file
+from services.db import (  # noqa: E402 - Import not at top of file
+    LIBRARY_VIEW,
+    create_library_view,
+    initialize_db,
+)
+
+DEFAULT_SIZE = 1_000_000
+TUNINGS = ["E Standard", "Drop D", "Eb Standard", "Open G", "DADGAD", "Drop C"]
+GENRES = ["rock", "blues", "metal", "folk", "jazz", "punk", "grunge", "indie"]
+
+
+def populate(cursor, count):
+    """Insert synthetic songs. Values are lowercase and double as keys."""
+    rows = []
+    for i in range(count):
+        title, artist, album = f"title {i}", f"artist {i % 20000}", f"album {i % 80000}"
+        rows.append((
+            title,
+            artist,
+            TUNINGS[i % len(TUNINGS)],
+            "",
+            album,
+            str(150000 + i % 200000),
+            ", ".join(GENRES[(i + k) % len(GENRES)] for k in range(i % 4)),
+            ("Not Started", "Learning", "Mastered")[i % 3],
+            title, artist, album, title, artist, album,
+        ))
+    cursor.executemany(
+        "INSERT INTO songs (title, artist, tuning, notes, album, duration, genres, "
+        "progress, title_key, artist_key, album_key, display_title, display_artist, "
+        "display_album) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    cursor.connection.commit()
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<38}{(time.perf_counter() - start) * 1000:>10.1f} ms")
+    return result
+
+
+def main(count):
+    conn, cursor = initialize_db(":memory:")
+    populate(cursor, count)
+    create_library_view(cursor, ["main"])
+    print(f"{count:,} songs")
+
+    table = timed("build table (one query)", lambda: SongTable.from_cursor(
+        cursor, LIBRARY_VIEW))
+    timed("progress stats", table.progress_counts)
+    timed("tuning stats", table.tuning_counts)
+    timed("genre stats", table.genre_counts)
+    timed("filter artist substring", lambda: table.filter(artist="artist 19"))
+    timed("filter title substring", lambda: table.filter(title="title 99999"))
+    timed("filter genre + tunings + mastered", lambda: table.filter(
+        genre="blues", tunings={"Drop D", "Open G"}, exclude_mastered=True))
+    mask = table.filter(album="album 7", exclude_mastered=True)
+    timed(f"materialize {min(1000, mask.sum())} songs",
+          lambda: table.to_songs(mask.nonzero()[0][:1000]))
+    conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
@@ -0,0 +1,65 @@
+"""
+Benchmark for tag-based song similarity.
+
+Builds a TagMatrix over synthetic songs with Zipf-distributed tags, like
+Last.fm's where a few tags (rock, pop) are on most songs, and times
+similar-song and recommendation queries and incremental updates.
+
+Usage:
+    python benchmarks/bench_tag_similarity.py [num_songs]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.tag_vectors import TagMatrix  # noqa: E402 - Import not at top of file
+
+DEFAULT_SIZE = 100_000
+NUM_TAGS = 5_000
+TAGS_PER_SONG = 8
+NUM_SEEDS = 500
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<38}{(time.perf_counter() - start) * 1000:>10.1f} ms")
+    return result
+
+
+def synthetic_tags(count):
+    rng = np.random.default_rng(0)
+    tags = np.minimum(rng.zipf(1.3, size=(count, TAGS_PER_SONG)), NUM_TAGS)
+    weights = rng.integers(1, 101, size=(count, TAGS_PER_SONG))
+    return [
+        {f"tag {tag}": float(weight) for tag, weight in zip(row, row_weights)}
+        for row, row_weights in zip(tags, weights)
+    ]
+
+
+def main(count):
+    songs = synthetic_tags(count)
+    print(f"{count:,} songs, {NUM_TAGS:,} tags")
+    timed("build matrix song by song", lambda: [
+        matrix.add(key, weights) for matrix in [TagMatrix()]
+        for key, weights in enumerate(songs)])
+    matrix = timed("build matrix in bulk", lambda: TagMatrix(enumerate(songs)))
+    timed("first query (idf and norms)", lambda: matrix.similar(0))
+    timed("similar songs x100", lambda: [matrix.similar(key) for key in range(100)])
+    seeds = {key: 1.0 for key in range(NUM_SEEDS)}
+    candidates = range(NUM_SEEDS, count)
+    timed(f"recommend from {NUM_SEEDS} seeds", lambda: matrix.recommend(
+        seeds, candidates))
+    timed("add 100 songs", lambda: [
+        matrix.add(count + key, songs[key]) for key in range(100)])
+    timed("query after adding", lambda: matrix.similar(0))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
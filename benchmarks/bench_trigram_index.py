@@ -0,0 +1,71 @@
+"""
+Benchmark for the trigram index used by substring filters.
+
+Builds the index over a synthetic library and times substring lookups
+against a full scan of the songs, plus the incremental updates done on
+save and delete.
+
+Usage:
+    python benchmarks/bench_trigram_index.py [num_songs]
+"""
+
+import os
+import sys
+import time
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.song import Song  # noqa: E402 - Import not at top of file
+from models.trigram_index import SongTextIndex  # noqa: E402
+
+DEFAULT_SIZE = 1_000_000
+QUERIES = [
+    ("title", "title 99999"),
+    ("artist", "artist 1999"),
+    ("album", "album 7777"),
+    ("title", "le 4"),
+    ("artist", "zz"),
+]
+
+
+def make_songs(count):
+    return [
+        Song(f"title {i}", f"artist {i % 20000}", album=f"album {i % 80000}",
+             library="main")
+        for i in range(count)
+    ]
+
+
+def scan(songs, field, text):
+    return [song for song in songs if text in getattr(song, f"{field}_key")]
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<38}{(time.perf_counter() - start) * 1000:>10.1f} ms")
+    return result
+
+
+def main(count):
+    songs = make_songs(count)
+    print(f"{count:,} songs")
+    index = timed("build index", lambda: SongTextIndex(songs))
+
+    for field, text in QUERIES:
+        indexed = timed(f"index {field} {text!r}",
+                        lambda: index.search(**{field: text}))
+        scanned = timed(f"scan  {field} {text!r}", lambda: scan(songs, field, text))
+        assert len(indexed) == len(scanned), (field, text)
+        print(f"{'':<38}{len(indexed):>10,} matches")
+
+    new_songs = [Song(f"new title {i}", "new artist", library="main")
+                 for i in range(1000)]
+    timed("add 1000 songs", lambda: [index.add(song) for song in new_songs])
+    timed("remove 1000 songs", lambda: [
+        index.remove("main", song.title, song.artist) for song in new_songs])
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
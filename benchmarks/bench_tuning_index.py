@@ -0,0 +1,66 @@
+"""
+Benchmark for tuning parsing and the tuning similarity index.
+
+Times parsing many distinct spelled-out tunings, finding the tunings within
+one string change of a tuning, and filtering a synthetic library down to the
+songs playable from Drop D with at most one string retuned.
+
+Usage:
+    python benchmarks/bench_tuning_index.py [num_songs]
+"""
+
+import os
+import sys
+import time
+from unittest.mock import patch
+
+import numpy as np
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench_song_table import populate  # noqa: E402 - Import not at top of file
+from controllers.song_controller import SongController  # noqa: E402
+from models.tuning import PITCH_NAMES, TuningIndex, parse_tuning  # noqa: E402
+
+DEFAULT_SIZE = 1_000_000
+NUM_TUNINGS = 10_000
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<38}{(time.perf_counter() - start) * 1000:>10.1f} ms")
+    return result
+
+
+def random_tunings(count):
+    """Spelled-out six-string tunings, e.g. "D A D G B E"."""
+    rng = np.random.default_rng(0)
+    notes = rng.integers(len(PITCH_NAMES), size=(count, 6))
+    return [" ".join(PITCH_NAMES[note] for note in row) for row in notes]
+
+
+def main(count):
+    tunings = random_tunings(NUM_TUNINGS)
+    print(f"{NUM_TUNINGS:,} spelled-out tunings")
+    timed("parse tunings", lambda: [parse_tuning(t) for t in tunings])
+    index = timed("build tuning index", lambda: TuningIndex(tunings))
+    timed("near Drop D (1 string)", lambda: index.near("Drop D"))
+    timed("near Drop D (2 strings)", lambda: index.near("Drop D", max_changes=2))
+
+    with patch("controllers.song_controller.get_default_db_path",
+               return_value=":memory:"):
+        controller = SongController()
+    populate(controller.cursor, count)
+    print(f"{count:,} songs")
+    timed("build song table", controller.get_song_table)
+    timed("songs near Drop D", lambda: controller.filter_songs(
+        near_tuning="DADGBE", num_songs=100))
+    timed("songs in drop d", lambda: controller.filter_songs(
+        tunings={"drop d"}, num_songs=100))
+    controller.conn.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE)
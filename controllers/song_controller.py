@@ -4,23 +4,127 @@ like adding, updating, and deleting songs. It also handles album art
 caching and interactions with the Last.FM API.
 """
 
+import asyncio
 import os
+import time
 import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
+import requests
+
+from models import chords, planner
+from models.dedup import SIMILARITY_THRESHOLD, find_duplicates, merge_song_fields
+from models.fuzzy_index import FuzzySongIndex
+from models.review import ReviewState, schedule_review, progress_after_review
+from models.sampler import BY_STALENESS, UNIFORM, AliasTable, song_weights
+from models.song import normalize_key
+from models.song_table import SongTable
+from models.tag_vectors import TagMatrix
+from models.trigram_index import SongTextIndex
+from models.tuning import canonical_tuning_name
 from services.db import (
+    MAIN_LIBRARY,
+    LIBRARY_VIEW,
     initialize_db,
+    open_read_only,
     save_song,
     load_songs,
     delete_song,
     update_song_info,
+    write_song_info,
+    merge_songs,
     song_exists,
     get_song,
     get_unique_genres,
     get_unique_tunings,
+    is_valid_library_name,
+    attach_library,
+    detach_library,
+    create_library_view,
+    count_songs,
+    get_current_schema_version,
+    get_change_counter,
+    get_data_version,
+    get_review_state,
+    save_review_state,
+    get_due_songs,
+    count_due_songs,
+    load_last_practiced,
+    get_unanalyzed_songs,
+    count_unanalyzed_songs,
+    save_chord_analysis,
+    find_chord_gram,
+    get_song_key,
+    save_tag_weights,
+    get_tag_weights,
+    load_tag_weights,
+    queue_enrichment,
+    get_pending_songs,
+    count_pending_songs,
+    finish_enrichment,
+    record_enrichment_attempt,
+    get_album_songs,
+)
+from services.lastfm_api import (
+    close_clients,
+    fetch_and_cache_album_art,
+    get_album,
+    lookup_track,
+    parse_album_info,
+    parse_track_info,
 )
-from services.lastfm_api import get_track_info, fetch_and_cache_album_art
+from services.snapshot import read_snapshot_header, read_snapshot, write_snapshot
 from utils.utils import get_default_db_path, get_resource_path, create_cache_directory
 
+# Songs analyzed per step of the background chord indexing pass
+CHORD_BATCH_SIZE = 200
+
+# How much songs in each progress state count toward recommendations
+RECOMMENDATION_SEEDS = {"Learning": 2.0, "Mastered": 1.0}
+
+# Pending songs of one album that are enriched with a single album lookup
+ALBUM_BATCH_MIN = 2
+
+# Failed lookups after which a pending song is taken off the queue
+MAX_ENRICHMENT_ATTEMPTS = 3
+
+# Album stored for songs Last.fm gave no album for
+UNKNOWN_ALBUM = "Unknown"
+
+# Seconds adding a song waits for Last.fm before saving it to be enriched
+# later; the lookup carries on in the background and fills the caches
+LOOKUP_BUDGET = 2.0
+
+# Threads running Last.fm lookups, so a hung one can be abandoned
+LOOKUP_THREADS = 4
+
+
+def _song_key(song):
+    """The (title key, artist key) a song is known by."""
+    return normalize_key(song.title), normalize_key(song.artist)
+
+
+def _album_batches(pending):
+    """
+    Group pending songs by artist and known album.
+
+    Args:
+        pending (list): (Song, attempts) pairs.
+
+    Returns:
+        list: The lists of songs of the albums with at least ALBUM_BATCH_MIN
+        pending songs, to be looked up with one album lookup each.
+    """
+    albums = OrderedDict()
+    for song, _ in pending:
+        album_key = normalize_key(song.album)
+        if album_key and song.album != UNKNOWN_ALBUM:
+            albums.setdefault((normalize_key(song.artist), album_key),
+                              []).append(song)
+    return [songs for songs in albums.values() if len(songs) >= ALBUM_BATCH_MIN]
+
 
 class SongController:
     def __init__(self):
@@ -30,12 +134,62 @@ class SongController:
         Args:
             db_path (str): The path to the database.
         """
+        self.db_path = get_default_db_path()
         self.conn, self.cursor = initialize_db(
-            db_path=get_default_db_path(),
+            db_path=self.db_path,
             schema_path=get_resource_path("db/schema.sql")
         )
         self.cache_dir = create_cache_directory()
 
+        # Extra song databases attached alongside the main one, by name
+        self.libraries = {}
+        self.active_libraries = [MAIN_LIBRARY]
+        create_library_view(self.cursor, self.active_libraries)
+
+        # Write-through cache of the active libraries' songs, keyed by
+        # (library, title key, artist key) and loaded on first use
+        self._songs = None
+        self._data_versions = None
+        # Trigram index over the cached songs, built on the first text filter
+        self._text_index = None
+        # Typo-tolerant index over the cached songs, built on first use
+        self._fuzzy_index = None
+        # TF-IDF tag vectors of the cached songs, built on first use
+        self._tag_matrix = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        # Columnar copy of the active libraries, built on first use
+        self._song_table = None
+
+        # Random practice sets; alias tables are kept per filter for the
+        # current song table
+        self.rng = np.random.default_rng()
+        self._samplers = {}
+        self._sampler_table = None
+
+        # Startup snapshot of the main library, kept next to the database
+        self.snapshot_path = (
+            None if self.db_path == ":memory:" else f"{self.db_path}.snapshot"
+        )
+        self._snapshot_key = None
+
+        # Change counter when the chord index last caught up with the songs
+        self._chords_analyzed_at = None
+
+        # Last.fm lookups run here and are waited for at most LOOKUP_BUDGET
+        self._lookups = ThreadPoolExecutor(LOOKUP_THREADS,
+                                           thread_name_prefix="lastfm-lookup")
+
+    def shutdown(self):
+        """
+        Stop the Last.fm lookups and close the shared Last.fm clients, which
+        flushes the response cache and any recording of the responses.
+        Lookups still running are abandoned. The database stays open.
+        """
+        self._lookups.shutdown(wait=False, cancel_futures=True)
+        close_clients()
+
     def song_exists(self, title, artist):
         """
         Check if a song exists in the database.
@@ -49,19 +203,20 @@ class SongController:
         """
         return song_exists(self.cursor, title, artist)
 
-    def get_song(self, title, artist):
+    def get_song(self, title, artist, library=None):
         """
         Retrieve a song from the database.
 
         Args:
             title (str): The title of the song.
             artist (str): The artist of the song.
+            library (str, optional): The library to look in. Defaults to main.
 
         Returns:
             dict: A dictionary containing song details.
         """
         logging.debug(f"Getting song: {title} by {artist}")
-        song = get_song(self.cursor, title, artist)
+        song = get_song(self.cursor, title, artist, library)
         if song:
             logging.info(f"Found song: {title} by {artist}")
         else:
@@ -70,69 +225,464 @@ class SongController:
 
     def get_all_songs(self):
         """
-        Retrieve all songs from the database.
+        Retrieve all songs from the active libraries.
 
         Returns:
             list: A list of dictionaries, each containing song details.
         """
+        return list(self._cached_songs().values())
+
+    @staticmethod
+    def _cache_key(song):
+        return (song.library or MAIN_LIBRARY, song.title_key, song.artist_key)
+
+    def _check_external_changes(self):
+        """
+        Drop the in-memory copies of the library if another connection
+        committed to one of the active libraries since they were loaded.
+        """
+        versions = [
+            get_data_version(self.cursor, library)
+            for library in self.active_libraries
+        ]
+        if versions != self._data_versions:
+            if self._data_versions is not None:
+                logging.info("Library changed outside the app, reloading songs")
+            self._reset_song_cache()
+            self._song_table = None
+            self._data_versions = versions
+
+    def _reset_song_cache(self):
+        """Drop the song cache and the indexes built over it."""
+        self._songs = None
+        self._text_index = None
+        self._fuzzy_index = None
+        self._tag_matrix = None
+
+    def _cached_songs(self):
+        """
+        Get the song cache, loading it from the database if needed.
+
+        Returns:
+            OrderedDict: Songs by (library, title key, artist key).
+        """
+        self._check_external_changes()
+        if self._songs is not None:
+            self.cache_hits += 1
+            return self._songs
+
+        self.cache_misses += 1
         logging.debug("Getting all songs from the database")
-        songs = load_songs(self.cursor)
+        songs = load_songs(self.cursor, LIBRARY_VIEW)
         logging.info(f"Retrieved {len(songs)} songs from the database")
-        return songs
+        self._songs = OrderedDict((self._cache_key(song), song) for song in songs)
+        return self._songs
+
+    def _refresh_cached_song(self, title, artist):
+        """
+        Write a song through to the cache after it was saved or updated.
+
+        The song is read back so the cache holds exactly what a reload
+        would return.
+
+        Args:
+            title (str): The title of the song.
+            artist (str): The artist of the song.
+        """
+        if self._songs is None or MAIN_LIBRARY not in self.active_libraries:
+            return
+        song = get_song(self.cursor, title, artist)
+        if song:
+            self._songs[self._cache_key(song)] = song
+            if self._text_index is not None:
+                self._text_index.add(song)
+            if self._fuzzy_index is not None:
+                self._fuzzy_index.add(song)
+            if self._tag_matrix is not None:
+                self._tag_matrix.add(
+                    self._cache_key(song),
+                    get_tag_weights(self.cursor, title, artist)
+                    or self._genre_weights(song),
+                )
+
+    def _forget_cached_song(self, title, artist):
+        """
+        Remove a deleted song from the cache and the indexes built over it.
+
+        Args:
+            title (str): The title of the song.
+            artist (str): The artist of the song.
+        """
+        key = (MAIN_LIBRARY, normalize_key(title), normalize_key(artist))
+        if self._songs is not None:
+            self._songs.pop(key, None)
+        if self._text_index is not None:
+            self._text_index.remove(MAIN_LIBRARY, title, artist)
+        if self._fuzzy_index is not None:
+            self._fuzzy_index.remove(MAIN_LIBRARY, title, artist)
+        if self._tag_matrix is not None:
+            self._tag_matrix.remove(key)
+
+    def get_cache_stats(self):
+        """
+        Get the song cache counters.
 
-    def save_song(self, song, is_custom=False):
+        Returns:
+            dict: Hits, misses and the number of cached songs.
+        """
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "size": len(self._songs) if self._songs is not None else 0,
+        }
+
+    def save_song(self, song, is_custom=False, enrich_later=False):
         """
         Save a new song to the database.
 
+        Songs that aren't custom are looked up on Last.FM first, for at most
+        LOOKUP_BUDGET seconds. If Last.FM can't be reached in that time, the
+        song is saved anyway and queued for enrich_pending_songs.
+
         Args:
             song (Song): A Song object containing song details.
             is_custom (bool): Whether the song is a custom entry.
+            enrich_later (bool): Save the song right away and queue it for
+                                 enrich_pending_songs instead of looking it
+                                 up on Last.FM first.
 
         Returns:
             tuple: (bool, str) A tuple containing a success flag and a message.
         """
+        start = time.monotonic()
+        message = "Song saved successfully"
         try:
+            tag_weights = None
+            queued = False
             if not self.song_exists(song.title, song.artist):
-                if not is_custom:
+                if enrich_later and not is_custom:
+                    queued = True
+                elif not is_custom:
                     logging.debug(
                         "Song does not exist, fetching track info: %s by %s",
                         song.title,
                         song.artist,
                     )
-                    track_info = self.get_track_info(song.artist, song.title)
-                    if track_info and "error" not in track_info:
+                    try:
+                        track_info = self.get_track_info(song.artist, song.title)
+                    except (requests.exceptions.RequestException, TimeoutError) as e:
+                        logging.warning(
+                            f"Saving {song.title} by {song.artist} without "
+                            f"details, Last.FM is unavailable: {str(e)}"
+                        )
+                        track_info = None
+                        queued = True
+                        message = ("Song saved. Last.FM is unavailable, so its "
+                                   "details will be fetched later.")
+                    if track_info:
                         # Update song with additional info from Last.fm
-                        track = track_info.get("track", {})
-                        song.album = track.get("album", {}).get("title", "Unknown")
-                        song.duration = track.get("duration", 0)
-                        song.genres = [
-                            tag["name"]
-                            for tag in track.get("toptags", {}).get("tag", [])
-                        ]
-
-                        # Fetch and cache album art
-                        album_images = track.get("album", {}).get("image", [])
-                        if album_images:
-                            album_art_url = album_images[-1].get("#text")
-                            if album_art_url:
-                                self.fetch_and_cache_album_art(
-                                    album_art_url, song.album
-                                )
-                    else:
+                        song.album = track_info.album or UNKNOWN_ALBUM
+                        song.duration = track_info.duration_ms
+                        song.genres = track_info.genres
+                        tag_weights = track_info.tag_weights
+                        remaining = LOOKUP_BUDGET - (time.monotonic() - start)
+                        self._cache_album_art(track_info.album_art_url, song.album,
+                                              timeout=max(0.0, remaining))
+                    elif not queued:
                         return False, (
                             "Song not found on Last.FM. Check your spelling, "
                             "or did you mean to add as a custom song?"
                         )
 
             save_song(self.cursor, song)
+            if tag_weights:
+                save_tag_weights(self.cursor, song.title, song.artist, tag_weights)
+            if queued:
+                queue_enrichment(self.cursor, song.title, song.artist)
             self.conn.commit()
+            self._song_table = None
+            self._refresh_cached_song(song.title, song.artist)
             logging.info(f"Song saved successfully: {song.title} by {song.artist}")
-            return True, "Song saved successfully"
+            return True, message
         except Exception as e:
             self.conn.rollback()
+            self._reset_song_cache()
             logging.error(f"Error saving song {song.title} by {song.artist}: {str(e)}")
             return False, "Unable to save the song. Please try again."
 
+    def _cache_album_art(self, album_art_url, album_name, timeout=None):
+        """
+        Download album art unless it is cached already, waiting for the
+        download at most timeout seconds.
+        """
+        if not album_art_url or self.get_cached_album_art(album_name):
+            return
+        future = self._lookups.submit(
+            self.fetch_and_cache_album_art, album_art_url, album_name
+        )
+        try:
+            future.result(timeout=timeout)
+        except TimeoutError:
+            logging.info(f"Still downloading album art for {album_name}")
+
+    def count_pending_songs(self):
+        """
+        Count the songs whose Last.FM details are still to be fetched.
+
+        Returns:
+            int: The number of songs.
+        """
+        return count_pending_songs(self.cursor)
+
+    def get_pending_songs(self, limit=None):
+        """
+        Get the songs whose Last.FM details are still to be fetched.
+
+        Args:
+            limit (int, optional): The most pending songs to return.
+
+        Returns:
+            list of tuple: (Song, attempts so far) pairs, longest queued first.
+        """
+        return get_pending_songs(self.cursor, limit)
+
+    def _apply_track_info(self, song, track_info, art_timeout=LOOKUP_BUDGET):
+        """
+        Fill in the details of a song in the main library that it is missing
+        from a Last.FM track, and take it off the enrichment queue. Does not
+        commit, so a batch of songs can be committed or rolled back together.
+
+        Details the song already has, like a duration entered by hand or
+        tags fetched before, are kept. Album art is waited for at most
+        art_timeout seconds and finishes downloading in the background.
+
+        Args:
+            song (Song): The song.
+            track_info (TrackInfo): The track.
+            art_timeout (float, optional): Seconds to wait for album art.
+        """
+        if not song.album or song.album == UNKNOWN_ALBUM:
+            song.album = track_info.album or UNKNOWN_ALBUM
+        if str(song.duration or 0) == "0" and track_info.duration_ms:
+            song.duration = track_info.duration_ms
+        if not song.genres:
+            song.genres = track_info.genres
+        write_song_info(self.cursor, song)
+        if track_info.tags and not get_tag_weights(self.cursor, song.title,
+                                                   song.artist):
+            save_tag_weights(self.cursor, song.title, song.artist,
+                             track_info.tag_weights)
+        self._cache_album_art(track_info.album_art_url, song.album,
+                              timeout=art_timeout)
+        finish_enrichment(self.cursor, song.title, song.artist)
+
+    def _enrich_album(self, artist, album):
+        """
+        Fetch an album once and fill in every main library song on it.
+
+        Args:
+            artist (str): The artist of the album.
+            album (str): The album.
+
+        Returns:
+            dict or None: The songs filled in by (title key, artist key), or
+            None if the album couldn't be fetched.
+        """
+        album_info = get_album(artist, album)
+        if album_info is None:
+            return None
+        enriched = {}
+        for song in get_album_songs(self.cursor, artist, album):
+            track_info = album_info.track_info(song.display_title)
+            if track_info is not None:
+                self._apply_track_info(song, track_info)
+                enriched[_song_key(song)] = song
+        return enriched
+
+    def enrich_album(self, artist, album):
+        """
+        Fill in the durations, tags and album art of every main library song
+        on an album with a single Last.FM lookup.
+
+        Args:
+            artist (str): The artist of the album.
+            album (str): The album.
+
+        Returns:
+            tuple: (bool, str) A tuple containing a success flag and a message.
+        """
+        try:
+            enriched = self._enrich_album(artist, album)
+            if enriched is None:
+                return False, f"Album {album} by {artist} not found on Last.FM."
+            self.conn.commit()
+            self._finish_enrichment(enriched)
+            logging.info(f"Enriched {len(enriched)} songs of {album} by {artist}")
+            return True, f"Updated {len(enriched)} songs"
+        except Exception as e:
+            self.conn.rollback()
+            self._reset_song_cache()
+            logging.error(f"Error enriching {album} by {artist}: {str(e)}")
+            return False, "Unable to update the album. Please try again."
+
+    def enrich_pending_songs(self, limit=None):
+        """
+        Fetch the Last.FM details of songs saved with enrich_later, or
+        saved while Last.FM was unavailable.
+
+        Pending songs that share an artist and a known album are looked up
+        with one album.getInfo call, which also fills in the album's other
+        songs in the library. The rest are looked up track by track. Songs
+        Last.FM doesn't know are taken off the queue after
+        MAX_ENRICHMENT_ATTEMPTS tries; if Last.FM is unavailable, the pass
+        stops and the remaining songs stay queued as they were.
+
+        Args:
+            limit (int, optional): The most pending songs to handle.
+
+        Returns:
+            tuple: (int, int) The songs enriched and those still pending.
+        """
+        pending = get_pending_songs(self.cursor, limit)
+        enriched = {}
+        try:
+            for songs in _album_batches(pending):
+                enriched.update(self._enrich_album(
+                    songs[0].display_artist, songs[0].display_album
+                ) or {})
+
+            for song, attempts in pending:
+                if _song_key(song) in enriched:
+                    continue
+                try:
+                    track_info = self.get_track_info(song.display_artist,
+                                                     song.display_title)
+                except (requests.exceptions.RequestException, TimeoutError) as e:
+                    logging.warning(f"Stopped fetching pending songs: {str(e)}")
+                    break
+                self._settle_pending_song(song, attempts, track_info, enriched)
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            self._reset_song_cache()
+            logging.error(f"Error enriching pending songs: {str(e)}")
+        self._finish_enrichment(enriched)
+        return len(enriched), count_pending_songs(self.cursor)
+
+    async def fetch_pending_details(self, client, pending):
+        """
+        Look up the Last.FM details of pending songs with an async client,
+        all at once. It doesn't touch the database, so it can run on an
+        event loop in another thread; apply_pending_details saves what it
+        found.
+
+        Pending songs that share an artist and a known album are looked up
+        with one album lookup, as in enrich_pending_songs.
+
+        Args:
+            client (AsyncLastFmClient): The client.
+            pending (list): (Song, attempts) pairs from get_pending_songs.
+
+        Returns:
+            dict: By (title key, artist key), the TrackInfo of each song,
+            None if Last.FM doesn't know it, or the error if it couldn't be
+            fetched.
+        """
+        details = {}
+        errors = (requests.exceptions.RequestException, ValueError,
+                  asyncio.TimeoutError)
+
+        async def fetch_album(songs):
+            artist, album = songs[0].display_artist, songs[0].display_album
+            try:
+                album_info = parse_album_info(
+                    await client.get_album_info(artist, album)
+                )
+            except errors as e:
+                logging.warning(f"Error fetching album {album} by {artist}: {e!r}")
+                return
+            for song in songs if album_info is not None else []:
+                track_info = album_info.track_info(song.display_title)
+                if track_info is not None:
+                    details[_song_key(song)] = track_info
+
+        async def fetch_track(song):
+            try:
+                details[_song_key(song)] = parse_track_info(
+                    await client.get_track_info(song.display_artist,
+                                                song.display_title)
+                )
+            except errors as e:
+                logging.warning(f"Error fetching track info for {song.title} "
+                                f"by {song.artist}: {e!r}")
+                details[_song_key(song)] = e
+
+        await asyncio.gather(*map(fetch_album, _album_batches(pending)))
+        await asyncio.gather(*(fetch_track(song) for song, _ in pending
+                               if _song_key(song) not in details))
+        return details
+
+    def apply_pending_details(self, details):
+        """
+        Save the details fetch_pending_details found, in one transaction.
+
+        Songs that are no longer pending are left alone, and songs whose
+        lookup failed stay queued as they were. Album art isn't waited for.
+
+        Args:
+            details (dict): The result of fetch_pending_details.
+
+        Returns:
+            tuple: (int, int) The songs enriched and those still pending.
+        """
+        enriched = {}
+        try:
+            for song, attempts in get_pending_songs(self.cursor):
+                key = _song_key(song)
+                # Queued since the lookups started, or the lookup failed
+                if key not in details or isinstance(details[key], Exception):
+                    continue
+                self._settle_pending_song(song, attempts, details[key], enriched,
+                                          art_timeout=0)
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            self._reset_song_cache()
+            enriched = {}
+            logging.error(f"Error saving details of pending songs: {str(e)}")
+        self._finish_enrichment(enriched)
+        return len(enriched), count_pending_songs(self.cursor)
+
+    def _settle_pending_song(self, song, attempts, track_info, enriched,
+                             art_timeout=LOOKUP_BUDGET):
+        """
+        Fill in a pending song from its Last.FM track, or count a failed
+        attempt if Last.FM doesn't know it. Does not commit.
+
+        Args:
+            song (Song): The pending song.
+            attempts (int): Its failed attempts so far.
+            track_info (TrackInfo or None): The track, or None if not found.
+            enriched (dict): Songs filled in, by key, to add the song to.
+            art_timeout (float, optional): Seconds to wait for album art.
+        """
+        if track_info:
+            self._apply_track_info(song, track_info, art_timeout)
+            enriched[_song_key(song)] = song
+        elif attempts + 1 >= MAX_ENRICHMENT_ATTEMPTS:
+            logging.warning(f"Giving up on details of {song.title} by {song.artist}")
+            finish_enrichment(self.cursor, song.title, song.artist)
+        else:
+            record_enrichment_attempt(self.cursor, song.title, song.artist)
+
+    def _finish_enrichment(self, songs):
+        """Write enriched songs, by key, through to the caches."""
+        if not songs:
+            return
+        self._song_table = None
+        for song in songs.values():
+            self._refresh_cached_song(song.title, song.artist)
+
     def delete_song(self, title, artist):
         """
         Delete a song from the database.
@@ -145,10 +695,13 @@ class SongController:
         try:
             delete_song(self.cursor, title, artist)
             self.conn.commit()
+            self._song_table = None
+            self._forget_cached_song(title, artist)
             logging.info(f"Successfully deleted song: {title} by {artist}")
             return True, "Song deleted successfully"
         except Exception as e:
             self.conn.rollback()
+            self._reset_song_cache()
             logging.error(f"Error deleting song {title} by {artist}: {str(e)}")
             return False, "Unable to delete the song. Please try again."
 
@@ -162,11 +715,15 @@ class SongController:
         logging.info(f"Updating song info for: {song.title} by {song.artist}")
         try:
             update_song_info(self.cursor, song)
+            self._song_table = None
+            self._refresh_cached_song(song.title, song.artist)
             logging.info(
                 f"Successfully updated song info for: {song.title} by {song.artist}"
             )
             return True, "Song updated successfully"
         except Exception as e:
+            self.conn.rollback()
+            self._reset_song_cache()
             logging.error(
                 f"Error updating song info for {song.title} by {song.artist}: {str(e)}"
             )
@@ -181,10 +738,24 @@ class SongController:
             track (str): The name of the track.
 
         Returns:
-            dict: A dictionary containing track information.
+            TrackInfo or None: The track, or None if it wasn't found.
+
+        Raises:
+            requests.exceptions.RequestException: If Last.FM couldn't be
+                reached, or the circuit breaker is open after it failed
+                repeatedly.
+            TimeoutError: If Last.FM didn't answer within LOOKUP_BUDGET.
         """
         logging.debug(f"Getting track info for {track} by {artist}")
-        track_info = get_track_info(artist, track)
+        future = self._lookups.submit(lookup_track, artist, track)
+        try:
+            track_info = future.result(timeout=LOOKUP_BUDGET)
+        except TimeoutError:
+            raise TimeoutError(
+                f"No answer from Last.FM within {LOOKUP_BUDGET:.0f}s"
+            ) from None
+        except ValueError as e:
+            raise requests.exceptions.InvalidJSONError(str(e)) from e
         if track_info:
             logging.info(f"Retrieved track info for {track} by {artist}")
         else:
@@ -263,15 +834,109 @@ class SongController:
 
     def get_unique_genres(self):
         """
-        Get all unique genres from the database.
+        Get all unique genres from the active libraries.
         """
-        return get_unique_genres(self.cursor)
+        return get_unique_genres(self.cursor, LIBRARY_VIEW)
 
     def get_unique_tunings(self):
         """
-        Get all unique tunings from the database.
+        Get all unique tunings from the active libraries.
+        """
+        return get_unique_tunings(self.cursor, LIBRARY_VIEW)
+
+    def attach_library(self, name, path):
+        """
+        Attach another song database and make it active.
+
+        Args:
+            name (str): The name to refer to the library by.
+            path (str): The path to the library database file.
+
+        Returns:
+            tuple: (bool, str) A tuple containing a success flag and a message.
+        """
+        if not is_valid_library_name(name):
+            return False, f"Invalid library name: {name}"
+        if name in self.libraries:
+            return False, f"Library {name} is already attached"
+        try:
+            # Make sure the file has an up to date schema before attaching it
+            conn, _ = initialize_db(
+                db_path=path, schema_path=get_resource_path("db/schema.sql")
+            )
+            conn.close()
+            # ATTACH and DETACH can't run inside an open transaction
+            self.conn.commit()
+            attach_library(self.cursor, name, path)
+            self.libraries[name] = path
+            self.set_active_libraries(self.active_libraries + [name])
+            logging.info(f"Attached library {name} from {path}")
+            return True, f"Library {name} attached"
+        except Exception as e:
+            logging.error(f"Error attaching library {name} from {path}: {str(e)}")
+            return False, "Unable to attach the library. Please try again."
+
+    def detach_library(self, name):
+        """
+        Detach a previously attached song database.
+
+        Args:
+            name (str): The name of the library.
+
+        Returns:
+            tuple: (bool, str) A tuple containing a success flag and a message.
+        """
+        if name not in self.libraries:
+            return False, f"Library {name} is not attached"
+        try:
+            remaining = [lib for lib in self.active_libraries if lib != name]
+            self.set_active_libraries(remaining or [MAIN_LIBRARY])
+            self.conn.commit()
+            detach_library(self.cursor, name)
+            del self.libraries[name]
+            logging.info(f"Detached library {name}")
+            return True, f"Library {name} detached"
+        except Exception as e:
+            logging.error(f"Error detaching library {name}: {str(e)}")
+            return False, "Unable to detach the library. Please try again."
+
+    def get_libraries(self):
         """
-        return get_unique_tunings(self.cursor)
+        Get the names of all known libraries, main first.
+
+        Returns:
+            list: The library names.
+        """
+        return [MAIN_LIBRARY] + list(self.libraries)
+
+    def is_attached_library(self, name):
+        """
+        Check whether a name refers to an attached (non-main) library.
+
+        Args:
+            name (str): The library name.
+
+        Returns:
+            bool: True if the library is attached.
+        """
+        return isinstance(name, str) and name in self.libraries
+
+    def set_active_libraries(self, names):
+        """
+        Choose which libraries queries run across.
+
+        Only the union view is redefined; nothing is reloaded into memory.
+
+        Args:
+            names (list of str): The libraries to activate.
+        """
+        known = self.get_libraries()
+        self.active_libraries = [name for name in known if name in names]
+        create_library_view(self.cursor, self.active_libraries)
+        self._reset_song_cache()
+        self._data_versions = None
+        self._song_table = None
+        logging.info(f"Active libraries: {', '.join(self.active_libraries)}")
 
     def search_songs(self, search_text):
         """
@@ -283,89 +948,767 @@ class SongController:
         Returns:
             list: A list of Song objects matching the search criteria.
         """
-        search_text = search_text.lower()
-        return [song for song in self.get_all_songs() if
-                search_text in song.title.lower() or
-                search_text in song.artist.lower()]
+        search_text = normalize_key(search_text)
+        return [
+            song for song in self._cached_songs().values()
+            if search_text in song.title_key or search_text in song.artist_key
+        ]
+
+    def get_snapshot_key(self):
+        """
+        Get the key identifying the current state of the main library.
+
+        Returns:
+            tuple: The schema version and the change counter.
+        """
+        return (
+            get_current_schema_version(self.cursor),
+            get_change_counter(self.cursor),
+        )
+
+    def load_snapshot_page(self):
+        """
+        Get the first page of songs from the startup snapshot.
+
+        This only reads the snapshot header, so it costs the same for any
+        library size and doesn't query the database. The songs may be stale.
+
+        Returns:
+            list or None: The songs, or None if there is no usable snapshot.
+        """
+        if not self.snapshot_path:
+            return None
+        header = read_snapshot_header(self.snapshot_path)
+        if header is None:
+            return None
+        self._snapshot_key = header["key"]
+        logging.info(
+            f"Loaded {len(header['page'])} of {header['count']} songs from snapshot"
+        )
+        return header["page"]
+
+    def load_snapshot(self):
+        """
+        Get all songs from the startup snapshot if it is still current.
+
+        Returns:
+            list or None: The songs, or None if the snapshot is missing or stale.
+        """
+        if not self.snapshot_path:
+            return None
+        return read_snapshot(self.snapshot_path, self.get_snapshot_key())
+
+    def read_main_library(self):
+        """
+        Read every song of the main library on a connection of its own, from
+        the snapshot if it is current and otherwise from the database, in
+        which case the snapshot is refreshed.
+
+        Safe to call from a worker thread: it doesn't touch the controller's
+        connection or caches. Hand the result to adopt_main_library on the
+        controller's thread.
+
+        Returns:
+            tuple or None: (library key, list of Song, whether the snapshot
+            is current), or None for an in-memory database, which can only
+            be read on the controller's connection.
+        """
+        if self.db_path == ":memory:":
+            return None
+        conn, cursor = open_read_only(self.db_path)
+        try:
+            key = (get_current_schema_version(cursor), get_change_counter(cursor))
+            songs = read_snapshot(self.snapshot_path, key)
+            if songs is not None:
+                return key, songs, True
+            songs = load_songs(cursor, "songs")
+        finally:
+            conn.close()
+        try:
+            write_snapshot(self.snapshot_path, key, songs)
+        except OSError as e:
+            logging.warning(f"Unable to write library snapshot: {str(e)}")
+            return key, songs, False
+        return key, songs, True
+
+    def adopt_main_library(self, key, songs, snapshot_current):
+        """
+        Fill the song cache with songs read by read_main_library, unless the
+        library changed or another library was activated since.
+
+        Args:
+            key (tuple): The library key they were read at.
+            songs (list of Song): The songs.
+            snapshot_current (bool): Whether the snapshot matches the key.
+
+        Returns:
+            list or None: All songs, or None if the songs are out of date.
+        """
+        if self.active_libraries != [MAIN_LIBRARY] or key != self.get_snapshot_key():
+            return None
+        if snapshot_current:
+            self._snapshot_key = key
+        self._check_external_changes()
+        if self._songs is None:
+            self.cache_misses += 1
+            self._songs = OrderedDict((self._cache_key(song), song) for song in songs)
+            logging.info(f"Read {len(songs)} songs in the background")
+        return self.get_all_songs()
+
+    def save_snapshot(self, songs=None):
+        """
+        Write the startup snapshot if the main library changed since the last one.
+
+        Args:
+            songs (list, optional): All songs of the main library, if already loaded.
+
+        Returns:
+            bool: True if a snapshot was written.
+        """
+        if not self.snapshot_path or self.active_libraries != [MAIN_LIBRARY]:
+            return False
+        key = self.get_snapshot_key()
+        if key == self._snapshot_key:
+            return False
+        if songs is None:
+            songs = self.get_all_songs()
+        try:
+            write_snapshot(self.snapshot_path, key, songs)
+        except OSError as e:
+            logging.warning(f"Unable to write library snapshot: {str(e)}")
+            return False
+        self._snapshot_key = key
+        return True
+
+    def get_song_table(self):
+        """
+        Get the columnar table of the active libraries.
+
+        The table is built with a single query and kept until the next write
+        or library switch.
+
+        Returns:
+            SongTable: The song table.
+        """
+        self._check_external_changes()
+        if self._song_table is None:
+            logging.debug("Building song table")
+            self._song_table = SongTable.from_cursor(self.cursor, LIBRARY_VIEW)
+            logging.info(f"Built song table with {len(self._song_table)} songs")
+        return self._song_table
+
+    def record_practice(self, title, artist, quality, now=None):
+        """
+        Record a practice session of a song and schedule the next one.
+
+        Args:
+            title (str): The title of the song.
+            artist (str): The artist of the song.
+            quality (int): How well it went, from 0 (forgot it) to 5 (perfect).
+            now (float, optional): Time of the practice. Defaults to now.
+
+        Returns:
+            tuple: (bool, str) A tuple containing a success flag and a message.
+        """
+        now = time.time() if now is None else now
+        try:
+            song = get_song(self.cursor, title, artist)
+            if song is None:
+                return False, f"Song not found: {title} by {artist}"
+            state = get_review_state(self.cursor, title, artist) or ReviewState.new()
+            state = schedule_review(state, quality, now)
+            save_review_state(self.cursor, title, artist, state)
+
+            progress = progress_after_review(song.progress, state, quality)
+            if progress != song.progress:
+                song.progress = progress
+                update_song_info(self.cursor, song)
+            self.conn.commit()
+            self._song_table = None
+            self._refresh_cached_song(song.title, song.artist)
+            logging.info(
+                f"Recorded practice of {title} by {artist}, "
+                f"next in {state.interval_days} days"
+            )
+            days = state.interval_days
+            return True, f"Next practice in {days} day{'s' if days != 1 else ''}"
+        except Exception as e:
+            self.conn.rollback()
+            self._reset_song_cache()
+            logging.error(f"Error recording practice of {title} by {artist}: {str(e)}")
+            return False, "Unable to record the practice. Please try again."
+
+    def get_review_state(self, title, artist):
+        """
+        Get the practice schedule of a song.
+
+        Args:
+            title (str): The title of the song.
+            artist (str): The artist of the song.
+
+        Returns:
+            ReviewState or None: The state, or None if it was never practiced.
+        """
+        return get_review_state(self.cursor, title, artist)
+
+    def get_due_songs(self, now=None, limit=None):
+        """
+        Get the songs due for practice, most overdue first.
+
+        Only songs in the main library are scheduled.
+
+        Args:
+            now (float, optional): The current time. Defaults to now.
+            limit (int, optional): The largest number of songs to return.
+
+        Returns:
+            list: The due Song objects.
+        """
+        if MAIN_LIBRARY not in self.active_libraries:
+            return []
+        return get_due_songs(
+            self.cursor, time.time() if now is None else now, limit
+        )
+
+    def count_due_songs(self, now=None):
+        """Get the number of songs due for practice"""
+        return count_due_songs(self.cursor, time.time() if now is None else now)
+
+    def analyze_chords(self, limit=CHORD_BATCH_SIZE):
+        """
+        Index the chords in the notes of songs not analyzed yet.
+
+        Meant to run in small batches in the background until nothing is
+        left; queries catch up on whatever is still pending themselves.
+
+        Args:
+            limit (int, optional): The largest number of songs to analyze,
+                                   None for all of them.
+
+        Returns:
+            int: The number of songs still waiting for analysis.
+        """
+        counter = get_change_counter(self.cursor)
+        if counter == self._chords_analyzed_at:
+            return 0
+        rows = get_unanalyzed_songs(self.cursor, limit)
+        for title_key, artist_key, notes in rows:
+            analysis = chords.analyze_notes(notes)
+            save_chord_analysis(
+                self.cursor,
+                title_key,
+                artist_key,
+                chords.key_name(analysis.key) if analysis.key else None,
+                analysis.progressions,
+                chords.chord_grams(analysis),
+            )
+        self.conn.commit()
+        remaining = count_unanalyzed_songs(self.cursor) if rows else 0
+        if not remaining:
+            # Song writes bump the change counter, so until it moves there
+            # is nothing to look for
+            self._chords_analyzed_at = counter
+        logging.debug(f"Analyzed chords of {len(rows)} songs, {remaining} left")
+        return remaining
+
+    def find_songs_with_chord(self, chord):
+        """
+        Find the songs whose notes use a chord.
+
+        A triad such as "Bm" also matches its extensions, like Bm7; an
+        extended chord only matches itself. Only songs in the main library
+        are indexed.
+
+        Args:
+            chord (str): The chord symbol.
+
+        Returns:
+            list: Song objects, empty if the symbol isn't a chord.
+        """
+        parsed = chords.parse_chord(chord)
+        if parsed is None or MAIN_LIBRARY not in self.active_libraries:
+            return []
+        self.analyze_chords(limit=None)
+        return self._songs_by_keys(
+            find_chord_gram(self.cursor, chords.CHORD, parsed.symbol)
+        )
+
+    def find_songs_with_progression(self, progression):
+        """
+        Find the songs whose chord lines contain a progression, relative to
+        each song's key, e.g. "I-V-vi-IV".
+
+        Progressions up to models.chords.MAX_NGRAM chords are a single index
+        lookup; longer ones are looked up by their first chords and checked
+        against the stored chord lines.
+
+        Args:
+            progression (str): Roman numerals separated by spaces or dashes.
+
+        Returns:
+            list: Song objects, empty if the text isn't a progression.
+        """
+        numerals = chords.parse_progression(progression)
+        if numerals is None or MAIN_LIBRARY not in self.active_libraries:
+            return []
+        self.analyze_chords(limit=None)
+        prefix = "-".join(numerals[:chords.MAX_NGRAM])
+        if len(numerals) <= chords.MAX_NGRAM:
+            return self._songs_by_keys(
+                find_chord_gram(self.cursor, chords.PROGRESSION, prefix)
+            )
+        gram = f"-{'-'.join(numerals)}-"
+        rows = find_chord_gram(
+            self.cursor, chords.PROGRESSION, prefix, with_progressions=True
+        )
+        return self._songs_by_keys(
+            row[:2] for row in rows
+            if any(gram in f"-{line}-" for line in row[2].split("\n"))
+        )
+
+    def _songs_by_keys(self, keys):
+        """
+        Get main library songs from the song cache by (title key, artist key).
+
+        Args:
+            keys (iterable of tuple): The keys.
+
+        Returns:
+            list: The Song objects, in key order.
+        """
+        songs = self._cached_songs()
+        return [
+            song for song in (
+                songs.get((MAIN_LIBRARY, title_key, artist_key))
+                for title_key, artist_key in keys
+            )
+            if song is not None
+        ]
+
+    def get_song_key(self, title, artist):
+        """Get the key detected from a song's chords, None if unknown"""
+        return get_song_key(self.cursor, title, artist)
+
+    def get_text_index(self):
+        """
+        Get the trigram index over the cached songs' artist, title and album.
+
+        The index is built from the song cache on first use and then kept up
+        to date by save_song, update_song_info and delete_song.
+
+        Returns:
+            SongTextIndex: The index.
+        """
+        songs = self._cached_songs()
+        if self._text_index is None:
+            logging.debug("Building text index")
+            self._text_index = SongTextIndex(songs.values())
+            logging.info(f"Built text index with {len(self._text_index)} songs")
+        return self._text_index
+
+    def get_fuzzy_index(self):
+        """
+        Get the typo-tolerant index over the cached songs' artist and title.
+
+        The index is built from the song cache on first use and then kept up
+        to date by save_song, update_song_info and delete_song.
+
+        Returns:
+            FuzzySongIndex: The index.
+        """
+        songs = self._cached_songs()
+        if self._fuzzy_index is None:
+            logging.debug("Building fuzzy index")
+            self._fuzzy_index = FuzzySongIndex(songs.values())
+            logging.info(f"Built fuzzy index with {len(self._fuzzy_index)} songs")
+        return self._fuzzy_index
+
+    @staticmethod
+    def _genre_weights(song):
+        """Tag weights for a song without Last.fm tags: its genres, equally."""
+        return {genre: 1.0 for genre in song.genres}
+
+    def get_tag_matrix(self):
+        """
+        Get the TF-IDF tag matrix of the cached songs.
+
+        Songs added from Last.fm are weighted by their tag counts; custom
+        songs and songs from attached libraries fall back to their genres.
+        The matrix is built from the song cache on first use and then kept
+        up to date by save_song, update_song_info and delete_song.
+
+        Returns:
+            TagMatrix: The matrix.
+        """
+        songs = self._cached_songs()
+        if self._tag_matrix is None:
+            logging.debug("Building tag matrix")
+            stored = (
+                load_tag_weights(self.cursor)
+                if MAIN_LIBRARY in self.active_libraries else {}
+            )
+            self._tag_matrix = TagMatrix(
+                (key, (key[0] == MAIN_LIBRARY and stored.get(key[1:]))
+                 or self._genre_weights(song))
+                for key, song in songs.items()
+            )
+            logging.info(f"Built tag matrix with {len(self._tag_matrix)} songs")
+        return self._tag_matrix
+
+    def find_songs_like(self, title, artist, limit=10, library=None):
+        """
+        Find the songs whose tags are most like a song's.
+
+        Args:
+            title (str): The title of the song.
+            artist (str): The artist of the song.
+            limit (int, optional): The number of songs to return.
+            library (str, optional): The library the song is in. Defaults
+                                     to main.
+
+        Returns:
+            list: Song objects, most similar first.
+        """
+        matrix = self.get_tag_matrix()
+        key = (library or MAIN_LIBRARY, normalize_key(title), normalize_key(artist))
+        return [self._songs[key] for _, key in matrix.similar(key, limit)]
+
+    def recommend_songs(self, limit=10):
+        """
+        Suggest what to learn next: the songs not started yet whose tags
+        are most like the songs being learned or already mastered.
+
+        Args:
+            limit (int, optional): The number of songs to return.
+
+        Returns:
+            list: Song objects, best suggestion first.
+        """
+        matrix = self.get_tag_matrix()
+        seeds = {}
+        candidates = []
+        for key, song in self._songs.items():
+            if song.progress in RECOMMENDATION_SEEDS:
+                seeds[key] = RECOMMENDATION_SEEDS[song.progress]
+            elif song.progress in (None, "Not Started"):
+                candidates.append(key)
+        return [
+            self._songs[key] for _, key in matrix.recommend(seeds, candidates, limit)
+        ]
+
+    def find_similar_songs(self, title, artist, limit=5):
+        """
+        Find songs whose title and artist are close to the given ones,
+        e.g. to suggest an existing song instead of adding a misspelled copy.
+
+        Args:
+            title (str): The title of the song.
+            artist (str): The artist of the song.
+            limit (int, optional): The number of songs to return.
+
+        Returns:
+            list: Song objects, closest first.
+        """
+        matches = self.get_fuzzy_index().search(artist=artist, title=title, limit=limit)
+        return [song for _, song in matches]
+
+    def fuzzy_search_songs(self, search_text, limit=20):
+        """
+        Search for songs by title or artist, tolerating typos.
+
+        Args:
+            search_text (str): The text to search for.
+            limit (int, optional): The number of songs to return.
+
+        Returns:
+            list: Song objects, closest first.
+        """
+        matches = self.get_fuzzy_index().search_any(search_text, limit=limit)
+        return [song for _, song in matches]
+
+    def find_duplicate_songs(self, threshold=SIMILARITY_THRESHOLD):
+        """
+        Find songs in the main library that look like the same song, e.g.
+        "Lithium" and "Lithium (Remastered)", or a copy with a typo.
+
+        Args:
+            threshold (float, optional): Smallest title and artist similarity,
+                                         from 0 to 1.
+
+        Returns:
+            list of DuplicateGroup: The groups, most similar first, each
+            with the suggested song to keep first.
+        """
+        songs = [
+            song for key, song in self._cached_songs().items()
+            if key[0] == MAIN_LIBRARY
+        ]
+        groups = find_duplicates(songs, threshold)
+        logging.info(f"Found {len(groups)} groups of duplicates in {len(songs)} songs")
+        return groups
+
+    def merge_songs(self, keep, duplicates):
+        """
+        Merge duplicates into one song and delete them.
+
+        The kept song gets the best progress of all copies, their combined
+        notes and any details it was missing. The merge is one transaction,
+        so either every copy is merged or nothing changes.
+
+        Args:
+            keep (Song): The song to keep.
+            duplicates (list of Song): The songs to merge into it.
+
+        Returns:
+            tuple: (bool, str) A tuple containing a success flag and a message.
+        """
+        duplicates = [
+            song for song in duplicates
+            if (song.title_key, song.artist_key) != (keep.title_key, keep.artist_key)
+        ]
+        if not duplicates:
+            return False, "Select at least two songs to merge."
+        logging.info(
+            f"Merging {len(duplicates)} duplicates into {keep.title} by {keep.artist}"
+        )
+        try:
+            merge_songs(self.cursor, merge_song_fields(keep, duplicates), duplicates)
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            self._reset_song_cache()
+            logging.error(f"Error merging into {keep.title} by {keep.artist}: {str(e)}")
+            return False, "Unable to merge the songs. Please try again."
+
+        self._song_table = None
+        for song in duplicates:
+            self._forget_cached_song(song.title, song.artist)
+        self._refresh_cached_song(keep.title, keep.artist)
+        return True, f"Merged {len(duplicates) + 1} copies of {keep.display_title}"
+
+    @staticmethod
+    def _song_matches(song, artist="", title="", album="", genre="", tunings=None,
+                      exclude_mastered=False):
+        """Check a single song against the filter_songs criteria."""
+        genre = genre.lower()
+        return (
+            normalize_key(artist) in song.artist_key
+            and normalize_key(title) in song.title_key
+            and normalize_key(album) in song.album_key
+            and (not genre or genre in (g.lower() for g in song.genres))
+            and (not tunings or canonical_tuning_name(song.tuning) in tunings)
+            and not (exclude_mastered and song.progress == "Mastered")
+        )
+
+    def get_tunings_near(self, tuning, max_changes=1):
+        """
+        Get the tunings in the active libraries that are at most max_changes
+        retuned strings away from a tuning, including the tuning itself.
+
+        Args:
+            tuning (str): The tuning, in any spelling.
+            max_changes (int, optional): The largest number of strings to retune.
+
+        Returns:
+            list of str: Canonical tuning names, closest first.
+        """
+        return self.get_song_table().tuning_index.near(tuning, max_changes)
+
+    def _resolve_tunings(self, tunings, near_tuning, max_string_changes):
+        """
+        Combine the tunings and near-tuning filters into one set of
+        canonical names.
+
+        Returns:
+            frozenset or None: The allowed tunings, None for any tuning. An
+            empty set means no tuning is allowed.
+        """
+        names = None
+        if tunings:
+            names = frozenset(canonical_tuning_name(tuning) for tuning in tunings)
+        if near_tuning:
+            near = frozenset(self.get_tunings_near(near_tuning, max_string_changes))
+            names = names & near if names is not None else near
+        return names
 
     def filter_songs(self, artist="", title="", album="", genre="", tunings=None,
-                     num_songs=None, exclude_mastered=False):
-        """Filter songs based on given criteria."""
-        filtered_songs = self.get_all_songs()
-        if artist:
-            filtered_songs = [
-                s for s in filtered_songs
-                if artist.lower() in s.artist.lower()
-            ]
-        if title:
-            filtered_songs = [
-                s for s in filtered_songs
-                if title.lower() in s.title.lower()
+                     num_songs=None, exclude_mastered=False, due_only=False,
+                     near_tuning=None, max_string_changes=1):
+        """
+        Filter songs based on given criteria.
+
+        Tunings are matched by canonical name. With near_tuning, only songs
+        in a tuning at most max_string_changes retuned strings away from it
+        are kept.
+        """
+        tunings = self._resolve_tunings(tunings, near_tuning, max_string_changes)
+        if tunings is not None and not tunings:
+            return []
+        criteria = {
+            "artist": artist,
+            "title": title,
+            "album": album,
+            "genre": genre,
+            "tunings": tunings,
+            "exclude_mastered": exclude_mastered,
+        }
+        if due_only:
+            # The due queue is usually short, so check its songs one by one
+            songs = [
+                song for song in self.get_due_songs()
+                if self._song_matches(song, **criteria)
             ]
-        if album:
-            filtered_songs = [
-                s for s in filtered_songs
-                if album.lower() in (s.album or "").lower()
+            return songs[:num_songs] if num_songs else songs
+
+        if artist or title or album:
+            # Substring filters narrow the rows down through the text index,
+            # so only the matching songs are checked against the rest
+            songs = [
+                song
+                for song in self.get_text_index().search(artist, title, album)
+                if self._song_matches(song, **criteria)
             ]
-        if genre:
-            filtered_songs = [s for s in filtered_songs if genre in (s.genres or [])]
-        if tunings:
-            filtered_songs = [s for s in filtered_songs if s.tuning in tunings]
-        if exclude_mastered:
-            filtered_songs = [s for s in filtered_songs if s.progress != "Mastered"]
+            return songs[:num_songs] if num_songs else songs
 
-        if num_songs and len(filtered_songs) > num_songs:
-            filtered_songs = filtered_songs[:num_songs]
+        table = self.get_song_table()
+        mask = table.filter(
+            artist=artist,
+            title=title,
+            album=album,
+            genre=genre,
+            tunings=tunings,
+            exclude_mastered=exclude_mastered,
+        )
+        rows = mask.nonzero()[0]
+        if num_songs:
+            rows = rows[:num_songs]
+        return table.to_songs(rows)
 
-        return filtered_songs
+    def set_random_seed(self, seed):
+        """
+        Seed the random number generator used to pick practice songs.
 
-    def get_progress_stats(self):
-        """Get statistics about song progress"""
-        songs = self.get_all_songs()
-        stats = {"Not Started": 0, "Learning": 0, "Mastered": 0}
+        Args:
+            seed (int or None): The seed, or None for a fresh random seed.
+        """
+        self.rng = np.random.default_rng(seed)
 
-        for song in songs:
-            if song.progress in stats:
-                stats[song.progress] += 1
+    def sample_songs(self, num_songs, weighting=UNIFORM, artist="", title="",
+                     album="", genre="", tunings=None, exclude_mastered=False,
+                     near_tuning=None, max_string_changes=1):
+        """
+        Pick distinct songs at random from the songs matching the filters.
 
-        return stats
+        The filtered rows and their alias table are kept until the library
+        changes, so drawing another set with the same filters only costs
+        num_songs draws.
 
-    def get_progress_history(self):
-        """Get history of song progress changes"""
-        songs = self.get_all_songs()
+        Args:
+            num_songs (int): The number of songs to pick.
+            weighting (str, optional): How to weight the songs, one of
+                                    models.sampler.WEIGHTINGS.
+            artist, title, album, genre, tunings, exclude_mastered,
+            near_tuning, max_string_changes: Filters, as in filter_songs.
 
-        # Group songs by progress state
-        progress_counts = {
-            "Not Started": 0,
-            "Learning": 0,
-            "Mastered": 0
-        }
+        Returns:
+            list: The picked Song objects, in the order they were drawn.
+        """
+        table = self.get_song_table()
+        if self._sampler_table is not table:
+            self._samplers = {}
+            self._sampler_table = table
 
-        for song in songs:
-            if song.progress in progress_counts:
-                progress_counts[song.progress] += 1
+        tunings = self._resolve_tunings(tunings, near_tuning, max_string_changes)
+        if tunings is not None and not tunings:
+            return []
+        key = (artist, title, album, genre, tunings, exclude_mastered, weighting)
+        sampler = self._samplers.get(key)
+        if sampler is None:
+            rows = table.filter(
+                artist=artist,
+                title=title,
+                album=album,
+                genre=genre,
+                tunings=tunings,
+                exclude_mastered=exclude_mastered,
+            ).nonzero()[0]
+            last_practiced = now = None
+            if weighting == BY_STALENESS:
+                last_practiced = self._last_practiced(table, rows)
+                now = time.time()
+            weights = song_weights(table, rows, weighting, last_practiced, now)
+            alias = AliasTable(weights) if len(rows) else None
+            sampler = self._samplers[key] = (rows, alias)
 
-        return progress_counts
+        rows, alias = sampler
+        if alias is None or num_songs <= 0:
+            return []
+        picks = alias.sample(self.rng, num_songs)
+        logging.info(f"Picked {len(picks)} of {len(rows)} songs ({weighting})")
+        return table.to_songs(rows[picks])
 
-    def get_tuning_stats(self):
-        """Get statistics about tuning usage"""
-        songs = self.get_all_songs()
-        tuning_stats = {}
+    def _last_practiced(self, table, rows):
+        """
+        Get when the given rows of the song table were last practiced.
+
+        Returns:
+            numpy.ndarray: Unix timestamps, NaN for songs never practiced
+            and for songs outside the main library, which have no schedule.
+        """
+        practiced = load_last_practiced(self.cursor)
+        main = (table.libraries.index(MAIN_LIBRARY)
+                if MAIN_LIBRARY in table.libraries else -1)
+        return np.array([
+            practiced.get(
+                (table.title_keys[row], table.artist_keys[table.artist_codes[row]]),
+                np.nan,
+            ) if table.library_codes[row] == main else np.nan
+            for row in rows.tolist()
+        ])
 
-        for song in songs:
-            if song.tuning:
-                tuning_stats[song.tuning] = tuning_stats.get(song.tuning, 0) + 1
+    def plan_practice(self, minutes, time_limit=planner.TIME_LIMIT, **filters):
+        """
+        Plan a practice session that fits in the given time.
 
-        return dict(sorted(tuning_stats.items(), key=lambda x: x[1], reverse=True))
+        Picks from the songs matching the filters, favoring songs that are
+        due or still being learned, and orders them so each tuning is played
+        in one go.
 
-    def get_genre_stats(self):
-        """Get statistics about genre usage"""
-        songs = self.get_all_songs()
-        genre_stats = {}
+        Args:
+            minutes (int): The length of the session.
+            time_limit (float, optional): Time limit for the solver, in seconds.
+            **filters: Filters, as in filter_songs.
+
+        Returns:
+            PracticePlan: The songs in practice order, with the total time
+                          and number of tuning changes.
+        """
+        songs = self.filter_songs(**filters)
+        due_keys = {(song.title_key, song.artist_key) for song in self.get_due_songs()}
+        plan = planner.plan_practice(songs, minutes * 60, due_keys, time_limit)
+        logging.info(
+            f"Planned {len(plan.songs)} songs from {len(songs)} candidates in "
+            f"{plan.total_seconds // 60} minutes with {plan.tuning_changes} retunes"
+        )
+        return plan
+
+    def get_song_count(self):
+        """Get the number of songs in the active libraries"""
+        return count_songs(self.cursor, LIBRARY_VIEW)
+
+    def get_progress_stats(self):
+        """Get statistics about song progress"""
+        return self.get_song_table().progress_counts()
 
-        for song in songs:
-            if song.genres:
-                for genre in song.genres:
-                    genre_stats[genre] = genre_stats.get(genre, 0) + 1
+    def get_progress_history(self):
+        """Get history of song progress changes"""
+        # Only current progress is stored, so this mirrors the progress stats
+        return self.get_progress_stats()
 
-        return dict(sorted(genre_stats.items(), key=lambda x: x[1], reverse=True))
+    def get_tuning_stats(self):
+        """Get statistics about tuning usage"""
+        return self.get_song_table().tuning_counts()
+
+    def get_genre_stats(self):
+        """Get statistics about genre usage"""
+        return self.get_song_table().genre_counts()
@@ -12,5 +12,117 @@ CREATE TABLE IF NOT EXISTS songs (
     duration INTEGER,
     genres TEXT,
     progress TEXT DEFAULT 'Not Started',
+    title_key TEXT,
+    artist_key TEXT,
+    album_key TEXT,
+    display_title TEXT,
+    display_artist TEXT,
+    display_album TEXT,
     PRIMARY KEY (title, artist)
-);
\ No newline at end of file
+);
+
+CREATE INDEX IF NOT EXISTS idx_songs_keys ON songs (title_key, artist_key);
+
+CREATE TABLE IF NOT EXISTS library_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    change_counter INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO library_state (id, change_counter) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS songs_insert_counter AFTER INSERT ON songs
+BEGIN
+    UPDATE library_state SET change_counter = change_counter + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS songs_update_counter AFTER UPDATE ON songs
+BEGIN
+    UPDATE library_state SET change_counter = change_counter + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS songs_delete_counter AFTER DELETE ON songs
+BEGIN
+    UPDATE library_state SET change_counter = change_counter + 1 WHERE id = 1;
+END;
+
+CREATE TABLE IF NOT EXISTS practice_schedule (
+    title_key TEXT NOT NULL,
+    artist_key TEXT NOT NULL,
+    ease REAL NOT NULL,
+    interval_days INTEGER NOT NULL,
+    repetitions INTEGER NOT NULL,
+    last_practiced REAL,
+    due_at REAL,
+    PRIMARY KEY (title_key, artist_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_practice_schedule_due ON practice_schedule (due_at);
+
+CREATE TRIGGER IF NOT EXISTS songs_delete_schedule AFTER DELETE ON songs
+BEGIN
+    DELETE FROM practice_schedule
+    WHERE title_key = OLD.title_key AND artist_key = OLD.artist_key;
+END;
+
+CREATE TABLE IF NOT EXISTS chord_analysis (
+    title_key TEXT NOT NULL,
+    artist_key TEXT NOT NULL,
+    song_key TEXT,
+    progressions TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (title_key, artist_key)
+);
+
+CREATE TABLE IF NOT EXISTS song_chords (
+    kind TEXT NOT NULL,
+    gram TEXT NOT NULL,
+    title_key TEXT NOT NULL,
+    artist_key TEXT NOT NULL,
+    PRIMARY KEY (kind, gram, title_key, artist_key)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_song_chords_song ON song_chords (title_key, artist_key);
+
+CREATE TRIGGER IF NOT EXISTS songs_update_chords
+AFTER UPDATE OF notes, title_key, artist_key ON songs
+BEGIN
+    DELETE FROM chord_analysis
+    WHERE title_key = OLD.title_key AND artist_key = OLD.artist_key;
+    DELETE FROM song_chords
+    WHERE title_key = OLD.title_key AND artist_key = OLD.artist_key;
+END;
+
+CREATE TRIGGER IF NOT EXISTS songs_delete_chords AFTER DELETE ON songs
+BEGIN
+    DELETE FROM chord_analysis
+    WHERE title_key = OLD.title_key AND artist_key = OLD.artist_key;
+    DELETE FROM song_chords
+    WHERE title_key = OLD.title_key AND artist_key = OLD.artist_key;
+END;
+
+CREATE TABLE IF NOT EXISTS song_tags (
+    title_key TEXT NOT NULL,
+    artist_key TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    weight REAL NOT NULL,
+    PRIMARY KEY (title_key, artist_key, tag)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS songs_delete_tags AFTER DELETE ON songs
+BEGIN
+    DELETE FROM song_tags
+    WHERE title_key = OLD.title_key AND artist_key = OLD.artist_key;
+END;
+
+CREATE TABLE IF NOT EXISTS pending_enrichment (
+    title_key TEXT NOT NULL,
+    artist_key TEXT NOT NULL,
+    queued_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (title_key, artist_key)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS songs_delete_pending AFTER DELETE ON songs
+BEGIN
+    DELETE FROM pending_enrichment
+    WHERE title_key = OLD.title_key AND artist_key = OLD.artist_key;
+END;
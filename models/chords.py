@@ -0,0 +1,327 @@
+"""
+Chord progressions in song notes: parsing chords, detecting the key and
+naming chords by Roman numeral.
+"""
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from models.tuning import PITCH_NAMES
+
+MAJOR, MINOR, DIMINISHED, AUGMENTED = "major", "minor", "dim", "aug"
+_QUALITIES = (MAJOR, MINOR, DIMINISHED, AUGMENTED)
+
+# Longest progression stored in the chord index
+MAX_NGRAM = 4
+
+# Index entries for chord symbols and for Roman numeral progressions
+CHORD, PROGRESSION = "chord", "progression"
+
+_ROOTS = {
+    "C": 0, "C#": 1, "Db": 1, "D": 2, "D#": 3, "Eb": 3, "E": 4, "Fb": 4,
+    "E#": 5, "F": 5, "F#": 6, "Gb": 6, "G": 7, "G#": 8, "Ab": 8, "A": 9,
+    "A#": 10, "Bb": 10, "B": 11, "Cb": 11, "B#": 0,
+}
+
+_CHORD_PATTERN = re.compile(
+    r"(?P<root>[A-G][#b]?)"
+    r"(?P<suffix>(?:maj|min|dim|aug|sus|add|m|M|°|ø|\+|-|b|#|\d|\(|\))*)"
+    r"(?:/(?P<bass>[A-G][#b]?))?"
+)
+
+# Tokens that can share a line with chords: bar lines, repeats, no chord
+_FILLER_PATTERN = re.compile(r"\|+|:?\|\|?:?|\(?x\d+\)?|\d+x|n\.?c\.?|%|/", re.I)
+
+# Section labels such as "Verse:" or "Chorus 2 -"
+_LABEL_PATTERN = re.compile(r"^\s*(?P<label>[^:\n]{1,30}?)\s*(?::|\s[-–—]\s)\s*")
+
+# Triads by scale degree in semitones above the tonic
+_DIATONIC = {
+    MAJOR: {(0, MAJOR), (2, MINOR), (4, MINOR), (5, MAJOR), (7, MAJOR),
+            (9, MINOR), (11, DIMINISHED)},
+    MINOR: {(0, MINOR), (2, DIMINISHED), (3, MAJOR), (5, MINOR), (7, MINOR),
+            (7, MAJOR), (8, MAJOR), (10, MAJOR)},
+}
+
+_NUMERALS = ["I", "II", "III", "IV", "V", "VI", "VII"]
+_DEGREES = {
+    MAJOR: ["I", "bII", "II", "bIII", "III", "IV", "#IV", "V", "bVI", "VI",
+            "bVII", "VII"],
+    MINOR: ["I", "bII", "II", "III", "#III", "IV", "#IV", "V", "VI", "#VI",
+            "VII", "#VII"],
+}
+_NUMERAL_PATTERN = re.compile(
+    r"(?P<accidental>[b#]?)(?P<numeral>VII|VI|IV|V|III|II|I)(?P<quality>°|\+)?",
+    re.I,
+)
+
+Key = namedtuple("Key", "tonic mode")
+Key.__doc__ = """
+A key: the tonic as a pitch class (0 is C) and MAJOR or MINOR.
+"""
+
+
+class Chord(namedtuple("Chord", "root quality symbol")):
+    """
+    A chord: its root pitch class, its triad quality and its normalized
+    symbol, e.g. (11, MINOR, "Bm7").
+    """
+
+    __slots__ = ()
+
+    @property
+    def triad(self):
+        """The symbol of the underlying triad, e.g. "Bm" for Bm7."""
+        suffix = {MAJOR: "", MINOR: "m", DIMINISHED: "dim", AUGMENTED: "aug"}
+        return PITCH_NAMES[self.root] + suffix[self.quality]
+
+
+ChordAnalysis = namedtuple("ChordAnalysis", "key chords progressions")
+ChordAnalysis.__doc__ = """
+The chords found in a song's notes.
+
+Attributes:
+    key (Key or None): The detected key, None if there are no chords.
+    chords (set of str): Chord and triad symbols.
+    progressions (list of tuple): Roman numerals, one tuple per chord line.
+"""
+
+
+def _normalize_suffix(suffix):
+    suffix = suffix.replace("°", "dim").replace("ø", "m7b5").replace("+", "aug")
+    if suffix.startswith("min"):
+        suffix = "m" + suffix[3:]
+    elif suffix.startswith("-"):
+        suffix = "m" + suffix[1:]
+    elif suffix.startswith("M"):
+        suffix = "maj" + suffix[1:]
+    return suffix
+
+
+def _quality(suffix):
+    if suffix.startswith("dim") or suffix.startswith("m7b5"):
+        return DIMINISHED
+    if suffix.startswith("aug"):
+        return AUGMENTED
+    if suffix.startswith("m") and not suffix.startswith("maj"):
+        return MINOR
+    return MAJOR
+
+
+@lru_cache(maxsize=4096)
+def parse_chord(token):
+    """
+    Parse a chord symbol such as "Am", "F#m7", "Bbmaj7" or "D/F#".
+
+    Args:
+        token (str): The symbol.
+
+    Returns:
+        Chord or None: The chord, or None if the token isn't a chord.
+    """
+    match = _CHORD_PATTERN.fullmatch(token.strip().replace("♯", "#").replace("♭", "b"))
+    if not match:
+        return None
+    root = _ROOTS[match.group("root")]
+    suffix = _normalize_suffix(match.group("suffix"))
+    symbol = PITCH_NAMES[root] + suffix
+    if match.group("bass"):
+        symbol += "/" + PITCH_NAMES[_ROOTS[match.group("bass")]]
+    return Chord(root, _quality(suffix), symbol)
+
+
+def extract_progressions(notes):
+    """
+    Find the chord lines in free-form notes.
+
+    A line counts as a chord line when, after an optional section label
+    like "Verse:", every token is a chord, a bar line or a repeat mark.
+    Lines of prose are skipped even if they mention a chord.
+
+    Args:
+        notes (str): The notes.
+
+    Returns:
+        list of list of Chord: The chords of each chord line, in order.
+    """
+    progressions = []
+    for line in (notes or "").splitlines():
+        label = _LABEL_PATTERN.match(line)
+        if label and parse_chord(label.group("label").split()[-1]):
+            # "Am - F - C" starts with a chord, not a label
+            label = None
+        body = line[label.end():] if label else line
+        chords = []
+        for token in re.split(r"[\s,\-–—]+", body):
+            if not token or _FILLER_PATTERN.fullmatch(token):
+                continue
+            chord = parse_chord(token)
+            if chord is None:
+                chords = []
+                break
+            chords.append(chord)
+        if len(chords) >= 2 or (chords and label):
+            progressions.append(chords)
+    return progressions
+
+
+def detect_key(chords):
+    """
+    Guess the key of a sequence of chords.
+
+    Every key is scored by the number of chords that belong to it, with a
+    bonus when the progression starts or ends on the tonic, which separates
+    a major key from its relative minor. The chords are counted by quality
+    and root once and scored against all 24 keys in one array operation.
+
+    Args:
+        chords (list of Chord): The chords, in order.
+
+    Returns:
+        Key or None: The most likely key, None if there are no chords.
+    """
+    if not chords:
+        return None
+    counts = np.zeros((len(_QUALITIES), 12))
+    for chord in chords:
+        counts[_QUALITIES.index(chord.quality), chord.root] += 1
+    # Chords that fit each key, plus small bonuses for the tonic chord
+    scores = (_KEY_TEMPLATES * counts).sum(axis=(1, 2))
+    scores += 0.1 * (_TONIC_TEMPLATES * counts).sum(axis=(1, 2))
+    first, last = chords[0], chords[-1]
+    scores += 0.75 * _TONIC_TEMPLATES[:, _QUALITIES.index(first.quality), first.root]
+    scores += 0.5 * _TONIC_TEMPLATES[:, _QUALITIES.index(last.quality), last.root]
+    return _KEYS[int(np.argmax(scores))]
+
+
+def _key_templates():
+    """
+    Diatonic and tonic triads of all 24 keys, as (key, quality, root) arrays.
+    """
+    keys = [Key(tonic, mode) for mode in (MAJOR, MINOR) for tonic in range(12)]
+    diatonic = np.zeros((len(keys), len(_QUALITIES), 12))
+    tonic = np.zeros_like(diatonic)
+    for row, key in enumerate(keys):
+        for degree, quality in _DIATONIC[key.mode]:
+            diatonic[row, _QUALITIES.index(quality), (key.tonic + degree) % 12] = 1
+        tonic[row, _QUALITIES.index(key.mode), key.tonic] = 1
+    return keys, diatonic, tonic
+
+
+_KEYS, _KEY_TEMPLATES, _TONIC_TEMPLATES = _key_templates()
+
+
+def key_name(key):
+    """
+    Get the name of a key, e.g. "A minor".
+
+    Args:
+        key (Key): The key.
+
+    Returns:
+        str: The name.
+    """
+    return f"{PITCH_NAMES[key.tonic]} {key.mode}"
+
+
+def roman_numeral(chord, key):
+    """
+    Name a chord by its scale degree in a key.
+
+    Minor and diminished chords are lowercase, diminished chords end in "°"
+    and augmented ones in "+". Degrees outside the scale get a "b" or "#".
+
+    Args:
+        chord (Chord): The chord.
+        key (Key): The key.
+
+    Returns:
+        str: The Roman numeral, e.g. "vi" or "bVII".
+    """
+    numeral = _DEGREES[key.mode][(chord.root - key.tonic) % 12]
+    if chord.quality in (MINOR, DIMINISHED):
+        numeral = numeral.lower()
+    if chord.quality == DIMINISHED:
+        numeral += "°"
+    elif chord.quality == AUGMENTED:
+        numeral += "+"
+    return numeral
+
+
+def parse_progression(text):
+    """
+    Parse a Roman numeral progression such as "I–V–vi–IV" or "i bVII bVI".
+
+    Args:
+        text (str): The progression, separated by spaces, dashes or commas.
+
+    Returns:
+        tuple of str or None: The normalized numerals, None if the text
+        isn't a progression.
+    """
+    text = text.replace("♭", "b").replace("♯", "#")
+    numerals = []
+    for token in re.split(r"[\s,\-–—|]+", text.strip()):
+        if not token:
+            continue
+        token = re.sub(r"(o|dim)$", "°", token)
+        match = _NUMERAL_PATTERN.fullmatch(token)
+        numeral = match and match.group("numeral")
+        if not match or numeral.upper() not in _NUMERALS or (
+            numeral != numeral.upper() and numeral != numeral.lower()
+        ):
+            return None
+        numerals.append(
+            match.group("accidental") + numeral + (match.group("quality") or "")
+        )
+    return tuple(numerals) or None
+
+
+def analyze_notes(notes):
+    """
+    Find the chords in a song's notes and name them relative to its key.
+
+    Repeated chords are collapsed, so "Am Am F C" is the progression
+    "i VI III".
+
+    Args:
+        notes (str): The notes.
+
+    Returns:
+        ChordAnalysis: The analysis.
+    """
+    lines = extract_progressions(notes)
+    key = detect_key([chord for line in lines for chord in line])
+    chords = set()
+    progressions = []
+    for line in lines:
+        numerals = []
+        for chord in line:
+            chords.update((chord.symbol, chord.triad))
+            numeral = roman_numeral(chord, key)
+            if not numerals or numerals[-1] != numeral:
+                numerals.append(numeral)
+        progressions.append(tuple(numerals))
+    return ChordAnalysis(key, chords, progressions)
+
+
+def chord_grams(analysis, max_n=MAX_NGRAM):
+    """
+    Get the chord index entries of an analyzed song.
+
+    Args:
+        analysis (ChordAnalysis): The analysis.
+        max_n (int, optional): The longest progression to index.
+
+    Returns:
+        set of tuple: (CHORD, symbol) and (PROGRESSION, "I-V-vi-IV") pairs.
+    """
+    grams = {(CHORD, symbol) for symbol in analysis.chords}
+    for numerals in analysis.progressions:
+        for n in range(1, max_n + 1):
+            for start in range(len(numerals) - n + 1):
+                grams.add((PROGRESSION, "-".join(numerals[start:start + n])))
+    return grams
@@ -0,0 +1,235 @@
+"""
+Finding songs entered more than once under slightly different names, and
+merging them.
+"""
+
+import logging
+import re
+import unicodedata
+from collections import defaultdict, namedtuple
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+from models.song import Song
+
+# Smallest title and artist similarity for two songs to be duplicates
+SIMILARITY_THRESHOLD = 0.85
+
+# Characters of the normalized title or artist a blocking key keeps
+BLOCK_PREFIX = 3
+
+# Blocks larger than this are too unspecific to compare pairwise
+MAX_BLOCK_SIZE = 200
+
+# Separates the notes of merged songs
+NOTES_SEPARATOR = "\n\n"
+
+# Leftover brackets and spaces before a match are folded away afterwards
+_FEATURING_PATTERN = re.compile(r"\b(?:feat|ft|featuring)\b\.?\s.*$", re.I)
+
+# Words that mark a release of a song rather than a different song
+_VERSION_WORDS = (
+    r"remaster(?:ed)?|live|version|edit|mono|stereo|deluxe|bonus|single|demo"
+    r"|explicit|radio|anniversary"
+)
+_VERSION_PATTERN = re.compile(
+    rf"[(\[][^)\]]*\b(?:{_VERSION_WORDS})\b[^)\]]*[)\]]"
+    rf"|\s[-–—]\s+[^-–—]*\b(?:{_VERSION_WORDS})\b.*$",
+    re.I,
+)
+
+DuplicateGroup = namedtuple("DuplicateGroup", "score songs")
+DuplicateGroup.__doc__ = """
+Songs that look like the same song.
+
+Attributes:
+    score (float): Similarity of the least similar linked pair, 1.0 if the
+        names only differ in case, punctuation or version tags.
+    songs (list of Song): The songs, the one to keep first.
+"""
+
+
+def _fold(text):
+    """Casefold text, drop accents and punctuation and collapse whitespace."""
+    text = text or ""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(char for char in text if not unicodedata.combining(char))
+    text = text.casefold().replace("&", " and ")
+    return " ".join(re.sub(r"[^\w\s]|_", " ", text).split())
+
+
+def normalize_title(title):
+    """
+    Normalize a title for duplicate matching.
+
+    Featured artists and version tags such as "(Remastered 2011)" or
+    "- Live at Reading" are dropped, so releases of a song share a title.
+
+    Args:
+        title (str): The title.
+
+    Returns:
+        str: The normalized title.
+    """
+    title = title or ""
+    stripped = _FEATURING_PATTERN.sub("", _VERSION_PATTERN.sub("", title))
+    # A title that is nothing but a version tag stays as it is
+    return _fold(stripped) or _fold(title)
+
+
+@lru_cache(maxsize=65536)
+def normalize_artist(artist):
+    """
+    Normalize an artist for duplicate matching.
+
+    Featured artists and a leading "The" are dropped.
+
+    Args:
+        artist (str): The artist.
+
+    Returns:
+        str: The normalized artist.
+    """
+    artist = _fold(_FEATURING_PATTERN.sub("", artist or "") or artist)
+    return artist[4:] if artist.startswith("the ") else artist
+
+
+def _similarity(a, b, threshold):
+    """String similarity of a and b, or 0.0 if it is below the threshold."""
+    if a == b:
+        return 1.0
+    # The ratio can't beat what the lengths allow, which rules out most
+    # pairs before setting up a matcher
+    if 2 * min(len(a), len(b)) < threshold * (len(a) + len(b)):
+        return 0.0
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    if matcher.quick_ratio() < threshold:
+        return 0.0
+    ratio = matcher.ratio()
+    return ratio if ratio >= threshold else 0.0
+
+
+def _keep_order(song):
+    """Sort key putting the song to keep first: most progress, most details."""
+    return (
+        -Song.PROGRESS_STATES.index(song.progress),
+        -sum(bool(value) for value in (song.album, song.tuning, song.duration,
+                                       song.genres)),
+        -len(song.notes or ""),
+    )
+
+
+def find_duplicates(songs, threshold=SIMILARITY_THRESHOLD):
+    """
+    Find groups of songs that look like the same song.
+
+    Songs whose normalized titles and artists are equal are grouped right
+    away. The remaining candidates are only compared within blocks of songs
+    sharing a normalized artist and the start of the title, or a normalized
+    title and the start of the artist, so a typo in either one is still
+    caught without comparing every pair of songs.
+
+    Args:
+        songs (iterable of Song): The songs to check.
+        threshold (float, optional): Smallest title and artist similarity,
+                                     from 0 to 1.
+
+    Returns:
+        list of DuplicateGroup: The groups, most similar first.
+    """
+    exact = defaultdict(list)
+    for song in songs:
+        exact[(normalize_title(song.title), normalize_artist(song.artist))].append(song)
+    names = list(exact)
+
+    # Union-find over the distinct normalized names, linking similar ones
+    parents = list(range(len(names)))
+    scores = [1.0] * len(names)
+
+    def root(index):
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    blocks = defaultdict(list)
+    for index, (title, artist) in enumerate(names):
+        blocks[("artist", artist, title[:BLOCK_PREFIX])].append(index)
+        blocks[("title", title, artist[:BLOCK_PREFIX])].append(index)
+
+    compared = set()
+    for block_key, members in blocks.items():
+        if len(members) > MAX_BLOCK_SIZE:
+            logging.debug(f"Skipping duplicate block {block_key} of {len(members)}")
+            continue
+        for position, first in enumerate(members):
+            for second in members[position + 1:]:
+                if (first, second) in compared:
+                    continue
+                compared.add((first, second))
+                (title_a, artist_a), (title_b, artist_b) = names[first], names[second]
+                title_score = _similarity(title_a, title_b, threshold)
+                if not title_score:
+                    continue
+                artist_score = _similarity(artist_a, artist_b, threshold)
+                if not artist_score:
+                    continue
+                score = (title_score + artist_score) / 2
+                root_a, root_b = root(first), root(second)
+                if root_a != root_b:
+                    parents[root_b] = root_a
+                scores[root_a] = min(scores[root_a], scores[root_b], score)
+
+    grouped = defaultdict(list)
+    for index, name in enumerate(names):
+        grouped[root(index)].extend(exact[name])
+    groups = [
+        DuplicateGroup(scores[group_root], sorted(group, key=_keep_order))
+        for group_root, group in grouped.items()
+        if len(group) > 1
+    ]
+    groups.sort(key=lambda group: (-group.score, group.songs[0].title_key))
+    return groups
+
+
+def merge_song_fields(keep, duplicates):
+    """
+    Combine duplicates of a song into the song to keep.
+
+    The kept song's title and artist stay. Its progress becomes the best
+    progress of any copy, notes of every copy are joined, and details it
+    is missing are taken from the first copy that has them.
+
+    Args:
+        keep (Song): The song to keep.
+        duplicates (list of Song): The songs merged into it.
+
+    Returns:
+        Song: The merged song.
+    """
+    songs = [keep] + list(duplicates)
+    notes = []
+    for song in songs:
+        text = (song.notes or "").strip()
+        if text and not any(text in earlier for earlier in notes):
+            notes = [earlier for earlier in notes if earlier not in text] + [text]
+
+    def first(field):
+        return next((getattr(song, field) for song in songs if getattr(song, field)),
+                    getattr(keep, field))
+
+    genres = first("genres")
+    return Song(
+        keep.title,
+        keep.artist,
+        tuning=first("tuning"),
+        notes=NOTES_SEPARATOR.join(notes) or keep.notes,
+        album=first("album"),
+        duration=first("duration"),
+        genres=list(genres) if genres else "",
+        progress=max(
+            (song.progress for song in songs), key=Song.PROGRESS_STATES.index
+        ),
+        library=keep.library,
+    )
@@ -0,0 +1,312 @@
+"""
+Typo-tolerant matching of song artists and titles.
+"""
+
+import time
+import logging
+from collections import defaultdict
+
+from models.song import normalize_key
+
+# Largest number of typos tolerated in a word
+MAX_DISTANCE = 2
+
+# Deletes are only generated for this many leading characters of a word,
+# which bounds the index size for long words
+PREFIX_LENGTH = 7
+
+# Default per-query time limit, in seconds
+TIME_LIMIT = 0.05
+
+
+def edit_distance(a, b):
+    """
+    Compute the Levenshtein distance between two strings.
+
+    Args:
+        a (str): The first string.
+        b (str): The second string.
+
+    Returns:
+        int: The number of single-character insertions, deletions and
+        substitutions needed to turn a into b.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        previous = current
+    return previous[-1]
+
+
+def distance_budget(word, max_distance=MAX_DISTANCE):
+    """
+    Get the number of typos tolerated in a word: none up to three
+    characters, then one per four characters.
+
+    Args:
+        word (str): The word.
+        max_distance (int, optional): Upper bound on the budget.
+
+    Returns:
+        int: The edit distance budget.
+    """
+    return min(max_distance, len(word) // 4)
+
+
+def deletes(word, distance):
+    """
+    Get every string obtained by deleting up to distance characters from
+    the prefix of a word.
+
+    Args:
+        word (str): The word.
+        distance (int): The largest number of deletions.
+
+    Returns:
+        set: The deletes, including the unchanged prefix.
+    """
+    frontier = {word[:PREFIX_LENGTH]}
+    results = set(frontier)
+    for _ in range(distance):
+        frontier = {
+            variant[:i] + variant[i + 1:]
+            for variant in frontier
+            for i in range(len(variant))
+        }
+        results |= frontier
+    return results
+
+
+class DeletionIndex:
+    """
+    Symmetric delete index over words, as in SymSpell.
+
+    Every word is stored under all of its deletes. Two words within edit
+    distance d share a delete of at most d characters each, so a lookup
+    only generates the deletes of the query and checks the words stored
+    under them, instead of comparing against every word.
+    """
+
+    def __init__(self, max_distance=MAX_DISTANCE):
+        self.max_distance = max_distance
+        self._words = defaultdict(set)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, word):
+        """
+        Add a word.
+
+        Args:
+            word (str): The word.
+        """
+        for variant in deletes(word, self.max_distance):
+            self._words[variant].add(word)
+        self._size += 1
+
+    def search(self, word, max_distance, deadline=None):
+        """
+        Find the words within max_distance of word.
+
+        Args:
+            word (str): The query word.
+            max_distance (int): The edit distance budget.
+            deadline (float, optional): time.perf_counter() value after
+                                    which the search stops early.
+
+        Returns:
+            tuple: (dict of word to distance, bool complete)
+        """
+        candidates = set()
+        for variant in deletes(word, max_distance):
+            candidates |= self._words.get(variant, set())
+        matches = {}
+        for candidate in candidates:
+            if deadline is not None and time.perf_counter() > deadline:
+                return matches, False
+            if abs(len(candidate) - len(word)) > max_distance:
+                continue
+            distance = edit_distance(word, candidate)
+            if distance <= max_distance:
+                matches[candidate] = distance
+        return matches, True
+
+
+class FuzzySongIndex:
+    """
+    Typo-tolerant index over the words of song artists and titles.
+
+    A query matches a field when each of its words is within the typo
+    budget of some word of the field; songs are ranked by the total number
+    of typos. Deleting a song only unlinks it from its words, and unused
+    words stay in the index until it is rebuilt with the song cache.
+    """
+
+    FIELDS = ("artist_key", "title_key")
+
+    def __init__(self, songs=()):
+        """
+        Build the index.
+
+        Args:
+            songs (iterable of Song): The songs to index.
+        """
+        self._words = DeletionIndex()
+        self._docs = {field: defaultdict(set) for field in self.FIELDS}
+        self._songs = {}
+        self._ids = {}
+        self._next_id = 0
+        for song in songs:
+            self.add(song)
+
+    def __len__(self):
+        return len(self._songs)
+
+    def add(self, song):
+        """
+        Add a song, replacing any earlier version of it.
+
+        Args:
+            song (Song): The song.
+        """
+        key = (song.library, song.title_key, song.artist_key)
+        doc_id = self._ids.get(key)
+        if doc_id is None:
+            doc_id = self._ids[key] = self._next_id
+            self._next_id += 1
+        self._songs[doc_id] = song
+        for field in self.FIELDS:
+            for word in getattr(song, field).split():
+                if not self._has_word(word):
+                    self._words.add(word)
+                self._docs[field][word].add(doc_id)
+
+    def _has_word(self, word):
+        return any(word in docs for docs in self._docs.values())
+
+    def remove(self, library, title, artist):
+        """
+        Remove a song.
+
+        Args:
+            library (str): The library the song is in.
+            title (str): The title of the song.
+            artist (str): The artist of the song.
+        """
+        title, artist = normalize_key(title), normalize_key(artist)
+        doc_id = self._ids.pop((library, title, artist), None)
+        if doc_id is None:
+            return
+        del self._songs[doc_id]
+        for field, value in zip(self.FIELDS, (artist, title)):
+            docs = self._docs[field]
+            for word in value.split():
+                if word in docs:
+                    docs[word].discard(doc_id)
+
+    def _field_matches(self, field, text, max_distance, deadline):
+        """
+        Score the songs whose field contains a close match for every word
+        of text.
+
+        Returns:
+            dict: Total distance by doc id.
+        """
+        totals = None
+        docs = self._docs[field]
+        for word in normalize_key(text).split():
+            words, complete = self._words.search(
+                word, distance_budget(word, max_distance), deadline
+            )
+            if not complete:
+                logging.debug(f"Fuzzy search for {text!r} hit its time limit")
+            scores = {}
+            for match, distance in words.items():
+                for doc_id in docs.get(match, ()):
+                    if distance < scores.get(doc_id, distance + 1):
+                        scores[doc_id] = distance
+            if totals is None:
+                totals = scores
+            else:
+                totals = {
+                    doc_id: totals[doc_id] + distance
+                    for doc_id, distance in scores.items()
+                    if doc_id in totals
+                }
+            if not totals:
+                return {}
+        return totals or {}
+
+    def _ranked(self, totals, limit):
+        best = sorted((distance, doc_id) for doc_id, distance in totals.items())
+        return [(distance, self._songs[doc_id]) for distance, doc_id in best[:limit]]
+
+    def search(self, artist="", title="", limit=5, max_distance=MAX_DISTANCE,
+               time_limit=TIME_LIMIT):
+        """
+        Find the songs closest to the given artist and title.
+
+        Songs must match every given field, and are ranked by the total
+        number of typos. When the time limit runs out the best matches found
+        so far are returned.
+
+        Args:
+            artist (str, optional): The artist to look for.
+            title (str, optional): The title to look for.
+            limit (int, optional): The number of songs to return.
+            max_distance (int, optional): Largest number of typos per word.
+            time_limit (float, optional): Time limit in seconds.
+
+        Returns:
+            list of tuple: (distance, Song) pairs, closest first.
+        """
+        deadline = time.perf_counter() + time_limit
+        totals = None
+        for field, text in zip(self.FIELDS, (artist, title)):
+            if not text or not text.strip():
+                continue
+            scores = self._field_matches(field, text, max_distance, deadline)
+            if totals is None:
+                totals = scores
+            else:
+                totals = {
+                    doc_id: totals[doc_id] + distance
+                    for doc_id, distance in scores.items()
+                    if doc_id in totals
+                }
+        return self._ranked(totals or {}, limit)
+
+    def search_any(self, text, limit=20, max_distance=MAX_DISTANCE,
+                   time_limit=TIME_LIMIT):
+        """
+        Find the songs whose artist or title is closest to text.
+
+        Args:
+            text (str): The text to look for.
+            limit (int, optional): The number of songs to return.
+            max_distance (int, optional): Largest number of typos per word.
+            time_limit (float, optional): Time limit in seconds.
+
+        Returns:
+            list of tuple: (distance, Song) pairs, closest first.
+        """
+        if not text or not text.strip():
+            return []
+        deadline = time.perf_counter() + time_limit
+        best = {}
+        for field in self.FIELDS:
+            scores = self._field_matches(field, text, max_distance, deadline)
+            for doc_id, distance in scores.items():
+                if distance < best.get(doc_id, distance + 1):
+                    best[doc_id] = distance
+        return self._ranked(best, limit)
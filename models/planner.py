@@ -0,0 +1,227 @@
+"""
+Planning practice sessions that fit a time budget.
+"""
+
+import math
+import time
+import logging
+from collections import namedtuple
+
+import numpy as np
+
+from models.tuning import canonical_tuning_name
+
+# Time it takes to retune between two songs, in seconds
+RETUNE_SECONDS = 90
+
+# Practice time assumed for songs without a known duration, in seconds
+DEFAULT_SONG_SECONDS = 240
+
+# Durations are planned in steps of this many seconds
+TIME_STEP = 15
+
+# Default time limit for finding the best plan, in seconds
+TIME_LIMIT = 0.5
+
+# Value of practicing a song, by progress, and the bonus for due songs
+PROGRESS_VALUES = {"Not Started": 2.0, "Learning": 3.0, "Mastered": 1.0}
+DUE_BONUS = 5.0
+
+PracticePlan = namedtuple(
+    "PracticePlan", "songs total_seconds tuning_changes optimal"
+)
+PracticePlan.__doc__ = """
+Songs to practice in order, grouped by tuning.
+
+Attributes:
+    songs (list of Song): The songs, in practice order.
+    total_seconds (int): Playing plus retuning time.
+    tuning_changes (int): Number of retunes between songs.
+    optimal (bool): False if the solver ran out of time and a greedy plan
+        was used instead.
+"""
+
+
+def duration_seconds(duration):
+    """
+    Get the length of a song in seconds from its stored duration.
+
+    Last.fm durations are in milliseconds while older custom songs stored
+    seconds, so values too small to be milliseconds are taken as seconds.
+
+    Args:
+        duration (str or int): The stored duration.
+
+    Returns:
+        int: The length in seconds, DEFAULT_SONG_SECONDS if unknown.
+    """
+    try:
+        value = int(duration)
+    except (TypeError, ValueError):
+        return DEFAULT_SONG_SECONDS
+    if value <= 0:
+        return DEFAULT_SONG_SECONDS
+    return value // 1000 if value >= 10_000 else value
+
+
+def song_value(song, due):
+    """
+    Get how much practicing a song is worth.
+
+    Args:
+        song (Song): The song.
+        due (bool): Whether the song is due for practice.
+
+    Returns:
+        float: The value.
+    """
+    value = PROGRESS_VALUES.get(song.progress, PROGRESS_VALUES["Not Started"])
+    return value + (DUE_BONUS if due else 0.0)
+
+
+def _group_by_tuning(candidates):
+    groups = {}
+    for candidate in candidates:
+        name = canonical_tuning_name(candidate[0].tuning)
+        groups.setdefault(name, []).append(candidate)
+    return list(groups.values())
+
+
+def _solve_exact(groups, capacity, retune_steps, deadline):
+    """
+    Knapsack over tuning groups, where opening a group costs one retune.
+
+    The first tuning is free, which is the same as adding one retune to the
+    capacity. Each group is a 0/1 knapsack on top of the best values with
+    the groups before it.
+
+    Returns:
+        list of Song or None: The chosen songs grouped by tuning, or None if
+        the deadline passed.
+    """
+    best = np.zeros(capacity + 1)
+    history = []
+    for group in groups:
+        current = np.full(capacity + 1, -np.inf)
+        current[retune_steps:] = best[:capacity + 1 - retune_steps]
+        takes = []
+        for _, steps, value in group:
+            if time.perf_counter() > deadline:
+                return None
+            take = np.zeros(capacity + 1, dtype=bool)
+            if steps <= capacity:
+                candidate = current[:capacity + 1 - steps] + value
+                take[steps:] = candidate > current[steps:]
+                current[steps:] = np.where(take[steps:], candidate, current[steps:])
+            takes.append(take)
+        opened = current > best
+        best = np.where(opened, current, best)
+        history.append((opened, takes))
+
+    # Walk back from the best reachable value to the songs that produced it
+    steps_left = int(np.argmax(best))
+    plan = []
+    for group, (opened, takes) in zip(reversed(groups), reversed(history)):
+        if not opened[steps_left]:
+            continue
+        chosen = []
+        for (song, steps, _), take in zip(reversed(group), reversed(takes)):
+            if take[steps_left]:
+                chosen.append(song)
+                steps_left -= steps
+        steps_left -= retune_steps
+        plan.append(chosen[::-1])
+    return plan[::-1]
+
+
+def _solve_greedy(groups, capacity, retune_steps):
+    """
+    Fill the budget tuning group by tuning group, most valuable groups and
+    songs first, paying a retune for every group after the first.
+
+    Returns:
+        list of Song: The chosen songs grouped by tuning.
+    """
+    def density(candidate):
+        return candidate[2] / candidate[1]
+
+    groups = sorted(
+        groups,
+        key=lambda group: sum(c[2] for c in group) / sum(c[1] for c in group),
+        reverse=True,
+    )
+    remaining = capacity
+    plan = []
+    for group in groups:
+        cost = retune_steps if plan else 0
+        chosen = []
+        for song, steps, _ in sorted(group, key=density, reverse=True):
+            if steps + cost <= remaining:
+                chosen.append(song)
+                remaining -= steps + cost
+                cost = 0
+        if chosen:
+            plan.append(chosen)
+    return plan
+
+
+def plan_practice(songs, budget_seconds, due_keys=(), time_limit=TIME_LIMIT,
+                  retune_seconds=RETUNE_SECONDS):
+    """
+    Choose and order songs to practice within a time budget.
+
+    Songs are worth more when they are due or still being learned.
+    Retuning takes time too, so the plan keeps each tuning together and
+    only switches tuning when the songs it opens up are worth the time.
+    The best plan is found with a knapsack over tuning groups; if that takes
+    longer than the time limit, a greedy plan is returned instead.
+
+    Args:
+        songs (list of Song): The candidate songs.
+        budget_seconds (int): The time available.
+        due_keys (set, optional): (title key, artist key) of the due songs.
+        time_limit (float, optional): Time limit for the exact solver.
+        retune_seconds (int, optional): Time one retune takes.
+
+    Returns:
+        PracticePlan: The plan.
+    """
+    deadline = time.perf_counter() + time_limit
+    capacity = max(0, int(budget_seconds) // TIME_STEP)
+    retune_steps = math.ceil(retune_seconds / TIME_STEP)
+    due_keys = set(due_keys)
+    candidates = [
+        (
+            song,
+            max(1, math.ceil(duration_seconds(song.duration) / TIME_STEP)),
+            song_value(song, (song.title_key, song.artist_key) in due_keys),
+        )
+        for song in songs
+    ]
+    groups = _group_by_tuning(candidates)
+
+    plan = _solve_exact(groups, capacity + retune_steps, retune_steps, deadline)
+    optimal = plan is not None
+    if not optimal:
+        logging.info(
+            f"Practice planner hit its time limit with {len(candidates)} "
+            "candidates, using a greedy plan"
+        )
+        plan = _solve_greedy(groups, capacity, retune_steps)
+
+    # Due songs first within each tuning
+    ordered = [
+        song
+        for group in plan
+        for song in sorted(
+            group, key=lambda s: (s.title_key, s.artist_key) not in due_keys
+        )
+    ]
+    total = sum(duration_seconds(song.duration) for song in ordered)
+    changes = max(0, len(plan) - 1)
+    return PracticePlan(
+        songs=ordered,
+        total_seconds=total + changes * retune_seconds,
+        tuning_changes=changes,
+        optimal=optimal,
+    )
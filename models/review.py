@@ -0,0 +1,107 @@
+"""
+Spaced-repetition scheduling of practice sessions (SM-2).
+"""
+
+from collections import namedtuple
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# Ease factor of a song that was never reviewed, and the lowest it can go
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+
+# Review grades, from 0 (forgot it completely) to 5 (perfect)
+AGAIN, HARD, GOOD, EASY = 1, 3, 4, 5
+PASSING_QUALITY = 3
+
+# Songs reviewed at least this many days apart count as mastered
+MASTERED_INTERVAL = 21
+
+
+class ReviewState(namedtuple(
+    "ReviewState",
+    "ease interval_days repetitions last_practiced due_at",
+)):
+    """
+    Spaced-repetition state of a song. Timestamps are Unix seconds.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def new(cls):
+        """
+        Get the state of a song that was never practiced.
+
+        Returns:
+            ReviewState: The initial state.
+        """
+        return cls(DEFAULT_EASE, 0, 0, None, None)
+
+
+def schedule_review(state, quality, now):
+    """
+    Schedule the next practice of a song after reviewing it.
+
+    Follows SM-2: a failed review starts the song over, passing reviews are
+    spaced 1 day, 6 days and then the previous interval times the ease
+    factor apart, and the ease factor moves with the quality of each review.
+
+    Args:
+        state (ReviewState): The state before the review.
+        quality (int): The review grade, from 0 to 5.
+        now (float): The time of the review.
+
+    Returns:
+        ReviewState: The state after the review.
+
+    Raises:
+        ValueError: If the grade is out of range.
+    """
+    if not 0 <= quality <= 5:
+        raise ValueError(f"Review quality must be between 0 and 5, not {quality}")
+
+    if quality < PASSING_QUALITY:
+        repetitions, interval = 0, 1
+    else:
+        repetitions = state.repetitions + 1
+        if repetitions == 1:
+            interval = 1
+        elif repetitions == 2:
+            interval = 6
+        else:
+            interval = round(state.interval_days * state.ease)
+
+    miss = 5 - quality
+    ease = max(MIN_EASE, state.ease + 0.1 - miss * (0.08 + miss * 0.02))
+    return ReviewState(
+        ease=ease,
+        interval_days=interval,
+        repetitions=repetitions,
+        last_practiced=now,
+        due_at=now + interval * SECONDS_PER_DAY,
+    )
+
+
+def progress_after_review(progress, state, quality):
+    """
+    Get the learning progress of a song after a review.
+
+    A failed review puts the song back to Learning, and a song reviewed
+    MASTERED_INTERVAL days or more apart is Mastered.
+
+    Args:
+        progress (str): The progress before the review.
+        state (ReviewState): The state after the review.
+        quality (int): The review grade.
+
+    Returns:
+        str: The new progress.
+    """
+    if quality < PASSING_QUALITY:
+        return "Learning"
+    if state.interval_days >= MASTERED_INTERVAL:
+        return "Mastered"
+    if progress == "Mastered":
+        return progress
+    return "Learning"
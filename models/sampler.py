@@ -0,0 +1,147 @@
+"""
+Random selection of practice songs.
+"""
+
+import numpy as np
+
+from models.song import Song
+
+# How to weight songs when picking them at random
+UNIFORM = "uniform"
+BY_PROGRESS = "progress"
+BY_TUNING = "tuning"
+BY_STALENESS = "staleness"
+WEIGHTINGS = (UNIFORM, BY_PROGRESS, BY_TUNING, BY_STALENESS)
+
+# Relative chance of picking a song in each progress state: songs being
+# learned come up most, mastered songs still come up now and then
+PROGRESS_WEIGHTS = {"Not Started": 2.0, "Learning": 3.0, "Mastered": 1.0}
+
+# Days without practice after which a song is as stale as it gets; songs
+# never practiced count as this stale
+MAX_STALENESS_DAYS = 30
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+class AliasTable:
+    """
+    Walker's alias table for drawing indices with given weights.
+
+    Building the table is linear in the number of weights (Vose's method);
+    each draw afterwards is one uniform index and one coin flip, however
+    many weights there are.
+    """
+
+    def __init__(self, weights):
+        """
+        Build the table.
+
+        Args:
+            weights (array-like): Non-negative weights, not all zero.
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        self.size = len(weights)
+        self.support = int(np.count_nonzero(weights))
+        self.weights = weights / weights.sum()
+        scaled = self.weights * self.size
+        small = np.flatnonzero(scaled < 1.0).tolist()
+        large = np.flatnonzero(scaled >= 1.0).tolist()
+        alias = list(range(self.size))
+        prob = [1.0] * self.size
+        # Plain lists are much faster than numpy arrays for this scalar loop
+        scaled = scaled.tolist()
+        while small and large:
+            less, more = small.pop(), large.pop()
+            prob[less] = scaled[less]
+            alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        self.prob = np.array(prob)
+        self.alias = np.array(alias)
+        # Whatever is left over has probability 1 up to rounding
+
+    def draw(self, rng, size):
+        """
+        Draw indices with replacement.
+
+        Args:
+            rng (numpy.random.Generator): The random number generator.
+            size (int): The number of draws.
+
+        Returns:
+            numpy.ndarray: The drawn indices.
+        """
+        columns = rng.integers(self.size, size=size)
+        coins = rng.random(size)
+        return np.where(coins < self.prob[columns], columns, self.alias[columns])
+
+    def sample(self, rng, count):
+        """
+        Draw distinct indices, each draw weighted among the ones not drawn yet.
+
+        Repeats are rejected and drawn again, which stays cheap while count
+        is small next to the number of weights, the usual case for a
+        practice set. Larger samples fall back to numpy's weighted sampling.
+
+        Args:
+            rng (numpy.random.Generator): The random number generator.
+            count (int): The number of indices to draw.
+
+        Returns:
+            numpy.ndarray: The drawn indices, in draw order.
+        """
+        count = min(count, self.support)
+        if count > self.support // 2:
+            return rng.choice(self.size, size=count, replace=False, p=self.weights)
+        picked = {}
+        while len(picked) < count:
+            for index in self.draw(rng, 2 * (count - len(picked))).tolist():
+                picked.setdefault(index, None)
+                if len(picked) == count:
+                    break
+        return np.fromiter(picked, dtype=np.int64, count=count)
+
+
+def song_weights(table, rows, weighting, last_practiced=None, now=None):
+    """
+    Weight the given rows of a song table for random selection.
+
+    Args:
+        table (SongTable): The song table.
+        rows (numpy.ndarray): The row positions to weight.
+        weighting (str): One of WEIGHTINGS.
+        last_practiced (numpy.ndarray, optional): When each of the rows was
+                                                  last practiced, as a Unix
+                                                  timestamp or NaN if never.
+                                                  Needed for BY_STALENESS.
+        now (float, optional): The current time, for BY_STALENESS.
+
+    Returns:
+        numpy.ndarray: One weight per row.
+
+    Raises:
+        ValueError: If the weighting is unknown.
+    """
+    if weighting == UNIFORM:
+        return np.ones(len(rows))
+    if weighting == BY_PROGRESS:
+        # Songs without a known state have code -1, which picks the trailing
+        # not started weight
+        lookup = np.array(
+            [PROGRESS_WEIGHTS[state] for state in Song.PROGRESS_STATES]
+            + [PROGRESS_WEIGHTS["Not Started"]]
+        )
+        return lookup[table.progress_codes[rows]]
+    if weighting == BY_TUNING:
+        # Favor the tunings most of the candidates share, so a practice set
+        # needs fewer retunes
+        codes = table.tuning_name_codes[rows]
+        return np.bincount(codes)[codes].astype(np.float64)
+    if weighting == BY_STALENESS:
+        # One more for every day since the last practice, up to a cap, so
+        # songs left alone for a while come back around
+        days = (now - np.asarray(last_practiced, dtype=np.float64)) / SECONDS_PER_DAY
+        days = np.nan_to_num(days, nan=MAX_STALENESS_DAYS)
+        return 1.0 + np.clip(days, 0, MAX_STALENESS_DAYS)
+    raise ValueError(f"Unknown weighting: {weighting}")
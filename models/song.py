@@ -2,14 +2,121 @@
 Song module.
 """
 
+from collections import namedtuple
+
+from titlecase import titlecase
+
+# Separator used to store genres as a single string in the database
+GENRE_SEPARATOR = ", "
+
+
+def normalize_key(text):
+    """
+    Normalize text into the key used for case-insensitive matching.
+
+    Args:
+        text (str): The text to normalize. None is treated as "".
+
+    Returns:
+        str: The casefolded text.
+    """
+    return (text or "").casefold()
+
+
+def display_text(text):
+    """
+    Format text the way it is shown in the UI.
+
+    Args:
+        text (str): The text to format. None is treated as "".
+
+    Returns:
+        str: The titlecased text.
+    """
+    return titlecase(text) if text else ""
+
+
+def decode_genres(genres_string):
+    """
+    Split a stored genres string into a list of genres.
+
+    Args:
+        genres_string (str): Genres joined with GENRE_SEPARATOR.
+
+    Returns:
+        list: The genres, empty if the string is empty or None.
+    """
+    return genres_string.split(GENRE_SEPARATOR) if genres_string else []
+
+
+class _DerivedField:
+    """
+    Song attribute derived from another field.
+
+    Songs loaded from the database get the value that was computed and
+    stored at write time. Otherwise it is computed from the source field on
+    first access.
+    """
+
+    def __init__(self, source, transform):
+        self.source = source
+        self.transform = transform
+
+    def __set_name__(self, owner, name):
+        self.slot = f"_{name}"
+
+    def __get__(self, song, owner=None):
+        if song is None:
+            return self
+        value = getattr(song, self.slot)
+        if value is None:
+            value = self.transform(getattr(song, self.source))
+            setattr(song, self.slot, value)
+        return value
+
+    def __set__(self, song, value):
+        setattr(song, self.slot, value)
+
 
 class Song:
     """
     Class to represent a song.
+
+    Songs are created for every row on each library load, so the class uses
+    __slots__ to drop the per-instance __dict__ and keeps the genres as the
+    stored string until they are first read.
     """
 
     PROGRESS_STATES = ["Not Started", "Learning", "Mastered"]
 
+    __slots__ = (
+        "title",
+        "artist",
+        "tuning",
+        "notes",
+        "album",
+        "duration",
+        "progress",
+        "library",
+        "_genres",
+        "_genres_string",
+        "_title_key",
+        "_artist_key",
+        "_album_key",
+        "_display_title",
+        "_display_artist",
+        "_display_album",
+    )
+
+    # Casefolded keys used for matching and titlecased strings used for
+    # display, computed once when the song is written
+    title_key = _DerivedField("title", normalize_key)
+    artist_key = _DerivedField("artist", normalize_key)
+    album_key = _DerivedField("album", normalize_key)
+    display_title = _DerivedField("title", display_text)
+    display_artist = _DerivedField("artist", display_text)
+    display_album = _DerivedField("album", display_text)
+
     def __init__(
         self,
         title,
@@ -20,6 +127,13 @@ class Song:
         duration=None,
         genres="",
         progress="Not Started",
+        library=None,
+        title_key=None,
+        artist_key=None,
+        album_key=None,
+        display_title=None,
+        display_artist=None,
+        display_album=None,
     ):
         """
         Initialize a Song object.
@@ -31,9 +145,15 @@ class Song:
             notes (str, optional): Notes about the song.
             album (str, optional): The album of the song.
             duration (str, optional): The duration of the song.
-            genres (list, optional): The genres of the song.
+            genres (list or str, optional): The genres of the song, either as a
+                                    list or as the comma-separated string
+                                    stored in the database.
             progress (str, optional): Learning progress of the song.
                                     One of: "Not Started", "Learning", "Mastered"
+            library (str, optional): Name of the library the song was loaded from.
+            title_key, artist_key, album_key (str, optional): Stored match keys.
+            display_title, display_artist, display_album (str, optional):
+                                    Stored display strings.
         """
         self.title = title
         self.artist = artist
@@ -41,10 +161,70 @@ class Song:
         self.notes = notes
         self.album = album
         self.duration = duration
-        self.genres = genres if genres is not None else []
+        self.genres = genres
         if progress not in self.PROGRESS_STATES:
             progress = "Not Started"
         self.progress = progress
+        self.library = library
+        self.title_key = title_key
+        self.artist_key = artist_key
+        self.album_key = album_key
+        self.display_title = display_title
+        self.display_artist = display_artist
+        self.display_album = display_album
+
+    @property
+    def genres(self):
+        """
+        The genres of the song as a list, decoded on first access.
+
+        Returns:
+            list: The genres of the song.
+        """
+        if self._genres is None:
+            self._genres = decode_genres(self._genres_string)
+            self._genres_string = None
+        return self._genres
+
+    @genres.setter
+    def genres(self, genres):
+        if isinstance(genres, str):
+            self._genres = None
+            self._genres_string = genres
+        else:
+            self._genres = genres if genres is not None else []
+            self._genres_string = None
+
+    @property
+    def encoded_genres(self):
+        """
+        The genres as stored in the database, without decoding them first.
+
+        Returns:
+            str: The genres joined with GENRE_SEPARATOR.
+        """
+        if self._genres is None:
+            return self._genres_string or ""
+        return GENRE_SEPARATOR.join(self._genres)
+
+    def freeze(self):
+        """
+        Return an immutable, hashable copy of the song.
+
+        Returns:
+            FrozenSong: The frozen song.
+        """
+        return FrozenSong(
+            self.title,
+            self.artist,
+            self.tuning,
+            self.notes,
+            self.album,
+            self.duration,
+            tuple(self.genres),
+            self.progress,
+            self.library,
+        )
 
     def __repr__(self):
         """
@@ -56,5 +236,38 @@ class Song:
         return (
             f"Song(title={self.title}, artist={self.artist}, tuning={self.tuning}, "
             f"notes={self.notes}, album={self.album}, duration={self.duration}, "
-            f"genres={self.genres}, progress={self.progress})"
+            f"genres={self.genres}, progress={self.progress}, "
+            f"library={self.library})"
+        )
+
+
+class FrozenSong(namedtuple(
+    "FrozenSong",
+    "title artist tuning notes album duration genres progress library",
+)):
+    """
+    Immutable, hashable song record, e.g. for sets and dictionary keys.
+
+    Genres are kept as a tuple so the whole record can be hashed.
+    """
+
+    __slots__ = ()
+
+    def thaw(self):
+        """
+        Return a mutable Song copy of this record.
+
+        Returns:
+            Song: The song.
+        """
+        return Song(
+            title=self.title,
+            artist=self.artist,
+            tuning=self.tuning,
+            notes=self.notes,
+            album=self.album,
+            duration=self.duration,
+            genres=list(self.genres),
+            progress=self.progress,
+            library=self.library,
         )
@@ -0,0 +1,359 @@
+"""
+Columnar, in-memory view of a song library for analytics and filtering.
+"""
+
+from itertools import chain, repeat
+
+import numpy as np
+
+from models.song import Song, decode_genres, normalize_key
+from models.tuning import TuningIndex, canonical_tuning_name
+
+# Separator for the concatenated text blobs used for substring search. It
+# can't appear in a search term, so a match never spans two values.
+_BLOB_SEPARATOR = "\x00"
+
+_MASTERED = Song.PROGRESS_STATES.index("Mastered")
+
+
+def _encode(values):
+    """
+    Dictionary-encode a sequence of values.
+
+    Args:
+        values (list): The values to encode. None is encoded as "".
+
+    Returns:
+        tuple: (numpy.ndarray of int32 codes, list of distinct values)
+    """
+    distinct = list(dict.fromkeys(values))
+    lookup = {value: code for code, value in enumerate(distinct)}
+    codes = np.fromiter(
+        map(lookup.__getitem__, values), dtype=np.int32, count=len(values)
+    )
+    return codes, [value or "" for value in distinct]
+
+
+def _parse_duration(duration):
+    """Parse a stored duration into an integer, 0 if it is missing or invalid."""
+    try:
+        return int(duration)
+    except (TypeError, ValueError):
+        return 0
+
+
+class _TextIndex:
+    """
+    Substring search over a list of normalized keys.
+
+    The keys are joined into a single blob so each lookup is a run of
+    str.find calls in C; match positions are mapped back to list positions
+    with a binary search over the key offsets.
+    """
+
+    def __init__(self, keys):
+        keys = [key or "" for key in keys]
+        self.blob = _BLOB_SEPARATOR.join(keys)
+        lengths = np.fromiter(map(len, keys), dtype=np.int64, count=len(keys))
+        self.starts = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+        self.size = len(keys)
+
+    def find(self, text):
+        """
+        Find the positions of all keys containing text.
+
+        Args:
+            text (str): The substring to look for, case-insensitive.
+
+        Returns:
+            numpy.ndarray: Sorted positions of the matching keys.
+        """
+        text = normalize_key(text)
+        if _BLOB_SEPARATOR in text:
+            return np.empty(0, dtype=np.int64)
+        hits = []
+        find = self.blob.find
+        pos = find(text)
+        while pos != -1:
+            hits.append(pos)
+            pos = find(text, pos + 1)
+        if not hits:
+            return np.empty(0, dtype=np.int64)
+        positions = np.searchsorted(self.starts, hits, side="right") - 1
+        return np.unique(positions)
+
+
+class SongTable:
+    """
+    Columnar snapshot of the songs in a table or view.
+
+    Categorical columns (library, artist, album, tuning, progress) are
+    dictionary-encoded into integer arrays, durations are integers and genre
+    membership is a sparse boolean matrix in CSR form (genre_indptr and
+    genre_indices), so statistics reduce to np.bincount and filters to
+    vectorized masks. Song objects are only built for the rows a caller asks
+    for.
+    """
+
+    def __init__(self, rows):
+        """
+        Build the table from rows of library, title, artist, tuning, notes,
+        album, duration, genres, progress, the title, artist and album keys
+        and their display strings.
+
+        Args:
+            rows (list of tuple): The rows, as fetched from the database.
+        """
+        self.size = len(rows)
+        (libraries, titles, artists, tunings, notes, albums, durations, genres,
+         progress, title_keys, artist_keys, album_keys, display_titles,
+         display_artists, display_albums) = (
+            (list(column) for column in zip(*rows)) if rows else ([],) * 15
+        )
+
+        self.titles = np.array(titles, dtype=object)
+        self.title_keys = np.array(title_keys, dtype=object)
+        self.display_titles = np.array(display_titles, dtype=object)
+        self.display_artists = np.array(display_artists, dtype=object)
+        self.display_albums = np.array(display_albums, dtype=object)
+        self.notes = np.array(notes, dtype=object)
+        self.raw_durations = np.array(durations, dtype=object)
+        self.raw_genres = np.array(genres, dtype=object)
+
+        self.library_codes, self.libraries = _encode(libraries)
+        self.artist_codes, self.artists = _encode(artists)
+        self.album_codes, self.albums = _encode(albums)
+        # Keys are a function of the value, so each code has a single key
+        self.artist_keys = self._code_values(self.artist_codes, artist_keys)
+        self.album_keys = self._code_values(self.album_codes, album_keys)
+        self.tuning_codes, self.tunings = _encode(tunings)
+        # Spellings of the same tuning share a canonical name code
+        self.tuning_name_codes, self.tuning_names = self._canonical_tunings()
+        self._tuning_index = None
+
+        state_codes = {state: i for i, state in enumerate(Song.PROGRESS_STATES)}
+        self.progress_codes = np.fromiter(
+            map(state_codes.get, progress, repeat(-1)),
+            dtype=np.int8,
+            count=self.size,
+        )
+        self.durations = np.fromiter(
+            map(_parse_duration, durations), dtype=np.int64, count=self.size
+        )
+        self._build_genres(genres)
+
+        self._title_index = _TextIndex(title_keys)
+        self._artist_index = _TextIndex(self.artist_keys)
+        self._album_index = _TextIndex(self.album_keys)
+
+    @staticmethod
+    def _code_values(codes, values):
+        """Pick one value per code from a column parallel to the codes."""
+        # Codes are dense, so the sorted unique codes are 0..n-1
+        _, first_rows = np.unique(codes, return_index=True)
+        return [values[row] or "" for row in first_rows.tolist()]
+
+    def _build_genres(self, genres):
+        """
+        Build the sparse genre membership matrix.
+
+        Row i has the genres genre_indices[genre_indptr[i]:genre_indptr[i + 1]].
+        Libraries repeat the same genre strings a lot, so only the distinct
+        strings are split and the rows are expanded with array operations.
+
+        Args:
+            genres (list of str): The stored genres string of every row.
+        """
+        string_codes, strings = _encode(genres)
+        genre_index = {}
+        string_genres = [
+            [genre_index.setdefault(genre, len(genre_index))
+             for genre in decode_genres(string)]
+            for string in strings
+        ]
+        string_lengths = np.fromiter(
+            map(len, string_genres), dtype=np.int64, count=len(strings)
+        )
+        string_starts = np.concatenate(([0], np.cumsum(string_lengths)[:-1]))
+        flat = np.fromiter(
+            chain.from_iterable(string_genres),
+            dtype=np.int32,
+            count=int(string_lengths.sum()),
+        )
+
+        counts = string_lengths[string_codes]
+        self.genre_indptr = np.concatenate(([0], np.cumsum(counts)))
+        self.genre_rows = np.repeat(np.arange(self.size), counts)
+        # Position of each entry within its row, added to the row's start
+        # offset in the flat per-string genre list
+        within = np.arange(len(self.genre_rows)) - self.genre_indptr[self.genre_rows]
+        self.genre_indices = flat[
+            np.repeat(string_starts[string_codes], counts) + within
+        ]
+        self.genres = list(genre_index)
+
+    @classmethod
+    def from_cursor(cls, cursor, source):
+        """
+        Build a table with a single query over a songs table or view.
+
+        Args:
+            cursor (sqlite3.Cursor): The database cursor.
+            source (str): The library view to read from.
+
+        Returns:
+            SongTable: The table.
+        """
+        cursor.execute(
+            "SELECT library, title, artist, tuning, notes, album, duration, "
+            "genres, progress, title_key, artist_key, album_key, display_title, "
+            f"display_artist, display_album FROM {source}"
+        )
+        return cls(cursor.fetchall())
+
+    def __len__(self):
+        return self.size
+
+    def genre_matrix(self):
+        """
+        Materialize the dense boolean genre membership matrix.
+
+        Returns:
+            numpy.ndarray: A (songs x genres) boolean array.
+        """
+        matrix = np.zeros((self.size, len(self.genres)), dtype=bool)
+        matrix[self.genre_rows, self.genre_indices] = True
+        return matrix
+
+    def progress_counts(self):
+        """
+        Count songs per progress state.
+
+        Returns:
+            dict: Mapping of progress state to number of songs.
+        """
+        counts = np.bincount(
+            self.progress_codes[self.progress_codes >= 0],
+            minlength=len(Song.PROGRESS_STATES),
+        )
+        return dict(zip(Song.PROGRESS_STATES, counts.tolist()))
+
+    def _canonical_tunings(self):
+        name_codes, names = _encode(
+            [canonical_tuning_name(tuning) for tuning in self.tunings]
+        )
+        if not self.size:
+            return np.empty(0, dtype=np.int32), names
+        return name_codes[self.tuning_codes], names
+
+    @property
+    def tuning_index(self):
+        """TuningIndex over the canonical tuning names, built on first use."""
+        if self._tuning_index is None:
+            self._tuning_index = TuningIndex(self.tuning_names)
+        return self._tuning_index
+
+    def tuning_counts(self):
+        """
+        Count songs per tuning, most used first.
+
+        Returns:
+            dict: Mapping of tuning to number of songs.
+        """
+        counts = np.bincount(self.tuning_name_codes, minlength=len(self.tuning_names))
+        return self._sorted_counts(self.tuning_names, counts)
+
+    def genre_counts(self):
+        """
+        Count songs per genre, most used first.
+
+        Returns:
+            dict: Mapping of genre to number of songs.
+        """
+        counts = np.bincount(self.genre_indices, minlength=len(self.genres))
+        return self._sorted_counts(self.genres, counts)
+
+    @staticmethod
+    def _sorted_counts(labels, counts):
+        order = np.argsort(-counts, kind="stable")
+        return {
+            labels[i]: int(counts[i])
+            for i in order
+            if labels[i] and counts[i] > 0
+        }
+
+    def _code_mask(self, codes, matching_codes):
+        return np.isin(codes, np.asarray(matching_codes, dtype=np.int32))
+
+    def filter(self, artist="", title="", album="", genre="", tunings=None,
+               exclude_mastered=False):
+        """
+        Build a mask of the rows matching all given criteria.
+
+        Args:
+            artist (str, optional): Substring the artist must contain.
+            title (str, optional): Substring the title must contain.
+            album (str, optional): Substring the album must contain.
+            genre (str, optional): Genre the song must be tagged with.
+            tunings (set, optional): Tunings the song may be in.
+            exclude_mastered (bool, optional): Leave out mastered songs.
+
+        Returns:
+            numpy.ndarray: Boolean mask over the rows.
+        """
+        mask = np.ones(self.size, dtype=bool)
+        if artist:
+            mask &= self._code_mask(self.artist_codes, self._artist_index.find(artist))
+        if album:
+            mask &= self._code_mask(self.album_codes, self._album_index.find(album))
+        if title:
+            title_mask = np.zeros(self.size, dtype=bool)
+            title_mask[self._title_index.find(title)] = True
+            mask &= title_mask
+        if genre:
+            genre = genre.lower()
+            codes = [i for i, name in enumerate(self.genres) if name.lower() == genre]
+            genre_mask = np.zeros(self.size, dtype=bool)
+            entries = self._code_mask(self.genre_indices, codes)
+            genre_mask[self.genre_rows[entries]] = True
+            mask &= genre_mask
+        if tunings:
+            tunings = {canonical_tuning_name(tuning) for tuning in tunings}
+            codes = [i for i, name in enumerate(self.tuning_names) if name in tunings]
+            mask &= self._code_mask(self.tuning_name_codes, codes)
+        if exclude_mastered:
+            mask &= self.progress_codes != _MASTERED
+        return mask
+
+    def to_songs(self, rows):
+        """
+        Build Song objects for the given rows.
+
+        Args:
+            rows (iterable of int): Row positions.
+
+        Returns:
+            list of Song: The songs, in row order.
+        """
+        progress_states = Song.PROGRESS_STATES
+        return [
+            Song(
+                title=self.titles[i],
+                artist=self.artists[self.artist_codes[i]],
+                tuning=self.tunings[self.tuning_codes[i]] or None,
+                notes=self.notes[i],
+                album=self.albums[self.album_codes[i]] or None,
+                duration=self.raw_durations[i],
+                genres=self.raw_genres[i] or "",
+                progress=(progress_states[self.progress_codes[i]]
+                          if self.progress_codes[i] >= 0 else None),
+                library=self.libraries[self.library_codes[i]],
+                title_key=self.title_keys[i],
+                artist_key=self.artist_keys[self.artist_codes[i]],
+                album_key=self.album_keys[self.album_codes[i]],
+                display_title=self.display_titles[i],
+                display_artist=self.display_artists[i],
+                display_album=self.display_albums[i],
+            )
+            for i in rows
+        ]
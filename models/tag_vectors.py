@@ -0,0 +1,316 @@
+"""
+Tag-based song similarity: a sparse TF-IDF matrix over song tags.
+"""
+
+import numpy as np
+
+
+def normalize_tag(tag):
+    """
+    Normalize a tag name for matching.
+
+    Args:
+        tag (str): The tag.
+
+    Returns:
+        str: The tag, lowercased with whitespace collapsed.
+    """
+    return " ".join(tag.lower().split())
+
+
+class _GrowableArrays:
+    """
+    Parallel row, value and (optionally) column arrays that grow by
+    doubling, so appending is amortized constant time and reading is a
+    view without copying.
+    """
+
+    def __init__(self, rows, values, columns=None):
+        self.rows = rows
+        self.values = values
+        self.columns = columns
+        self.size = len(rows)
+
+    @classmethod
+    def empty(cls, with_columns=False):
+        return cls(
+            np.empty(0, dtype=np.int64),
+            np.empty(0),
+            np.empty(0, dtype=np.int64) if with_columns else None,
+        )
+
+    def append(self, row, value, column=None):
+        if self.size == len(self.rows):
+            capacity = max(4, 2 * self.size)
+            self.rows = np.resize(self.rows, capacity)
+            self.values = np.resize(self.values, capacity)
+            if self.columns is not None:
+                self.columns = np.resize(self.columns, capacity)
+        self.rows[self.size] = row
+        self.values[self.size] = value
+        if column is not None:
+            self.columns[self.size] = column
+        self.size += 1
+
+
+class TagMatrix:
+    """
+    Sparse TF-IDF matrix of songs by tags, stored as an inverted index.
+
+    Each tag column holds the rows of the songs tagged with it and their
+    term frequencies (a song's tag weights scaled to sum to 1), in arrays
+    that grow in place, so adding a song only appends to its own tags.
+    Removed songs leave dead rows behind that queries mask out.
+
+    IDF weights and row norms depend on the whole library, so they are
+    recomputed when a query finds them out of date, in one vectorized pass
+    over a row, column, frequency copy of all postings.
+    """
+
+    def __init__(self, songs=()):
+        """
+        Build the matrix.
+
+        Args:
+            songs (iterable of tuple): (key, tag weights) pairs, as for add.
+        """
+        self._rows = {}
+        self._keys = []
+        self._row_tags = []
+        self._columns = {}
+        self._postings = []
+        self._entries = _GrowableArrays.empty(with_columns=True)
+        self._df = []
+        self._idf = None
+        self._norms = None
+        self._alive = None
+        self._load(songs)
+
+    def _load(self, songs):
+        """
+        Add many songs at once, sorting all postings into their columns
+        with numpy instead of appending them one by one.
+        """
+        rows, columns, frequencies = [], [], []
+        # Later versions of a song replace earlier ones, as with add
+        for key, weights in dict(songs).items():
+            tags = self._frequencies(weights)
+            if not tags:
+                continue
+            row = self._rows[key] = len(self._keys)
+            self._keys.append(key)
+            row_tags = {}
+            for tag, frequency in tags.items():
+                column = self._columns.setdefault(tag, len(self._columns))
+                row_tags[column] = frequency
+                rows.append(row)
+                columns.append(column)
+                frequencies.append(frequency)
+            self._row_tags.append(row_tags)
+
+        self._entries = _GrowableArrays(
+            np.array(rows, dtype=np.int64),
+            np.array(frequencies),
+            np.array(columns, dtype=np.int64),
+        )
+        order = np.argsort(self._entries.columns, kind="stable")
+        counts = np.bincount(self._entries.columns, minlength=len(self._columns))
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        self._postings = [
+            _GrowableArrays(
+                self._entries.rows[order[start:stop]],
+                self._entries.values[order[start:stop]],
+            )
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+        self._df = counts.tolist()
+
+    @staticmethod
+    def _frequencies(weights):
+        """Scale positive tag weights to sum to 1, by normalized tag."""
+        weights = {
+            normalize_tag(tag): float(weight)
+            for tag, weight in weights.items()
+            if weight and weight > 0 and tag.strip()
+        }
+        total = sum(weights.values())
+        return {tag: weight / total for tag, weight in weights.items()}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def add(self, key, weights):
+        """
+        Add a song, replacing any earlier version of it.
+
+        Args:
+            key (hashable): The song's key.
+            weights (dict): Tag weights, e.g. Last.fm tag counts. Songs
+                            without positive weights aren't indexed.
+        """
+        self.remove(key)
+        frequencies = self._frequencies(weights)
+        if not frequencies:
+            return
+
+        row = len(self._keys)
+        self._rows[key] = row
+        self._keys.append(key)
+        tags = {}
+        for tag, frequency in frequencies.items():
+            column = self._columns.get(tag)
+            if column is None:
+                column = self._columns[tag] = len(self._postings)
+                self._postings.append(_GrowableArrays.empty())
+                self._df.append(0)
+            self._postings[column].append(row, frequency)
+            self._entries.append(row, frequency, column)
+            self._df[column] += 1
+            tags[column] = frequency
+        self._row_tags.append(tags)
+        self._idf = None
+
+    def remove(self, key):
+        """
+        Remove a song.
+
+        Args:
+            key (hashable): The song's key.
+        """
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        for column in self._row_tags[row]:
+            self._df[column] -= 1
+        self._row_tags[row] = {}
+        self._idf = None
+
+    def _column(self, column):
+        postings = self._postings[column]
+        return postings.rows[:postings.size], postings.values[:postings.size]
+
+    def _refresh(self):
+        """Recompute the IDF weights, the live rows and the row norms."""
+        if self._idf is not None:
+            return
+        df = np.array(self._df, dtype=np.float64)
+        self._idf = np.log((1.0 + len(self._rows)) / (1.0 + df)) + 1.0
+        self._alive = np.zeros(len(self._keys), dtype=bool)
+        self._alive[list(self._rows.values())] = True
+
+        entries = self._entries
+        size = entries.size
+        weights = entries.values[:size] * self._idf[entries.columns[:size]]
+        self._norms = np.sqrt(np.bincount(
+            entries.rows[:size], weights=weights * weights, minlength=len(self._keys)
+        ))
+
+    def vector(self, key):
+        """
+        Get the TF-IDF vector of a song.
+
+        Args:
+            key (hashable): The song's key.
+
+        Returns:
+            dict: Tag weights by tag, empty for unknown songs.
+        """
+        row = self._rows.get(key)
+        if row is None:
+            return {}
+        self._refresh()
+        tags = list(self._columns)
+        return {
+            tags[column]: frequency * self._idf[column]
+            for column, frequency in self._row_tags[row].items()
+        }
+
+    def _scores(self, query):
+        """
+        Cosine similarity of every row with a query vector.
+
+        Args:
+            query (dict): TF-IDF weights by column.
+
+        Returns:
+            numpy.ndarray: One score per row, 0 for dead rows.
+        """
+        scores = np.zeros(len(self._keys))
+        query_norm = np.sqrt(sum(value * value for value in query.values()))
+        if not query_norm:
+            return scores
+        for column, value in query.items():
+            rows, frequencies = self._column(column)
+            scores[rows] += frequencies * (self._idf[column] * value)
+        live = self._alive & (self._norms > 0)
+        scores[live] /= self._norms[live] * query_norm
+        scores[~live] = 0.0
+        return scores
+
+    def _top(self, scores, limit):
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            best = np.argpartition(-scores[candidates], limit - 1)[:limit]
+            candidates = candidates[best]
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(float(scores[row]), self._keys[row]) for row in order]
+
+    def similar(self, key, limit=10):
+        """
+        Find the songs whose tags are closest to a song's.
+
+        Args:
+            key (hashable): The song's key.
+            limit (int, optional): The number of songs to return.
+
+        Returns:
+            list of tuple: (cosine similarity, key) pairs, closest first.
+        """
+        row = self._rows.get(key)
+        if row is None or limit <= 0:
+            return []
+        self._refresh()
+        query = {
+            column: frequency * self._idf[column]
+            for column, frequency in self._row_tags[row].items()
+        }
+        scores = self._scores(query)
+        scores[row] = 0.0
+        return self._top(scores, limit)
+
+    def recommend(self, seeds, candidates, limit=10):
+        """
+        Find the candidate songs closest to a set of seed songs.
+
+        The seeds' unit-length TF-IDF vectors are summed with their weights
+        into one profile, which the candidates are ranked against.
+
+        Args:
+            seeds (dict): Weights by key of the songs to start from.
+            candidates (iterable): Keys of the songs that may be returned.
+            limit (int, optional): The number of songs to return.
+
+        Returns:
+            list of tuple: (cosine similarity, key) pairs, closest first.
+        """
+        if limit <= 0:
+            return []
+        self._refresh()
+        profile = {}
+        for key, weight in seeds.items():
+            row = self._rows.get(key)
+            if row is None or not self._norms[row]:
+                continue
+            scale = weight / self._norms[row]
+            for column, frequency in self._row_tags[row].items():
+                value = frequency * self._idf[column] * scale
+                profile[column] = profile.get(column, 0.0) + value
+
+        allowed = np.zeros(len(self._keys), dtype=bool)
+        allowed[[self._rows[key] for key in candidates if key in self._rows]] = True
+        scores = self._scores(profile)
+        scores[~allowed] = 0.0
+        return self._top(scores, limit)
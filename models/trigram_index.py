@@ -0,0 +1,215 @@
+"""
+Trigram inverted index for substring search over song fields.
+"""
+
+from collections import defaultdict
+
+from models.song import normalize_key
+
+# Length of the n-grams in the posting lists
+GRAM_SIZE = 3
+
+
+def trigrams(text):
+    """
+    Get the distinct trigrams of a text.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        set: The trigrams, empty if the text is shorter than GRAM_SIZE.
+    """
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+class TrigramIndex:
+    """
+    Substring index over the values of one field.
+
+    Posting lists map each trigram to the distinct values containing it, and
+    each value maps to the ids of the documents that have it. A lookup
+    intersects the posting lists of the query's trigrams, smallest first,
+    then verifies the remaining candidate values with a plain substring
+    check. Artists and albums repeat a lot, so indexing distinct values keeps
+    the posting lists short. Most titles are unique, so a value with a
+    single document stores the bare id instead of a set.
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(set)
+        self._docs = {}
+
+    def add(self, doc_id, value):
+        """
+        Index a document under a value.
+
+        Args:
+            doc_id (int): The document id.
+            value (str): The normalized field value.
+        """
+        value = value or ""
+        docs = self._docs.get(value)
+        if docs is None:
+            self._docs[value] = doc_id
+            for gram in trigrams(value):
+                self._postings[gram].add(value)
+        elif isinstance(docs, set):
+            docs.add(doc_id)
+        elif docs != doc_id:
+            self._docs[value] = {docs, doc_id}
+
+    def remove(self, doc_id, value):
+        """
+        Remove a document from the index.
+
+        Args:
+            doc_id (int): The document id.
+            value (str): The normalized value it was indexed under.
+        """
+        value = value or ""
+        docs = self._docs.get(value)
+        if isinstance(docs, set):
+            docs.discard(doc_id)
+            if len(docs) == 1:
+                self._docs[value] = docs.pop()
+            return
+        if docs != doc_id:
+            return
+        del self._docs[value]
+        for gram in trigrams(value):
+            values = self._postings[gram]
+            values.discard(value)
+            if not values:
+                del self._postings[gram]
+
+    def _candidate_values(self, text):
+        grams = trigrams(text)
+        if not grams:
+            # Too short for the posting lists, check every distinct value
+            return self._docs.keys()
+        postings = sorted(
+            (self._postings.get(gram, ()) for gram in grams), key=len
+        )
+        candidates = set(postings[0])
+        for values in postings[1:]:
+            if not candidates:
+                break
+            candidates &= values
+        return candidates
+
+    def search(self, text):
+        """
+        Find the documents whose value contains text.
+
+        Args:
+            text (str): The normalized substring to look for.
+
+        Returns:
+            set: The matching document ids.
+        """
+        docs = set()
+        for value in self._candidate_values(text):
+            if text in value:
+                value_docs = self._docs[value]
+                if isinstance(value_docs, set):
+                    docs |= value_docs
+                else:
+                    docs.add(value_docs)
+        return docs
+
+
+class SongTextIndex:
+    """
+    Trigram indexes over the artist, title and album keys of a set of songs.
+
+    Songs are numbered in the order they are added, so results come back in
+    library order. The index is updated one song at a time as songs are
+    saved, edited and deleted.
+    """
+
+    FIELDS = ("artist_key", "title_key", "album_key")
+
+    def __init__(self, songs=()):
+        """
+        Build the index.
+
+        Args:
+            songs (iterable of Song): The songs to index.
+        """
+        self._indexes = {field: TrigramIndex() for field in self.FIELDS}
+        self._songs = {}
+        self._ids = {}
+        self._next_id = 0
+        for song in songs:
+            self.add(song)
+
+    @staticmethod
+    def _key(song):
+        return (song.library, song.title_key, song.artist_key)
+
+    def __len__(self):
+        return len(self._songs)
+
+    def add(self, song):
+        """
+        Add a song, replacing any earlier version of it in place.
+
+        Args:
+            song (Song): The song.
+        """
+        key = self._key(song)
+        doc_id = self._ids.get(key)
+        if doc_id is None:
+            doc_id = self._ids[key] = self._next_id
+            self._next_id += 1
+        else:
+            self._unindex(doc_id)
+        self._songs[doc_id] = song
+        for field, index in self._indexes.items():
+            index.add(doc_id, getattr(song, field))
+
+    def remove(self, library, title, artist):
+        """
+        Remove a song.
+
+        Args:
+            library (str): The library the song is in.
+            title (str): The title of the song.
+            artist (str): The artist of the song.
+        """
+        doc_id = self._ids.pop(
+            (library, normalize_key(title), normalize_key(artist)), None
+        )
+        if doc_id is not None:
+            self._unindex(doc_id)
+            del self._songs[doc_id]
+
+    def _unindex(self, doc_id):
+        song = self._songs[doc_id]
+        for field, index in self._indexes.items():
+            index.remove(doc_id, getattr(song, field))
+
+    def search(self, artist="", title="", album=""):
+        """
+        Find the songs matching all given substrings.
+
+        Args:
+            artist (str, optional): Substring the artist must contain.
+            title (str, optional): Substring the title must contain.
+            album (str, optional): Substring the album must contain.
+
+        Returns:
+            list of Song: The matching songs, in the order they were added.
+        """
+        matches = None
+        for field, text in zip(self.FIELDS, (artist, title, album)):
+            if not text:
+                continue
+            docs = self._indexes[field].search(normalize_key(text))
+            matches = docs if matches is None else matches & docs
+            if not matches:
+                return []
+        if matches is None:
+            return list(self._songs.values())
+        return [self._songs[doc_id] for doc_id in sorted(matches)]
@@ -0,0 +1,293 @@
+"""
+Parsing guitar tunings into per-string pitches, and comparing them.
+"""
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+# Pitch class names used in canonical tuning names
+PITCH_NAMES = ["C", "C#", "D", "Eb", "E", "F", "F#", "G", "Ab", "A", "Bb", "B"]
+
+_PITCH_CLASSES = {
+    "c": 0, "c#": 1, "db": 1, "d": 2, "d#": 3, "eb": 3, "e": 4, "fb": 4,
+    "e#": 5, "f": 5, "f#": 6, "gb": 6, "g": 7, "g#": 8, "ab": 8, "a": 9,
+    "a#": 10, "bb": 10, "b": 11, "cb": 11, "b#": 0,
+}
+
+# Standard tuning as MIDI note numbers, low string first (E2 A2 D3 G3 B3 E4)
+STANDARD = (40, 45, 50, 55, 59, 64)
+
+# Tunings with a name of their own, besides "<note> Standard" and "Drop <note>"
+NAMED_TUNINGS = {
+    "Open G": (38, 43, 50, 55, 59, 62),
+    "Open D": (38, 45, 50, 54, 57, 62),
+    "Open E": (40, 47, 52, 56, 59, 64),
+    "Open C": (36, 43, 48, 55, 60, 64),
+    "Open A": (40, 45, 52, 57, 61, 64),
+    "DADGAD": (38, 45, 50, 55, 57, 62),
+}
+
+_ALIASES = {
+    "standard": "e standard",
+    "std": "e standard",
+    "e std": "e standard",
+    "half step down": "eb standard",
+    "half-step down": "eb standard",
+    "whole step down": "d standard",
+    "whole-step down": "d standard",
+}
+
+# Fewest strings a tuning spelled out note by note can have
+MIN_STRINGS = 4
+
+Tuning = namedtuple("Tuning", "name pitches")
+Tuning.__doc__ = """
+A parsed tuning.
+
+Attributes:
+    name (str): The canonical name, or the cleaned up text if it couldn't
+        be parsed.
+    pitches (tuple or None): MIDI note numbers, low string first, or None
+        if the tuning couldn't be parsed.
+"""
+
+
+def _note_shift(note):
+    """Semitones from E to a note, between -9 and +2."""
+    shift = (_PITCH_CLASSES[note] - 4) % 12
+    return shift - 12 if shift > 2 else shift
+
+
+def _standard(note):
+    return tuple(pitch + _note_shift(note) for pitch in STANDARD)
+
+
+def _drop(note):
+    # Drop tunings are standard a whole step above the low string, with the
+    # low string dropped another whole step
+    pitches = _standard_above(note, 2)
+    return (pitches[0] - 2,) + pitches[1:]
+
+
+def _standard_above(note, semitones):
+    pitch_class = PITCH_NAMES[(_PITCH_CLASSES[note] + semitones) % 12].lower()
+    return _standard(pitch_class)
+
+
+def _build_names():
+    names = {}
+    for note in PITCH_NAMES:
+        names.setdefault(_standard(note.lower()), f"{note} Standard")
+        names.setdefault(_drop(note.lower()), f"Drop {note}")
+    for name, pitches in NAMED_TUNINGS.items():
+        names[pitches] = name
+    return names
+
+
+# Canonical name of every tuning that has one, by pitches
+_CANONICAL_NAMES = _build_names()
+
+
+def _spelled_out(text):
+    """
+    Parse a tuning spelled out note by note, e.g. "DADGBE" or "Eb Ab Db Gb Bb Eb".
+
+    A "b" right after a note can be a flat or the note B, so every reading
+    is tried. The one with the fewest unusual intervals between strings
+    wins, then the one closest to six strings.
+
+    Returns:
+        tuple or None: The pitch classes, low string first.
+    """
+    text = text.replace("♯", "#").replace("♭", "b")
+    if not re.fullmatch(r"[a-g#b\s,\-/]+", text):
+        return None
+    tokens = text.split()
+    if len(tokens) > 1:
+        classes = [_PITCH_CLASSES.get(token.strip(",-/")) for token in tokens]
+        if None in classes or len(classes) < MIN_STRINGS:
+            return None
+        return tuple(classes)
+
+    letters = re.sub(r"[\s,\-/]", "", text)
+    readings = []
+
+    def read(position, classes):
+        if len(readings) > 64:
+            return
+        if position == len(letters):
+            readings.append(tuple(classes))
+            return
+        letter = letters[position]
+        if letter == "#":
+            return
+        if position + 1 < len(letters) and letters[position + 1] in "#b":
+            accidental = letter + letters[position + 1]
+            if accidental in _PITCH_CLASSES:
+                read(position + 2, classes + [_PITCH_CLASSES[accidental]])
+        if letter in _PITCH_CLASSES:
+            read(position + 1, classes + [_PITCH_CLASSES[letter]])
+
+    read(0, [])
+    readings = [classes for classes in readings if len(classes) >= MIN_STRINGS]
+    if not readings:
+        return None
+    return min(readings, key=lambda classes: (_odd_intervals(classes),
+                                              abs(len(classes) - 6)))
+
+
+def _odd_intervals(pitch_classes):
+    """Count the neighbouring strings tuned unusually close or far apart."""
+    pitches = _voice(pitch_classes)
+    return sum(not 2 <= high - low <= 7 for low, high in zip(pitches, pitches[1:]))
+
+
+def _voice(pitch_classes):
+    """
+    Place pitch classes on strings: the lowest string near standard low E,
+    and each string above the one before it.
+    """
+    low = 40 + (pitch_classes[0] - 4) % 12
+    if low > 42:
+        low -= 12
+    pitches = [low]
+    for pitch_class in pitch_classes[1:]:
+        interval = (pitch_class - pitches[-1]) % 12 or 12
+        pitches.append(pitches[-1] + interval)
+    return tuple(pitches)
+
+
+@lru_cache(maxsize=4096)
+def parse_tuning(text):
+    """
+    Parse a tuning from the way people write it.
+
+    Understands names like "Drop D", "eb standard" or "Open G" and tunings
+    spelled out string by string like "DADGBE" or "D A D G B E". Spellings
+    of the same tuning get the same canonical name.
+
+    Args:
+        text (str): The tuning as entered.
+
+    Returns:
+        Tuning: The parsed tuning. Unparseable text keeps a cleaned up name
+        and has no pitches.
+    """
+    cleaned = " ".join((text or "").split())
+    key = cleaned.casefold()
+    key = _ALIASES.get(key, key)
+    key = re.sub(r"\s*-?\s*flat\b", "b", key)
+    key = re.sub(r"\s*-?\s*sharp\b", "#", key)
+    if not key:
+        return Tuning("", None)
+
+    pitches = None
+    match = re.fullmatch(r"(?:([a-g][#b]?)\s*)?(standard|std)", key)
+    if match:
+        pitches = _standard(match.group(1) or "e")
+    match = re.fullmatch(r"drop\s*([a-g][#b]?)", key)
+    if match:
+        pitches = _drop(match.group(1))
+    for name, named_pitches in NAMED_TUNINGS.items():
+        if key == name.casefold():
+            pitches = named_pitches
+    if pitches is None:
+        classes = _spelled_out(key)
+        if classes:
+            pitches = _voice(classes)
+
+    if pitches is None:
+        if len(cleaned) == 6 and cleaned.isupper():
+            return Tuning(cleaned, None)
+        return Tuning(" ".join(word.capitalize() for word in cleaned.split()), None)
+    name = _CANONICAL_NAMES.get(pitches) or " ".join(
+        PITCH_NAMES[pitch % 12] for pitch in pitches
+    )
+    return Tuning(name, pitches)
+
+
+def canonical_tuning_name(text):
+    """
+    Get the canonical name of a tuning.
+
+    Args:
+        text (str): The tuning as entered.
+
+    Returns:
+        str: The canonical name, "" for no tuning.
+    """
+    return parse_tuning(text).name
+
+
+class TuningIndex:
+    """
+    Pitches of a set of tunings in one array, for vectorized comparisons.
+
+    Row i holds the pitches of names[i], padded with -1 past the last
+    string. Tunings that couldn't be parsed are left out.
+    """
+
+    MAX_STRINGS = 12
+
+    def __init__(self, names):
+        """
+        Build the index.
+
+        Args:
+            names (iterable of str): Tunings, by name or as entered.
+        """
+        tunings = [parse_tuning(name) for name in dict.fromkeys(names)]
+        tunings = [tuning for tuning in tunings
+                   if tuning.pitches and len(tuning.pitches) <= self.MAX_STRINGS]
+        self.names = [tuning.name for tuning in tunings]
+        self.pitches = np.full((len(tunings), self.MAX_STRINGS), -1, dtype=np.int16)
+        for row, tuning in enumerate(tunings):
+            self.pitches[row, :len(tuning.pitches)] = tuning.pitches
+        self.string_counts = (self.pitches >= 0).sum(axis=1)
+
+    def __len__(self):
+        return len(self.names)
+
+    def distances(self, tuning):
+        """
+        Compare every tuning in the index with the given one.
+
+        Args:
+            tuning (str): The tuning to compare with.
+
+        Returns:
+            tuple: (string changes, total semitones) arrays, one entry per
+            indexed tuning. Tunings with a different number of strings, or
+            any tuning if the given one can't be parsed, are -1.
+        """
+        pitches = parse_tuning(tuning).pitches
+        changes = np.full(len(self.names), -1, dtype=np.int64)
+        semitones = np.full(len(self.names), -1, dtype=np.int64)
+        if not pitches or len(pitches) > self.MAX_STRINGS:
+            return changes, semitones
+        query = np.full(self.MAX_STRINGS, -1, dtype=np.int16)
+        query[:len(pitches)] = pitches
+        same_strings = self.string_counts == len(pitches)
+        diff = np.abs(self.pitches.astype(np.int64) - query)
+        changes[same_strings] = (diff[same_strings] != 0).sum(axis=1)
+        semitones[same_strings] = diff[same_strings].sum(axis=1)
+        return changes, semitones
+
+    def near(self, tuning, max_changes=1):
+        """
+        Find the tunings at most max_changes string changes away.
+
+        Args:
+            tuning (str): The tuning to start from.
+            max_changes (int, optional): The largest number of strings to retune.
+
+        Returns:
+            list of str: Canonical names, closest first.
+        """
+        changes, semitones = self.distances(tuning)
+        rows = np.flatnonzero((changes >= 0) & (changes <= max_changes))
+        order = np.lexsort((semitones[rows], changes[rows]))
+        return [self.names[row] for row in rows[order]]
@@ -0,0 +1,102 @@
+"""
+Bridge between the Qt event loop and an asyncio event loop.
+"""
+
+import asyncio
+import logging
+import threading
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+class AsyncBridge(QObject):
+    """
+    Runs coroutines on an asyncio event loop in a background thread and
+    hands their results back to the Qt event loop.
+
+    submit returns at once, so the UI keeps painting while the coroutine
+    runs. Callbacks are delivered through a queued signal and so run on the
+    thread the bridge was created on, where they may touch widgets.
+    Cancelling the returned future cancels the coroutine, and its callbacks
+    are then not called.
+    """
+
+    _finished = pyqtSignal(object, object, object)
+
+    def __init__(self, parent=None):
+        """
+        Start the asyncio event loop thread.
+
+        Args:
+            parent (QObject, optional): The Qt parent.
+        """
+        super().__init__(parent)
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run_loop, name="asyncio", daemon=True
+        )
+        self._thread.start()
+        self._finished.connect(self._deliver)
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coroutine, callback=None, error_callback=None):
+        """
+        Run a coroutine on the asyncio event loop.
+
+        Args:
+            coroutine (coroutine): The coroutine.
+            callback (callable, optional): Called on the Qt thread with the
+                                           coroutine's result.
+            error_callback (callable, optional): Called on the Qt thread
+                                                 with the exception if the
+                                                 coroutine raised one.
+
+        Returns:
+            concurrent.futures.Future: The coroutine's future, which can
+            be cancelled.
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        if callback is not None or error_callback is not None:
+            future.add_done_callback(
+                lambda done: self._finished.emit(done, callback, error_callback)
+            )
+        return future
+
+    def _deliver(self, future, callback, error_callback):
+        """Call a finished coroutine's callbacks, on the Qt thread."""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            if callback is not None:
+                callback(future.result())
+        elif error_callback is not None:
+            error_callback(error)
+        else:
+            logging.error(f"Background task failed: {error!r}")
+
+    def close(self, timeout=5.0):
+        """
+        Cancel the running coroutines and stop the event loop.
+
+        Args:
+            timeout (float, optional): Seconds to wait for the loop to stop.
+        """
+        if not self.loop.is_running():
+            return
+
+        async def shutdown():
+            tasks = [task for task in asyncio.all_tasks()
+                     if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.loop.stop()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self.loop.close()
@@ -0,0 +1,492 @@
+"""
+asyncio client for the Last.fm API, for looking up many tracks at once.
+"""
+
+import asyncio
+import json
+import logging
+import ssl
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from services.lastfm_api import (
+    API_ROOT,
+    AsyncSingleFlight,
+    BACKOFF_BASE,
+    DEFAULT_TIMEOUT,
+    MAX_RETRIES,
+    backoff_delay,
+    cache_response,
+    check_circuit,
+    check_response,
+    get_circuit_breaker,
+    get_client,
+    get_rate_limiter,
+    get_retry_after,
+    parse_track_info,
+    record_outcome,
+)
+from services.response_cache import cache_key
+from services.rate_limiter import OVERLOADED, ERROR
+
+# Requests in flight at once; waiting on the network costs no thread
+DEFAULT_CONCURRENCY = 32
+
+# Seconds a whole lookup may take, retries and waits included
+DEFAULT_DEADLINE = 20.0
+
+USER_AGENT = "GuitarParts/1.0"
+
+
+class HttpResponse:
+    """
+    A response read off an asyncio stream, with the parts of the
+    requests.Response interface the Last.fm client uses.
+    """
+
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        """Decode the body as JSON."""
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        """Raise requests.exceptions.HTTPError for 4xx and 5xx statuses."""
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} from {self.url}", response=self
+            )
+
+
+async def _read_head(reader):
+    """Read a status line and headers, returning (status, headers)."""
+    status_line = (await reader.readuntil(b"\r\n")).decode("latin-1")
+    try:
+        status = int(status_line.split()[1])
+    except (IndexError, ValueError):
+        raise requests.exceptions.ConnectionError(
+            f"Malformed status line: {status_line!r}"
+        )
+    headers = CaseInsensitiveDict()
+    while True:
+        line = (await reader.readuntil(b"\r\n")).decode("latin-1")
+        if line == "\r\n":
+            return status, headers
+        name, _, value = line.partition(":")
+        headers[name.strip()] = value.strip()
+
+
+async def _read_body(reader, status, headers):
+    """
+    Read a response body.
+
+    Returns:
+        tuple: (body, reusable), reusable being False if the body ran to the
+        end of the connection.
+    """
+    if status in (204, 304) or 100 <= status < 200:
+        return b"", True
+    if "chunked" in headers.get("Transfer-Encoding", "").lower():
+        chunks = []
+        while True:
+            size_line = await reader.readuntil(b"\r\n")
+            size = int(size_line.split(b";")[0], 16)
+            if size == 0:
+                # Skip any trailers up to the final blank line
+                while await reader.readuntil(b"\r\n") != b"\r\n":
+                    pass
+                return b"".join(chunks), True
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+    if "Content-Length" in headers:
+        return await reader.readexactly(int(headers["Content-Length"])), True
+    return await reader.read(), False
+
+
+class AsyncLastFmClient:
+    """
+    Last.fm API client built on asyncio streams.
+
+    Thousands of lookups can be in progress from a single thread: at most
+    max_concurrency of them are on the network at once, over keep-alive
+    connections pooled per host. Each lookup has a deadline
+    covering its retries, and cancelling the task running it drops its
+    connection. Retries, the rate limiter, the circuit breaker, the
+    response cache and the sharing of identical requests in flight work as
+    in LastFmClient.
+
+    A client belongs to the event loop it is first used on.
+    """
+
+    def __init__(self, api_key, api_root=API_ROOT, timeout=DEFAULT_TIMEOUT,
+                 deadline=DEFAULT_DEADLINE, max_concurrency=DEFAULT_CONCURRENCY,
+                 max_retries=MAX_RETRIES, backoff=BACKOFF_BASE, cache=None,
+                 rate_limiter=None, circuit_breaker=None):
+        """
+        Initialize the client.
+
+        Args:
+            api_key (str): The Last.fm API key.
+            api_root (str, optional): The API endpoint.
+            timeout (float, optional): Seconds to wait for each attempt.
+            deadline (float, optional): Default seconds a whole request may
+                                        take, retries included.
+            max_concurrency (int, optional): Most requests on the network
+                                             at once.
+            max_retries (int, optional): Retries after the first attempt.
+            backoff (float, optional): Base of the retry backoff, in seconds.
+            cache (ResponseCache, optional): Cache of track lookups.
+            rate_limiter (RateLimiter, optional): Limiter shared by the
+                                                  clients of the API.
+            circuit_breaker (CircuitBreaker, optional): Breaker shared by
+                                                        the clients.
+        """
+        self.api_key = api_key
+        self.api_root = api_root
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.single_flight = AsyncSingleFlight()
+        self.retries = 0
+        self.peak_in_flight = 0
+        self._in_flight = 0
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._idle = defaultdict(list)
+        self._ssl_context = None
+
+    async def close(self):
+        """
+        Close the pooled connections. The cache is left open, as it may be
+        shared with a LastFmClient.
+        """
+        for connections in self._idle.values():
+            for _, writer in connections:
+                writer.close()
+        self._idle.clear()
+
+    async def _open(self, scheme, host, port):
+        ssl_context = None
+        if scheme == "https":
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            ssl_context = self._ssl_context
+        return await asyncio.open_connection(host, port, ssl=ssl_context)
+
+    async def _exchange(self, key, connection, url, target, host):
+        """
+        Send a request over a connection and read the response, returning
+        the connection to the pool if it can be reused.
+        """
+        reader, writer = connection
+        reusable = False
+        try:
+            writer.write(
+                f"GET {target} HTTP/1.1\r\n"
+                f"Host: {host}\r\n"
+                f"User-Agent: {USER_AGENT}\r\n"
+                "Accept: */*\r\n"
+                "Accept-Encoding: identity\r\n"
+                "Connection: keep-alive\r\n\r\n".encode("latin-1")
+            )
+            await writer.drain()
+            status, headers = await _read_head(reader)
+            body, reusable = await _read_body(reader, status, headers)
+            reusable = reusable and headers.get("Connection", "").lower() != "close"
+            return HttpResponse(url, status, headers, body)
+        finally:
+            if reusable and len(self._idle[key]) < self.max_concurrency:
+                self._idle[key].append(connection)
+            else:
+                writer.close()
+
+    async def _send(self, url, params=None):
+        """
+        Send one GET request.
+
+        Returns:
+            HttpResponse: The response.
+
+        Raises:
+            OSError, asyncio.IncompleteReadError: If the connection failed.
+        """
+        parts = urlsplit(url)
+        query = "&".join(filter(None, [parts.query, urlencode(params or {})]))
+        target = (parts.path or "/") + (f"?{query}" if query else "")
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        key = (parts.scheme, parts.hostname, port)
+        if self._idle[key]:
+            try:
+                return await self._exchange(
+                    key, self._idle[key].pop(), url, target, parts.netloc
+                )
+            except (OSError, asyncio.IncompleteReadError):
+                # The server closed the idle connection; use a fresh one
+                pass
+        connection = await self._open(*key)
+        return await self._exchange(key, connection, url, target, parts.netloc)
+
+    async def _attempt(self, url, params, decode):
+        """
+        Send one request. The caller holds the concurrency bound.
+
+        Returns:
+            tuple: (outcome, result, error, response), see check_response.
+        """
+        self._in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+        try:
+            response = await asyncio.wait_for(self._send(url, params), self.timeout)
+        except asyncio.TimeoutError:
+            error = requests.exceptions.Timeout(f"No response from {url}")
+            return OVERLOADED, None, error, None
+        except (OSError, ValueError, asyncio.IncompleteReadError,
+                asyncio.LimitOverrunError,
+                requests.exceptions.ConnectionError) as e:
+            error = requests.exceptions.ConnectionError(f"{url}: {e!r}")
+            return OVERLOADED, None, error, None
+        finally:
+            self._in_flight -= 1
+        return (*check_response(url, response, decode), response)
+
+    async def _acquire_limiter(self):
+        """
+        Wait for the rate limiter on the event loop, without holding a
+        thread. Nothing is taken from the limiter until the request may go
+        ahead, so a cancelled wait leaves it as it was.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        while True:
+            wait = self.rate_limiter.try_acquire(loop.time() - start)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    async def _get(self, url, params=None, decode=False):
+        """
+        Send a GET request with the retries of LastFmClient._get.
+
+        Raises:
+            requests.exceptions.RequestException: If every attempt failed.
+            CircuitOpenError: If the circuit breaker is open.
+            ValueError: If the response isn't valid JSON.
+        """
+        for attempt in range(self.max_retries + 1):
+            check_circuit(self.circuit_breaker)
+            outcome = ERROR
+            retry_after = None
+            result = response = None
+            async with self._semaphore:
+                if self.rate_limiter is not None:
+                    try:
+                        await self._acquire_limiter()
+                    except asyncio.CancelledError:
+                        if self.circuit_breaker is not None:
+                            self.circuit_breaker.record_abandoned()
+                        raise
+                try:
+                    outcome, result, error, response = await self._attempt(
+                        url, params, decode
+                    )
+                    if response is not None and outcome == OVERLOADED:
+                        retry_after = get_retry_after(response)
+                finally:
+                    if self.rate_limiter is not None:
+                        self.rate_limiter.release(outcome, retry_after)
+                    record_outcome(self.circuit_breaker, outcome, response, result)
+            if outcome == ERROR:
+                response.raise_for_status()
+                return response.json() if decode else response
+            if error is None:
+                return result
+            if attempt == self.max_retries:
+                if result is not None:
+                    return result
+                raise error
+            delay = backoff_delay(attempt, self.backoff, response)
+            logging.warning(f"Retrying {url} in {delay:.2f}s after: {error}")
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+    async def call(self, method, deadline=None, **params):
+        """
+        Call an API method.
+
+        Args:
+            method (str): The method, e.g. "track.getInfo".
+            deadline (float, optional): Seconds the call may take, retries
+                                        included. Defaults to the client's.
+            **params: The method's parameters.
+
+        Returns:
+            dict: The decoded response, Last.fm errors included.
+
+        Raises:
+            requests.exceptions.RequestException: If the request failed.
+            asyncio.TimeoutError: If the deadline passed.
+        """
+        return await asyncio.wait_for(
+            self._call(method, **params), deadline or self.deadline
+        )
+
+    async def _call(self, method, **params):
+        query = {"method": method, **params, "api_key": self.api_key,
+                 "format": "json"}
+        return await self._get(self.api_root, query, decode=True)
+
+    async def get_track_info(self, artist, track, deadline=None):
+        """
+        Get info about a track, from the cache if it was looked up before.
+        If the same track is being fetched already, wait for that request.
+
+        Args:
+            artist (str): The artist name.
+            track (str): The track name.
+            deadline (float, optional): Seconds the lookup may take.
+
+        Returns:
+            dict: The track.getInfo response, with "album_art_url" added as
+            LastFmClient.get_track_info does.
+
+        Raises:
+            requests.exceptions.RequestException: If the request failed.
+            asyncio.TimeoutError: If the deadline passed.
+        """
+        if self.cache is not None:
+            track_info = self.cache.get("track.getInfo", artist, track)
+            if track_info is not None:
+                return track_info
+        return await asyncio.wait_for(
+            self.single_flight.do(
+                cache_key("track.getInfo", artist, track),
+                lambda: self._fetch_track_info(artist, track),
+            ),
+            deadline or self.deadline,
+        )
+
+    async def get_album_info(self, artist, album, deadline=None):
+        """
+        Get info about an album and its tracks, from the cache if it was
+        looked up before. If the same album is being fetched already, wait
+        for that request.
+
+        Args:
+            artist (str): The artist name.
+            album (str): The album title.
+            deadline (float, optional): Seconds the lookup may take.
+
+        Returns:
+            dict: The album.getInfo response.
+
+        Raises:
+            requests.exceptions.RequestException: If the request failed.
+            asyncio.TimeoutError: If the deadline passed.
+        """
+        if self.cache is not None:
+            album_info = self.cache.get("album.getInfo", artist, album)
+            if album_info is not None:
+                return album_info
+        return await asyncio.wait_for(
+            self.single_flight.do(
+                cache_key("album.getInfo", artist, album),
+                lambda: self._fetch_album_info(artist, album),
+            ),
+            deadline or self.deadline,
+        )
+
+    async def _fetch_album_info(self, artist, album):
+        """Fetch an album and cache the response."""
+        album_info = await self._call("album.getInfo", artist=artist, album=album)
+        cache_response(self.cache, "album.getInfo", artist, album, album_info)
+        return album_info
+
+    async def _fetch_track_info(self, artist, track):
+        """Fetch a track and cache the response."""
+        track_info = await self._call("track.getInfo", artist=artist, track=track)
+        images = track_info.get("track", {}).get("album", {}).get("image", [])
+        track_info["album_art_url"] = images[-1]["#text"] if images else None
+        cache_response(self.cache, "track.getInfo", artist, track, track_info)
+        return track_info
+
+    async def get_tracks(self, lookups, deadline=None):
+        """
+        Look up many tracks concurrently.
+
+        Args:
+            lookups (iterable): (artist, track) pairs.
+            deadline (float, optional): Seconds each lookup may take.
+
+        Returns:
+            list: A TrackInfo per lookup, in order, None for the tracks
+            that weren't found or couldn't be fetched in time.
+        """
+        async def lookup(artist, track):
+            try:
+                return parse_track_info(
+                    await self.get_track_info(artist, track, deadline)
+                )
+            except (requests.exceptions.RequestException, ValueError,
+                    asyncio.TimeoutError) as e:
+                logging.warning(f"Error fetching track info for {track} "
+                                f"by {artist}: {e!r}")
+                return None
+
+        return await asyncio.gather(
+            *(lookup(artist, track) for artist, track in lookups)
+        )
+
+    async def fetch_image(self, url, deadline=None):
+        """
+        Download an image, or wait for the download if it is in progress.
+
+        Args:
+            url (str): The image URL.
+            deadline (float, optional): Seconds the download may take.
+
+        Returns:
+            bytes: The image data.
+
+        Raises:
+            requests.exceptions.RequestException: If the request failed.
+            asyncio.TimeoutError: If the deadline passed.
+        """
+        response = await asyncio.wait_for(
+            self.single_flight.do(("image", url), lambda: self._get(url)),
+            deadline or self.deadline,
+        )
+        return response.content
+
+
+def create_async_client(**kwargs):
+    """
+    Create an async client with the API key and root from the settings,
+    sharing the rate limiter, circuit breaker and response cache of the
+    synchronous client.
+    Recorded responses can't be replayed through it; point it at a
+    StandInServer instead.
+
+    Args:
+        **kwargs: Further AsyncLastFmClient arguments.
+
+    Returns:
+        AsyncLastFmClient or None: The client, or None if the API isn't
+        configured.
+    """
+    client = get_client()
+    if client is None:
+        return None
+    return AsyncLastFmClient(client.api_key, api_root=client.api_root,
+                             cache=client.cache, rate_limiter=get_rate_limiter(),
+                             circuit_breaker=get_circuit_breaker(), **kwargs)
@@ -0,0 +1,142 @@
+"""
+Circuit breaker for Last.fm requests.
+"""
+
+import logging
+import threading
+import time
+
+# Consecutive failed requests that open the breaker
+DEFAULT_FAILURE_THRESHOLD = 5
+
+# Seconds the breaker stays open before letting a trial request through
+DEFAULT_RESET_TIMEOUT = 30.0
+
+# Breaker states
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a service that keeps failing.
+
+    The breaker starts closed and lets every request through. After
+    failure_threshold consecutive failures it opens, and requests are
+    refused without trying, so callers fail fast instead of waiting out
+    timeouts. Once reset_timeout seconds have passed it is half open: one
+    trial request goes through, and its outcome closes the breaker again
+    or reopens it for another reset_timeout.
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT, clock=time.monotonic):
+        """
+        Initialize a closed breaker.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open it.
+            reset_timeout (float): Seconds it stays open.
+            clock (callable, optional): Monotonic clock, for testing.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self.opened = 0
+        self.rejected = 0
+
+    def _update(self):
+        if self._state == OPEN and (
+            self._clock() - self._opened_at >= self.reset_timeout
+        ):
+            self._state = HALF_OPEN
+            self._trial = False
+
+    @property
+    def state(self):
+        """CLOSED, OPEN or HALF_OPEN."""
+        with self._lock:
+            self._update()
+            return self._state
+
+    def retry_in(self):
+        """
+        Get how long until requests are let through again.
+
+        Returns:
+            float: Seconds until the breaker half opens, 0 unless it is open.
+        """
+        with self._lock:
+            self._update()
+            if self._state != OPEN:
+                return 0.0
+            return self.reset_timeout - (self._clock() - self._opened_at)
+
+    def allow(self):
+        """
+        Ask whether a request may be sent. Every allowed request must be
+        followed by record_success, record_failure or record_abandoned.
+
+        Returns:
+            bool: True if the request may go ahead.
+        """
+        with self._lock:
+            self._update()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        """Report a request that reached the service."""
+        with self._lock:
+            if self._state != CLOSED:
+                logging.info("Last.fm is reachable again, closing the circuit")
+            self._state = CLOSED
+            self._failures = 0
+            self._trial = False
+
+    def record_abandoned(self):
+        """Report an allowed request that was given up before being sent."""
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self):
+        """Report a request that failed because of the service."""
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._failures >= self.failure_threshold
+            ):
+                logging.warning(
+                    f"Last.fm failed {self._failures} times in a row, not "
+                    f"trying again for {self.reset_timeout:.0f}s"
+                )
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self._trial = False
+                self.opened += 1
+
+    def get_stats(self):
+        """
+        Get the breaker state and counters.
+
+        Returns:
+            dict: The state, consecutive failures, times the breaker opened
+            and requests it refused.
+        """
+        with self._lock:
+            self._update()
+            return {
+                "state": self._state,
+                "failures": self._failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
@@ -2,13 +2,32 @@
 Module for database stuffs.
 """
 
+import os
+import re
+import time
 import sqlite3
 import logging
-from models.song import Song
+from urllib.request import pathname2url
+from models.review import ReviewState, MASTERED_INTERVAL, SECONDS_PER_DAY
+from models.song import Song, normalize_key, display_text
+from models.tuning import canonical_tuning_name
 from utils.utils import get_default_db_path, get_resource_path, setup_logging
 
 setup_logging()
 
+# Name of the primary library, i.e. the database opened by initialize_db
+MAIN_LIBRARY = "main"
+
+# Temp view that unions the songs tables of all active libraries
+LIBRARY_VIEW = "library_songs"
+
+SONG_COLUMNS = (
+    "title, artist, tuning, notes, album, duration, genres, progress, "
+    "title_key, artist_key, album_key, display_title, display_artist, display_album"
+)
+
+_LIBRARY_NAME_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
 
 def get_current_schema_version(cursor):
     """Get the current database schema version"""
@@ -63,6 +82,246 @@ def add_progress_column(cursor):
         """)
 
 
+def add_normalized_columns(cursor):
+    """
+    Migration 3: Add precomputed match keys and display strings.
+
+    Existing rows are backfilled and the keys get an index so lookups don't
+    have to normalize every row.
+    """
+    cursor.execute("PRAGMA table_info(songs)")
+    existing = {row[1] for row in cursor.fetchall()}
+    for column in ("title_key", "artist_key", "album_key",
+                   "display_title", "display_artist", "display_album"):
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE songs ADD COLUMN {column} TEXT")
+
+    cursor.execute("SELECT rowid, title, artist, album FROM songs")
+    cursor.executemany(
+        "UPDATE songs SET title_key = ?, artist_key = ?, album_key = ?, "
+        "display_title = ?, display_artist = ?, display_album = ? WHERE rowid = ?",
+        [
+            (*_derived_values(title, artist, album), rowid)
+            for rowid, title, artist, album in cursor.fetchall()
+        ],
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_songs_keys ON songs (title_key, artist_key)"
+    )
+
+
+def _derived_values(title, artist, album):
+    """
+    Compute the stored match keys and display strings for a song, from
+    its title, artist and album as stored, so new and migrated rows show
+    the same.
+
+    Returns:
+        tuple: title, artist and album keys followed by their display strings.
+    """
+    return (
+        normalize_key(title),
+        normalize_key(artist),
+        normalize_key(album),
+        display_text(title),
+        display_text(artist),
+        display_text(album),
+    )
+
+
+def add_change_counter(cursor):
+    """
+    Migration 4: Add a persistent counter of changes to the songs table.
+
+    Triggers bump the counter on every insert, update and delete, so a
+    cached copy of the library can tell whether it is still current.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS library_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            change_counter INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute(
+        "INSERT OR IGNORE INTO library_state (id, change_counter) VALUES (1, 0)"
+    )
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS songs_{event.lower()}_counter
+            AFTER {event} ON songs
+            BEGIN
+                UPDATE library_state SET change_counter = change_counter + 1
+                WHERE id = 1;
+            END
+        """)
+
+
+# Schedules Mastered songs that have no practice schedule yet, due within
+# MASTERED_INTERVAL days of now, spread by rowid. Extra conditions on the
+# songs can be appended with AND.
+_SCHEDULE_MASTERED = (
+    "INSERT OR IGNORE INTO practice_schedule (title_key, artist_key, ease, "
+    "interval_days, repetitions, last_practiced, due_at) "
+    "SELECT title_key, artist_key, ?, ?, 3, NULL, ? + (rowid % ?) * ? "
+    "FROM songs WHERE progress = 'Mastered'"
+)
+
+
+def _schedule_mastered_params(now):
+    return (ReviewState.new().ease, MASTERED_INTERVAL, now,
+            MASTERED_INTERVAL, SECONDS_PER_DAY)
+
+
+def add_practice_schedule(cursor):
+    """
+    Migration 5: Add spaced-repetition practice scheduling.
+
+    Mastered songs are scheduled right away, spread over the next
+    MASTERED_INTERVAL days so they don't all come due on the same day.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS practice_schedule (
+            title_key TEXT NOT NULL,
+            artist_key TEXT NOT NULL,
+            ease REAL NOT NULL,
+            interval_days INTEGER NOT NULL,
+            repetitions INTEGER NOT NULL,
+            last_practiced REAL,
+            due_at REAL,
+            PRIMARY KEY (title_key, artist_key)
+        )
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_practice_schedule_due "
+        "ON practice_schedule (due_at)"
+    )
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS songs_delete_schedule AFTER DELETE ON songs
+        BEGIN
+            DELETE FROM practice_schedule
+            WHERE title_key = OLD.title_key AND artist_key = OLD.artist_key;
+        END
+    """)
+    cursor.execute(_SCHEDULE_MASTERED, _schedule_mastered_params(time.time()))
+
+
+def add_chord_index(cursor):
+    """
+    Migration 6: Add the chord index.
+
+    Songs are analyzed by a background pass, which picks up every song
+    without a chord_analysis row. Editing a song's notes or deleting it
+    drops its rows so it gets analyzed again.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS chord_analysis (
+            title_key TEXT NOT NULL,
+            artist_key TEXT NOT NULL,
+            song_key TEXT,
+            progressions TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (title_key, artist_key)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS song_chords (
+            kind TEXT NOT NULL,
+            gram TEXT NOT NULL,
+            title_key TEXT NOT NULL,
+            artist_key TEXT NOT NULL,
+            PRIMARY KEY (kind, gram, title_key, artist_key)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_song_chords_song "
+        "ON song_chords (title_key, artist_key)"
+    )
+    for name, event in (
+        ("songs_update_chords", "UPDATE OF notes, title_key, artist_key"),
+        ("songs_delete_chords", "DELETE"),
+    ):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON songs
+            BEGIN
+                DELETE FROM chord_analysis
+                WHERE title_key = OLD.title_key AND artist_key = OLD.artist_key;
+                DELETE FROM song_chords
+                WHERE title_key = OLD.title_key AND artist_key = OLD.artist_key;
+            END
+        """)
+
+
+def add_song_tags(cursor):
+    """Migration 7: Store weighted tags per song."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS song_tags (
+            title_key TEXT NOT NULL,
+            artist_key TEXT NOT NULL,
+            tag TEXT NOT NULL,
+            weight REAL NOT NULL,
+            PRIMARY KEY (title_key, artist_key, tag)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS songs_delete_tags AFTER DELETE ON songs
+        BEGIN
+            DELETE FROM song_tags
+            WHERE title_key = OLD.title_key AND artist_key = OLD.artist_key;
+        END
+    """)
+
+
+def add_enrichment_queue(cursor):
+    """Migration 8: Queue songs whose details are still to be fetched."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pending_enrichment (
+            title_key TEXT NOT NULL,
+            artist_key TEXT NOT NULL,
+            queued_at REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (title_key, artist_key)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS songs_delete_pending AFTER DELETE ON songs
+        BEGIN
+            DELETE FROM pending_enrichment
+            WHERE title_key = OLD.title_key AND artist_key = OLD.artist_key;
+        END
+    """)
+
+
+def get_change_counter(cursor):
+    """
+    Get the number of changes made to the songs table so far.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+
+    Returns:
+        int: The change counter.
+    """
+    cursor.execute("SELECT change_counter FROM library_state WHERE id = 1")
+    return cursor.fetchone()[0]
+
+
+def get_data_version(cursor, library=MAIN_LIBRARY):
+    """
+    Get the SQLite data version of a library database.
+
+    The value changes whenever another connection commits to the database,
+    but not for this connection's own writes.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        library (str, optional): The library to check. Defaults to main.
+
+    Returns:
+        int: The data version.
+    """
+    cursor.execute(f"PRAGMA {library}.data_version")
+    return cursor.fetchone()[0]
+
+
 def migrate_database(cursor):
     """
     Handle all database migrations in order.
@@ -75,6 +334,12 @@ def migrate_database(cursor):
     migrations = [
         add_schema_version_table,
         add_progress_column,
+        add_normalized_columns,
+        add_change_counter,
+        add_practice_schedule,
+        add_chord_index,
+        add_song_tags,
+        add_enrichment_queue,
         # Future migrations will be added here
     ]
 
@@ -111,7 +376,139 @@ def initialize_db(db_path=None, schema_path=None):
     return conn, cursor
 
 
-def get_song(cursor, title, artist):
+def open_read_only(db_path):
+    """
+    Open a read-only connection to an initialized database, for reading it
+    on a thread other than the one its main connection belongs to.
+
+    Args:
+        db_path (str): The database file path.
+
+    Returns:
+        tuple: (sqlite3.Connection, sqlite3.Cursor)
+    """
+    uri = f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True)
+    return conn, conn.cursor()
+
+
+def song_from_row(row):
+    """
+    Build a Song from a row of SONG_COLUMNS followed by the library name.
+
+    Args:
+        row (tuple): The database row.
+
+    Returns:
+        Song: The song object.
+    """
+    return Song(
+        title=row[0],
+        artist=row[1],
+        tuning=row[2],
+        notes=row[3],
+        album=row[4],
+        duration=row[5],
+        genres=row[6] or "",  # Decoded lazily by Song
+        progress=row[7],
+        title_key=row[8],
+        artist_key=row[9],
+        album_key=row[10],
+        display_title=row[11],
+        display_artist=row[12],
+        display_album=row[13],
+        library=row[14],
+    )
+
+
+def _library_column(source):
+    """Return the SQL expression naming the library rows from source belong to."""
+    return "library" if source == LIBRARY_VIEW else f"'{MAIN_LIBRARY}'"
+
+
+def _library_table(library):
+    """Return the songs table for the given library."""
+    if library in (None, MAIN_LIBRARY):
+        return "songs"
+    if not is_valid_library_name(library):
+        raise ValueError(f"Invalid library name: {library}")
+    return f"{library}.songs"
+
+
+def is_valid_library_name(name):
+    """
+    Check whether a name can be used as the schema name of an attached library.
+
+    Args:
+        name (str): The proposed library name.
+
+    Returns:
+        bool: True if the name is a plain SQL identifier that is not reserved.
+    """
+    return (
+        isinstance(name, str)
+        and bool(_LIBRARY_NAME_RE.match(name))
+        and name.lower() not in (MAIN_LIBRARY, "temp")
+    )
+
+
+def attach_library(cursor, name, path):
+    """
+    Attach another song database to the connection.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        name (str): The schema name to attach the library under.
+        path (str): The path to the library database file.
+    """
+    if not is_valid_library_name(name):
+        raise ValueError(f"Invalid library name: {name}")
+    logging.info("Attaching library %s from %s", name, path)
+    cursor.execute(f"ATTACH DATABASE ? AS {name}", (path,))
+
+
+def detach_library(cursor, name):
+    """
+    Detach a previously attached song database.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        name (str): The schema name the library was attached under.
+    """
+    if not is_valid_library_name(name):
+        raise ValueError(f"Invalid library name: {name}")
+    logging.info("Detaching library %s", name)
+    cursor.execute(f"DETACH DATABASE {name}")
+
+
+def create_library_view(cursor, libraries):
+    """
+    (Re)create the temp view that unions the songs of the given libraries.
+
+    Each row of the view carries a library column naming the database it came
+    from. Only the view definition changes when libraries are switched, no
+    song data is copied.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        libraries (list of str): Names of the libraries to include.
+    """
+    selects = [
+        f"SELECT '{name}' AS library, {SONG_COLUMNS} FROM {_library_table(name)}"
+        for name in libraries
+    ]
+    if not selects:
+        # Keep the view queryable when no library is active
+        selects = [
+            f"SELECT '{MAIN_LIBRARY}' AS library, {SONG_COLUMNS} FROM songs WHERE 0"
+        ]
+    cursor.execute(f"DROP VIEW IF EXISTS temp.{LIBRARY_VIEW}")
+    cursor.execute(
+        f"CREATE TEMP VIEW {LIBRARY_VIEW} AS " + " UNION ALL ".join(selects)
+    )
+
+
+def get_song(cursor, title, artist, library=None):
     """
     Get a song from the database.
 
@@ -119,86 +516,491 @@ def get_song(cursor, title, artist):
         cursor (sqlite3.Cursor): The database cursor.
         title (str): The title of the song.
         artist (str): The artist of the song.
+        library (str, optional): The library to look in. Defaults to main.
 
     Returns:
         Song: The song object if found, None otherwise.
     """
     logging.debug("Fetching song: %s by %s", title, artist)
+    library = library or MAIN_LIBRARY
     cursor.execute(
-        "SELECT title, artist, tuning, notes, album, duration, genres, progress "
-        "FROM songs WHERE LOWER(title) = LOWER(?) AND LOWER(artist) = LOWER(?)",
-        (title.lower(), artist.lower()),
+        f"SELECT {SONG_COLUMNS}, ? FROM {_library_table(library)} "
+        "WHERE title_key = ? AND artist_key = ?",
+        (library, normalize_key(title), normalize_key(artist)),
     )
     row = cursor.fetchone()
     if row:
         logging.debug("Song found: %s by %s", row[0], row[1])
-        return Song(
-            title=row[0],
-            artist=row[1],
-            tuning=row[2],
-            notes=row[3],
-            album=row[4],
-            duration=row[5],
-            genres=row[6].split(", "),  # Convert genres back to a list
-            progress=row[7],
-        )
+        return song_from_row(row)
     logging.debug("Song not found: %s by %s", title, artist)
     return None
 
 
 def save_song(cursor, song):
     """
-    Save a song to the database.
+    Save a song to the database, scheduling it for practice if it is
+    Mastered.
 
     Args:
         cursor (sqlite3.Cursor): The database cursor.
         song (Song): The song object to save.
     """
+    title, artist = song.title.lower(), song.artist.lower()
     cursor.execute(
         "INSERT INTO songs (title, artist, tuning, notes, album, duration, "
-        "genres, progress) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        "genres, progress, title_key, artist_key, album_key, display_title, "
+        "display_artist, display_album) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
         (
-            song.title.lower(),
-            song.artist.lower(),
+            title,
+            artist,
             song.tuning,
             song.notes,
             song.album,
             song.duration,
-            ", ".join(song.genres),  # Convert genres to a comma-separated string
+            song.encoded_genres,  # Genres as a comma-separated string
             song.progress,
+            *_derived_values(title, artist, song.album),
         ),
     )
+    schedule_mastered_song(cursor, title, artist)
     cursor.connection.commit()
 
 
-def load_songs(cursor):
+def load_songs(cursor, source="songs"):
     """
     Load all songs from the database.
 
     Args:
         cursor (sqlite3.Cursor): The database cursor.
+        source (str, optional): Table or view to read from.
 
     Returns:
         list of Song: List of Song objects.
     """
     cursor.execute(
-        "SELECT title, artist, tuning, notes, album, duration, genres, progress "
-        "FROM songs"
+        f"SELECT {SONG_COLUMNS}, {_library_column(source)} FROM {source}"
     )
     rows = cursor.fetchall()
-    return [
-        Song(
-            title=row[0],
-            artist=row[1],
-            tuning=row[2],
-            notes=row[3],
-            album=row[4],
-            duration=row[5],
-            genres=row[6].split(", "),  # Convert genres back to a list
-            progress=row[7],
+    return [song_from_row(row) for row in rows]
+
+
+def count_songs(cursor, source=LIBRARY_VIEW):
+    """
+    Count the songs in a table or view.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        source (str, optional): Table or view to count.
+
+    Returns:
+        int: The number of songs.
+    """
+    cursor.execute(f"SELECT COUNT(*) FROM {source}")
+    return cursor.fetchone()[0]
+
+
+def get_review_state(cursor, title, artist):
+    """
+    Get the practice schedule of a song in the main library.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        title (str): The title of the song.
+        artist (str): The artist of the song.
+
+    Returns:
+        ReviewState or None: The state, or None if the song was never scheduled.
+    """
+    cursor.execute(
+        "SELECT ease, interval_days, repetitions, last_practiced, due_at "
+        "FROM practice_schedule WHERE title_key = ? AND artist_key = ?",
+        (normalize_key(title), normalize_key(artist)),
+    )
+    row = cursor.fetchone()
+    return ReviewState(*row) if row else None
+
+
+def save_review_state(cursor, title, artist, state):
+    """
+    Save the practice schedule of a song in the main library.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        title (str): The title of the song.
+        artist (str): The artist of the song.
+        state (ReviewState): The state to save.
+    """
+    cursor.execute(
+        "INSERT OR REPLACE INTO practice_schedule (title_key, artist_key, ease, "
+        "interval_days, repetitions, last_practiced, due_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (normalize_key(title), normalize_key(artist), *state),
+    )
+
+
+def schedule_mastered_song(cursor, title, artist, now=None):
+    """
+    Schedule a Mastered song in the main library that has no practice
+    schedule yet, the way migration 5 schedules the songs that were
+    Mastered then. Does not commit.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        title (str): The title of the song.
+        artist (str): The artist of the song.
+        now (float, optional): The current time. Defaults to now.
+    """
+    now = time.time() if now is None else now
+    cursor.execute(
+        _SCHEDULE_MASTERED + " AND title_key = ? AND artist_key = ?",
+        (*_schedule_mastered_params(now), normalize_key(title),
+         normalize_key(artist)),
+    )
+
+
+def load_last_practiced(cursor):
+    """
+    Get when every practiced song in the main library was last practiced.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+
+    Returns:
+        dict: Unix timestamps by (title key, artist key).
+    """
+    cursor.execute(
+        "SELECT title_key, artist_key, last_practiced FROM practice_schedule "
+        "WHERE last_practiced IS NOT NULL"
+    )
+    return {(title_key, artist_key): last_practiced
+            for title_key, artist_key, last_practiced in cursor.fetchall()}
+
+
+def get_due_songs(cursor, now, limit=None):
+    """
+    Get the songs in the main library that are due for practice.
+
+    The due_at index turns this into a range scan, so the cost grows with
+    the number of due songs rather than with the library.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        now (float): The current time, as a Unix timestamp.
+        limit (int, optional): The largest number of songs to return.
+
+    Returns:
+        list of Song: The due songs, most overdue first.
+    """
+    columns = ", ".join(f"s.{column}" for column in SONG_COLUMNS.split(", "))
+    cursor.execute(
+        f"SELECT {columns}, '{MAIN_LIBRARY}' FROM practice_schedule p "
+        "JOIN songs s ON s.title_key = p.title_key AND s.artist_key = p.artist_key "
+        "WHERE p.due_at <= ? ORDER BY p.due_at LIMIT ?",
+        (now, -1 if limit is None else limit),
+    )
+    return [song_from_row(row) for row in cursor.fetchall()]
+
+
+def count_due_songs(cursor, now):
+    """
+    Count the songs in the main library that are due for practice.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        now (float): The current time, as a Unix timestamp.
+
+    Returns:
+        int: The number of due songs.
+    """
+    cursor.execute("SELECT COUNT(*) FROM practice_schedule WHERE due_at <= ?", (now,))
+    return cursor.fetchone()[0]
+
+
+def get_unanalyzed_songs(cursor, limit=None):
+    """
+    Get songs in the main library whose notes haven't been analyzed for
+    chords yet.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        limit (int, optional): The largest number of songs to return.
+
+    Returns:
+        list of tuple: (title key, artist key, notes) rows.
+    """
+    cursor.execute(
+        "SELECT s.title_key, s.artist_key, s.notes FROM songs s "
+        "LEFT JOIN chord_analysis c "
+        "ON c.title_key = s.title_key AND c.artist_key = s.artist_key "
+        "WHERE c.title_key IS NULL LIMIT ?",
+        (-1 if limit is None else limit,),
+    )
+    return cursor.fetchall()
+
+
+def count_unanalyzed_songs(cursor):
+    """
+    Count the songs in the main library waiting for chord analysis.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+
+    Returns:
+        int: The number of songs.
+    """
+    cursor.execute(
+        "SELECT COUNT(*) FROM songs s LEFT JOIN chord_analysis c "
+        "ON c.title_key = s.title_key AND c.artist_key = s.artist_key "
+        "WHERE c.title_key IS NULL"
+    )
+    return cursor.fetchone()[0]
+
+
+def save_chord_analysis(cursor, title_key, artist_key, song_key, progressions, grams):
+    """
+    Store the chord analysis of a song, replacing any earlier one. Does not
+    commit.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        title_key (str): The normalized title.
+        artist_key (str): The normalized artist.
+        song_key (str or None): The name of the detected key.
+        progressions (list of tuple): Roman numerals, one tuple per chord line.
+        grams (iterable of tuple): (kind, gram) index entries.
+    """
+    cursor.execute(
+        "DELETE FROM song_chords WHERE title_key = ? AND artist_key = ?",
+        (title_key, artist_key),
+    )
+    cursor.execute(
+        "INSERT OR REPLACE INTO chord_analysis "
+        "(title_key, artist_key, song_key, progressions) VALUES (?, ?, ?, ?)",
+        (title_key, artist_key, song_key,
+         "\n".join("-".join(numerals) for numerals in progressions)),
+    )
+    cursor.executemany(
+        "INSERT OR IGNORE INTO song_chords (kind, gram, title_key, artist_key) "
+        "VALUES (?, ?, ?, ?)",
+        [(kind, gram, title_key, artist_key) for kind, gram in grams],
+    )
+
+
+def find_chord_gram(cursor, kind, gram, with_progressions=False):
+    """
+    Look up the songs in the main library with a chord index entry.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        kind (str): models.chords.CHORD or models.chords.PROGRESSION.
+        gram (str): A chord symbol or a progression like "I-V-vi-IV".
+        with_progressions (bool, optional): Also return the stored chord
+                                            lines of each song.
+
+    Returns:
+        list of tuple: (title key, artist key) rows, with the song's chord
+        lines as a third value if asked for.
+    """
+    if with_progressions:
+        cursor.execute(
+            "SELECT g.title_key, g.artist_key, c.progressions FROM song_chords g "
+            "JOIN chord_analysis c "
+            "ON c.title_key = g.title_key AND c.artist_key = g.artist_key "
+            "WHERE g.kind = ? AND g.gram = ?",
+            (kind, gram),
         )
-        for row in rows
-    ]
+    else:
+        cursor.execute(
+            "SELECT title_key, artist_key FROM song_chords WHERE kind = ? AND gram = ?",
+            (kind, gram),
+        )
+    return cursor.fetchall()
+
+
+def get_song_key(cursor, title, artist):
+    """
+    Get the detected key of a song in the main library.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        title (str): The title of the song.
+        artist (str): The artist of the song.
+
+    Returns:
+        str or None: The key name, None if unknown or not analyzed yet.
+    """
+    cursor.execute(
+        "SELECT song_key FROM chord_analysis WHERE title_key = ? AND artist_key = ?",
+        (normalize_key(title), normalize_key(artist)),
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def save_tag_weights(cursor, title, artist, weights):
+    """
+    Store the weighted tags of a song in the main library, replacing any
+    earlier ones. Does not commit.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        title (str): The title of the song.
+        artist (str): The artist of the song.
+        weights (dict): Tag weights by tag.
+    """
+    title_key, artist_key = normalize_key(title), normalize_key(artist)
+    cursor.execute(
+        "DELETE FROM song_tags WHERE title_key = ? AND artist_key = ?",
+        (title_key, artist_key),
+    )
+    cursor.executemany(
+        "INSERT OR REPLACE INTO song_tags (title_key, artist_key, tag, weight) "
+        "VALUES (?, ?, ?, ?)",
+        [(title_key, artist_key, tag, weight) for tag, weight in weights.items()],
+    )
+
+
+def get_tag_weights(cursor, title, artist):
+    """
+    Get the weighted tags of a song in the main library.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        title (str): The title of the song.
+        artist (str): The artist of the song.
+
+    Returns:
+        dict: Tag weights by tag, empty if none were stored.
+    """
+    cursor.execute(
+        "SELECT tag, weight FROM song_tags WHERE title_key = ? AND artist_key = ?",
+        (normalize_key(title), normalize_key(artist)),
+    )
+    return dict(cursor.fetchall())
+
+
+def load_tag_weights(cursor):
+    """
+    Get the weighted tags of every song in the main library.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+
+    Returns:
+        dict: Tag weights by (title key, artist key).
+    """
+    cursor.execute("SELECT title_key, artist_key, tag, weight FROM song_tags")
+    weights = {}
+    for title_key, artist_key, tag, weight in cursor.fetchall():
+        weights.setdefault((title_key, artist_key), {})[tag] = weight
+    return weights
+
+
+def queue_enrichment(cursor, title, artist, now=None):
+    """
+    Queue a song in the main library for fetching its details from Last.fm.
+    Does not commit.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        title (str): The title of the song.
+        artist (str): The artist of the song.
+        now (float, optional): The current time, as a Unix timestamp.
+    """
+    cursor.execute(
+        "INSERT OR IGNORE INTO pending_enrichment (title_key, artist_key, queued_at) "
+        "VALUES (?, ?, ?)",
+        (normalize_key(title), normalize_key(artist),
+         time.time() if now is None else now),
+    )
+
+
+def get_pending_songs(cursor, limit=None):
+    """
+    Get the songs in the main library queued for fetching their details.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        limit (int, optional): The largest number of songs to return.
+
+    Returns:
+        list of tuple: (Song, attempts so far) pairs, longest queued first.
+    """
+    columns = ", ".join(f"s.{column}" for column in SONG_COLUMNS.split(", "))
+    cursor.execute(
+        f"SELECT {columns}, '{MAIN_LIBRARY}', p.attempts FROM pending_enrichment p "
+        "JOIN songs s ON s.title_key = p.title_key AND s.artist_key = p.artist_key "
+        "ORDER BY p.queued_at LIMIT ?",
+        (-1 if limit is None else limit,),
+    )
+    return [(song_from_row(row[:-1]), row[-1]) for row in cursor.fetchall()]
+
+
+def count_pending_songs(cursor):
+    """
+    Count the songs queued for fetching their details.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+
+    Returns:
+        int: The number of songs.
+    """
+    cursor.execute("SELECT COUNT(*) FROM pending_enrichment")
+    return cursor.fetchone()[0]
+
+
+def finish_enrichment(cursor, title, artist):
+    """
+    Take a song off the enrichment queue. Does not commit.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        title (str): The title of the song.
+        artist (str): The artist of the song.
+    """
+    cursor.execute(
+        "DELETE FROM pending_enrichment WHERE title_key = ? AND artist_key = ?",
+        (normalize_key(title), normalize_key(artist)),
+    )
+
+
+def record_enrichment_attempt(cursor, title, artist):
+    """
+    Count a failed attempt at fetching a queued song's details. Does not
+    commit.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        title (str): The title of the song.
+        artist (str): The artist of the song.
+    """
+    cursor.execute(
+        "UPDATE pending_enrichment SET attempts = attempts + 1 "
+        "WHERE title_key = ? AND artist_key = ?",
+        (normalize_key(title), normalize_key(artist)),
+    )
+
+
+def get_album_songs(cursor, artist, album):
+    """
+    Get the songs of an album in the main library.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        artist (str): The artist of the album.
+        album (str): The album.
+
+    Returns:
+        list of Song: The songs, matched on the normalized artist and album.
+    """
+    cursor.execute(
+        f"SELECT {SONG_COLUMNS}, '{MAIN_LIBRARY}' FROM songs "
+        "WHERE artist_key = ? AND album_key = ?",
+        (normalize_key(artist), normalize_key(album)),
+    )
+    return [song_from_row(row) for row in cursor.fetchall()]
 
 
 def delete_song(cursor, title, artist):
@@ -211,8 +1013,8 @@ def delete_song(cursor, title, artist):
         artist (str): The artist for the song.
     """
     cursor.execute(
-        "DELETE FROM songs WHERE LOWER(title) = LOWER(?) AND LOWER(artist) = LOWER(?)",
-        (title, artist),
+        "DELETE FROM songs WHERE title_key = ? AND artist_key = ?",
+        (normalize_key(title), normalize_key(artist)),
     )
     cursor.connection.commit()
 
@@ -221,14 +1023,31 @@ def update_song_info(cursor, song):
     """
     Update the song information in the database.
 
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        song (Song): The song object with updated information.
+    """
+    write_song_info(cursor, song)
+    cursor.connection.commit()
+
+
+def write_song_info(cursor, song):
+    """
+    Update the song information like update_song_info. Does not commit, so
+    the caller can commit or roll back a batch of updates together.
+
+    A song that became Mastered is scheduled for practice, see
+    schedule_mastered_song.
+
     Args:
         cursor (sqlite3.Cursor): The database cursor.
         song (Song): The song object with updated information.
     """
     query = """
     UPDATE songs
-    SET notes = ?, tuning = ?, album = ?, duration = ?, genres = ?, progress = ?
-    WHERE LOWER(artist) = LOWER(?) AND LOWER(title) = LOWER(?)
+    SET notes = ?, tuning = ?, album = ?, duration = ?, genres = ?, progress = ?,
+        album_key = ?, display_album = ?
+    WHERE artist_key = ? AND title_key = ?
     """
     cursor.execute(
         query,
@@ -237,13 +1056,72 @@ def update_song_info(cursor, song):
             song.tuning,
             song.album,
             song.duration,
-            ", ".join(song.genres),  # Convert genres to a comma-separated string
+            song.encoded_genres,  # Genres as a comma-separated string
             song.progress,
-            song.artist.lower(),
-            song.title.lower(),
+            normalize_key(song.album),
+            display_text(song.album),
+            normalize_key(song.artist),
+            normalize_key(song.title),
         ),
     )
-    cursor.connection.commit()
+    schedule_mastered_song(cursor, song.title, song.artist)
+
+
+def merge_songs(cursor, merged, duplicates):
+    """
+    Replace duplicates of a song with the merged song. Does not commit, so
+    the caller can commit or roll back the whole merge.
+
+    The merged song keeps the practice schedule with the most repetitions
+    of any copy, and the stored tags of the first copy that has them.
+
+    Args:
+        cursor (sqlite3.Cursor): The database cursor.
+        merged (Song): The song to keep, with the combined details.
+        duplicates (list of Song): The songs merged into it, which are deleted.
+    """
+    keep = (normalize_key(merged.title), normalize_key(merged.artist))
+    keys = [keep] + [
+        (normalize_key(song.title), normalize_key(song.artist)) for song in duplicates
+    ]
+    keys = list(dict.fromkeys(keys))
+    cursor.execute(
+        "UPDATE songs SET notes = ?, tuning = ?, album = ?, duration = ?, "
+        "genres = ?, progress = ?, album_key = ?, display_album = ? "
+        "WHERE title_key = ? AND artist_key = ?",
+        (merged.notes, merged.tuning, merged.album, merged.duration,
+         merged.encoded_genres, merged.progress, normalize_key(merged.album),
+         display_text(merged.album), *keep),
+    )
+
+    pairs = " OR ".join(["(title_key = ? AND artist_key = ?)"] * len(keys))
+    values = [value for key in keys for value in key]
+    cursor.execute(
+        "SELECT ease, interval_days, repetitions, last_practiced, due_at "
+        f"FROM practice_schedule WHERE {pairs} "
+        "ORDER BY repetitions DESC, last_practiced DESC LIMIT 1",
+        values,
+    )
+    schedule = cursor.fetchone()
+    cursor.execute(
+        f"SELECT title_key, artist_key, tag, weight FROM song_tags WHERE {pairs}",
+        values,
+    )
+    tags = {}
+    for title_key, artist_key, tag, weight in cursor.fetchall():
+        tags.setdefault((title_key, artist_key), {})[tag] = weight
+    weights = next((tags[key] for key in keys if key in tags), None)
+
+    cursor.executemany(
+        "DELETE FROM songs WHERE title_key = ? AND artist_key = ?",
+        [key for key in keys if key != keep],
+    )
+    if schedule:
+        save_review_state(cursor, *keep, ReviewState(*schedule))
+    else:
+        schedule_mastered_song(cursor, *keep)
+    if weights:
+        save_tag_weights(cursor, *keep, weights)
 
 
 def song_exists(cursor, title, artist):
@@ -259,19 +1137,18 @@ def song_exists(cursor, title, artist):
         bool: True if the song exists, False otherwise.
     """
     cursor.execute(
-        "SELECT COUNT(*) FROM songs WHERE LOWER(title) = LOWER(?) AND "
-        "LOWER(artist) = LOWER(?)",
-        (title.lower(), artist.lower()),
+        "SELECT COUNT(*) FROM songs WHERE title_key = ? AND artist_key = ?",
+        (normalize_key(title), normalize_key(artist)),
     )
     return cursor.fetchone()[0] > 0
 
 
-def get_unique_genres(cursor):
+def get_unique_genres(cursor, source="songs"):
     """
     Fetch all unique genres from the database, excluding artist names.
     """
     cursor.execute(
-        "SELECT DISTINCT genres, artist FROM songs "
+        f"SELECT DISTINCT genres, artist FROM {source} "
         "WHERE genres IS NOT NULL AND genres != ''"
     )
     all_genres = cursor.fetchall()
@@ -288,18 +1165,15 @@ def get_unique_genres(cursor):
     return sorted(filtered_genres)
 
 
-def get_unique_tunings(cursor):
+def get_unique_tunings(cursor, source="songs"):
     """
-    Fetch all unique tunings from the database, case-insensitive.
+    Fetch all unique tunings from the database by canonical name, so
+    spellings like "drop d" and "DADGBE" are listed once as "Drop D".
     """
     cursor.execute(
-        "SELECT DISTINCT tuning FROM songs WHERE tuning IS NOT NULL AND tuning != ''"
+        f"SELECT DISTINCT tuning FROM {source} "
+        "WHERE tuning IS NOT NULL AND tuning != ''"
     )
-    tunings = [tuning[0] for tuning in cursor.fetchall()]
-
-    def format_tuning(tuning):
-        if len(tuning) == 6 and tuning.isupper():
-            return tuning
-        return ' '.join(word.capitalize() for word in tuning.split())
-
-    return sorted(set(format_tuning(tuning) for tuning in tunings))
+    tunings = {canonical_tuning_name(tuning) for (tuning,) in cursor.fetchall()}
+    tunings.discard("")
+    return sorted(tunings)
@@ -2,29 +2,896 @@
 Wrapper for the Last.fm API.
 """
 
+import asyncio
+from collections import OrderedDict, namedtuple
 from datetime import timedelta
+import random
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 import os
 import logging
-from dotenv import load_dotenv
-from utils.utils import setup_logging, get_settings_path
+from models.song import normalize_key
+from services.circuit_breaker import CircuitBreaker
+from services.rate_limiter import RateLimiter, SUCCESS, OVERLOADED, ERROR
+from services.response_cache import ResponseCache, cache_key
+from services.settings import get_settings, LASTFM_API_ROOT, LASTFM_TRANSPORT
+from services.transport import create_transport
+from utils.utils import setup_logging, get_response_cache_path
 
-API_ROOT = "http://ws.audioscrobbler.com/2.0/"
+API_ROOT = "https://ws.audioscrobbler.com/2.0/"
+
+# Seconds to wait for a response before giving up on an attempt
+DEFAULT_TIMEOUT = 5.0
+
+# Retries after the first attempt, for rate limits and server errors
+MAX_RETRIES = 3
+
+# Backoff before retry n is drawn between 0 and BACKOFF_BASE * 2 ** n
+# seconds, capped at BACKOFF_MAX, so clients that failed together don't
+# retry together
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+# Keep-alive connections kept open per host
+POOL_SIZE = 10
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Last.fm error codes that mean "try again later": operation failed,
+# service offline, temporarily unavailable and rate limit exceeded
+RETRY_ERRORS = frozenset({8, 11, 16, 29})
+RATE_LIMIT_ERROR = 29
+
+# Last.fm error for an unknown track or album
+NOT_FOUND_ERROR = 6
+
+# Seconds a "not found" answer is cached, short so a track added to
+# Last.fm or a lookup retried with the right spelling isn't held up
+NOT_FOUND_TTL = 10 * 60
+
+# Parsed track lookups kept in memory, most recently used last
+TRACK_INFO_MEMO_SIZE = 1024
+
+# Parsed album lookups kept in memory, most recently used last
+ALBUM_INFO_MEMO_SIZE = 256
 
 setup_logging()
 
 
+class TrackInfo(namedtuple(
+    "TrackInfo", "name artist album duration_ms tags images"
+)):
+    """
+    The parts of a track.getInfo response the app uses.
+
+    Attributes:
+        name (str): The track name as Last.fm spells it.
+        artist (str): The artist name as Last.fm spells it.
+        album (str or None): The album title.
+        duration_ms (int): The duration in milliseconds, 0 if unknown.
+        tags (tuple): (name, count) pairs, most used first. The count is
+            None when Last.fm doesn't give one, as in track.getInfo toptags.
+        images (tuple of str): Album image URLs, smallest first.
+    """
+
+    __slots__ = ()
+
+    @property
+    def genres(self):
+        """The tag names, most used first."""
+        return [name for name, _ in self.tags]
+
+    @property
+    def album_art_url(self):
+        """The URL of the largest album image, None if there is none."""
+        return self.images[-1] if self.images else None
+
+    @property
+    def tag_weights(self):
+        """
+        Tag weights by lowercased tag name.
+
+        Tags carry a count from 0 to 100 when Last.fm provides one. Tags
+        with only a name are weighted by rank instead.
+        """
+        return _tag_weights(self.tags)
+
+
+class AlbumInfo(namedtuple("AlbumInfo", "name artist tracks tags images")):
+    """
+    The parts of an album.getInfo response the app uses.
+
+    Attributes:
+        name (str): The album title as Last.fm spells it.
+        artist (str): The artist name as Last.fm spells it.
+        tracks (tuple): (name, duration_ms) pairs in album order, the
+            duration 0 if unknown.
+        tags (tuple): (name, count) pairs like TrackInfo.tags.
+        images (tuple of str): Album image URLs, smallest first.
+    """
+
+    __slots__ = ()
+
+    genres = TrackInfo.genres
+    album_art_url = TrackInfo.album_art_url
+    tag_weights = TrackInfo.tag_weights
+
+    def track_info(self, title):
+        """
+        Get a track of the album as a TrackInfo carrying the album's tags
+        and images.
+
+        Args:
+            title (str): The track title, matched case-insensitively.
+
+        Returns:
+            TrackInfo or None: The track, or None if it isn't on the album.
+        """
+        key = _match_key(title)
+        for name, duration_ms in self.tracks:
+            if _match_key(name) == key:
+                return TrackInfo(name, self.artist, self.name, duration_ms,
+                                 self.tags, self.images)
+        return None
+
+
+def _tag_weights(tags):
+    weights = {}
+    for rank, (name, count) in enumerate(tags):
+        if count is None:
+            count = 100.0 * (len(tags) - rank) / len(tags)
+        if count > 0:
+            weights.setdefault(name.lower(), float(count))
+    return weights
+
+
+def _match_key(name):
+    """Normalize a name for matching, as cache_key does."""
+    return " ".join(normalize_key(name).split())
+
+
+def _as_list(value):
+    """Last.fm sends a single item as a dict instead of a list of one."""
+    if isinstance(value, dict):
+        return [value]
+    return value if isinstance(value, list) else []
+
+
+def _parse_tags(tags):
+    """Parse a toptags or tags element into (name, count) pairs."""
+    parsed = []
+    for tag in _as_list((tags or {}).get("tag")):
+        name = (tag.get("name") or "").strip()
+        if not name:
+            continue
+        try:
+            count = float(tag["count"])
+        except (KeyError, TypeError, ValueError):
+            count = None
+        parsed.append((name, count))
+    return tuple(parsed)
+
+
+def _parse_images(images):
+    """Parse an image element into URLs, smallest first."""
+    return tuple(image["#text"] for image in _as_list(images) if image.get("#text"))
+
+
+def parse_track_info(response):
+    """
+    Parse a track.getInfo response.
+
+    Args:
+        response (dict): The decoded response.
+
+    Returns:
+        TrackInfo or None: The track, or None for an error response.
+    """
+    track = (response or {}).get("track")
+    if not isinstance(track, dict) or "error" in response:
+        return None
+    album = track.get("album") or {}
+    artist = track.get("artist")
+    if isinstance(artist, dict):
+        artist = artist.get("name")
+    try:
+        duration_ms = int(track.get("duration") or 0)
+    except (TypeError, ValueError):
+        duration_ms = 0
+
+    return TrackInfo(
+        name=track.get("name"),
+        artist=artist,
+        album=album.get("title"),
+        duration_ms=duration_ms,
+        tags=_parse_tags(track.get("toptags")),
+        images=_parse_images(album.get("image")),
+    )
+
+
+def parse_album_info(response):
+    """
+    Parse an album.getInfo response.
+
+    Args:
+        response (dict): The decoded response.
+
+    Returns:
+        AlbumInfo or None: The album, or None for an error response.
+    """
+    album = (response or {}).get("album")
+    if not isinstance(album, dict) or "error" in response:
+        return None
+    artist = album.get("artist")
+    if isinstance(artist, dict):
+        artist = artist.get("name")
+
+    tracks = []
+    for track in _as_list((album.get("tracks") or {}).get("track")):
+        if not track.get("name"):
+            continue
+        # Unlike track.getInfo, album.getInfo gives durations in seconds
+        try:
+            duration_ms = int(track.get("duration") or 0) * 1000
+        except (TypeError, ValueError):
+            duration_ms = 0
+        tracks.append((track["name"], duration_ms))
+
+    return AlbumInfo(
+        name=album.get("name"),
+        artist=artist,
+        tracks=tuple(tracks),
+        tags=_parse_tags(album.get("tags")),
+        images=_parse_images(album.get("image")),
+    )
+
+
+def get_retry_after(response):
+    """
+    Get the seconds a response's Retry-After header asks to wait.
+
+    Args:
+        response (requests.Response): The response.
+
+    Returns:
+        float or None: The seconds, at most BACKOFF_MAX, or None if the
+        header is missing or not a number of seconds.
+    """
+    try:
+        return min(float(response.headers.get("Retry-After")), BACKOFF_MAX)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, backoff=BACKOFF_BASE, response=None):
+    """
+    Seconds to wait before retrying, honoring a Retry-After header.
+
+    Args:
+        attempt (int): The number of the failed attempt, from 0.
+        backoff (float, optional): Base of the backoff, in seconds.
+        response (requests.Response, optional): The failed response.
+
+    Returns:
+        float: The delay.
+    """
+    retry_after = response is not None and get_retry_after(response)
+    if retry_after:
+        return retry_after
+    return random.uniform(0, min(BACKOFF_MAX, backoff * 2 ** attempt))
+
+
+def check_response(url, response, decode=False):
+    """
+    Sort a response into the outcomes the rate limiter and the retry loop
+    act on.
+
+    Args:
+        url (str): The requested URL, for error messages.
+        response (requests.Response): The response.
+        decode (bool, optional): Decode the response as JSON.
+
+    Returns:
+        tuple: (outcome, result, error). The outcome is SUCCESS, OVERLOADED
+        or ERROR. The result is the response, or its decoded JSON if decode
+        is set, and None when it is worth retrying because of the error.
+        Errors that aren't worth retrying have neither a result nor an error.
+    """
+    if response.status_code in RETRY_STATUSES:
+        error = requests.exceptions.HTTPError(
+            f"{response.status_code} from {url}", response=response
+        )
+        return OVERLOADED, None, error
+    try:
+        response.raise_for_status()
+        result = response.json() if decode else response
+    except (requests.exceptions.RequestException, ValueError):
+        return ERROR, None, None
+    if decode and result.get("error") in RETRY_ERRORS:
+        error = requests.exceptions.HTTPError(
+            f"Last.fm error {result['error']}: {result.get('message')}",
+            response=response,
+        )
+        return OVERLOADED, result, error
+    return SUCCESS, result, None
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request while the circuit is open."""
+
+
+def is_outage(outcome, response, result):
+    """
+    Tell whether an attempt failed because Last.fm is down or unreachable,
+    as opposed to answering or asking to slow down.
+
+    Args:
+        outcome (str): SUCCESS, OVERLOADED or ERROR.
+        response: The response, None if none came.
+        result: The decoded response, if any.
+
+    Returns:
+        bool: True for connection failures, timeouts, server errors and
+        Last.fm "try again later" errors other than rate limiting.
+    """
+    if outcome == SUCCESS:
+        return False
+    if response is None:
+        return True
+    if outcome == ERROR:
+        return False
+    return response.status_code != 429 and (
+        not isinstance(result, dict) or result.get("error") != RATE_LIMIT_ERROR
+    )
+
+
+def check_circuit(circuit_breaker):
+    """
+    Refuse to send a request while the circuit breaker is open.
+
+    Args:
+        circuit_breaker (CircuitBreaker): The breaker, or None.
+
+    Raises:
+        CircuitOpenError: If the breaker doesn't let the request through.
+    """
+    if circuit_breaker is not None and not circuit_breaker.allow():
+        raise CircuitOpenError(
+            f"Last.fm is unreachable, trying again in "
+            f"{circuit_breaker.retry_in():.0f}s"
+        )
+
+
+def record_outcome(circuit_breaker, outcome, response, result):
+    """
+    Report an attempt let through by check_circuit to the breaker.
+
+    Args:
+        circuit_breaker (CircuitBreaker): The breaker, or None.
+        outcome (str): SUCCESS, OVERLOADED or ERROR.
+        response: The response, None if none came.
+        result: The decoded response, if any.
+    """
+    if circuit_breaker is None:
+        return
+    if is_outage(outcome, response, result):
+        circuit_breaker.record_failure()
+    else:
+        circuit_breaker.record_success()
+
+
+def cache_response(cache, method, artist, name, response):
+    """
+    Cache a lookup's response: found ones for the cache's TTL, "not found"
+    answers for NOT_FOUND_TTL, and other errors not at all.
+
+    Args:
+        cache (ResponseCache): The cache, or None.
+        method (str): The API method.
+        artist (str): The artist name.
+        name (str): The track or album name.
+        response (dict): The decoded response.
+    """
+    if cache is None:
+        return
+    error = response.get("error")
+    if error is None:
+        cache.put(method, artist, name, response)
+    elif error == NOT_FOUND_ERROR:
+        cache.put(method, artist, name, response, ttl=NOT_FOUND_TTL)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call for a key is in
+    flight, callers asking for the same key wait for it and share its
+    result or exception instead of making a call of their own.
+    """
+
+    class _Call:
+        __slots__ = ("done", "result", "error")
+
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.saved = 0
+
+    def do(self, key, func):
+        """
+        Call a function unless a call for the same key is in flight.
+
+        Args:
+            key (hashable): Identifies identical calls.
+            func (callable): The call, taking no arguments.
+
+        Returns:
+            The result of func, possibly from another thread's call.
+
+        Raises:
+            Exception: Whatever func raised, possibly in another thread.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+                self.calls += 1
+            else:
+                self.saved += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def get_stats(self):
+        """
+        Get the coalescing counters.
+
+        Returns:
+            dict: Calls made, calls saved by sharing an in-flight call, and
+            the calls in flight now.
+        """
+        with self._lock:
+            return {"calls": self.calls, "saved": self.saved,
+                    "in_flight": len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines on one event loop.
+
+    Each caller waits for the shared call with its own deadline. The call
+    is cancelled only once every caller waiting for it was cancelled.
+    """
+
+    class _Call:
+        __slots__ = ("task", "waiters")
+
+        def __init__(self, task):
+            self.task = task
+            self.waiters = 0
+
+    def __init__(self):
+        self._calls = {}
+        self.calls = 0
+        self.saved = 0
+
+    async def do(self, key, func):
+        """
+        Await a coroutine function unless a call for the same key is in
+        flight.
+
+        Args:
+            key (hashable): Identifies identical calls.
+            func (callable): Returns the coroutine to run.
+
+        Returns:
+            The result of the coroutine, possibly another caller's.
+
+        Raises:
+            Exception: Whatever the coroutine raised.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = self._Call(asyncio.ensure_future(func()))
+            call.task.add_done_callback(lambda _: self._calls.pop(key, None))
+            self.calls += 1
+        else:
+            self.saved += 1
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1:
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def get_stats(self):
+        """
+        Get the coalescing counters, see SingleFlight.get_stats.
+        """
+        return {"calls": self.calls, "saved": self.saved,
+                "in_flight": len(self._calls)}
+
+
+class LastFmClient:
+    """
+    Last.fm API client that keeps connections open between requests.
+
+    All requests go through one requests.Session, so repeated calls reuse
+    pooled keep-alive connections instead of opening a new TCP and TLS
+    connection each time. Rate limits and server errors are retried with
+    jittered exponential backoff. Every attempt passes through an optional
+    shared rate limiter, which learns from the outcomes how hard it can
+    push. Track and album lookups are kept in an optional response cache,
+    "not found" answers briefly, and concurrent identical lookups and image
+    downloads share one request. An optional circuit breaker refuses
+    requests without sending them while Last.fm is down.
+    """
+
+    def __init__(self, api_key, api_root=API_ROOT, timeout=DEFAULT_TIMEOUT,
+                 max_retries=MAX_RETRIES, backoff=BACKOFF_BASE, session=None,
+                 cache=None, rate_limiter=None, circuit_breaker=None):
+        """
+        Initialize the client.
+
+        Args:
+            api_key (str): The Last.fm API key.
+            api_root (str, optional): The API endpoint.
+            timeout (float, optional): Seconds to wait for each attempt.
+            max_retries (int, optional): Retries after the first attempt.
+            backoff (float, optional): Base of the retry backoff, in seconds.
+            session (optional): What to send requests with: a
+                                requests.Session, or a transport from
+                                services.transport to record or replay
+                                responses. Defaults to a pooled session.
+            cache (ResponseCache, optional): Cache of track lookups.
+            rate_limiter (RateLimiter, optional): Limiter shared by the
+                                                  clients of the API.
+            circuit_breaker (CircuitBreaker, optional): Breaker shared by
+                                                        the clients.
+        """
+        self.api_key = api_key
+        self.api_root = api_root
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.single_flight = SingleFlight()
+        self.retries = 0
+        self._sending = 0
+        self._retired = False
+        self._sending_lock = threading.Lock()
+
+    def close(self):
+        """Close the pooled connections and the cache."""
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def retire(self):
+        """
+        Close the pooled connections of a client that is being replaced,
+        once the requests other threads are sending with it finished. The
+        cache is left open for the new client.
+        """
+        with self._sending_lock:
+            self._retired = True
+            idle = self._sending == 0
+        if idle:
+            self.session.close()
+
+    def _attempt(self, url, params, decode):
+        """
+        Send one request.
+
+        Returns:
+            tuple: (outcome, result, error, response), see check_response.
+        """
+        with self._sending_lock:
+            self._sending += 1
+        try:
+            response = self.session.get(url, params=params, timeout=self.timeout)
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout) as e:
+            return OVERLOADED, None, e, None
+        finally:
+            with self._sending_lock:
+                self._sending -= 1
+                idle = self._retired and self._sending == 0
+            if idle:
+                self.session.close()
+        return (*check_response(url, response, decode), response)
+
+    def _get(self, url, params=None, decode=False):
+        """
+        Send a GET request, retrying rate limits, server errors, Last.fm
+        "try again later" errors and connection failures.
+
+        Args:
+            url (str): The URL.
+            params (dict, optional): Query parameters, encoded by requests.
+            decode (bool, optional): Decode the response as JSON.
+
+        Returns:
+            requests.Response or dict: The successful response, or its
+            decoded JSON. A Last.fm error still there after the last retry
+            is returned as the API sent it.
+
+        Raises:
+            requests.exceptions.RequestException: If every attempt failed.
+            CircuitOpenError: If the circuit breaker is open.
+            ValueError: If the response isn't valid JSON.
+        """
+        for attempt in range(self.max_retries + 1):
+            check_circuit(self.circuit_breaker)
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            outcome = ERROR
+            retry_after = None
+            result = response = None
+            try:
+                outcome, result, error, response = self._attempt(url, params, decode)
+                if response is not None and outcome == OVERLOADED:
+                    retry_after = get_retry_after(response)
+            finally:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.release(outcome, retry_after)
+                record_outcome(self.circuit_breaker, outcome, response, result)
+            if outcome == ERROR:
+                # Not worth retrying: raise the client error or bad JSON
+                response.raise_for_status()
+                return response.json() if decode else response
+            if error is None:
+                return result
+            if attempt == self.max_retries:
+                if result is not None:
+                    return result
+                raise error
+            delay = backoff_delay(attempt, self.backoff, response)
+            logging.warning(f"Retrying {url} in {delay:.2f}s after: {error}")
+            self.retries += 1
+            time.sleep(delay)
+
+    def call(self, method, **params):
+        """
+        Call an API method.
+
+        Args:
+            method (str): The method, e.g. "track.getInfo".
+            **params: The method's parameters.
+
+        Returns:
+            dict: The decoded response. Last.fm errors are returned as
+            {"error": code, "message": text} like the API sends them.
+
+        Raises:
+            requests.exceptions.RequestException: If the request failed.
+        """
+        query = {"method": method, **params, "api_key": self.api_key,
+                 "format": "json"}
+        return self._get(self.api_root, query, decode=True)
+
+    def get_track_info(self, artist, track):
+        """
+        Get info about a track, from the cache if it was looked up before.
+        If the same track is being fetched already, wait for that request.
+
+        Args:
+            artist (str): The artist name.
+            track (str): The track name.
+
+        Returns:
+            dict: The track.getInfo response, with the URL of the largest
+            album image added as "album_art_url".
+
+        Raises:
+            requests.exceptions.RequestException: If the request failed.
+        """
+        if self.cache is not None:
+            track_info = self.cache.get("track.getInfo", artist, track)
+            if track_info is not None:
+                return track_info
+        return self.single_flight.do(
+            cache_key("track.getInfo", artist, track),
+            lambda: self._fetch_track_info(artist, track),
+        )
+
+    def get_album_info(self, artist, album):
+        """
+        Get info about an album and its tracks, from the cache if it was
+        looked up before. If the same album is being fetched already, wait
+        for that request.
+
+        Args:
+            artist (str): The artist name.
+            album (str): The album title.
+
+        Returns:
+            dict: The album.getInfo response.
+
+        Raises:
+            requests.exceptions.RequestException: If the request failed.
+        """
+        if self.cache is not None:
+            album_info = self.cache.get("album.getInfo", artist, album)
+            if album_info is not None:
+                return album_info
+        return self.single_flight.do(
+            cache_key("album.getInfo", artist, album),
+            lambda: self._fetch_album_info(artist, album),
+        )
+
+    def _fetch_album_info(self, artist, album):
+        """Fetch an album and cache the response."""
+        album_info = self.call("album.getInfo", artist=artist, album=album)
+        cache_response(self.cache, "album.getInfo", artist, album, album_info)
+        return album_info
+
+    def _fetch_track_info(self, artist, track):
+        """Fetch a track and cache the response."""
+        track_info = self.call("track.getInfo", artist=artist, track=track)
+        images = track_info.get("track", {}).get("album", {}).get("image", [])
+        track_info["album_art_url"] = images[-1]["#text"] if images else None
+        cache_response(self.cache, "track.getInfo", artist, track, track_info)
+        return track_info
+
+    def fetch_image(self, url):
+        """
+        Download an image, or wait for the download if it is in progress.
+
+        Args:
+            url (str): The image URL.
+
+        Returns:
+            bytes: The image data.
+
+        Raises:
+            requests.exceptions.RequestException: If the request failed.
+        """
+        return self.single_flight.do(("image", url), lambda: self._get(url).content)
+
+
+_client = None
+_client_config = None
+_image_client = None
+_rate_limiter = None
+_circuit_breaker = None
+# Guards the globals above and the parsed-info memos, which are used from
+# the lookup threads of SongController as well as the GUI thread
+_lock = threading.RLock()
+
+
+def get_rate_limiter():
+    """
+    Get the rate limiter shared by every Last.fm request, created on first
+    use.
+
+    Returns:
+        RateLimiter: The rate limiter.
+    """
+    global _rate_limiter
+    with _lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
+
+
+def get_circuit_breaker():
+    """
+    Get the circuit breaker shared by every Last.fm request, created on
+    first use.
+
+    Returns:
+        CircuitBreaker: The circuit breaker.
+    """
+    global _circuit_breaker
+    with _lock:
+        if _circuit_breaker is None:
+            _circuit_breaker = CircuitBreaker()
+        return _circuit_breaker
+
+
+def get_client():
+    """
+    Get the shared client, creating it on first use or when the API key,
+    API root or transport in the settings changed.
+
+    Returns:
+        LastFmClient or None: The client, or None if the API isn't configured.
+    """
+    global _client, _client_config
+    api_key, api_secret = load_api_credentials()
+    if not (api_key and api_secret):
+        return None
+    settings = get_settings()
+    config = (api_key, settings.get(LASTFM_API_ROOT, API_ROOT),
+              settings.get(LASTFM_TRANSPORT))
+    with _lock:
+        if _client is None or _client_config != config:
+            cache = _client and _client.cache
+            if _client is not None:
+                _client.retire()
+            _client = LastFmClient(
+                api_key, api_root=config[1], session=create_transport(config[2]),
+                cache=cache or ResponseCache(get_response_cache_path()),
+                rate_limiter=get_rate_limiter(),
+                circuit_breaker=get_circuit_breaker(),
+            )
+            _client_config = config
+        return _client
+
+
+def get_image_client():
+    """
+    Get the client that downloads album art when the API isn't configured,
+    created on first use. It has no API key and no response cache.
+
+    Returns:
+        LastFmClient: The client.
+    """
+    global _image_client
+    with _lock:
+        if _image_client is None:
+            _image_client = LastFmClient(
+                None, rate_limiter=get_rate_limiter(),
+                circuit_breaker=get_circuit_breaker(),
+            )
+        return _image_client
+
+
+def close_clients():
+    """
+    Close the shared clients at shutdown: their pooled connections, the
+    response cache, which saves its access times, and a recording
+    transport, which writes its fixture file. Clients are created again if
+    Last.fm is used afterwards.
+    """
+    global _client, _client_config, _image_client
+    with _lock:
+        clients = [client for client in (_client, _image_client)
+                   if client is not None]
+        _client = _client_config = _image_client = None
+    for client in clients:
+        client.close()
+
+
 def load_api_credentials():
-    """Load API credentials from settings file"""
-    settings_path = get_settings_path()
-    if os.path.exists(settings_path):
-        load_dotenv(settings_path)
-    return os.getenv("API_KEY"), os.getenv("API_SECRET")
+    """Get the API credentials from the settings, parsed once and cached"""
+    return get_settings().api_credentials()
 
 
 def is_api_configured():
-    api_key, api_secret = load_api_credentials()
-    return bool(api_key and api_secret)
+    return get_settings().is_api_configured()
 
 
 def get_track_info(artist, track):
@@ -38,36 +905,151 @@ def get_track_info(artist, track):
     Returns:
         dict: Dictionary containing track info.
     """
-    if not is_api_configured():
+    client = get_client()
+    if client is None:
         logging.warning("Last.fm API is not configured. Skipping track info fetch.")
         return None
 
-    api_key, _ = load_api_credentials()
     logging.info(f"Fetching track info for: {track} by {artist}")
-    method = "track.getInfo"
-    artist = artist.replace(" ", "+")
-    track = track.replace(" ", "+")
-    api_key_str = "&api_key=" + api_key
-    method_call = f"{API_ROOT}?method={method}"
-    track_info_query = f"&artist={artist}&track={track}"
-    call = f"{method_call}{track_info_query}{api_key_str}&format=json"
-
     try:
-        response = requests.get(call, timeout=5)
-        response.raise_for_status()
-        track_info = response.json()
-
-        # Extract album art URL
-        images = track_info.get("track", {}).get("album", {}).get("image", [])
-        album_art_url = images[-1]["#text"] if images else None  # Get the largest image
-        track_info["album_art_url"] = album_art_url
+        track_info = client.get_track_info(artist, track)
         logging.info(f"Successfully fetched track info for: {track} by {artist}")
         return track_info
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, ValueError) as e:
         logging.error(f"Error fetching track info for {track} by {artist}: {str(e)}")
         return None
 
 
+_track_infos = OrderedDict()
+
+
+def get_track(artist, track):
+    """
+    Get the parsed info of a track, fetching it at most once per process.
+
+    Only the parsed TrackInfo is remembered, not the response it came from.
+    Failed lookups aren't remembered, so they are tried again next time.
+
+    Args:
+        artist (str): The artist name.
+        track (str): The track name.
+
+    Returns:
+        TrackInfo or None: The track, or None if it couldn't be fetched or
+        Last.fm doesn't know it.
+    """
+    key = cache_key("track.getInfo", artist, track)
+    track_info = _recall(_track_infos, key)
+    if track_info is not None:
+        return track_info
+
+    return _remember_track(key, parse_track_info(get_track_info(artist, track)))
+
+
+def lookup_track(artist, track):
+    """
+    Get the parsed info of a track like get_track, but tell a track Last.fm
+    doesn't know from a lookup that failed.
+
+    Args:
+        artist (str): The artist name.
+        track (str): The track name.
+
+    Returns:
+        TrackInfo or None: The track, or None if Last.fm doesn't know it or
+        the API isn't configured.
+
+    Raises:
+        requests.exceptions.RequestException: If Last.fm couldn't be reached,
+            CircuitOpenError included.
+        ValueError: If the response isn't valid JSON.
+    """
+    key = cache_key("track.getInfo", artist, track)
+    track_info = _recall(_track_infos, key)
+    if track_info is not None:
+        return track_info
+
+    client = get_client()
+    if client is None:
+        logging.warning("Last.fm API is not configured. Skipping track info fetch.")
+        return None
+    logging.info(f"Looking up track: {track} by {artist}")
+    return _remember_track(key, parse_track_info(client.get_track_info(artist, track)))
+
+
+def _remember_track(key, track_info):
+    """Memoize a parsed track unless it is None, and return it."""
+    return _remember(_track_infos, key, track_info, TRACK_INFO_MEMO_SIZE)
+
+
+def _recall(memo, key):
+    """Get a memoized value and mark it recently used, or None."""
+    with _lock:
+        value = memo.get(key)
+        if value is not None:
+            memo.move_to_end(key)
+        return value
+
+
+def _remember(memo, key, value, size):
+    """Memoize a value unless it is None, evicting the oldest, and return it."""
+    if value is not None:
+        with _lock:
+            memo[key] = value
+            memo.move_to_end(key)
+            if len(memo) > size:
+                memo.popitem(last=False)
+    return value
+
+
+def get_album_info(artist, album):
+    """
+    Get info about an album from Last.fm API.
+
+    Args:
+        artist (str): The artist name.
+        album (str): The album title.
+
+    Returns:
+        dict: The album.getInfo response, or None if it couldn't be fetched.
+    """
+    client = get_client()
+    if client is None:
+        logging.warning("Last.fm API is not configured. Skipping album info fetch.")
+        return None
+
+    logging.info(f"Fetching album info for: {album} by {artist}")
+    try:
+        return client.get_album_info(artist, album)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logging.error(f"Error fetching album info for {album} by {artist}: {str(e)}")
+        return None
+
+
+_album_infos = OrderedDict()
+
+
+def get_album(artist, album):
+    """
+    Get the parsed info of an album, fetching it at most once per process.
+
+    Args:
+        artist (str): The artist name.
+        album (str): The album title.
+
+    Returns:
+        AlbumInfo or None: The album, or None if it couldn't be fetched or
+        Last.fm doesn't know it.
+    """
+    key = cache_key("album.getInfo", artist, album)
+    album_info = _recall(_album_infos, key)
+    if album_info is not None:
+        return album_info
+
+    album_info = parse_album_info(get_album_info(artist, album))
+    return _remember(_album_infos, key, album_info, ALBUM_INFO_MEMO_SIZE)
+
+
 def get_album_name(artist, track):
     """
     Get the album name for a given track.
@@ -79,8 +1061,8 @@ def get_album_name(artist, track):
     Returns:
         str: The album name.
     """
-    track_info = get_track_info(artist, track)
-    return track_info.get("track", {}).get("album", {}).get("title", "N/A")
+    track_info = get_track(artist, track)
+    return (track_info and track_info.album) or "N/A"
 
 
 def get_track_duration(artist, track):
@@ -94,8 +1076,8 @@ def get_track_duration(artist, track):
     Returns:
         timedelta: The duration of the track.
     """
-    track_info = get_track_info(artist, track)
-    return timedelta(milliseconds=int(track_info.get("track", {}).get("duration", 0)))
+    track_info = get_track(artist, track)
+    return timedelta(milliseconds=track_info.duration_ms if track_info else 0)
 
 
 def get_genre(artist, track):
@@ -109,22 +1091,90 @@ def get_genre(artist, track):
     Returns:
         list: A list of genres.
     """
-    track_info = get_track_info(artist, track)
-    genres = [
-        tag["name"]
-        for tag in track_info.get("track", {}).get("toptags", {}).get("tag", [])
-    ]
-    return genres
+    track_info = get_track(artist, track)
+    return track_info.genres if track_info else []
+
+
+def get_cache_stats():
+    """
+    Get the counters of the Last.fm response cache.
+
+    Returns:
+        dict: The cache counters, empty if no client was created yet.
+    """
+    if _client is None or _client.cache is None:
+        return {}
+    return _client.cache.get_stats()
+
+
+def get_single_flight_stats():
+    """
+    Get how many Last.fm requests were saved by sharing in-flight ones.
+
+    Returns:
+        dict: The counters of the shared client, see SingleFlight.get_stats,
+        empty if no client was created yet.
+    """
+    if _client is None:
+        return {}
+    return _client.single_flight.get_stats()
+
+
+def get_rate_limiter_stats():
+    """
+    Get the counters of the shared rate limiter.
+
+    Returns:
+        dict: The rate limiter counters, see RateLimiter.get_stats.
+    """
+    return get_rate_limiter().get_stats()
+
+
+def get_circuit_breaker_stats():
+    """
+    Get the state and counters of the shared circuit breaker.
+
+    Returns:
+        dict: The breaker state and counters, see CircuitBreaker.get_stats.
+    """
+    return get_circuit_breaker().get_stats()
+
+
+def extract_tag_weights(track_info):
+    """
+    Get weighted tags from a track.getInfo response.
+
+    Args:
+        track_info (dict): The response of get_track_info.
+
+    Returns:
+        dict: Tag weights by tag name, see TrackInfo.tag_weights.
+    """
+    parsed = parse_track_info(track_info)
+    return parsed.tag_weights if parsed else {}
 
 
 def fetch_and_cache_album_art(album_art_url, album_name, cache_dir):
+    """
+    Download album art into the cache directory.
+
+    Album art is served from Last.fm's image hosts, which don't need an
+    API key, so this works without one.
+
+    Args:
+        album_art_url (str): The image URL.
+        album_name (str): The album, which names the cached file.
+        cache_dir (str): The cache directory.
+
+    Returns:
+        str: The path of the cached image, or None if it couldn't be fetched.
+    """
     try:
         logging.debug("Fetching album art from %s", album_art_url)
-        response = requests.get(album_art_url, timeout=5)
-        response.raise_for_status()
+        content = (get_client() or get_image_client()).fetch_image(album_art_url)
         album_art_path = os.path.join(cache_dir, f"{album_name}.jpg")
         with open(album_art_path, "wb") as f:
-            f.write(response.content)
+            f.write(content)
         return album_art_path
     except requests.exceptions.RequestException as e:
         logging.warning("Error fetching album art: %s", e)
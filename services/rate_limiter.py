@@ -0,0 +1,313 @@
+"""
+Client-side rate limiting for Last.fm requests.
+"""
+
+import logging
+import threading
+import time
+
+# Last.fm asks for at most 5 requests per second, averaged over 5 minutes
+DEFAULT_RATE = 5.0
+DEFAULT_BURST = 10
+
+# Concurrent requests allowed at first, and the bounds AIMD moves between
+DEFAULT_CONCURRENCY = 4
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 16
+
+# Factor the concurrency limit is cut by when the server pushes back
+DECREASE_FACTOR = 0.5
+
+# Slack for float rounding when refilled tokens add up to a whole one
+EPSILON = 1e-9
+
+# Seconds try_acquire suggests waiting while every concurrency slot is taken
+SLOT_POLL_INTERVAL = 0.05
+
+# Outcomes of a request, reported when releasing its slot
+SUCCESS, OVERLOADED, ERROR = "success", "overloaded", "error"
+
+
+class TokenBucket:
+    """
+    Token bucket: requests take a token, tokens refill at a steady rate up
+    to a burst capacity, and a request waits when the bucket is empty.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, capacity=DEFAULT_BURST,
+                 clock=time.monotonic, sleep=time.sleep):
+        """
+        Initialize a full bucket.
+
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): Most tokens the bucket holds.
+            clock (callable, optional): Monotonic clock, for testing.
+            sleep (callable, optional): Sleep function, for testing.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self):
+        """The tokens available now, negative while paused."""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def acquire(self, timeout=None):
+        """
+        Take a token, waiting for one if the bucket is empty.
+
+        Args:
+            timeout (float, optional): Most seconds to wait, None for no limit.
+
+        Returns:
+            float or None: Seconds waited, or None if no token came in time.
+        """
+        start = self._clock()
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return self._clock() - start
+            if timeout is not None:
+                remaining = timeout - (self._clock() - start)
+                if wait > remaining:
+                    return None
+            self._sleep(wait)
+
+    def try_acquire(self):
+        """
+        Take a token if there is one, without waiting.
+
+        Returns:
+            float: 0 if a token was taken, otherwise seconds until one is due.
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1 - EPSILON:
+                self._tokens = max(0.0, self._tokens - 1)
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def pause(self, seconds):
+        """
+        Hand out no tokens for a while, e.g. after the server asked to wait.
+
+        Args:
+            seconds (float): How long to pause.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+class AdaptiveConcurrency:
+    """
+    Limit on concurrent requests tuned by AIMD: each successful request
+    raises the limit by 1 / limit, about one more slot per round of
+    requests, and each overloaded one multiplies it by DECREASE_FACTOR.
+    """
+
+    def __init__(self, initial=DEFAULT_CONCURRENCY, minimum=MIN_CONCURRENCY,
+                 maximum=MAX_CONCURRENCY, decrease_factor=DECREASE_FACTOR):
+        """
+        Initialize the limit.
+
+        Args:
+            initial (int): The starting limit.
+            minimum (int): The lowest the limit goes.
+            maximum (int): The highest the limit goes.
+            decrease_factor (float): Factor applied on overload.
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self._limit = float(initial)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self):
+        """The number of requests allowed in flight."""
+        return max(self.minimum, int(self._limit))
+
+    def acquire(self, timeout=None):
+        """
+        Take a slot, waiting while the limit is reached.
+
+        Args:
+            timeout (float, optional): Most seconds to wait, None for no limit.
+
+        Returns:
+            bool: True if a slot was taken.
+        """
+        with self._condition:
+            if not self._condition.wait_for(
+                lambda: self.in_flight < self.limit, timeout
+            ):
+                return False
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return True
+
+    def release(self, outcome):
+        """
+        Give a slot back and adjust the limit by the request's outcome.
+
+        Args:
+            outcome (str): SUCCESS, OVERLOADED or ERROR.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if outcome == SUCCESS:
+                self._limit = min(self.maximum, self._limit + 1.0 / self._limit)
+            elif outcome == OVERLOADED:
+                self._limit = max(self.minimum, self._limit * self.decrease_factor)
+            self._condition.notify_all()
+
+
+class RateLimiter:
+    """
+    Shared gate for Last.fm requests: a token bucket caps the sustained
+    request rate and an AIMD limit caps how many run at once, backing off
+    when Last.fm answers with 429s, server errors or rate limit errors.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST,
+                 concurrency=DEFAULT_CONCURRENCY, max_concurrency=MAX_CONCURRENCY,
+                 clock=time.monotonic, sleep=time.sleep):
+        """
+        Initialize the limiter.
+
+        Args:
+            rate (float): Sustained requests per second.
+            burst (int): Requests allowed at once after an idle period.
+            concurrency (int): Initial concurrent requests.
+            max_concurrency (int): Most concurrent requests.
+            clock (callable, optional): Monotonic clock, for testing.
+            sleep (callable, optional): Sleep function, for testing.
+        """
+        self.bucket = TokenBucket(rate, burst, clock=clock, sleep=sleep)
+        self.concurrency = AdaptiveConcurrency(concurrency, maximum=max_concurrency)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.overloaded = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self, timeout=None):
+        """
+        Wait for a concurrency slot and a token.
+
+        Args:
+            timeout (float, optional): Most seconds to wait, None for no limit.
+
+        Returns:
+            bool: True if the request may go ahead. It must then call
+            release with its outcome.
+        """
+        start = self._clock()
+        if not self.concurrency.acquire(timeout):
+            self._timed_out()
+            return False
+        remaining = None
+        if timeout is not None:
+            remaining = max(0.0, timeout - (self._clock() - start))
+        if self.bucket.acquire(remaining) is None:
+            self.concurrency.release(ERROR)
+            self._timed_out()
+            return False
+        with self._lock:
+            self.requests += 1
+            self.wait_seconds += self._clock() - start
+        return True
+
+    def try_acquire(self, waited=0.0):
+        """
+        Take a concurrency slot and a token if both are free, without
+        waiting, for callers that wait on their own, like an event loop.
+        Nothing is taken unless the request may go ahead.
+
+        Args:
+            waited (float, optional): Seconds the caller waited so far,
+                                      counted in the stats if it succeeds.
+
+        Returns:
+            float: 0 if the request may go ahead, and it must then call
+            release with its outcome. Otherwise seconds to wait before
+            trying again.
+        """
+        if not self.concurrency.acquire(0):
+            return SLOT_POLL_INTERVAL
+        wait = self.bucket.try_acquire()
+        if wait:
+            self.concurrency.release(ERROR)
+            return wait
+        with self._lock:
+            self.requests += 1
+            self.wait_seconds += waited
+        return 0.0
+
+    def _timed_out(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def release(self, outcome, retry_after=None):
+        """
+        Report a request's outcome and free its slot.
+
+        Args:
+            outcome (str): SUCCESS, OVERLOADED or ERROR.
+            retry_after (float, optional): Seconds the server asked to wait,
+                                           which pauses every request.
+        """
+        self.concurrency.release(outcome)
+        if retry_after:
+            self.bucket.pause(retry_after)
+        with self._lock:
+            if outcome == OVERLOADED:
+                self.overloaded += 1
+            elif outcome == ERROR:
+                self.errors += 1
+        if outcome == OVERLOADED:
+            logging.info(
+                f"Last.fm pushed back, concurrency limit now {self.concurrency.limit}"
+            )
+
+    def get_stats(self):
+        """
+        Get the limiter counters.
+
+        Returns:
+            dict: Requests let through, overloaded and failed requests,
+            acquires that timed out, total seconds spent waiting, the current
+            concurrency limit, requests in flight and the most seen at once,
+            and the tokens available.
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "overloaded": self.overloaded,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "wait_seconds": self.wait_seconds,
+                "concurrency_limit": self.concurrency.limit,
+                "in_flight": self.concurrency.in_flight,
+                "peak_in_flight": self.concurrency.peak_in_flight,
+                "tokens": self.bucket.tokens,
+            }
@@ -0,0 +1,212 @@
+"""
+On-disk cache of Last.fm API responses.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from models.song import normalize_key
+
+# Seconds a cached response stays fresh; track metadata rarely changes
+DEFAULT_TTL = 30 * 24 * 60 * 60
+
+# Responses kept before the least recently used ones are evicted
+DEFAULT_MAX_ENTRIES = 10_000
+
+
+def cache_key(method, artist, track):
+    """
+    Normalize a lookup into the key its response is cached under.
+
+    Args:
+        method (str): The API method, e.g. "track.getInfo".
+        artist (str): The artist name.
+        track (str): The track name.
+
+    Returns:
+        tuple: (method, artist key, track key), casefolded with whitespace
+        collapsed.
+    """
+    return (
+        method.lower(),
+        " ".join(normalize_key(artist).split()),
+        " ".join(normalize_key(track).split()),
+    )
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache of API responses with a per-entry TTL and a size
+    cap enforced by evicting the least recently used entries.
+
+    Reads don't write to the database: access times are collected in
+    memory and written out before evicting or closing, so a hit costs one
+    indexed lookup.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        Open or create the cache.
+
+        Args:
+            path (str): The cache database, or ":memory:".
+            ttl (float, optional): Seconds a response stays fresh.
+            max_entries (int, optional): Responses kept at most.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._touched = {}
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                method TEXT NOT NULL,
+                artist_key TEXT NOT NULL,
+                track_key TEXT NOT NULL,
+                body TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                ttl REAL,
+                PRIMARY KEY (method, artist_key, track_key)
+            ) WITHOUT ROWID
+        """)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(responses)")]
+        if "ttl" not in columns:
+            # Caches written before responses had their own TTL
+            self.conn.execute("ALTER TABLE responses ADD COLUMN ttl REAL")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_accessed "
+            "ON responses (accessed_at)"
+        )
+        self.conn.commit()
+        self._size = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def __len__(self):
+        return self._size
+
+    def get(self, method, artist, track, now=None):
+        """
+        Look up a cached response.
+
+        Args:
+            method (str): The API method.
+            artist (str): The artist name.
+            track (str): The track name.
+            now (float, optional): The current time, for testing.
+
+        Returns:
+            dict or None: The response, or None if it isn't cached or expired.
+        """
+        now = time.time() if now is None else now
+        key = cache_key(method, artist, track)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT body, fetched_at, ttl FROM responses "
+                "WHERE method = ? AND artist_key = ? AND track_key = ?",
+                key,
+            ).fetchone()
+            if row is None or now - row[1] > (self.ttl if row[2] is None else row[2]):
+                self.misses += 1
+                self.expired += row is not None
+                return None
+            self.hits += 1
+            self._touched[key] = now
+        return json.loads(row[0])
+
+    def put(self, method, artist, track, response, now=None, ttl=None):
+        """
+        Cache a response, evicting the least recently used ones if the
+        cache is full.
+
+        Args:
+            method (str): The API method.
+            artist (str): The artist name.
+            track (str): The track name.
+            response (dict): The decoded response.
+            now (float, optional): The current time, for testing.
+            ttl (float, optional): Seconds this response stays fresh, if
+                                   not the cache's TTL.
+        """
+        now = time.time() if now is None else now
+        key = cache_key(method, artist, track)
+        with self._lock:
+            exists = self.conn.execute(
+                "SELECT 1 FROM responses "
+                "WHERE method = ? AND artist_key = ? AND track_key = ?",
+                key,
+            ).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (method, artist_key, track_key, "
+                "body, fetched_at, accessed_at, ttl) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*key, json.dumps(response), now, now, ttl),
+            )
+            self._touched.pop(key, None)
+            self._size += not exists
+            if self._size > self.max_entries:
+                self._evict(self._size - self.max_entries)
+            self.conn.commit()
+
+    def _flush_access_times(self):
+        """Write the access times of recent hits to the database."""
+        if self._touched:
+            self.conn.executemany(
+                "UPDATE responses SET accessed_at = ? "
+                "WHERE method = ? AND artist_key = ? AND track_key = ?",
+                [(accessed_at, *key) for key, accessed_at in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self, count):
+        """Delete the count least recently used responses."""
+        self._flush_access_times()
+        self.conn.execute(
+            "DELETE FROM responses WHERE (method, artist_key, track_key) IN ("
+            "SELECT method, artist_key, track_key FROM responses "
+            "ORDER BY accessed_at LIMIT ?)",
+            (count,),
+        )
+        self._size -= count
+        self.evictions += count
+        logging.debug(f"Evicted {count} cached Last.fm responses")
+
+    def clear(self):
+        """Delete every cached response."""
+        with self._lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+            self._touched.clear()
+            self._size = 0
+
+    def close(self):
+        """Save the access times and close the cache."""
+        with self._lock:
+            self._flush_access_times()
+            self.conn.commit()
+            self.conn.close()
+
+    def get_stats(self):
+        """
+        Get the cache counters.
+
+        Returns:
+            dict: Hits, misses (including expired entries), expired entries,
+            evictions, the number of cached responses and the hit rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "size": self._size,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
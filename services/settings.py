@@ -0,0 +1,177 @@
+"""
+Application settings stored in the settings file.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from dotenv import dotenv_values
+
+from utils.utils import get_settings_path
+
+# Seconds between checks of the settings file for outside changes
+CHECK_INTERVAL = 1.0
+
+# Keys of the Last.fm credentials
+API_KEY, API_SECRET = "API_KEY", "API_SECRET"
+
+# Keys for pointing the Last.fm client at a stand-in server or at recorded
+# responses, e.g. "http://127.0.0.1:8000/2.0/" and "replay:<fixture file>"
+LASTFM_API_ROOT, LASTFM_TRANSPORT = "LASTFM_API_ROOT", "LASTFM_TRANSPORT"
+
+
+class Settings:
+    """
+    Settings parsed once from a dotenv file and kept in memory.
+
+    The file is parsed again only when its modification time or size
+    changes, which is checked at most every CHECK_INTERVAL seconds.
+    Environment variables of the same name take precedence over the file,
+    as they did when the file was loaded with load_dotenv. Subscribers are
+    called with the names of the settings that changed.
+    """
+
+    def __init__(self, path=None, check_interval=CHECK_INTERVAL):
+        """
+        Initialize the settings.
+
+        Args:
+            path (str, optional): The settings file. Defaults to the one in
+                                  the application data directory.
+            check_interval (float, optional): Seconds between file checks.
+        """
+        self.path = path or get_settings_path()
+        self.check_interval = check_interval
+        self._values = {}
+        self._signature = None
+        self._checked_at = None
+        self._subscribers = []
+        self._lock = threading.RLock()
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self, force=False):
+        """
+        Parse the settings file again if it changed since it was last read.
+
+        Args:
+            force (bool, optional): Check the file even if it was checked
+                                    less than check_interval seconds ago.
+
+        Returns:
+            set: The names of the settings that changed.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if (not force and self._checked_at is not None
+                    and now - self._checked_at < self.check_interval):
+                return set()
+            self._checked_at = now
+            signature = self._file_signature()
+            if signature == self._signature:
+                return set()
+            self._signature = signature
+            values = dotenv_values(self.path) if signature else {}
+            values = {key: value for key, value in values.items() if value is not None}
+            changed = {
+                key for key in self._values.keys() | values.keys()
+                if self._values.get(key) != values.get(key)
+            }
+            self._values = values
+            subscribers = list(self._subscribers)
+        if changed:
+            logging.info(f"Loaded settings from {self.path}")
+            for callback in subscribers:
+                callback(changed)
+        return changed
+
+    def get(self, key, default=None):
+        """
+        Get a setting.
+
+        Args:
+            key (str): The setting's name.
+            default (optional): The value if the setting isn't set.
+
+        Returns:
+            str: The value from the environment, else from the settings file.
+        """
+        self.reload()
+        return os.environ.get(key) or self._values.get(key) or default
+
+    def save(self, values):
+        """
+        Update settings in the settings file, keeping the others.
+
+        Args:
+            values (dict): New values by setting name.
+        """
+        with self._lock:
+            self.reload(force=True)
+            merged = {**self._values, **values}
+            with open(self.path, "w") as f:
+                for key, value in merged.items():
+                    f.write(f"{key}={value}\n")
+        self.reload(force=True)
+
+    def subscribe(self, callback):
+        """
+        Call a function whenever settings change.
+
+        The function is called on the thread that noticed the change, which
+        can be any thread reading a setting. Qt widgets should subscribe a
+        signal's emit method, so the change is handled on the GUI thread.
+
+        Args:
+            callback (callable): Called with the set of changed names.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """
+        Stop calling a function subscribed with subscribe.
+
+        Args:
+            callback (callable): The function.
+        """
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def api_credentials(self):
+        """
+        Get the Last.fm credentials.
+
+        Returns:
+            tuple: (API key, API secret), None for the ones that aren't set.
+        """
+        return self.get(API_KEY), self.get(API_SECRET)
+
+    def is_api_configured(self):
+        """Check whether both Last.fm credentials are set."""
+        api_key, api_secret = self.api_credentials()
+        return bool(api_key and api_secret)
+
+
+_settings = None
+
+
+def get_settings():
+    """
+    Get the shared settings, created on first use.
+
+    Returns:
+        Settings: The settings.
+    """
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
@@ -0,0 +1,138 @@
+"""
+Binary snapshot of the song library for fast startup.
+
+A snapshot file holds two pickles (protocol 5) written back to back:
+
+1. A small header with the snapshot format, the key it was taken at and the
+   first page of songs in display order.
+2. All songs, as plain row tuples in the same layout as the database rows.
+
+Reading only the header costs the same no matter how big the library is, so
+the main window can paint the first page before touching the database.
+"""
+
+import os
+import pickle
+import logging
+
+from services.db import song_from_row
+
+# Bump when the row layout or the header changes
+SNAPSHOT_FORMAT = 1
+
+# Number of songs stored in the header for the first paint
+SNAPSHOT_PAGE_SIZE = 200
+
+_PICKLE_PROTOCOL = 5
+
+
+def song_to_row(song):
+    """
+    Convert a Song into a row tuple in database column order.
+
+    Args:
+        song (Song): The song.
+
+    Returns:
+        tuple: SONG_COLUMNS followed by the library name.
+    """
+    return (
+        song.title,
+        song.artist,
+        song.tuning,
+        song.notes,
+        song.album,
+        song.duration,
+        song.encoded_genres,
+        song.progress,
+        song.title_key,
+        song.artist_key,
+        song.album_key,
+        song.display_title,
+        song.display_artist,
+        song.display_album,
+        song.library,
+    )
+
+
+def write_snapshot(path, key, songs):
+    """
+    Write a snapshot of the given songs.
+
+    The file is written next to its final location and renamed into place,
+    so readers never see a partial snapshot.
+
+    Args:
+        path (str): The snapshot file path.
+        key (tuple): Identifies the library state the songs were loaded at.
+        songs (list of Song): The songs to store.
+    """
+    rows = sorted(
+        (song_to_row(song) for song in songs),
+        key=lambda row: (row[12], row[11]),  # display artist, display title
+    )
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "key": key,
+        "count": len(rows),
+        "page": rows[:SNAPSHOT_PAGE_SIZE],
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(header, f, protocol=_PICKLE_PROTOCOL)
+        pickle.dump(rows, f, protocol=_PICKLE_PROTOCOL)
+    os.replace(tmp_path, path)
+    logging.info(f"Wrote library snapshot with {len(rows)} songs to {path}")
+
+
+def read_snapshot_header(path):
+    """
+    Read the header of a snapshot.
+
+    Args:
+        path (str): The snapshot file path.
+
+    Returns:
+        dict or None: The header with the page rows converted to Songs, or
+        None if there is no usable snapshot.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable snapshot {path}: {str(e)}")
+        return None
+
+    if not isinstance(header, dict) or header.get("format") != SNAPSHOT_FORMAT:
+        logging.info(f"Ignoring snapshot {path} with an old format")
+        return None
+    header["page"] = [song_from_row(row) for row in header["page"]]
+    return header
+
+
+def read_snapshot(path, key):
+    """
+    Read all songs from a snapshot if it was taken at the given key.
+
+    Args:
+        path (str): The snapshot file path.
+        key (tuple): The current library state.
+
+    Returns:
+        list of Song or None: The songs, or None if the snapshot is missing
+        or stale.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = pickle.load(f)
+            if header.get("format") != SNAPSHOT_FORMAT or header.get("key") != key:
+                return None
+            rows = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable snapshot {path}: {str(e)}")
+        return None
+    return [song_from_row(row) for row in rows]
@@ -0,0 +1,262 @@
+"""
+Local stand-in for the Last.fm API, for offline benchmarks.
+
+Serves recorded responses with configurable latency, server errors and
+bursts of 429s. Run it on its own and set LASTFM_API_ROOT to the printed
+URL to try the app against it:
+
+    python -m services.standin_server fixtures.json --latency 0.05
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from services.transport import Recording, request_key
+
+NOT_FOUND = json.dumps({"error": 6, "message": "Track not found"}).encode()
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes, which Nagle's algorithm
+    # would hold back for a delayed ACK on a kept-alive connection
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        status, headers, body = self.server.standin.respond(self.path)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for many clients connecting at once
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        # Clients that gave up close their connection before the reply
+        pass
+
+
+class StandInServer:
+    """
+    HTTP server answering Last.fm requests from a recording.
+
+    Requests are matched to recorded responses by path and query, without
+    the API key, like ReplayTransport does. API calls that weren't recorded
+    get Last.fm's "not found" error, other paths a 404. On top of that the
+    server can be made slow, flaky and rate limited:
+
+    - every response is delayed by latency plus up to jitter seconds;
+    - a fraction error_rate of requests get a 503;
+    - every burst_every seconds, a burst_length second burst answers
+      every request with a 429 and a Retry-After header;
+    - beyond rate_limit requests in a second, requests get a 429.
+
+    Random choices come from a seeded generator, so runs are reproducible.
+    """
+
+    def __init__(self, recording=None, latency=0.0, jitter=0.0, error_rate=0.0,
+                 burst_every=None, burst_length=0.0, rate_limit=None, seed=0,
+                 host="127.0.0.1", port=0):
+        """
+        Initialize the server; start it with start.
+
+        Args:
+            recording (Recording or str, optional): The responses to serve,
+                                                    or their fixture file.
+            latency (float, optional): Seconds every response is delayed.
+            jitter (float, optional): Most extra seconds of random delay.
+            error_rate (float, optional): Fraction of requests given a 503.
+            burst_every (float, optional): Seconds between 429 bursts.
+            burst_length (float, optional): Seconds each burst lasts.
+            rate_limit (int, optional): Requests allowed per second.
+            seed (int, optional): Seed of the random generator.
+            host (str, optional): The address to listen on.
+            port (int, optional): The port, 0 for any free one.
+        """
+        if isinstance(recording, str):
+            recording = Recording.load(recording)
+        self.recording = recording or Recording()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.rate_limit = rate_limit
+        self.requests = 0
+        self.replayed = 0
+        self.missing = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self._random = random.Random(seed)
+        self._served = {}
+        self._recent = []
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._serving = False
+        self._httpd = _HTTPServer((host, port), _StandInHandler)
+        self._httpd.standin = self
+
+    @property
+    def url(self):
+        """The server's root URL."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_root(self):
+        """The URL to use as the client's API root."""
+        return f"{self.url}/2.0/"
+
+    def serve_forever(self):
+        """Serve requests until stop is called."""
+        self._started = time.monotonic()
+        self._serving = True
+        self._httpd.serve_forever()
+
+    def start(self):
+        """
+        Serve requests in a background thread.
+
+        Returns:
+            StandInServer: The server.
+        """
+        self._started = time.monotonic()
+        self._serving = True
+        threading.Thread(target=self._httpd.serve_forever,
+                         name="standin-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        if self._serving:
+            self._httpd.shutdown()
+            self._serving = False
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _burst_remaining(self, now):
+        """Seconds left of the 429 burst under way, or 0."""
+        if not self.burst_every or not self.burst_length:
+            return 0.0
+        phase = (now - self._started) % self.burst_every
+        if phase < self.burst_every - self.burst_length:
+            return 0.0
+        return self.burst_every - phase
+
+    def _over_rate_limit(self, now):
+        if self.rate_limit is None:
+            return False
+        self._recent = [t for t in self._recent if now - t < 1.0]
+        if len(self._recent) >= self.rate_limit:
+            return True
+        self._recent.append(now)
+        return False
+
+    def respond(self, path):
+        """
+        Choose the response to a request.
+
+        Args:
+            path (str): The request path and query.
+
+        Returns:
+            tuple: (status, headers, body bytes).
+        """
+        now = time.monotonic()
+        key = request_key(path)
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            burst = self._burst_remaining(now)
+            failed = self._random.random() < self.error_rate
+            if burst:
+                self.rate_limited += 1
+                response = 429, {"Retry-After": str(math.ceil(burst))}, b""
+            elif self._over_rate_limit(now):
+                self.rate_limited += 1
+                response = 429, {"Retry-After": "1"}, b""
+            elif failed:
+                self.errors += 1
+                response = 503, {}, b""
+            else:
+                index = self._served.get(key, 0)
+                self._served[key] = index + 1
+                response = self.recording.get(key, index)
+                if response is None:
+                    self.missing += 1
+                    query = dict(parse_qsl(urlsplit(path).query))
+                    if "method" in query:
+                        response = 200, {"Content-Type": "application/json"}, NOT_FOUND
+                    else:
+                        response = 404, {}, b""
+                else:
+                    self.replayed += 1
+        time.sleep(delay)
+        return response
+
+    def get_stats(self):
+        """
+        Get the server counters.
+
+        Returns:
+            dict: Requests received, answered from the recording, not
+            recorded, failed with a 503 and rate limited with a 429.
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "replayed": self.replayed,
+                "missing": self.missing,
+                "errors": self.errors,
+                "rate_limited": self.rate_limited,
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("fixtures", help="fixture file recorded with record:<path>")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--burst-every", type=float)
+    parser.add_argument("--burst-length", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = StandInServer(
+        args.fixtures, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, burst_every=args.burst_every,
+        burst_length=args.burst_length, rate_limit=args.rate_limit,
+        seed=args.seed, port=args.port,
+    )
+    print(f"Serving {len(server.recording)} responses at {server.api_root}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import os
 import sys
+from collections import OrderedDict
+
 import pytest
 
 # Make sure project root dir is in PYTHONPATH
@@ -14,3 +16,25 @@ def db_cursor():
     conn, cursor = initialize_db(":memory:")
     yield cursor
     conn.close()
+
+
+@pytest.fixture(autouse=True)
+def isolated_services(tmp_path, monkeypatch):
+    """
+    Give each test a fresh Last.fm client, rate limiter, response cache and
+    settings file
+    """
+    import services.lastfm_api as lastfm_api
+    import services.settings as settings
+
+    monkeypatch.setattr(settings, "_settings",
+                        settings.Settings(str(tmp_path / "settings.env")))
+    monkeypatch.setattr(lastfm_api, "_client", None)
+    monkeypatch.setattr(lastfm_api, "_client_config", None)
+    monkeypatch.setattr(lastfm_api, "_image_client", None)
+    monkeypatch.setattr(lastfm_api, "_rate_limiter", None)
+    monkeypatch.setattr(lastfm_api, "_circuit_breaker", None)
+    monkeypatch.setattr(lastfm_api, "_track_infos", OrderedDict())
+    monkeypatch.setattr(lastfm_api, "_album_infos", OrderedDict())
+    monkeypatch.setattr(lastfm_api, "get_response_cache_path",
+                        lambda: str(tmp_path / "lastfm_cache.db"))
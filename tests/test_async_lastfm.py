@@ -0,0 +1,371 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import requests
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.async_lastfm import AsyncLastFmClient  # noqa: E402
+from services.async_bridge import AsyncBridge  # noqa: E402
+from services.lastfm_api import parse_album_info  # noqa: E402
+from services.rate_limiter import RateLimiter, SUCCESS  # noqa: E402
+from services.response_cache import ResponseCache  # noqa: E402
+
+
+def track_response(artist, track):
+    return {"track": {
+        "name": track,
+        "artist": {"name": artist},
+        "album": {"title": "Album", "image": [{"#text": "small.jpg"},
+                                              {"#text": "large.jpg"}]},
+        "duration": "200000",
+        "toptags": {"tag": [{"name": "rock"}]},
+    }}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.peak_in_flight = max(server.peak_in_flight, server.in_flight)
+            status = server.statuses.pop(0) if server.statuses else 200
+        time.sleep(server.latency)
+        with server.lock:
+            server.in_flight -= 1
+
+        parts = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        if parts.path.endswith(".jpg"):
+            body, content_type = b"\xff\xd8image", "image/jpeg"
+        elif query.get("method") == "album.getInfo":
+            body = json.dumps({"album": {
+                "name": query["album"], "artist": query["artist"],
+                "tracks": {"track": [{"name": "Lithium", "duration": 257}]},
+            }}).encode()
+            content_type = "application/json"
+        elif query.get("track") == "Missing":
+            body = json.dumps({"error": 6, "message": "Track not found"}).encode()
+            content_type = "application/json"
+        else:
+            body = json.dumps(track_response(query["artist"], query["track"])).encode()
+            content_type = "application/json"
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if server.chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for start in range(0, len(body), 16):
+                chunk = body[start:start + 16]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Cancelled requests close their connection before the reply
+        pass
+
+
+@pytest.fixture
+def server():
+    """Serve track.getInfo responses and images on a local port"""
+    server = StandInServer(("127.0.0.1", 0), StandInHandler)
+    server.lock = threading.Lock()
+    server.requests = server.in_flight = server.peak_in_flight = 0
+    server.statuses = []
+    server.latency = 0.0
+    server.chunked = False
+    server.root = f"http://127.0.0.1:{server.server_address[1]}/2.0/"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def run(client, coroutine):
+    """Run a coroutine, then close the client on the same event loop"""
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await client.close()
+    return asyncio.run(main())
+
+
+def test_get_track_info(server):
+    """
+    Test a lookup over asyncio streams, and that the connection is reused.
+    """
+    client = AsyncLastFmClient("key", api_root=server.root)
+
+    async def lookups():
+        first = await client.get_track_info("AC/DC", "Back in Black & Blue")
+        second = await client.get_track_info("Nirvana", "Lithium")
+        return first, second, sum(len(idle) for idle in client._idle.values())
+
+    first, second, idle = run(client, lookups())
+    assert first["track"]["artist"]["name"] == "AC/DC"
+    assert first["track"]["name"] == "Back in Black & Blue"
+    assert first["album_art_url"] == "large.jpg"
+    assert second["track"]["name"] == "Lithium"
+    assert idle == 1
+
+
+def test_chunked_responses_and_images(server):
+    """
+    Test that chunked bodies are decoded and images download as bytes.
+    """
+    server.chunked = True
+    client = AsyncLastFmClient("key", api_root=server.root)
+
+    async def fetch():
+        track_info = await client.get_track_info("Nirvana", "Lithium")
+        image = await client.fetch_image(server.root + "art.jpg")
+        return track_info, image
+
+    track_info, image = run(client, fetch())
+    assert track_info["track"]["duration"] == "200000"
+    assert image == b"\xff\xd8image"
+
+
+def test_get_tracks_bounds_concurrency(server):
+    """
+    Test that many lookups run concurrently, no more than max_concurrency
+    at a time, with results in order.
+    """
+    server.latency = 0.05
+    client = AsyncLastFmClient("key", api_root=server.root, max_concurrency=5)
+    lookups = [("Artist", f"Track {i}") for i in range(20)] + [("Artist", "Missing")]
+    tracks = run(client, client.get_tracks(lookups))
+
+    assert [track.name for track in tracks[:20]] == [f"Track {i}" for i in range(20)]
+    assert tracks[20] is None
+    assert server.peak_in_flight == 5
+    assert client.peak_in_flight == 5
+
+
+def test_retries_and_rate_limiter(server):
+    """
+    Test that 429s and server errors are retried through the rate limiter.
+    """
+    server.statuses = [429, 503]
+    limiter = RateLimiter()
+    client = AsyncLastFmClient("key", api_root=server.root, backoff=0.01,
+                               rate_limiter=limiter)
+    track_info = run(client, client.get_track_info("Nirvana", "Lithium"))
+    assert track_info["track"]["name"] == "Lithium"
+    assert client.retries == 2
+    assert limiter.get_stats()["overloaded"] == 2
+
+    server.statuses = [404]
+    client = AsyncLastFmClient("key", api_root=server.root)
+    with pytest.raises(requests.exceptions.HTTPError):
+        run(client, client.get_track_info("Nirvana", "Lithium"))
+
+
+def test_deadline_and_cancellation(server):
+    """
+    Test that a lookup past its deadline is abandoned, and that a cancelled
+    lookup doesn't leave its connection in the pool.
+    """
+    server.latency = 0.5
+    client = AsyncLastFmClient("key", api_root=server.root)
+    with pytest.raises(asyncio.TimeoutError):
+        run(client, client.get_track_info("Nirvana", "Lithium", deadline=0.05))
+
+    async def cancel():
+        task = asyncio.create_task(client.get_track_info("Nirvana", "Lithium"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return sum(len(idle) for idle in client._idle.values())
+
+    client = AsyncLastFmClient("key", api_root=server.root)
+    assert run(client, cancel()) == 0
+
+
+def test_cancelled_while_waiting_for_rate_limiter(server):
+    """
+    Test that a call cancelled while it waits for the rate limiter takes
+    nothing from it, and waits without holding a thread.
+    """
+    limiter = RateLimiter(rate=5, burst=1)
+    assert limiter.acquire()
+    limiter.release(SUCCESS)
+    client = AsyncLastFmClient("key", api_root=server.root, rate_limiter=limiter)
+    threads = threading.active_count()
+    with pytest.raises(asyncio.TimeoutError):
+        run(client, client.call("track.getInfo", deadline=0.01,
+                                artist="Nirvana", track="Lithium"))
+    assert threading.active_count() == threads
+    time.sleep(0.3)
+    stats = limiter.get_stats()
+    assert (stats["requests"], stats["errors"], stats["in_flight"]) == (1, 0, 0)
+    # The token the cancelled call didn't take is still there
+    assert stats["tokens"] >= 1
+    assert server.requests == 0
+
+
+def test_connection_errors_are_retried():
+    """
+    Test that a refused connection is retried and then raised.
+    """
+    client = AsyncLastFmClient("key", api_root="http://127.0.0.1:9/2.0/",
+                               max_retries=1, backoff=0.01)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        run(client, client.get_track_info("Nirvana", "Lithium"))
+    assert client.retries == 1
+
+
+def test_uses_response_cache(server):
+    """
+    Test that cached lookups don't reach the network.
+    """
+    client = AsyncLastFmClient("key", api_root=server.root,
+                               cache=ResponseCache(":memory:"))
+
+    async def lookups():
+        await client.get_track_info("Nirvana", "Lithium")
+        return await client.get_track_info("nirvana", "LITHIUM")
+
+    assert run(client, lookups())["track"]["name"] == "Lithium"
+    assert server.requests == 1
+
+
+def test_get_album_info(server):
+    """
+    Test that album lookups are cached like track lookups.
+    """
+    client = AsyncLastFmClient("key", api_root=server.root,
+                               cache=ResponseCache(":memory:"))
+
+    async def lookups():
+        await client.get_album_info("Nirvana", "Nevermind")
+        return await client.get_album_info("nirvana", "NEVERMIND")
+
+    album_info = parse_album_info(run(client, lookups()))
+    assert album_info.track_info("lithium").duration_ms == 257000
+    assert server.requests == 1
+
+
+async def failing():
+    raise ValueError("boom")
+
+
+def test_bridge_delivers_results_on_qt_thread(qtbot, server):
+    """
+    Test that the bridge runs coroutines off the Qt thread and calls back
+    on it, and that cancelled coroutines don't call back.
+    """
+    bridge = AsyncBridge()
+    client = AsyncLastFmClient("key", api_root=server.root)
+    results, errors, threads = [], [], []
+
+    def on_result(tracks):
+        threads.append(threading.current_thread())
+        results.extend(tracks)
+
+    bridge.submit(client.get_tracks([("Nirvana", "Lithium")]), on_result)
+    bridge.submit(failing(), error_callback=errors.append)
+    qtbot.waitUntil(lambda: bool(results and errors), timeout=5000)
+    assert results[0].name == "Lithium"
+    assert isinstance(errors[0], ValueError)
+    assert threads == [threading.main_thread()]
+
+    called = []
+    future = bridge.submit(asyncio.sleep(10), called.append)
+    future.cancel()
+    qtbot.wait(50)
+    assert called == []
+
+    bridge.submit(client.close()).result(5)
+    bridge.close()
+    assert not bridge.loop.is_running()
+
+
+def test_create_async_client_shares_limiter_and_cache(monkeypatch):
+    """
+    Test that the async client uses the configured key and the shared
+    rate limiter and response cache.
+    """
+    from services import lastfm_api
+    from services.async_lastfm import create_async_client
+    from services.settings import get_settings
+
+    monkeypatch.delenv("API_KEY", raising=False)
+    monkeypatch.delenv("API_SECRET", raising=False)
+    assert create_async_client() is None
+    get_settings().save({"API_KEY": "key", "API_SECRET": "secret"})
+    client = create_async_client(max_concurrency=8)
+    assert client.api_key == "key"
+    assert client.max_concurrency == 8
+    assert client.cache is lastfm_api.get_client().cache
+    assert client.rate_limiter is lastfm_api.get_rate_limiter()
+
+
+def test_concurrent_identical_lookups_share_one_request(server):
+    """
+    Test that identical lookups in flight at once share one request, and
+    that cancelling one waiter leaves the shared request to the others.
+    """
+    server.latency = 0.1
+    client = AsyncLastFmClient("key", api_root=server.root)
+
+    async def lookups():
+        tasks = [asyncio.create_task(client.get_track_info("Nirvana", "Lithium"))
+                 for _ in range(5)]
+        tasks += [asyncio.create_task(client.fetch_image(server.root + "art.jpg"))
+                  for _ in range(3)]
+        await asyncio.sleep(0.02)
+        tasks[0].cancel()
+        return await asyncio.gather(*tasks[1:])
+
+    results = run(client, lookups())
+    assert all(result["track"]["name"] == "Lithium" for result in results[:4])
+    assert results[4:] == [b"\xff\xd8image"] * 3
+    assert server.requests == 2
+    assert client.single_flight.get_stats() == {"calls": 2, "saved": 6,
+                                                "in_flight": 0}
+
+
+def test_single_flight_call_cancelled_with_last_waiter(server):
+    """
+    Test that a shared request is cancelled once nobody waits for it.
+    """
+    server.latency = 0.5
+    client = AsyncLastFmClient("key", api_root=server.root)
+
+    async def lookups():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.gather(
+                client.get_track_info("Nirvana", "Lithium", deadline=0.05),
+                client.get_track_info("Nirvana", "Lithium", deadline=0.1),
+            )
+        await asyncio.sleep(0.1)
+        return client.single_flight.get_stats()
+
+    assert run(client, lookups()) == {"calls": 1, "saved": 1, "in_flight": 0}
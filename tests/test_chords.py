@@ -0,0 +1,91 @@
+import os
+import sys
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.chords import (  # noqa: E402 - Import not at top of file
+    CHORD,
+    PROGRESSION,
+    MAJOR,
+    MINOR,
+    DIMINISHED,
+    Key,
+    analyze_notes,
+    chord_grams,
+    detect_key,
+    extract_progressions,
+    key_name,
+    parse_chord,
+    parse_progression,
+    roman_numeral,
+)
+
+
+def test_parse_chord():
+    """Test normalizing chord symbols"""
+    assert parse_chord("Am") == (9, MINOR, "Am")
+    assert parse_chord("A#m7") == (10, MINOR, "Bbm7")
+    assert parse_chord("Amin") == parse_chord("Am")
+    assert parse_chord("CM7").symbol == "Cmaj7"
+    assert parse_chord("Bø") == (11, DIMINISHED, "Bm7b5")
+    assert parse_chord("D/F#") == (2, MAJOR, "D/F#")
+    assert parse_chord("Bm7").triad == "Bm"
+    assert parse_chord("Hm") is None
+    assert parse_chord("Be") is None
+
+
+def test_extract_progressions_skips_prose():
+    """Test that only lines made of chords are read"""
+    notes = (
+        "Capo 2, the bridge has a tricky Bm\n"
+        "Verse: Am F C G\n"
+        "Chorus - C | G | Am | F (x2)\n"
+        "Outro: E\n"
+        "Play A and E loud"
+    )
+    lines = extract_progressions(notes)
+    assert [[chord.symbol for chord in line] for line in lines] == [
+        ["Am", "F", "C", "G"], ["C", "G", "Am", "F"], ["E"]
+    ]
+    assert extract_progressions(None) == []
+
+
+def test_detect_key_and_numerals():
+    """Test naming chords relative to the detected key"""
+    g_major = [parse_chord(c) for c in ["G", "D", "Em", "C"]]
+    assert detect_key(g_major) == Key(7, MAJOR)
+    a_minor = [parse_chord(c) for c in ["Am", "F", "C", "G"]]
+    assert key_name(detect_key(a_minor)) == "A minor"
+    assert detect_key([]) is None
+
+    c_major = Key(0, MAJOR)
+    assert roman_numeral(parse_chord("Am7"), c_major) == "vi"
+    assert roman_numeral(parse_chord("Bdim"), c_major) == "vii°"
+    assert roman_numeral(parse_chord("Bb"), c_major) == "bVII"
+    assert roman_numeral(parse_chord("G"), Key(9, MINOR)) == "VII"
+
+
+def test_parse_progression():
+    """Test reading Roman numeral progressions"""
+    assert parse_progression("I–V–vi–IV") == ("I", "V", "vi", "IV")
+    assert parse_progression("ii V I") == ("ii", "V", "I")
+    assert parse_progression("i, bVII, bVI") == ("i", "bVII", "bVI")
+    assert parse_progression("viio") == ("vii°",)
+    assert parse_progression("Am F") is None
+    assert parse_progression("Vi") is None
+    assert parse_progression("") is None
+
+
+def test_analyze_notes_and_grams():
+    """Test the index entries of a song"""
+    analysis = analyze_notes("Verse: C G Am Am F\nBridge: Dm7 G")
+    assert key_name(analysis.key) == "C major"
+    assert analysis.progressions == [("I", "V", "vi", "IV"), ("ii", "V")]
+    grams = chord_grams(analysis)
+    assert (CHORD, "Am") in grams
+    assert (CHORD, "Dm7") in grams and (CHORD, "Dm") in grams
+    assert (PROGRESSION, "I-V-vi-IV") in grams
+    assert (PROGRESSION, "vi-IV") in grams
+    assert (PROGRESSION, "IV-ii") not in grams  # lines aren't joined
+    assert chord_grams(analyze_notes("no chords here")) == set()
@@ -0,0 +1,71 @@
+import os
+import sys
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.circuit_breaker import (  # noqa: E402 - Import not at top of file
+    CircuitBreaker,
+    CLOSED,
+    OPEN,
+    HALF_OPEN,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_opens_after_consecutive_failures():
+    """
+    Test that only an unbroken run of failures opens the breaker, and that
+    it then refuses requests until the reset timeout.
+    """
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10.0, clock=clock)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    clock.now = 4.0
+    assert breaker.retry_in() == 6.0
+    assert breaker.get_stats() == {"state": OPEN, "failures": 3, "opened": 1,
+                                   "rejected": 1}
+
+
+def test_half_open_trial_closes_or_reopens():
+    """
+    Test that after the reset timeout one trial request is let through, and
+    its outcome decides the state.
+    """
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0, clock=clock)
+    breaker.record_failure()
+    clock.now = 10.0
+    assert breaker.state == HALF_OPEN
+    assert breaker.retry_in() == 0.0
+    assert breaker.allow()
+    assert not breaker.allow()
+    # A trial given up before it was sent lets another one through
+    breaker.record_abandoned()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now = 20.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert all(breaker.allow() for _ in range(5))
+    assert breaker.get_stats()["opened"] == 2
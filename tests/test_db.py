@@ -13,8 +13,33 @@ from services.db import (  # noqa: E402 - Import not at top of file
     update_song_info,
     song_exists,
     get_song,
+    attach_library,
+    create_library_view,
+    get_unique_tunings,
+    is_valid_library_name,
+    get_change_counter,
+    get_review_state,
+    save_review_state,
+    get_due_songs,
+    count_due_songs,
+    get_unanalyzed_songs,
+    save_chord_analysis,
+    find_chord_gram,
+    get_song_key,
+    save_tag_weights,
+    get_tag_weights,
+    load_tag_weights,
+    merge_songs,
+    queue_enrichment,
+    get_pending_songs,
+    count_pending_songs,
+    finish_enrichment,
+    record_enrichment_attempt,
+    get_album_songs,
+    LIBRARY_VIEW,
 )
 from models.song import Song  # noqa: E402 - Import not at top of file
+from models.review import ReviewState  # noqa: E402 - Import not at top of file
 
 
 @pytest.fixture
@@ -134,3 +159,222 @@ def test_song_exists(db_cursor):
     save_song(db_cursor, song)
     assert song_exists(db_cursor, "Test Song", "Test Artist")
     assert not song_exists(db_cursor, "Bogus Song", "Bunk Artist")
+
+
+def test_library_view_tags_songs(db_cursor, test_song, tmp_path):
+    """Test that the library view unions attached libraries and tags each row"""
+    save_song(db_cursor, test_song)
+
+    student_path = str(tmp_path / "student.db")
+    conn, cursor = initialize_db(student_path, "db/schema.sql")
+    save_song(cursor, Song("Other Song", "Other Artist", tuning="Drop D",
+                           genres=["Rock"], progress="Mastered"))
+    conn.close()
+
+    attach_library(db_cursor, "student", student_path)
+    create_library_view(db_cursor, ["main", "student"])
+
+    songs = load_songs(db_cursor, LIBRARY_VIEW)
+    assert {(s.title, s.library) for s in songs} == {
+        ("test song", "main"), ("other song", "student")
+    }
+    assert get_song(db_cursor, "Other Song", "Other Artist", "student") is not None
+
+    create_library_view(db_cursor, ["student"])
+    assert [s.library for s in load_songs(db_cursor, LIBRARY_VIEW)] == ["student"]
+
+
+def test_tunings_by_canonical_name(db_cursor):
+    """Test that spellings of a tuning are listed as one"""
+    for i, tuning in enumerate(["Drop D", "drop d", "DADGBE", "weird tuning"]):
+        save_song(db_cursor, Song(f"Song {i}", "Artist", tuning=tuning))
+    create_library_view(db_cursor, ["main"])
+
+    assert get_unique_tunings(db_cursor) == ["Drop D", "Weird Tuning"]
+
+
+def test_is_valid_library_name():
+    """Test that library names must be plain, non-reserved identifiers"""
+    assert is_valid_library_name("student_1")
+    assert not is_valid_library_name("main")
+    assert not is_valid_library_name("temp")
+    assert not is_valid_library_name("1st")
+    assert not is_valid_library_name("x; DROP TABLE songs")
+
+
+def test_normalized_columns_are_stored(db_cursor):
+    """Test that match keys and display strings are computed on write"""
+    song = Song("STRAßE", "Test Artist", album="the album", genres=["Rock"])
+    save_song(db_cursor, song)
+
+    saved = get_song(db_cursor, "strasse", "TEST ARTIST")
+    assert saved is not None
+    assert saved.title_key == "strasse"
+    assert saved.display_artist == "Test Artist"
+    assert saved.display_album == "The Album"
+
+    saved.album = "another album"
+    update_song_info(db_cursor, saved)
+    assert get_song(db_cursor, "straße", "test artist").display_album == (
+        "Another Album"
+    )
+
+
+def test_normalized_columns_backfilled(tmp_path):
+    """Test that migrating an old database fills in keys for existing rows"""
+    import sqlite3
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE schema_version (id INTEGER PRIMARY KEY, version INTEGER);
+        INSERT INTO schema_version VALUES (1, 2);
+        CREATE TABLE songs (title TEXT, artist TEXT, tuning TEXT, notes TEXT,
+            album TEXT, duration TEXT, genres TEXT, progress TEXT,
+            PRIMARY KEY (title, artist));
+        INSERT INTO songs VALUES ('black dog', 'led zeppelin', NULL, NULL,
+            'iv', NULL, 'Rock', 'Learning');
+        INSERT INTO songs VALUES ('iphone blues', 'old band', NULL, NULL,
+            NULL, NULL, NULL, NULL);
+    """)
+    conn.commit()
+    conn.close()
+
+    conn, cursor = initialize_db(path)
+    song = get_song(cursor, "Black Dog", "Led Zeppelin")
+    # Songs saved after the migration are shown like the migrated ones
+    save_song(cursor, Song("iPhone Blues", "New Band"))
+    migrated = get_song(cursor, "iPhone Blues", "Old Band")
+    new = get_song(cursor, "iPhone Blues", "New Band")
+    conn.close()
+    assert song.display_title == "Black Dog"
+    assert song.album_key == "iv"
+    assert new.display_title == migrated.display_title
+
+
+def test_change_counter_tracks_writes(db_cursor, test_song):
+    """Test that every write to the songs table bumps the change counter"""
+    start = get_change_counter(db_cursor)
+    save_song(db_cursor, test_song)
+    assert get_change_counter(db_cursor) == start + 1
+
+    test_song.notes = "Changed"
+    update_song_info(db_cursor, test_song)
+    delete_song(db_cursor, test_song.title, test_song.artist)
+    assert get_change_counter(db_cursor) == start + 3
+
+
+def test_due_songs(db_cursor):
+    """Test the due queue and that deleting a song unschedules it"""
+    for i, due_at in enumerate([300, 100, 200, None]):
+        save_song(db_cursor, Song(f"Song {i}", "Artist"))
+        save_review_state(db_cursor, f"Song {i}", "Artist",
+                          ReviewState(2.5, 1, 1, 0, due_at))
+
+    assert [s.title for s in get_due_songs(db_cursor, now=250)] == [
+        "song 1", "song 2"
+    ]
+    assert [s.title for s in get_due_songs(db_cursor, now=1000, limit=1)] == [
+        "song 1"
+    ]
+    assert count_due_songs(db_cursor, now=1000) == 3
+    assert get_review_state(db_cursor, "SONG 0", "artist").due_at == 300
+
+    delete_song(db_cursor, "Song 1", "Artist")
+    assert get_review_state(db_cursor, "Song 1", "Artist") is None
+    assert count_due_songs(db_cursor, now=1000) == 2
+
+
+def test_mastered_songs_scheduled_on_migration(tmp_path):
+    """Test that upgrading schedules mastered songs over the coming weeks"""
+    path = str(tmp_path / "old.db")
+    conn, cursor = initialize_db(path)
+    save_song(cursor, Song("Old Favorite", "Artist", progress="Mastered"))
+    save_song(cursor, Song("New Song", "Artist"))
+    cursor.execute("DROP TABLE practice_schedule")
+    cursor.execute("UPDATE schema_version SET version = 4")
+    conn.commit()
+    conn.close()
+
+    conn, cursor = initialize_db(path)
+    state = get_review_state(cursor, "Old Favorite", "Artist")
+    assert state is not None and state.interval_days == 21
+    assert get_review_state(cursor, "New Song", "Artist") is None
+    conn.close()
+
+
+def test_chord_index_follows_notes(db_cursor):
+    """Test that editing or deleting a song drops its chord analysis"""
+    save_song(db_cursor, Song("Song", "Artist", notes="C G Am F"))
+    assert get_unanalyzed_songs(db_cursor) == [("song", "artist", "C G Am F")]
+
+    save_chord_analysis(db_cursor, "song", "artist", "C major",
+                        [("I", "V", "vi", "IV")], {("chord", "Am")})
+    assert get_unanalyzed_songs(db_cursor) == []
+    assert get_song_key(db_cursor, "Song", "Artist") == "C major"
+    assert find_chord_gram(db_cursor, "chord", "Am") == [("song", "artist")]
+    assert find_chord_gram(db_cursor, "chord", "Am", with_progressions=True) == [
+        ("song", "artist", "I-V-vi-IV")
+    ]
+
+    update_song_info(db_cursor, Song("Song", "Artist", notes="D A Bm G"))
+    assert find_chord_gram(db_cursor, "chord", "Am") == []
+    assert len(get_unanalyzed_songs(db_cursor)) == 1
+
+    save_chord_analysis(db_cursor, "song", "artist", None, [], {("chord", "D")})
+    delete_song(db_cursor, "Song", "Artist")
+    db_cursor.execute("SELECT COUNT(*) FROM song_chords")
+    assert db_cursor.fetchone()[0] == 0
+    assert get_song_key(db_cursor, "Song", "Artist") is None
+
+
+def test_tag_weights(db_cursor):
+    """Test storing, replacing and dropping weighted tags"""
+    save_song(db_cursor, Song("Song", "Artist"))
+    save_tag_weights(db_cursor, "Song", "Artist", {"rock": 100.0, "90s": 40.0})
+    save_tag_weights(db_cursor, "SONG", "artist", {"rock": 80.0})
+    assert get_tag_weights(db_cursor, "Song", "Artist") == {"rock": 80.0}
+    assert load_tag_weights(db_cursor) == {("song", "artist"): {"rock": 80.0}}
+
+    delete_song(db_cursor, "Song", "Artist")
+    assert load_tag_weights(db_cursor) == {}
+
+
+def test_enrichment_queue(db_cursor):
+    """Test queueing songs for their Last.fm details, oldest first"""
+    save_song(db_cursor, Song("Lithium", "Nirvana", album="Nevermind"))
+    save_song(db_cursor, Song("Breed", "Nirvana", album="nevermind"))
+    save_song(db_cursor, Song("Creep", "Radiohead", album="Pablo Honey"))
+    queue_enrichment(db_cursor, "Breed", "Nirvana", now=2.0)
+    queue_enrichment(db_cursor, "LITHIUM", "nirvana", now=1.0)
+    queue_enrichment(db_cursor, "Lithium", "Nirvana", now=3.0)
+    record_enrichment_attempt(db_cursor, "Breed", "Nirvana")
+    pending = get_pending_songs(db_cursor)
+    assert [(song.display_title, attempts) for song, attempts in pending] == [
+        ("Lithium", 0), ("Breed", 1)
+    ]
+    assert [song.display_title
+            for song, _ in get_pending_songs(db_cursor, limit=1)] == ["Lithium"]
+    album_songs = get_album_songs(db_cursor, "NIRVANA", "Nevermind")
+    assert {song.display_title for song in album_songs} == {"Lithium", "Breed"}
+
+    finish_enrichment(db_cursor, "Lithium", "Nirvana")
+    delete_song(db_cursor, "Breed", "Nirvana")
+    assert count_pending_songs(db_cursor) == 0
+
+
+def test_merge_songs(db_cursor):
+    """Test replacing duplicates with the merged song in one step"""
+    save_song(db_cursor, Song("Lithium", "Nirvana", notes="Verse"))
+    save_song(db_cursor, Song("Lithium (Live)", "Nirvana", progress="Mastered"))
+    save_review_state(db_cursor, "Lithium (Live)", "Nirvana",
+                      ReviewState(2.5, 6, 2, 100.0, 200.0))
+    save_tag_weights(db_cursor, "Lithium (Live)", "Nirvana", {"grunge": 100.0})
+
+    merged = Song("Lithium", "Nirvana", notes="Verse", progress="Mastered")
+    merge_songs(db_cursor, merged, [Song("Lithium (Live)", "Nirvana")])
+    db_cursor.connection.commit()
+
+    assert [song.title for song in load_songs(db_cursor)] == ["lithium"]
+    assert get_song(db_cursor, "Lithium", "Nirvana").progress == "Mastered"
+    assert get_review_state(db_cursor, "Lithium", "Nirvana").repetitions == 2
+    assert load_tag_weights(db_cursor) == {("lithium", "nirvana"): {"grunge": 100.0}}
@@ -0,0 +1,69 @@
+import os
+import sys
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.dedup import (  # noqa: E402 - Import not at top of file
+    find_duplicates,
+    merge_song_fields,
+    normalize_artist,
+    normalize_title,
+)
+from models.song import Song  # noqa: E402 - Import not at top of file
+
+
+def test_normalize_title():
+    """Test dropping version tags, featured artists and punctuation"""
+    assert normalize_title("Lithium (Remastered 2011)") == "lithium"
+    assert normalize_title("Lithium - Live at Reading") == "lithium"
+    assert normalize_title("Stay (feat. Someone)") == "stay"
+    assert normalize_title("Don't Stop Me Now") == "don t stop me now"
+    assert normalize_title("Live and Let Die") == "live and let die"
+    assert normalize_title("(Live)") == "live"
+
+
+def test_normalize_artist():
+    """Test dropping a leading "The", featured artists and accents"""
+    assert normalize_artist("The Beatles") == "beatles"
+    assert normalize_artist("Santana feat. Rob Thomas") == "santana"
+    assert normalize_artist("Motörhead") == "motorhead"
+    assert normalize_artist("Simon & Garfunkel") == "simon and garfunkel"
+
+
+def test_find_duplicates():
+    """Test grouping exact, tagged and misspelled copies of songs"""
+    songs = [
+        Song("lithium", "nirvana"),
+        Song("Lithium (Live)", "Nirvana", progress="Mastered"),
+        Song("Lithum", "Nirvana"),
+        Song("Lithium", "Nirvanna"),
+        Song("Let It Be", "The Beatles"),
+        Song("let it be - remastered", "beatles"),
+        Song("Let It Go", "Idina Menzel"),
+        Song("Come Together", "The Beatles"),
+    ]
+    groups = find_duplicates(songs)
+    assert [[song.title for song in group.songs] for group in groups] == [
+        ["Let It Be", "let it be - remastered"],
+        ["Lithium (Live)", "lithium", "Lithum", "Lithium"],
+    ]
+    assert groups[0].score == 1.0
+    assert 0.85 <= groups[1].score < 1.0
+    assert find_duplicates(songs, threshold=1.0)[1].songs[-1].title == "lithium"
+
+
+def test_merge_song_fields():
+    """Test keeping the best progress, all notes and missing details"""
+    keep = Song("Lithium", "Nirvana", notes="Verse: Em G", progress="Learning")
+    duplicates = [
+        Song("Lithium (Live)", "Nirvana", notes="Chorus: D C", album="Nevermind",
+             progress="Mastered", genres=["Grunge"]),
+        Song("Lithum", "Nirvana", notes="Verse: Em G"),
+    ]
+    merged = merge_song_fields(keep, duplicates)
+    assert (merged.title, merged.artist) == ("Lithium", "Nirvana")
+    assert merged.notes == "Verse: Em G\n\nChorus: D C"
+    assert merged.progress == "Mastered"
+    assert merged.album == "Nevermind"
+    assert merged.genres == ["Grunge"]
@@ -0,0 +1,72 @@
+import os
+import sys
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.song import Song  # noqa: E402 - Import not at top of file
+from models.fuzzy_index import (  # noqa: E402 - Import not at top of file
+    DeletionIndex,
+    FuzzySongIndex,
+    edit_distance,
+)
+
+
+def make_index():
+    return FuzzySongIndex([
+        Song("Black Dog", "Led Zeppelin", library="main"),
+        Song("Stairway to Heaven", "Led Zeppelin", library="main"),
+        Song("Paranoid", "Black Sabbath", library="main"),
+    ])
+
+
+def test_edit_distance():
+    """Test the Levenshtein distance"""
+    assert edit_distance("zepelin", "zeppelin") == 1
+    assert edit_distance("kitten", "sitting") == 3
+    assert edit_distance("", "abc") == 3
+
+
+def test_deletion_index_search():
+    """Test that the index finds every word within the budget"""
+    index = DeletionIndex()
+    for word in ["book", "books", "cake", "boo", "cape", "cart"]:
+        index.add(word)
+    matches, complete = index.search("bork", 1)
+    assert complete
+    assert matches == {"book": 1}
+    matches, _ = index.search("cake", 1)
+    assert matches == {"cake": 0, "cape": 1}
+
+
+def test_deletion_index_long_words():
+    """Test typos past the indexed prefix of a word"""
+    index = DeletionIndex()
+    index.add("stairwayss")
+    assert index.search("stairwaysx", 1)[0] == {"stairwayss": 1}
+    assert index.search("stairway", 2)[0] == {"stairwayss": 2}
+
+
+def test_deletion_index_time_limit():
+    """Test that an expired deadline stops the search"""
+    index = DeletionIndex()
+    index.add("book")
+    assert index.search("book", 1, deadline=0) == ({}, False)
+
+
+def test_fuzzy_search_any_matches_words():
+    """Test that a misspelled word finds the songs containing it"""
+    index = make_index()
+    titles = [song.title for _, song in index.search_any("zepelin")]
+    assert sorted(titles) == ["Black Dog", "Stairway to Heaven"]
+    assert index.search_any("zzzzzz") == []
+
+
+def test_fuzzy_search_ranks_by_distance():
+    """Test did-you-mean lookups over artist and title"""
+    index = make_index()
+    matches = index.search(artist="Led Zepelin", title="Stairway to Heavn")
+    assert [(d, s.title) for d, s in matches] == [(2, "Stairway to Heaven")]
+
+    index.remove("main", "stairway to heaven", "led zeppelin")
+    assert index.search(artist="Led Zepelin", title="Stairway to Heavn") == []
@@ -1,8 +1,14 @@
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch, Mock, mock_open
 from datetime import timedelta
 
+import pytest
+import requests
+
 # Make sure project root dir is in PYTHONPATH
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
@@ -11,8 +17,25 @@ from services.lastfm_api import (  # noqa: E402 - Import not at top of file
     get_album_name,
     get_track_duration,
     get_genre,
+    extract_tag_weights,
     fetch_and_cache_album_art,
+    get_cache_stats,
+    get_rate_limiter_stats,
+    get_track,
+    get_album,
+    parse_album_info,
+    parse_track_info,
+    lookup_track,
+    LastFmClient,
+    SingleFlight,
+    CircuitOpenError,
+    NOT_FOUND_TTL,
+    get_client,
 )
+from services import lastfm_api  # noqa: E402
+from services.circuit_breaker import CircuitBreaker, OPEN  # noqa: E402
+from services.rate_limiter import RateLimiter  # noqa: E402
+from services.response_cache import ResponseCache  # noqa: E402
 
 # Sample mock data for API responses
 mock_track_info = {
@@ -38,7 +61,7 @@ mock_track_info = {
 }
 
 
-@patch("services.lastfm_api.requests.get")
+@patch("services.lastfm_api.requests.Session.get")
 def test_get_track_info(mock_get):
     """
     Test fetching track info from Last.fm API.
@@ -52,9 +75,12 @@ def test_get_track_info(mock_get):
     assert track_info["track"]["name"] == "Test Track"
     assert track_info["track"]["album"]["title"] == "Test Album"
     assert track_info["album_art_url"] == "large.jpg"
+    params = mock_get.call_args.kwargs["params"]
+    assert params["method"] == "track.getInfo"
+    assert (params["artist"], params["track"]) == ("Test Artist", "Test Track")
 
 
-@patch("services.lastfm_api.requests.get")
+@patch("services.lastfm_api.requests.Session.get")
 def test_get_album_name(mock_get):
     """
     Test fetching album name from Last.fm API.
@@ -68,7 +94,7 @@ def test_get_album_name(mock_get):
     assert album_name == "Test Album"
 
 
-@patch("services.lastfm_api.requests.get")
+@patch("services.lastfm_api.requests.Session.get")
 def test_get_track_duration(mock_get):
     """
     Test fetching track duration from Last.fm API.
@@ -82,7 +108,7 @@ def test_get_track_duration(mock_get):
     assert duration == timedelta(milliseconds=300000)
 
 
-@patch("services.lastfm_api.requests.get")
+@patch("services.lastfm_api.requests.Session.get")
 def test_get_genre(mock_get):
     """
     Test fetching genre(s) from Last.fm API.
@@ -96,7 +122,7 @@ def test_get_genre(mock_get):
     assert genres == ["Rock", "Alternative"]
 
 
-@patch("services.lastfm_api.requests.get")
+@patch("services.lastfm_api.requests.Session.get")
 def test_fetch_and_cache_album_art(mock_get):
     """
     Test fetching a track's album art from Last.fm API.
@@ -117,3 +143,432 @@ def test_fetch_and_cache_album_art(mock_get):
         )
         mock_file().write.assert_called_once_with(b"fake_image_data")
         assert album_art_path == os.path.join(cache_dir, f"{album_name}.jpg")
+
+
+@patch("services.lastfm_api.requests.Session.get")
+def test_album_art_without_api_reuses_one_client(mock_get, monkeypatch):
+    """
+    Test that album art downloads without API credentials share one
+    client, and leave the API client alone.
+    """
+    monkeypatch.delenv("API_KEY", raising=False)
+    monkeypatch.delenv("API_SECRET", raising=False)
+    mock_get.return_value = Mock(status_code=200, headers={}, content=b"image")
+    with patch("builtins.open", mock_open()):
+        fetch_and_cache_album_art("https://example.com/a.jpg", "A", "/tmp")
+        client = lastfm_api._image_client
+        fetch_and_cache_album_art("https://example.com/b.jpg", "B", "/tmp")
+    assert client is not None and lastfm_api._image_client is client
+    assert lastfm_api._client is None
+
+
+def test_extract_tag_weights():
+    """
+    Test weighting tags by count, or by rank when there are no counts.
+    """
+    assert extract_tag_weights(mock_track_info) == {"rock": 100.0, "alternative": 50.0}
+    counted = {"track": {"toptags": {"tag": [
+        {"name": "Grunge", "count": 100},
+        {"name": "90s", "count": "35"},
+        {"name": "seen live", "count": 0},
+    ]}}}
+    assert extract_tag_weights(counted) == {"grunge": 100.0, "90s": 35.0}
+    assert extract_tag_weights({"track": {"toptags": {"tag": {"name": "Solo"}}}}) == {
+        "solo": 100.0
+    }
+    assert extract_tag_weights({}) == {}
+
+
+def make_response(status_code=200, json_data=None, headers=None):
+    response = Mock(status_code=status_code, headers=headers or {})
+    response.json.return_value = json_data or {}
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(
+            response=response
+        )
+    return response
+
+
+@patch("services.lastfm_api.time.sleep")
+def test_client_retries_rate_limits_and_server_errors(mock_sleep):
+    """
+    Test that 429s, 5xx responses and Last.fm rate limit errors are retried.
+    """
+    session = Mock()
+    session.get.side_effect = [
+        make_response(429, headers={"Retry-After": "2"}),
+        make_response(503),
+        make_response(200, {"error": 29, "message": "Rate limit exceeded"}),
+        make_response(200, mock_track_info),
+    ]
+    client = LastFmClient("key", session=session, max_retries=3)
+    track_info = client.get_track_info("AC/DC", "Back in Black & Blue")
+
+    assert track_info["album_art_url"] == "large.jpg"
+    assert client.retries == 3
+    assert mock_sleep.call_args_list[0].args == (2.0,)
+    assert all(0 <= call.args[0] <= 8.0 for call in mock_sleep.call_args_list)
+    params = session.get.call_args.kwargs["params"]
+    assert params["artist"] == "AC/DC"
+    assert params["track"] == "Back in Black & Blue"
+    assert session.get.call_args.kwargs["timeout"] == client.timeout
+
+
+@patch("services.lastfm_api.time.sleep")
+def test_client_gives_up_after_max_retries(mock_sleep):
+    """
+    Test that the last error is raised once the retries are used up, and
+    that client errors aren't retried.
+    """
+    session = Mock()
+    session.get.return_value = make_response(502)
+    client = LastFmClient("key", session=session, max_retries=2)
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.call("track.getInfo", artist="a", track="b")
+    assert session.get.call_count == 3
+
+    session.get.reset_mock()
+    session.get.return_value = make_response(403)
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.call("track.getInfo", artist="a", track="b")
+    assert session.get.call_count == 1
+
+    session.get.return_value = make_response(200, {"error": 6, "message": "No"})
+    assert client.call("track.getInfo", artist="a", track="b")["error"] == 6
+
+
+@patch("services.lastfm_api.time.sleep")
+@patch("services.lastfm_api.requests.Session.get")
+def test_get_track_info_returns_none_on_failure(mock_get, mock_sleep):
+    """
+    Test that the module function reports failures as None.
+    """
+    mock_get.side_effect = requests.exceptions.ConnectionError("refused")
+    assert get_track_info("Test Artist", "Test Track") is None
+
+
+@patch("services.lastfm_api.time.sleep")
+def test_circuit_breaker_fails_fast(mock_sleep):
+    """
+    Test that repeated connection failures open the circuit, so requests
+    fail without being sent, and that rate limiting doesn't count.
+    """
+    session = Mock()
+    session.get.side_effect = requests.exceptions.ConnectionError("unreachable")
+    breaker = CircuitBreaker(failure_threshold=3)
+    client = LastFmClient("key", session=session, max_retries=1,
+                          circuit_breaker=breaker)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.call("track.getInfo", artist="a", track="b")
+    with pytest.raises(CircuitOpenError):
+        client.call("track.getInfo", artist="a", track="b")
+    assert session.get.call_count == 3
+    with pytest.raises(CircuitOpenError):
+        client.get_track_info("a", "c")
+    assert session.get.call_count == 3
+    assert breaker.state == OPEN
+
+    session = Mock()
+    session.get.side_effect = [make_response(429), make_response(503),
+                               make_response(200, {"error": 29}),
+                               make_response(200, mock_track_info)]
+    breaker = CircuitBreaker(failure_threshold=2)
+    client = LastFmClient("key", session=session, circuit_breaker=breaker)
+    assert client.call("track.getInfo", artist="a", track="b") == mock_track_info
+    assert breaker.get_stats()["opened"] == 0
+
+
+@patch("services.lastfm_api.time.sleep")
+@patch("services.lastfm_api.requests.Session.get")
+def test_lookup_track_tells_not_found_from_failure(mock_get, mock_sleep):
+    """
+    Test that lookup_track raises when Last.fm can't be reached and
+    returns None only for tracks it doesn't know.
+    """
+    mock_get.return_value = make_response(200, {"error": 6, "message": "No"})
+    assert lookup_track("Test Artist", "Tset Track") is None
+    mock_get.side_effect = requests.exceptions.ConnectionError("unreachable")
+    with pytest.raises(requests.exceptions.ConnectionError):
+        lookup_track("Test Artist", "Test Track")
+    assert get_track("Test Artist", "Test Track") is None
+    # The "not found" answer is cached, so it doesn't need Last.fm
+    assert lookup_track("Test Artist", "Tset Track") is None
+
+
+def test_client_caches_track_lookups():
+    """
+    Test that repeated lookups are served from the cache, "not found"
+    answers for a short while, and other errors not at all.
+    """
+    session = Mock()
+    session.get.side_effect = [
+        make_response(200, {"error": 10, "message": "Invalid API key"}),
+        make_response(200, mock_track_info),
+        make_response(200, {"error": 6, "message": "Track not found"}),
+    ]
+    client = LastFmClient("key", session=session, cache=ResponseCache(":memory:"))
+    assert "error" in client.get_track_info("Test Artist", "Test Track")
+    assert client.get_track_info("Test Artist", "Test Track")["album_art_url"] == (
+        "large.jpg"
+    )
+    cached = client.get_track_info("test artist", "TEST TRACK")
+    assert cached["track"]["name"] == "Test Track"
+    assert session.get.call_count == 2
+
+    for _ in range(2):
+        assert client.get_track_info("Test Artist", "Tset Track")["error"] == 6
+    assert session.get.call_count == 3
+    assert client.cache.get_stats()["hits"] == 2
+    assert client.cache.get("track.getInfo", "Test Artist", "Tset Track",
+                            now=time.time() + NOT_FOUND_TTL + 1) is None
+
+
+@patch("services.lastfm_api.requests.Session.get")
+def test_get_track_info_uses_response_cache(mock_get):
+    """
+    Test that the module functions share one cached client.
+    """
+    mock_get.return_value = make_response(200, mock_track_info)
+    get_track_info("Test Artist", "Test Track")
+    assert get_album_name("Test Artist", "Test Track") == "Test Album"
+    assert mock_get.call_count == 1
+    assert get_cache_stats()["hits"] == 1
+
+
+def test_parse_track_info():
+    """
+    Test parsing the fields the app uses out of a track.getInfo response.
+    """
+    track_info = parse_track_info(mock_track_info)
+    assert track_info.name == "Test Track"
+    assert track_info.artist == "Test Artist"
+    assert track_info.album == "Test Album"
+    assert track_info.duration_ms == 300000
+    assert track_info.tags == (("Rock", None), ("Alternative", None))
+    assert track_info.genres == ["Rock", "Alternative"]
+    assert track_info.images == ("small.jpg", "medium.jpg", "large.jpg")
+    assert track_info.album_art_url == "large.jpg"
+
+    sparse = parse_track_info({"track": {
+        "name": "Solo", "artist": "Someone", "duration": "",
+        "album": {"image": {"#text": ""}},
+        "toptags": {"tag": {"name": "Jazz", "count": "40"}},
+    }})
+    assert (sparse.album, sparse.duration_ms, sparse.images) == (None, 0, ())
+    assert sparse.tags == (("Jazz", 40.0),)
+    assert sparse.album_art_url is None
+    assert parse_track_info({"error": 6, "message": "Track not found"}) is None
+    assert parse_track_info(None) is None
+
+
+mock_album_info = {
+    "album": {
+        "name": "Nevermind",
+        "artist": "Nirvana",
+        "image": [{"#text": "small.jpg"}, {"#text": "large.jpg"}],
+        "tags": {"tag": [{"name": "grunge"}, {"name": "90s"}]},
+        "tracks": {"track": [
+            {"name": "Smells Like Teen Spirit", "duration": 301},
+            {"name": "Lithium", "duration": "257"},
+            {"name": "Endless, Nameless", "duration": None},
+        ]},
+    }
+}
+
+
+def test_parse_album_info():
+    """
+    Test parsing an album.getInfo response and matching its tracks.
+    """
+    album_info = parse_album_info(mock_album_info)
+    assert (album_info.name, album_info.artist) == ("Nevermind", "Nirvana")
+    assert album_info.tracks[1] == ("Lithium", 257000)
+    assert album_info.tracks[2] == ("Endless, Nameless", 0)
+    assert album_info.genres == ["grunge", "90s"]
+    assert album_info.album_art_url == "large.jpg"
+
+    track_info = album_info.track_info("  lithium ")
+    assert (track_info.name, track_info.album, track_info.duration_ms) == (
+        "Lithium", "Nevermind", 257000
+    )
+    assert track_info.tag_weights == {"grunge": 100.0, "90s": 50.0}
+    assert album_info.track_info("Lounge Act") is None
+
+    single = parse_album_info({"album": {
+        "name": "Single", "artist": "Someone",
+        "tracks": {"track": {"name": "Only", "duration": "60"}},
+    }})
+    assert single.tracks == (("Only", 60000),)
+    assert parse_album_info({"error": 6, "message": "Album not found"}) is None
+
+
+@patch("services.lastfm_api.get_album_info")
+def test_get_album_fetches_once(mock_get_album_info):
+    """
+    Test that an album is looked up once however it's spelled.
+    """
+    mock_get_album_info.return_value = mock_album_info
+    assert get_album("Nirvana", "Nevermind").name == "Nevermind"
+    assert get_album("nirvana", "NEVERMIND").tracks[0][1] == 301000
+    assert mock_get_album_info.call_count == 1
+
+    mock_get_album_info.return_value = None
+    assert get_album("Nirvana", "Bleach") is None
+    assert get_album("Nirvana", "Bleach") is None
+    assert mock_get_album_info.call_count == 3
+
+
+@patch("services.lastfm_api.get_track_info")
+def test_get_track_fetches_once(mock_get_track_info):
+    """
+    Test that album, duration and genres of a track cost one lookup.
+    """
+    mock_get_track_info.return_value = mock_track_info
+    assert get_album_name("Test Artist", "Test Track") == "Test Album"
+    assert get_track_duration("test artist", "TEST TRACK") == timedelta(minutes=5)
+    assert get_genre("Test Artist", "Test Track") == ["Rock", "Alternative"]
+    assert mock_get_track_info.call_count == 1
+
+    mock_get_track_info.return_value = None
+    assert get_track("Other Artist", "Other Track") is None
+    assert get_album_name("Other Artist", "Other Track") == "N/A"
+    assert mock_get_track_info.call_count == 3
+
+
+@patch("services.lastfm_api.time.sleep")
+def test_client_reports_outcomes_to_rate_limiter(mock_sleep):
+    """
+    Test that every attempt passes through the rate limiter, and that
+    pushback from Last.fm lowers its concurrency limit.
+    """
+    session = Mock()
+    session.get.side_effect = [
+        make_response(429, headers={"Retry-After": "1"}),
+        make_response(200, {"error": 29, "message": "Rate limit exceeded"}),
+        make_response(200, mock_track_info),
+        make_response(404),
+    ]
+    now = [0.0]
+    limiter = RateLimiter(concurrency=8, clock=lambda: now[0],
+                          sleep=lambda seconds: now.__setitem__(0, now[0] + seconds))
+    client = LastFmClient("key", session=session, rate_limiter=limiter)
+    client.call("track.getInfo", artist="a", track="b")
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.fetch_image("https://example.com/missing.jpg")
+
+    stats = limiter.get_stats()
+    assert stats["requests"] == 4
+    assert stats["overloaded"] == 2
+    assert stats["errors"] == 1
+    assert stats["in_flight"] == 0
+    assert stats["concurrency_limit"] == 2
+    # The Retry-After pause held back the requests that followed
+    assert stats["wait_seconds"] >= 1.0
+
+
+@patch("services.lastfm_api.requests.Session.get")
+def test_module_clients_share_rate_limiter(mock_get):
+    """
+    Test that lookups and album art downloads share one rate limiter.
+    """
+    mock_get.return_value = make_response(200, mock_track_info)
+    get_track_info("Test Artist", "Test Track")
+    with patch("builtins.open", mock_open()):
+        fetch_and_cache_album_art("https://example.com/art.jpg", "Album", "/tmp")
+    assert get_rate_limiter_stats()["requests"] == 2
+
+
+def test_concurrent_identical_lookups_share_one_request():
+    """
+    Test that threads looking up the same track or image at once share one
+    request and its result, and that the saved calls are counted.
+    """
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_get(url, params=None, timeout=None):
+        started.set()
+        release.wait(5)
+        if url.endswith(".jpg"):
+            return Mock(status_code=200, headers={}, content=b"image")
+        return make_response(200, mock_track_info)
+
+    session = Mock()
+    session.get.side_effect = slow_get
+    client = LastFmClient("key", session=session)
+    with ThreadPoolExecutor(8) as pool:
+        lookups = [pool.submit(client.get_track_info, "Test Artist", "Test Track")]
+        started.wait(5)
+        lookups += [pool.submit(client.get_track_info, "test artist", "TEST TRACK")
+                    for _ in range(4)]
+        images = [pool.submit(client.fetch_image, "https://example.com/a.jpg")
+                  for _ in range(3)]
+        while client.single_flight.get_stats()["saved"] < 6:
+            time.sleep(0.01)
+        release.set()
+        results = [future.result(5) for future in lookups]
+        assert [future.result(5) for future in images] == [b"image"] * 3
+
+    assert all(result is results[0] for result in results)
+    assert session.get.call_count == 2
+    assert client.single_flight.get_stats() == {"calls": 2, "saved": 6,
+                                                "in_flight": 0}
+
+
+def test_single_flight_shares_errors_and_forgets_finished_calls():
+    """
+    Test that waiters get the leader's exception, and that a call made
+    after the first finished runs again.
+    """
+    single_flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise requests.exceptions.ConnectionError("refused")
+
+    with ThreadPoolExecutor(2) as pool:
+        first = pool.submit(single_flight.do, "key", fail)
+        while not single_flight.get_stats()["in_flight"]:
+            time.sleep(0.01)
+        second = pool.submit(single_flight.do, "key", fail)
+        while not single_flight.get_stats()["saved"]:
+            time.sleep(0.01)
+        release.set()
+        for future in (first, second):
+            with pytest.raises(requests.exceptions.ConnectionError):
+                future.result(5)
+    assert single_flight.do("key", lambda: 42) == 42
+    assert single_flight.get_stats()["calls"] == 2
+
+
+def test_concurrent_lookups_build_one_client(monkeypatch):
+    """
+    Test that lookup threads starting at once share one client, and that
+    a replaced client's session is only closed after its requests finished.
+    """
+    monkeypatch.setenv("API_KEY", "key")
+    monkeypatch.setenv("API_SECRET", "secret")
+    with ThreadPoolExecutor(8) as pool:
+        clients = list(pool.map(lambda _: get_client(), range(32)))
+    assert all(client is clients[0] for client in clients)
+
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_get(url, params=None, timeout=None):
+        started.set()
+        release.wait(5)
+        return make_response(200, mock_track_info)
+
+    session = Mock()
+    session.get.side_effect = slow_get
+    client = LastFmClient("key", session=session)
+    with ThreadPoolExecutor(1) as pool:
+        lookup = pool.submit(client.get_track_info, "Test Artist", "Test Track")
+        started.wait(5)
+        client.retire()
+        session.close.assert_not_called()
+        release.set()
+        assert lookup.result(5)["track"]["name"] == "Test Track"
+    session.close.assert_called_once()
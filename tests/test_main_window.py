@@ -1,5 +1,7 @@
+import asyncio
 import os
 import sys
+import threading
 import pytest
 from PyQt6.QtWidgets import (
     QApplication,
@@ -10,6 +12,7 @@ from PyQt6.QtWidgets import (
     QDialogButtonBox,
     QCheckBox,
     QComboBox,
+    QMessageBox,
 )
 from unittest.mock import patch, MagicMock
 import logging
@@ -19,6 +22,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 
 from views.main_window import SongApp  # noqa: E402 - Import not at top of file
 from models.song import Song  # noqa: E402 - Import not at top of file
+from controllers.song_controller import SongController  # noqa: E402
 
 # Initialize the Qt Application
 app = QApplication(sys.argv)
@@ -29,7 +33,9 @@ def song_app():
     """
     Fixture to init the SongApp.
     """
-    with patch("services.db.initialize_db") as mock_initialize_db:
+    with patch("services.db.initialize_db") as mock_initialize_db, patch(
+        "controllers.song_controller.get_default_db_path", return_value=":memory:"
+    ):
         mock_initialize_db.return_value = (MagicMock(), MagicMock())
         app = SongApp()
         yield app
@@ -83,6 +89,9 @@ def test_select_song_in_tree(mock_get_all_songs, song_app):
         title="Test Song",
         artist="Test Artist",
         album="Test Album",
+        display_title="Test Song",
+        display_artist="Test Artist",
+        display_album="Test Album",
         tuning="Standard",
         notes="Test Notes",
         progress="Not Started",
@@ -155,6 +164,9 @@ def test_load_songs(mock_get_all_songs, song_app):
         title="Test Song",
         artist="Test Artist",
         album="Test Album",
+        display_title="Test Song",
+        display_artist="Test Artist",
+        display_album="Test Album",
         tuning="Standard",
         notes="Test Notes",
         progress="Not Started"
@@ -384,19 +396,19 @@ def test_delete_song_no_selection(song_app):
     )
 
 
-@patch("controllers.song_controller.SongController.get_all_songs")
+@patch("controllers.song_controller.SongController.get_song_count")
 @patch("controllers.song_controller.SongController.get_unique_genres")
 @patch("controllers.song_controller.SongController.get_unique_tunings")
 def test_show_select_songs_dialog_empty_database(
     mock_get_unique_tunings,
     mock_get_unique_genres,
-    mock_get_all_songs,
+    mock_get_song_count,
     song_app
 ):
     """
     Test if show_select_songs_dialog handles empty database correctly.
     """
-    mock_get_all_songs.return_value = []
+    mock_get_song_count.return_value = 0
     mock_get_unique_genres.return_value = []
     mock_get_unique_tunings.return_value = []
     with patch.object(song_app, "show_status_message") as mock_show_status, \
@@ -406,20 +418,20 @@ def test_show_select_songs_dialog_empty_database(
     mock_show_status.assert_called_once_with("No songs in the database to filter")
 
 
-@patch("controllers.song_controller.SongController.get_all_songs")
+@patch("controllers.song_controller.SongController.get_song_count")
 @patch("controllers.song_controller.SongController.get_unique_genres")
 @patch("controllers.song_controller.SongController.get_unique_tunings")
 def test_show_select_songs_dialog(
     mock_get_unique_tunings,
     mock_get_unique_genres,
-    mock_get_all_songs,
+    mock_get_song_count,
     song_app,
     caplog
 ):
     """
     Test if the show select songs dialog logs correctly.
     """
-    mock_get_all_songs.return_value = [MagicMock()]
+    mock_get_song_count.return_value = 1
     mock_get_unique_genres.return_value = ["Rock", "Pop"]
     mock_get_unique_tunings.return_value = ["Standard", "Drop D"]
     with caplog.at_level(logging.DEBUG), \
@@ -464,24 +476,20 @@ def test_edit_song_progress(mock_get_all_songs, mock_get_song, mock_update_song,
         assert updated_song.progress == "Learning"
 
 
-@patch("controllers.song_controller.SongController.get_all_songs")
+@patch("controllers.song_controller.SongController.get_song_count")
 @patch("controllers.song_controller.SongController.get_unique_genres")
 @patch("controllers.song_controller.SongController.get_unique_tunings")
 def test_select_songs_dialog_exclude_mastered(
     mock_get_unique_tunings,
     mock_get_unique_genres,
-    mock_get_all_songs,
+    mock_get_song_count,
     song_app
 ):
     """Test selecting songs with exclude mastered option."""
     # Setup mock data
     mock_get_unique_genres.return_value = ["Rock", "Metal"]
     mock_get_unique_tunings.return_value = ["Standard", "Drop D"]
-    mock_get_all_songs.return_value = [
-        Song("Song 1", "Artist 1", progress="Mastered"),
-        Song("Song 2", "Artist 2", progress="Learning"),
-        Song("Song 3", "Artist 3", progress="Not Started")
-    ]
+    mock_get_song_count.return_value = 3
 
     # Show dialog and interact with it
     with patch.object(QDialog, "exec") as mock_dialog_exec:
@@ -498,8 +506,7 @@ def test_select_songs_dialog_exclude_mastered(
             assert song_app.filter_settings["exclude_mastered"] is True
 
 
-@patch("controllers.song_controller.SongController.get_all_songs")
-def test_filter_songs_exclude_mastered(mock_get_all_songs, song_app):
+def test_filter_songs_exclude_mastered(song_app):
     """Test filtering out mastered songs."""
     # Create test songs
     songs = [
@@ -507,7 +514,8 @@ def test_filter_songs_exclude_mastered(mock_get_all_songs, song_app):
         Song("Song 2", "Artist 2", progress="Learning"),
         Song("Song 3", "Artist 3", progress="Not Started")
     ]
-    mock_get_all_songs.return_value = songs
+    for song in songs:
+        song_app.controller.save_song(song, is_custom=True)
 
     # Filter songs
     filtered_songs = song_app.controller.filter_songs(exclude_mastered=True)
@@ -515,8 +523,8 @@ def test_filter_songs_exclude_mastered(mock_get_all_songs, song_app):
     # Verify results
     assert len(filtered_songs) == 2
     assert all(song.progress != "Mastered" for song in filtered_songs)
-    assert any(song.title == "Song 2" for song in filtered_songs)
-    assert any(song.title == "Song 3" for song in filtered_songs)
+    assert any(song.title == "song 2" for song in filtered_songs)
+    assert any(song.title == "song 3" for song in filtered_songs)
 
 
 def test_filter_songs(song_app):
@@ -528,24 +536,25 @@ def test_filter_songs(song_app):
         Song("Another Song", "Another Artist", album="Another Album",
              genres=["Metal"], tuning="Drop D", progress="Mastered"),
     ]
+    for song in songs:
+        song_app.controller.save_song(song, is_custom=True)
+
+    # Test filtering with various criteria
+    filtered = song_app.controller.filter_songs(
+        artist="Test",
+        title="Song",
+        album="Album",
+        genre="Rock",
+        tunings={"E Standard"},
+        exclude_mastered=False  # Add this parameter
+    )
+    assert len(filtered) == 1
+    assert filtered[0].title == "test song"
 
-    with patch.object(song_app.controller, "get_all_songs", return_value=songs):
-        # Test filtering with various criteria
-        filtered = song_app.controller.filter_songs(
-            artist="Test",
-            title="Song",
-            album="Album",
-            genre="Rock",
-            tunings={"E Standard"},
-            exclude_mastered=False  # Add this parameter
-        )
-        assert len(filtered) == 1
-        assert filtered[0].title == "Test Song"
-
-        # Test excluding mastered songs
-        filtered = song_app.controller.filter_songs(exclude_mastered=True)
-        assert len(filtered) == 1
-        assert filtered[0].progress != "Mastered"
+    # Test excluding mastered songs
+    filtered = song_app.controller.filter_songs(exclude_mastered=True)
+    assert len(filtered) == 1
+    assert filtered[0].progress != "Mastered"
 
 
 @patch("controllers.song_controller.SongController.get_all_songs")
@@ -559,3 +568,266 @@ def test_show_statistics_dialog(mock_get_all_songs, song_app):
         mock_dialog_exec.return_value = QDialog.DialogCode.Accepted
         song_app.show_statistics_dialog()
         mock_dialog_exec.assert_called_once()
+
+
+@patch("views.main_window.QMessageBox.question")
+@patch("controllers.song_controller.SongController.save_song")
+def test_save_song_suggests_similar(mock_save_song, mock_question, song_app):
+    """Test that adding a misspelled copy asks before saving"""
+    mock_question.return_value = QMessageBox.StandardButton.No
+    with patch.object(song_app.controller, "find_similar_songs",
+                      return_value=[Song("Black Dog", "Led Zeppelin")]):
+        song_app.save_song("Led Zepelin", "Blak Dog", "", "E Standard")
+
+    mock_question.assert_called_once()
+    assert "Black Dog by Led Zeppelin" in mock_question.call_args[0][2]
+    mock_save_song.assert_not_called()
+
+
+def test_search_falls_back_to_fuzzy(song_app):
+    """Test that the search box shows close matches when nothing contains the text"""
+    song_app.controller.save_song(Song("Black Dog", "Led Zeppelin"), is_custom=True)
+    song_app.on_search_text_changed("zepelin")
+    assert song_app.song_tree.topLevelItemCount() == 1
+    assert "close matches" in song_app.status_label.text()
+
+
+@patch("controllers.song_controller.SongController.get_song_count")
+@patch("controllers.song_controller.SongController.sample_songs")
+def test_select_songs_dialog_picks_random_songs(
+    mock_sample_songs,
+    mock_get_song_count,
+    song_app
+):
+    """Test that asking for a number of songs draws a random practice set"""
+    mock_get_song_count.return_value = 3
+    mock_sample_songs.return_value = [Song("Song 1", "Artist 1")]
+    song_app.filter_settings["num_songs"] = 2
+    song_app.filter_settings["weighting"] = "progress"
+
+    with patch.object(QDialog, "exec") as mock_dialog_exec:
+        mock_dialog_exec.return_value = QDialog.DialogCode.Accepted
+        song_app.show_select_songs_dialog()
+
+    mock_sample_songs.assert_called_once()
+    assert mock_sample_songs.call_args[0][0] == 2
+    assert mock_sample_songs.call_args[1]["weighting"] == "progress"
+    assert song_app.song_tree.topLevelItemCount() == 1
+
+
+@patch("controllers.song_controller.SongController.record_practice")
+def test_record_practice(mock_record_practice, song_app):
+    """Test recording a practice session of the selected song"""
+    mock_record_practice.return_value = (True, "Next practice in 6 days")
+    mock_item = MagicMock()
+    mock_item.text.side_effect = ["Test Artist", "Test Song"]
+    mock_item.data.return_value = "main"
+    song_app.last_selected_item = mock_item
+
+    song_app.record_practice(4)
+
+    mock_record_practice.assert_called_once_with("Test Song", "Test Artist", 4)
+    assert song_app.status_label.text() == "Next practice in 6 days"
+
+
+@patch("views.main_window.QMessageBox.information")
+@patch("controllers.song_controller.SongController.get_song_count")
+def test_plan_practice_dialog(mock_get_song_count, mock_information, song_app):
+    """Test that an accepted practice plan is listed and shown"""
+    mock_get_song_count.return_value = 1
+    song_app.controller.save_song(
+        Song("Black Dog", "Led Zeppelin", tuning="E Standard", duration="300000"),
+        is_custom=True,
+    )
+    with patch.object(QDialog, "exec") as mock_dialog_exec:
+        mock_dialog_exec.return_value = QDialog.DialogCode.Accepted
+        song_app.show_plan_practice_dialog()
+
+    assert song_app.song_tree.topLevelItemCount() == 1
+    assert "1. Black Dog by Led Zeppelin" in mock_information.call_args[0][2]
+
+
+def test_search_by_chord(song_app):
+    """Test that the search box answers chord and progression searches"""
+    song_app.controller.save_song(
+        Song("Let It Be", "The Beatles", notes="C G Am F"), is_custom=True
+    )
+    song_app.controller.save_song(Song("Other", "Artist"), is_custom=True)
+    song_app.on_search_text_changed("progression: I-V-vi-IV")
+    assert song_app.song_tree.topLevelItemCount() == 1
+    song_app.on_search_text_changed("chord: Bm")
+    assert song_app.song_tree.topLevelItemCount() == 0
+
+
+def test_songs_like_and_recommendations(song_app):
+    """Test listing songs like the selected one and songs to learn next"""
+    controller = song_app.controller
+    controller.save_song(Song("Lithium", "Nirvana", genres=["Grunge"],
+                              progress="Learning"), is_custom=True)
+    controller.save_song(Song("Black", "Pearl Jam", genres=["Grunge"]),
+                         is_custom=True)
+    controller.save_song(Song("Sunny", "Bobby Hebb", genres=["Soul"]),
+                         is_custom=True)
+    song_app.update_song_list(controller.get_all_songs())
+    song_app.select_song_in_tree("Lithium", "Nirvana")
+
+    song_app.show_songs_like()
+    assert song_app.song_tree.topLevelItemCount() == 1
+    assert song_app.song_tree.topLevelItem(0).text(1) == "Black"
+
+    song_app.show_recommendations()
+    assert song_app.song_tree.topLevelItemCount() == 1
+    assert "to learn next" in song_app.status_label.text()
+
+
+def test_duplicates_dialog(song_app):
+    """Test merging the duplicate groups checked in the dialog"""
+    controller = song_app.controller
+    controller.save_song(Song("Lithium", "Nirvana"), is_custom=True)
+    controller.save_song(Song("Lithium (Live)", "Nirvana"), is_custom=True)
+    with patch.object(QDialog, "exec") as mock_dialog_exec:
+        mock_dialog_exec.return_value = QDialog.DialogCode.Accepted
+        song_app.show_duplicates_dialog()
+    assert song_app.song_tree.topLevelItemCount() == 1
+    assert "Merged 1 groups" in song_app.status_label.text()
+
+    song_app.show_duplicates_dialog()
+    assert "No duplicate songs" in song_app.status_label.text()
+
+
+def test_settings_dialog_applies_without_restart(song_app, monkeypatch):
+    """Test that saved credentials are used right away"""
+    from services.lastfm_api import load_api_credentials
+
+    monkeypatch.delenv("API_KEY", raising=False)
+    monkeypatch.delenv("API_SECRET", raising=False)
+
+    def fill_in_and_accept(dialog):
+        key_input, secret_input = dialog.findChildren(QLineEdit)
+        key_input.setText("new key")
+        secret_input.setText("new secret")
+        return QDialog.DialogCode.Accepted
+
+    with patch.object(QDialog, "exec", fill_in_and_accept):
+        song_app.show_settings_dialog()
+    assert load_api_credentials() == ("new key", "new secret")
+    assert song_app.status_label.text() == "API settings saved."
+
+
+def test_settings_changes_reach_gui_thread(song_app, qtbot, monkeypatch):
+    """Test that settings reloaded on another thread update the GUI thread"""
+    monkeypatch.delenv("API_KEY", raising=False)
+    monkeypatch.delenv("API_SECRET", raising=False)
+    threads = []
+    monkeypatch.setattr(song_app, "show_status_message",
+                        lambda message, **kwargs: threads.append(
+                            threading.current_thread()))
+
+    worker = threading.Thread(target=song_app.settings.save,
+                              args=({"API_KEY": "key", "API_SECRET": "secret"},))
+    worker.start()
+    worker.join()
+    qtbot.waitUntil(lambda: bool(threads))
+    assert threads == [threading.main_thread()]
+
+
+def test_library_is_read_off_the_gui_thread(tmp_path, qtbot):
+    """
+    Test that the window reads the library on a worker thread and shows
+    it once it arrives.
+    """
+    db_path = str(tmp_path / "songs.db")
+    with patch("controllers.song_controller.get_default_db_path",
+               return_value=db_path):
+        window = SongApp()
+        window.controller.save_song(Song("Test Song", "Test Artist"), is_custom=True)
+        window.close()
+        window.controller.conn.close()
+
+        threads = []
+        read_main_library = SongController.read_main_library
+
+        def read_on_worker(controller):
+            threads.append(threading.current_thread())
+            return read_main_library(controller)
+
+        with patch.object(SongController, "read_main_library", autospec=True,
+                          side_effect=read_on_worker):
+            window = SongApp()
+            qtbot.waitUntil(lambda: window.controller.get_cache_stats()["size"] == 1)
+    assert threads and threads[0] is not threading.main_thread()
+    assert window.controller.get_cache_stats()["misses"] == 1
+    assert window.song_tree.topLevelItemCount() == 1
+    window.controller.conn.close()
+
+
+def test_attach_library_names_library_in_ascii(song_app):
+    """Test that the default library name leaves out non-ASCII letters"""
+    with patch("views.main_window.QFileDialog.getOpenFileName",
+               return_value=("/music/Élève 2.db", "")), \
+            patch.object(song_app.controller, "attach_library",
+                         return_value=(False, "")) as mock_attach:
+        song_app.attach_library()
+    mock_attach.assert_called_once_with("l_ve_2", "/music/Élève 2.db")
+
+
+def test_closing_saves_recorded_responses(song_app, tmp_path, monkeypatch):
+    """
+    Test that responses recorded with LASTFM_TRANSPORT=record:<path> are
+    written to the fixture file when the window closes.
+    """
+    path = tmp_path / "fixtures.json"
+    monkeypatch.setenv("API_KEY", "key")
+    monkeypatch.setenv("API_SECRET", "secret")
+    monkeypatch.setenv("LASTFM_TRANSPORT", f"record:{path}")
+    track = {"track": {"name": "Lithium", "artist": {"name": "Nirvana"}}}
+    response = MagicMock(status_code=200, headers={}, content=b"{}")
+    response.json.return_value = track
+    with patch("requests.Session.get", return_value=response):
+        assert song_app.controller.get_track_info("Nirvana", "Lithium")
+    assert not path.exists()
+    song_app.close()
+    assert path.exists()
+
+
+def test_missing_details_are_fetched_off_the_gui_thread(song_app, qtbot):
+    """
+    Test that Fetch Missing Details looks songs up on the asyncio event
+    loop, returning at once, and saves what it found on the GUI thread.
+    """
+    controller = song_app.controller
+    controller.save_song(Song("Creep", "Radiohead"), enrich_later=True)
+    lookup_threads = []
+    released = threading.Event()
+
+    class SlowClient:
+        async def get_track_info(self, artist, track):
+            lookup_threads.append(threading.current_thread())
+            while not released.is_set():
+                await asyncio.sleep(0.01)
+            return {"track": {"name": "Creep", "artist": {"name": "Radiohead"},
+                              "album": {"title": "Pablo Honey"}}}
+
+        async def close(self):
+            pass
+
+    apply_pending_details = controller.apply_pending_details
+    apply_threads = []
+
+    def apply_on(details):
+        apply_threads.append(threading.current_thread())
+        return apply_pending_details(details)
+
+    with patch("views.main_window.create_async_client", return_value=SlowClient()), \
+            patch.object(controller, "apply_pending_details", side_effect=apply_on):
+        song_app.enrich_pending_songs()
+        assert song_app.status_label.text() == "Fetching details of 1 songs..."
+        song_app.enrich_pending_songs()
+        assert song_app.status_label.text() == "Already fetching missing details"
+        released.set()
+        qtbot.waitUntil(lambda: bool(apply_threads))
+    assert lookup_threads[0] is not threading.main_thread()
+    assert apply_threads == [threading.main_thread()]
+    assert song_app.status_label.text() == "Fetched details of 1 songs"
+    assert controller.get_song("Creep", "Radiohead").album == "Pablo Honey"
+    song_app.close()
@@ -0,0 +1,89 @@
+import os
+import sys
+from itertools import combinations
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.song import Song  # noqa: E402 - Import not at top of file
+from models.planner import (  # noqa: E402 - Import not at top of file
+    duration_seconds,
+    plan_practice,
+    song_value,
+    DEFAULT_SONG_SECONDS,
+)
+
+
+def make_song(title, tuning, seconds, progress="Learning"):
+    return Song(title, "Artist", tuning=tuning, duration=str(seconds * 1000),
+                progress=progress)
+
+
+def test_duration_seconds():
+    """Test reading stored durations in milliseconds or seconds"""
+    assert duration_seconds("240000") == 240
+    assert duration_seconds("210") == 210
+    assert duration_seconds(None) == DEFAULT_SONG_SECONDS
+    assert duration_seconds("abc") == DEFAULT_SONG_SECONDS
+
+
+def test_plan_groups_tunings_and_fits_budget():
+    """Test that each tuning is played in one go within the budget"""
+    songs = [
+        make_song("a", "E Standard", 180),
+        make_song("b", "Drop D", 180),
+        make_song("c", "E Standard", 180),
+        make_song("d", "Drop D", 180),
+        make_song("e", "Open G", 180),
+    ]
+    plan = plan_practice(songs, 12 * 60, retune_seconds=90)
+    assert plan.optimal
+    assert plan.total_seconds <= 12 * 60
+    tunings = [song.tuning for song in plan.songs]
+    assert len(plan.songs) == 3
+    assert plan.tuning_changes == 1
+    # Each tuning appears in a single run
+    runs = [t for i, t in enumerate(tunings) if i == 0 or tunings[i - 1] != t]
+    assert len(runs) == len(set(runs))
+
+
+def test_plan_matches_brute_force():
+    """Test the exact solver against trying every subset"""
+    songs = [
+        make_song("a", "E Standard", 200, "Mastered"),
+        make_song("b", "Drop D", 120),
+        make_song("c", "E Standard", 300),
+        make_song("d", "Drop D", 240, "Not Started"),
+        make_song("e", "Open G", 90),
+        make_song("f", "Open G", 150, "Mastered"),
+    ]
+    budget, retune = 600, 60
+    due = {("a", "artist")}
+
+    def value(subset):
+        return sum(song_value(s, (s.title_key, s.artist_key) in due) for s in subset)
+
+    def fits(subset):
+        changes = max(0, len({s.tuning for s in subset}) - 1)
+        steps = sum(-(-duration_seconds(s.duration) // 15) for s in subset)
+        return (steps + changes * (-(-retune // 15))) * 15 <= budget
+
+    best = max(
+        value(subset)
+        for size in range(len(songs) + 1)
+        for subset in combinations(songs, size)
+        if fits(subset)
+    )
+    plan = plan_practice(songs, budget, due, retune_seconds=retune)
+    assert value(plan.songs) == best
+    assert plan.songs[0].title == "a"  # due songs lead their tuning
+
+
+def test_plan_falls_back_to_greedy():
+    """Test that running out of time still returns a plan within budget"""
+    songs = [make_song(str(i), ["E", "D"][i % 2], 200) for i in range(20)]
+    plan = plan_practice(songs, 15 * 60, time_limit=0)
+    assert not plan.optimal
+    assert plan.songs
+    assert plan.total_seconds <= 15 * 60
+    assert plan.tuning_changes == 0
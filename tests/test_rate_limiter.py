@@ -0,0 +1,179 @@
+import os
+import sys
+import threading
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.rate_limiter import (  # noqa: E402 - Import not at top of file
+    AdaptiveConcurrency,
+    RateLimiter,
+    SLOT_POLL_INTERVAL,
+    TokenBucket,
+    SUCCESS,
+    OVERLOADED,
+    ERROR,
+)
+
+
+class FakeClock:
+    """Clock that only moves when something sleeps"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_token_bucket_allows_burst_then_steady_rate():
+    """
+    Test that a full bucket lets a burst through, then one request per
+    1 / rate seconds.
+    """
+    clock = FakeClock()
+    bucket = TokenBucket(rate=5.0, capacity=3, clock=clock, sleep=clock.sleep)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.acquire() == 0.2
+    for _ in range(10):
+        bucket.acquire()
+    assert abs(clock.now - 2.2) < 1e-6
+    clock.now += 60
+    assert bucket.tokens == 3
+
+
+def test_token_bucket_timeout_and_pause():
+    """
+    Test that acquire gives up when no token comes in time, and that a
+    pause holds back every token for its duration.
+    """
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=1, clock=clock, sleep=clock.sleep)
+    bucket.acquire()
+    assert bucket.acquire(timeout=0.1) is None
+    assert clock.now == 0.0
+
+    clock.now += 0.5
+    bucket.pause(3.0)
+    assert bucket.tokens == -6.0
+    assert bucket.acquire() == 3.5
+
+
+def test_adaptive_concurrency_aimd():
+    """
+    Test that successes raise the limit additively and overloads cut it
+    multiplicatively, within the bounds.
+    """
+    concurrency = AdaptiveConcurrency(initial=2, minimum=1, maximum=4)
+    assert concurrency.acquire(timeout=0)
+    assert concurrency.acquire(timeout=0)
+    assert not concurrency.acquire(timeout=0)
+
+    concurrency.release(SUCCESS)
+    concurrency.release(SUCCESS)
+    assert concurrency.limit == 2
+    concurrency.acquire()
+    concurrency.release(SUCCESS)
+    assert concurrency.limit == 3
+    for _ in range(50):
+        concurrency.acquire()
+        concurrency.release(SUCCESS)
+    assert concurrency.limit == 4
+
+    concurrency.acquire()
+    concurrency.release(OVERLOADED)
+    assert concurrency.limit == 2
+    concurrency.acquire()
+    concurrency.release(ERROR)
+    assert concurrency.limit == 2
+    for _ in range(5):
+        concurrency.acquire()
+        concurrency.release(OVERLOADED)
+    assert concurrency.limit == 1
+    assert concurrency.in_flight == 0
+    assert concurrency.peak_in_flight == 2
+
+
+def test_adaptive_concurrency_blocks_until_release():
+    """
+    Test that a request waiting for a slot goes ahead once one is freed.
+    """
+    concurrency = AdaptiveConcurrency(initial=1)
+    concurrency.acquire()
+    acquired = threading.Event()
+
+    def worker():
+        concurrency.acquire()
+        acquired.set()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert not acquired.wait(0.05)
+    concurrency.release(SUCCESS)
+    assert acquired.wait(1.0)
+    thread.join()
+
+
+def test_rate_limiter_stats_and_retry_after():
+    """
+    Test that the limiter counts outcomes, and that a Retry-After pauses the
+    requests that follow.
+    """
+    clock = FakeClock()
+    limiter = RateLimiter(rate=10.0, burst=1, concurrency=4,
+                          clock=clock, sleep=clock.sleep)
+    assert limiter.acquire()
+    limiter.release(SUCCESS)
+    assert limiter.acquire()
+    limiter.release(OVERLOADED, retry_after=2.0)
+    assert limiter.acquire()
+    limiter.release(ERROR)
+
+    stats = limiter.get_stats()
+    assert stats["requests"] == 3
+    assert stats["overloaded"] == 1
+    assert stats["errors"] == 1
+    assert stats["in_flight"] == 0
+    assert stats["concurrency_limit"] == 2
+    assert abs(stats["wait_seconds"] - 2.2) < 1e-6
+
+
+def test_rate_limiter_timeout():
+    """
+    Test that an acquire that times out doesn't hold a slot.
+    """
+    clock = FakeClock()
+    limiter = RateLimiter(rate=1.0, burst=1, concurrency=1,
+                          clock=clock, sleep=clock.sleep)
+    assert limiter.acquire()
+    assert not limiter.acquire(timeout=0.01)
+    limiter.release(SUCCESS)
+    assert not limiter.acquire(timeout=0.5)
+    assert limiter.concurrency.in_flight == 0
+    assert limiter.get_stats()["timeouts"] == 2
+
+
+def test_rate_limiter_try_acquire():
+    """
+    Test that try_acquire takes a slot and a token only when both are free,
+    and otherwise says how long to wait.
+    """
+    clock = FakeClock()
+    limiter = RateLimiter(rate=2.0, burst=1, concurrency=1,
+                          clock=clock, sleep=clock.sleep)
+    assert limiter.try_acquire() == 0
+    assert limiter.try_acquire() == SLOT_POLL_INTERVAL
+    limiter.release(SUCCESS)
+    assert abs(limiter.try_acquire() - 0.5) < 1e-6
+    assert limiter.concurrency.in_flight == 0
+    clock.now += 0.5
+    assert limiter.try_acquire(waited=0.5) == 0
+    limiter.release(SUCCESS)
+
+    stats = limiter.get_stats()
+    assert stats["requests"] == 2
+    assert stats["errors"] == 0
+    assert abs(stats["wait_seconds"] - 0.5) < 1e-6
@@ -0,0 +1,85 @@
+import os
+import sqlite3
+import sys
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.response_cache import (  # noqa: E402 - Import not at top of file
+    ResponseCache,
+    cache_key,
+)
+
+
+def test_cache_key():
+    """Test that lookups differing in case and spacing share a key"""
+    assert cache_key("track.getInfo", " The  Beatles", "LET IT BE") == (
+        "track.getinfo", "the beatles", "let it be"
+    )
+
+
+def test_hits_misses_and_ttl(tmp_path):
+    """Test serving cached responses until they expire, across reopening"""
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(path, ttl=100)
+    assert cache.get("track.getInfo", "Nirvana", "Lithium", now=0) is None
+    cache.put("track.getInfo", "Nirvana", "Lithium", {"track": {"name": "Lithium"}},
+              now=0)
+    assert cache.get("track.getInfo", "nirvana", "lithium", now=50) == {
+        "track": {"name": "Lithium"}
+    }
+    assert cache.get("track.getInfo", "Nirvana", "Lithium", now=101) is None
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["expired"]) == (1, 2, 1)
+    assert stats["hit_rate"] == 1 / 3
+    cache.close()
+
+    reopened = ResponseCache(path, ttl=100)
+    assert len(reopened) == 1
+    assert reopened.get("track.getInfo", "Nirvana", "Lithium", now=10) is not None
+    reopened.clear()
+    assert len(reopened) == 0
+    reopened.close()
+
+
+def test_evicts_least_recently_used():
+    """Test that a full cache drops the entries read least recently"""
+    cache = ResponseCache(":memory:", max_entries=2)
+    cache.put("track.getInfo", "a", "1", {"n": 1}, now=1)
+    cache.put("track.getInfo", "a", "2", {"n": 2}, now=2)
+    cache.put("track.getInfo", "a", "2", {"n": 22}, now=3)
+    assert len(cache) == 2
+    cache.get("track.getInfo", "a", "1", now=4)
+    cache.put("track.getInfo", "a", "3", {"n": 3}, now=5)
+
+    assert len(cache) == 2
+    assert cache.get_stats()["evictions"] == 1
+    assert cache.get("track.getInfo", "a", "1", now=6) == {"n": 1}
+    assert cache.get("track.getInfo", "a", "2", now=6) is None
+    assert cache.get("track.getInfo", "a", "3", now=6) == {"n": 3}
+
+
+def test_entry_ttl_and_older_caches(tmp_path):
+    """
+    Test responses cached with their own TTL, in a cache written before
+    entries had one.
+    """
+    path = str(tmp_path / "cache.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE responses (method TEXT NOT NULL, artist_key TEXT NOT NULL, "
+        "track_key TEXT NOT NULL, body TEXT NOT NULL, fetched_at REAL NOT NULL, "
+        "accessed_at REAL NOT NULL, PRIMARY KEY (method, artist_key, track_key)) "
+        "WITHOUT ROWID"
+    )
+    conn.execute("INSERT INTO responses VALUES ('track.getinfo', 'nirvana', "
+                 "'lithium', '{}', 0, 0)")
+    conn.commit()
+    conn.close()
+
+    cache = ResponseCache(path, ttl=100)
+    assert cache.get("track.getInfo", "Nirvana", "Lithium", now=50) == {}
+    cache.put("track.getInfo", "Nirvana", "Lithum", {"error": 6}, now=0, ttl=10)
+    assert cache.get("track.getInfo", "Nirvana", "Lithum", now=5) == {"error": 6}
+    assert cache.get("track.getInfo", "Nirvana", "Lithum", now=11) is None
+    cache.close()
@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pytest
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.review import (  # noqa: E402 - Import not at top of file
+    ReviewState,
+    schedule_review,
+    progress_after_review,
+    SECONDS_PER_DAY,
+    MIN_EASE,
+    AGAIN,
+    GOOD,
+    EASY,
+)
+
+
+def test_passing_reviews_space_out():
+    """Test the SM-2 interval sequence for good reviews"""
+    state = ReviewState.new()
+    intervals = []
+    for day in range(4):
+        state = schedule_review(state, GOOD, now=day * SECONDS_PER_DAY)
+        intervals.append(state.interval_days)
+    assert intervals == [1, 6, 15, 38]
+    assert state.ease == pytest.approx(2.5)
+    assert state.due_at == 3 * SECONDS_PER_DAY + 38 * SECONDS_PER_DAY
+
+
+def test_failed_review_starts_over():
+    """Test that forgetting a song resets it and lowers its ease"""
+    state = ReviewState(2.5, 38, 4, 0, 0)
+    state = schedule_review(state, AGAIN, now=100)
+    assert (state.repetitions, state.interval_days) == (0, 1)
+    assert state.ease < 2.5
+    assert state.due_at == 100 + SECONDS_PER_DAY
+
+    for _ in range(10):
+        state = schedule_review(state, 0, now=100)
+    assert state.ease == MIN_EASE
+
+    with pytest.raises(ValueError):
+        schedule_review(state, 6, now=100)
+
+
+def test_progress_after_review():
+    """Test how reviews move songs between progress states"""
+    short = ReviewState(2.5, 6, 2, 0, 0)
+    long = ReviewState(2.5, 30, 4, 0, 0)
+    assert progress_after_review("Not Started", short, GOOD) == "Learning"
+    assert progress_after_review("Learning", long, EASY) == "Mastered"
+    assert progress_after_review("Mastered", short, GOOD) == "Mastered"
+    assert progress_after_review("Mastered", short, AGAIN) == "Learning"
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.sampler import (  # noqa: E402 - Import not at top of file
+    AliasTable,
+    song_weights,
+    BY_PROGRESS,
+    BY_STALENESS,
+    BY_TUNING,
+    MAX_STALENESS_DAYS,
+    UNIFORM,
+)
+from models.song_table import SongTable  # noqa: E402 - Import not at top of file
+
+
+def make_row(title, tuning, progress):
+    return ("main", title, "artist", tuning, "", "", "", "", progress,
+            title, "artist", "", title, "Artist", "")
+
+
+def test_alias_table_matches_weights():
+    """Test that draws follow the weights"""
+    table = AliasTable([1, 0, 3])
+    draws = table.draw(np.random.default_rng(0), 40000)
+    counts = np.bincount(draws, minlength=3) / len(draws)
+    assert counts[1] == 0
+    assert counts[0] == pytest.approx(0.25, abs=0.02)
+    assert counts[2] == pytest.approx(0.75, abs=0.02)
+
+
+def test_alias_table_sample_is_distinct_and_seeded():
+    """Test that samples have no repeats and depend only on the seed"""
+    table = AliasTable(np.ones(100))
+    first = table.sample(np.random.default_rng(42), 10)
+    again = table.sample(np.random.default_rng(42), 10)
+    assert len(set(first.tolist())) == 10
+    assert first.tolist() == again.tolist()
+
+    # More than there are songs with a non-zero weight
+    skewed = AliasTable([0, 1, 1, 0])
+    assert sorted(skewed.sample(np.random.default_rng(1), 5).tolist()) == [1, 2]
+
+
+def test_song_weights():
+    """Test the progress, tuning and staleness weightings"""
+    table = SongTable([
+        make_row("a", "Drop D", "Learning"),
+        make_row("b", "Drop D", "Mastered"),
+        make_row("c", "E Standard", None),
+    ])
+    rows = np.arange(3)
+    assert song_weights(table, rows, UNIFORM).tolist() == [1, 1, 1]
+    assert song_weights(table, rows, BY_PROGRESS).tolist() == [3.0, 1.0, 2.0]
+    assert song_weights(table, rows, BY_TUNING).tolist() == [2.0, 2.0, 1.0]
+    day = 24 * 60 * 60
+    last_practiced = np.array([10 * day, 100 * day, np.nan])
+    assert song_weights(table, rows, BY_STALENESS, last_practiced, now=12 * day
+                        ).tolist() == [3.0, 1.0, 1.0 + MAX_STALENESS_DAYS]
+    with pytest.raises(ValueError):
+        song_weights(table, rows, "bogus")
@@ -0,0 +1,76 @@
+import os
+import sys
+from unittest.mock import Mock, patch
+
+import pytest
+from dotenv import dotenv_values
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.settings import Settings  # noqa: E402 - Import not at top of file
+
+
+@pytest.fixture(autouse=True)
+def no_credentials_in_environment(monkeypatch):
+    """Keep credentials set for the test run from overriding the files"""
+    monkeypatch.delenv("API_KEY", raising=False)
+    monkeypatch.delenv("API_SECRET", raising=False)
+
+
+def write(path, text, mtime):
+    path.write_text(text)
+    os.utime(path, (mtime, mtime))
+
+
+def test_parses_once_and_reloads_on_change(tmp_path):
+    """Test that the file is only parsed again after it changed"""
+    path = tmp_path / "settings.env"
+    write(path, "API_KEY=first\nAPI_SECRET=secret\n", 1000)
+    settings = Settings(str(path), check_interval=0)
+    callback = Mock()
+    settings.subscribe(callback)
+
+    with patch("services.settings.dotenv_values", wraps=dotenv_values) as parse:
+        assert settings.api_credentials() == ("first", "secret")
+        assert settings.get("API_KEY") == "first"
+        assert parse.call_count == 1
+
+        write(path, "API_KEY=second\nAPI_SECRET=secret\n", 2000)
+        assert settings.get("API_KEY") == "second"
+        assert parse.call_count == 2
+    callback.assert_called_with({"API_KEY"})
+
+    settings.unsubscribe(callback)
+    path.unlink()
+    assert not settings.is_api_configured()
+    assert callback.call_count == 2
+
+
+def test_check_interval_and_environment(tmp_path, monkeypatch):
+    """Test throttled file checks and environment variables winning"""
+    path = tmp_path / "settings.env"
+    write(path, "API_KEY=file\n", 1000)
+    settings = Settings(str(path), check_interval=3600)
+    assert settings.get("API_KEY") == "file"
+    write(path, "API_KEY=changed\n", 2000)
+    assert settings.get("API_KEY") == "file"
+    assert settings.reload(force=True) == {"API_KEY"}
+    monkeypatch.setenv("API_KEY", "environment")
+    assert settings.get("API_KEY") == "environment"
+    assert settings.get("MISSING", "default") == "default"
+
+
+def test_save_keeps_other_settings(tmp_path):
+    """Test saving new values without dropping unrelated ones"""
+    path = tmp_path / "settings.env"
+    write(path, "API_KEY=old\nTHEME=dark\n", 1000)
+    settings = Settings(str(path))
+    callback = Mock()
+    settings.subscribe(callback)
+    settings.save({"API_KEY": "new", "API_SECRET": "secret"})
+
+    assert settings.get("API_KEY") == "new"
+    assert settings.get("THEME") == "dark"
+    assert settings.is_api_configured()
+    callback.assert_called_with({"API_KEY", "API_SECRET"})
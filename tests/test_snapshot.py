@@ -0,0 +1,56 @@
+import os
+import sys
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services import snapshot  # noqa: E402 - Import not at top of file
+from models.song import Song  # noqa: E402 - Import not at top of file
+
+
+def make_songs(count):
+    return [
+        Song(f"song {i:03}", f"artist {i % 7}", genres=["Rock", "Blues"],
+             library="main")
+        for i in range(count)
+    ]
+
+
+def test_snapshot_round_trip(tmp_path):
+    """Test that a current snapshot returns every song with its fields"""
+    path = str(tmp_path / "songs.db.snapshot")
+    snapshot.write_snapshot(path, (4, 10), make_songs(3))
+
+    songs = snapshot.read_snapshot(path, (4, 10))
+    assert len(songs) == 3
+    assert {song.title for song in songs} == {"song 000", "song 001", "song 002"}
+    assert songs[0].genres == ["Rock", "Blues"]
+    assert songs[0].display_artist == "Artist 0"
+
+
+def test_snapshot_header_holds_first_page(tmp_path, monkeypatch):
+    """Test that the header holds the first page in display order"""
+    monkeypatch.setattr(snapshot, "SNAPSHOT_PAGE_SIZE", 5)
+    path = str(tmp_path / "songs.db.snapshot")
+    snapshot.write_snapshot(path, (4, 1), make_songs(20))
+
+    header = snapshot.read_snapshot_header(path)
+    assert header["count"] == 20
+    assert header["key"] == (4, 1)
+    artists = [song.display_artist for song in header["page"]]
+    assert len(artists) == 5
+    assert artists == sorted(artists)
+
+
+def test_stale_or_missing_snapshot(tmp_path):
+    """Test that stale, missing and corrupt snapshots are ignored"""
+    path = str(tmp_path / "songs.db.snapshot")
+    assert snapshot.read_snapshot_header(path) is None
+    assert snapshot.read_snapshot(path, (4, 1)) is None
+
+    snapshot.write_snapshot(path, (4, 1), make_songs(2))
+    assert snapshot.read_snapshot(path, (4, 2)) is None
+
+    with open(path, "wb") as f:
+        f.write(b"not a pickle")
+    assert snapshot.read_snapshot_header(path) is None
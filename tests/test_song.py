@@ -0,0 +1,42 @@
+import os
+import sys
+import pytest
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.song import Song, FrozenSong  # noqa: E402 - Import not at top of file
+
+
+def test_song_has_no_instance_dict():
+    """Test that songs are slotted and reject unknown attributes"""
+    song = Song("Test Song", "Test Artist")
+    assert not hasattr(song, "__dict__")
+    with pytest.raises(AttributeError):
+        song.bogus = True
+
+
+def test_genres_decoded_lazily():
+    """Test that stored genre strings are only split when read"""
+    song = Song("Test Song", "Test Artist", genres="Rock, Blues")
+    assert song.encoded_genres == "Rock, Blues"
+    assert song.genres == ["Rock", "Blues"]
+
+    song.genres.append("Metal")
+    assert song.encoded_genres == "Rock, Blues, Metal"
+
+    assert Song("Test Song", "Test Artist").genres == []
+    assert Song("Test Song", "Test Artist", genres=None).genres == []
+
+
+def test_freeze_and_thaw():
+    """Test the hashable frozen variant round-trips"""
+    song = Song("Test Song", "Test Artist", genres=["Rock"], progress="Learning")
+    frozen = song.freeze()
+    assert isinstance(frozen, FrozenSong)
+    assert frozen.genres == ("Rock",)
+    assert len({frozen, song.freeze()}) == 1
+
+    thawed = frozen.thaw()
+    assert thawed.genres == ["Rock"]
+    assert thawed.progress == "Learning"
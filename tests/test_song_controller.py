@@ -1,7 +1,15 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
+import requests
 from unittest.mock import patch, MagicMock
 from controllers.song_controller import SongController
 from models.song import Song
+from services.db import get_pending_songs, get_tag_weights
+from services.lastfm_api import AlbumInfo, CircuitOpenError, TrackInfo
 
 
 @pytest.fixture
@@ -11,6 +19,16 @@ def song_controller():
         return SongController()
 
 
+@pytest.fixture
+def library_controller():
+    """A controller backed by a real in-memory database"""
+    with patch("controllers.song_controller.get_default_db_path",
+               return_value=":memory:"):
+        controller = SongController()
+    yield controller
+    controller.conn.close()
+
+
 def test_initialization(song_controller):
     assert song_controller is not None
     assert song_controller.conn is not None
@@ -69,16 +87,14 @@ def test_save_song(song_controller):
 
         # Test case 2: Successful save (non-custom song with Last.fm info)
         mock_song_exists.return_value = False
-        mock_get_track_info.return_value = {
-            "track": {
-                "album": {
-                    "title": "Test Album",
-                    "image": [{"#text": "http://example.com/image.jpg"}],
-                },
-                "duration": "180000",
-                "toptags": {"tag": [{"name": "Rock"}, {"name": "Pop"}]},
-            }
-        }
+        mock_get_track_info.return_value = TrackInfo(
+            name="Non-Custom Song",
+            artist="Non-Custom Artist",
+            album="Test Album",
+            duration_ms=180000,
+            tags=(("Rock", None), ("Pop", None)),
+            images=("http://example.com/image.jpg",),
+        )
 
         non_custom_song = Song("Non-Custom Song", "Non-Custom Artist")
         success, message = song_controller.save_song(non_custom_song, is_custom=False)
@@ -87,7 +103,12 @@ def test_save_song(song_controller):
         assert message == "Song saved successfully"
         mock_save_song.assert_called_once()
         mock_get_track_info.assert_called_once()
-        mock_fetch_art.assert_called_once()
+        mock_fetch_art.assert_called_once_with(
+            "http://example.com/image.jpg", "Test Album"
+        )
+        saved = mock_save_song.call_args.args[1]
+        assert (saved.album, saved.duration) == ("Test Album", 180000)
+        assert saved.genres == ["Rock", "Pop"]
 
         # Test case 3: Unsuccessful save (non-custom song, track info not found)
         mock_save_song.reset_mock()
@@ -128,8 +149,8 @@ def test_update_song_info(song_controller):
 
 
 def test_get_track_info(song_controller):
-    with patch("controllers.song_controller.get_track_info") as mock_get_track_info:
-        mock_track_info = {"track": {"name": "Test Track"}}
+    with patch("controllers.song_controller.lookup_track") as mock_get_track_info:
+        mock_track_info = TrackInfo("Test Track", "Test Artist", None, 0, (), ())
         mock_get_track_info.return_value = mock_track_info
         result = song_controller.get_track_info("Test Artist", "Test Track")
         assert result == mock_track_info
@@ -144,3 +165,599 @@ def test_get_cached_album_art(song_controller):
         mock_exists.return_value = False
         result = song_controller.get_cached_album_art("Nonexistent Album")
         assert result is None
+
+
+def test_attach_and_switch_libraries(library_controller, tmp_path):
+    controller = library_controller
+    controller.save_song(Song("Main Song", "Main Artist", progress="Learning"),
+                         is_custom=True)
+
+    success, _ = controller.attach_library("student", str(tmp_path / "student.db"))
+    assert success is True
+    assert controller.get_libraries() == ["main", "student"]
+    assert controller.active_libraries == ["main", "student"]
+
+    # Attached libraries get the current schema and show up in queries
+    controller.cursor.execute(
+        "INSERT INTO student.songs (title, artist, genres, progress, title_key, "
+        "artist_key) VALUES ('student song', 'student artist', 'Rock', 'Mastered', "
+        "'student song', 'student artist')"
+    )
+    songs = controller.get_all_songs()
+    assert {song.library for song in songs} == {"main", "student"}
+    assert controller.get_song_count() == 2
+    assert controller.get_progress_stats() == {
+        "Not Started": 0, "Learning": 1, "Mastered": 1
+    }
+    assert [s.library for s in controller.search_songs("student")] == ["student"]
+
+    controller.set_active_libraries(["student"])
+    assert [s.title for s in controller.get_all_songs()] == ["student song"]
+
+    success, _ = controller.detach_library("student")
+    assert success is True
+    assert controller.active_libraries == ["main"]
+    assert controller.get_song_count() == 1
+
+
+def test_attach_library_rejects_bad_names(library_controller, tmp_path):
+    success, message = library_controller.attach_library("main", str(tmp_path))
+    assert success is False
+    assert "Invalid library name" in message
+    assert library_controller.is_attached_library("main") is False
+
+
+def test_snapshot_follows_library_changes(tmp_path):
+    """Test that the snapshot is only reused while the library is unchanged"""
+    db_path = str(tmp_path / "songs.db")
+    with patch("controllers.song_controller.get_default_db_path",
+               return_value=db_path):
+        controller = SongController()
+    try:
+        controller.save_song(Song("Test Song", "Test Artist"), is_custom=True)
+        assert controller.load_snapshot_page() is None
+        assert controller.save_snapshot() is True
+        assert controller.save_snapshot() is False
+
+        assert [song.title for song in controller.load_snapshot_page()] == [
+            "test song"
+        ]
+        assert len(controller.load_snapshot()) == 1
+
+        controller.save_song(Song("Other Song", "Test Artist"), is_custom=True)
+        assert controller.load_snapshot() is None
+    finally:
+        controller.conn.close()
+
+
+def test_read_main_library_off_the_controller_thread(tmp_path):
+    """
+    Test that the library read on another thread fills the song cache,
+    and is dropped if the library changed in the meantime.
+    """
+    db_path = str(tmp_path / "songs.db")
+    with patch("controllers.song_controller.get_default_db_path",
+               return_value=db_path):
+        controller = SongController()
+    try:
+        controller.save_song(Song("Test Song", "Test Artist"), is_custom=True)
+        with ThreadPoolExecutor(1) as pool:
+            library = pool.submit(controller.read_main_library).result(5)
+        assert [song.title for song in library[1]] == ["test song"]
+        songs = controller.adopt_main_library(*library)
+        assert [song.title for song in songs] == ["test song"]
+        assert controller.get_cache_stats()["misses"] == 1
+        # The database was read once, and the snapshot written from it
+        assert len(controller.load_snapshot()) == 1
+        assert controller.save_snapshot() is False
+
+        with ThreadPoolExecutor(1) as pool:
+            library = pool.submit(controller.read_main_library).result(5)
+        assert library[2] is True
+        controller.save_song(Song("Other Song", "Test Artist"), is_custom=True)
+        assert controller.adopt_main_library(*library) is None
+    finally:
+        controller.conn.close()
+
+
+def test_song_cache_write_through(library_controller):
+    """Test that writes update the cache without reloading the library"""
+    controller = library_controller
+    assert controller.get_all_songs() == []
+    assert controller.get_cache_stats()["misses"] == 1
+
+    controller.save_song(Song("Test Song", "Test Artist"), is_custom=True)
+    controller.save_song(Song("Other Song", "Test Artist"), is_custom=True)
+    song = controller.get_song("Test Song", "Test Artist")
+    song.notes = "Updated"
+    controller.update_song_info(song)
+    controller.delete_song("Other Song", "Test Artist")
+
+    songs = controller.get_all_songs()
+    assert [(s.title, s.notes) for s in songs] == [("test song", "Updated")]
+    assert [s.title for s in controller.search_songs("TEST")] == ["test song"]
+    stats = controller.get_cache_stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 2
+    assert stats["size"] == 1
+
+
+def test_failed_update_is_rolled_back(library_controller):
+    """Test that a failed update doesn't leave half its changes pending"""
+    controller = library_controller
+    controller.save_song(Song("Test Song", "Test Artist"), is_custom=True)
+
+    def fail_halfway(cursor, song):
+        cursor.execute("UPDATE songs SET notes = 'half done'")
+        raise RuntimeError("disk full")
+
+    song = controller.get_song("Test Song", "Test Artist")
+    song.notes = "Updated"
+    with patch("controllers.song_controller.update_song_info", fail_halfway):
+        assert controller.update_song_info(song)[0] is False
+    assert not controller.conn.in_transaction
+    assert controller.get_song("Test Song", "Test Artist").notes != "half done"
+
+
+def test_song_cache_reloads_on_external_change(tmp_path):
+    """Test that a commit from another connection invalidates the cache"""
+    import sqlite3
+    db_path = str(tmp_path / "songs.db")
+    with patch("controllers.song_controller.get_default_db_path",
+               return_value=db_path):
+        controller = SongController()
+    try:
+        assert controller.get_all_songs() == []
+        assert controller.get_all_songs() == []
+
+        other = sqlite3.connect(db_path)
+        other.execute(
+            "INSERT INTO songs (title, artist, title_key, artist_key) "
+            "VALUES ('new song', 'new artist', 'new song', 'new artist')"
+        )
+        other.commit()
+        other.close()
+
+        assert [s.title for s in controller.get_all_songs()] == ["new song"]
+        assert controller.get_cache_stats()["misses"] == 2
+    finally:
+        controller.conn.close()
+
+
+def test_filter_songs_uses_text_index(library_controller):
+    """Test that substring filters stay correct as songs are written"""
+    controller = library_controller
+    controller.save_song(Song("Black Dog", "Led Zeppelin", album="IV"),
+                         is_custom=True)
+    assert [s.title for s in controller.filter_songs(artist="zep")] == ["black dog"]
+
+    controller.save_song(Song("Rock and Roll", "Led Zeppelin", album="IV"),
+                         is_custom=True)
+    song = controller.get_song("Black Dog", "Led Zeppelin")
+    song.progress = "Mastered"
+    controller.update_song_info(song)
+    assert [s.title for s in controller.filter_songs(
+        album="iv", exclude_mastered=True)] == ["rock and roll"]
+
+    controller.delete_song("Rock and Roll", "Led Zeppelin")
+    assert [s.title for s in controller.filter_songs(title="roll")] == []
+
+
+def test_find_similar_songs(library_controller):
+    """Test that close spellings of saved songs are suggested"""
+    controller = library_controller
+    controller.save_song(Song("Black Dog", "Led Zeppelin"), is_custom=True)
+    assert [s.title for s in controller.find_similar_songs(
+        "Blak Dog", "Led Zepelin")] == ["black dog"]
+
+    controller.save_song(Song("Paranoid", "Black Sabbath"), is_custom=True)
+    assert [s.title for s in controller.fuzzy_search_songs("sabath")] == [
+        "paranoid"
+    ]
+    controller.delete_song("Paranoid", "Black Sabbath")
+    assert controller.fuzzy_search_songs("sabath") == []
+
+
+def test_sample_songs(library_controller):
+    """Test that practice sets are random, filtered and reproducible"""
+    controller = library_controller
+    for i in range(20):
+        controller.save_song(
+            Song(f"Song {i}", "Artist", progress="Mastered" if i % 2 else "Learning"),
+            is_custom=True,
+        )
+
+    controller.set_random_seed(7)
+    first = [s.title for s in controller.sample_songs(5, exclude_mastered=True)]
+    controller.set_random_seed(7)
+    again = [s.title for s in controller.sample_songs(5, exclude_mastered=True)]
+    assert first == again
+    assert len(set(first)) == 5
+    assert all(int(title.split()[1]) % 2 == 0 for title in first)
+
+    assert len(controller.sample_songs(50, weighting="progress")) == 20
+    assert controller.sample_songs(3, title="missing") == []
+
+    # Songs practiced just now are the least likely to come up again
+    for i in range(1, 20):
+        controller.record_practice(f"Song {i}", "Artist", 4)
+    picks = [controller.sample_songs(1, weighting="staleness")[0].title
+             for _ in range(20)]
+    assert picks.count("song 0") >= 8
+
+
+def test_songs_marked_mastered_are_scheduled(library_controller):
+    """Test that songs added or edited as Mastered come due within weeks"""
+    controller = library_controller
+    controller.save_song(Song("Black Dog", "Led Zeppelin", progress="Mastered"),
+                         is_custom=True)
+    controller.save_song(Song("Paranoid", "Black Sabbath"), is_custom=True)
+    assert controller.get_review_state("Paranoid", "Black Sabbath") is None
+
+    song = controller.get_song("Paranoid", "Black Sabbath")
+    song.progress = "Mastered"
+    assert controller.update_song_info(song)[0]
+    later = time.time() + 22 * 24 * 60 * 60
+    assert sorted(s.title for s in controller.get_due_songs(now=later)) == [
+        "black dog", "paranoid"
+    ]
+    # Editing a scheduled song again keeps its schedule
+    state = controller.get_review_state("Paranoid", "Black Sabbath")
+    song.notes = "Riff: E5 D5"
+    controller.update_song_info(song)
+    assert controller.get_review_state("Paranoid", "Black Sabbath") == state
+
+
+def test_record_practice(library_controller):
+    """Test that practice sessions schedule songs and update their progress"""
+    controller = library_controller
+    controller.save_song(Song("Black Dog", "Led Zeppelin"), is_custom=True)
+    controller.save_song(Song("Paranoid", "Black Sabbath"), is_custom=True)
+    day = 24 * 60 * 60
+
+    success, message = controller.record_practice("Black Dog", "Led Zeppelin", 4,
+                                                  now=0)
+    assert success
+    assert message == "Next practice in 1 day"
+    assert controller.get_song("Black Dog", "Led Zeppelin").progress == "Learning"
+    assert [s.progress for s in controller.get_all_songs()
+            if s.title == "black dog"] == ["Learning"]
+
+    assert controller.get_due_songs(now=day / 2) == []
+    controller.record_practice("Paranoid", "Black Sabbath", 1, now=day / 4)
+    assert [s.title for s in controller.get_due_songs(now=2 * day)] == [
+        "black dog", "paranoid"
+    ]
+    assert controller.count_due_songs(now=2 * day) == 2
+    # Both were practiced long ago, so both are due now
+    assert [s.title for s in controller.filter_songs(
+        due_only=True, artist="zep")] == ["black dog"]
+
+    assert controller.record_practice("Missing", "Nobody", 4)[0] is False
+
+
+def test_plan_practice(library_controller):
+    """Test planning a session from the library"""
+    controller = library_controller
+    for i, tuning in enumerate(["Drop D", "E Standard", "Drop D", "E Standard"]):
+        controller.save_song(
+            Song(f"Song {i}", "Artist", tuning=tuning, duration="240000"),
+            is_custom=True,
+        )
+    controller.record_practice("Song 1", "Artist", 1, now=0)
+
+    plan = controller.plan_practice(10)
+    assert len(plan.songs) == 2
+    assert plan.songs[0].title == "song 1"  # due songs come first
+    assert plan.tuning_changes == 0
+    assert plan.total_seconds == 480
+
+
+def test_filter_songs_by_tuning(library_controller):
+    """Test filtering by canonical tuning and by nearby tunings"""
+    controller = library_controller
+    for i, tuning in enumerate(["DADGBE", "drop d", "E Standard", "DADGAD",
+                                "Open G"]):
+        controller.save_song(Song(f"Song {i}", "Artist", tuning=tuning),
+                             is_custom=True)
+
+    def titles(songs):
+        return sorted(song.title for song in songs)
+
+    assert controller.get_unique_tunings() == [
+        "DADGAD", "Drop D", "E Standard", "Open G"
+    ]
+    assert titles(controller.filter_songs(tunings={"Drop D"})) == [
+        "song 0", "song 1"
+    ]
+    # The text index path matches canonical tunings too
+    assert titles(controller.filter_songs(artist="art", tunings={"drop d"})) == [
+        "song 0", "song 1"
+    ]
+    assert controller.get_tunings_near("Drop D") == ["Drop D", "E Standard"]
+    assert titles(controller.filter_songs(near_tuning="DADGBE")) == [
+        "song 0", "song 1", "song 2"
+    ]
+    assert titles(controller.filter_songs(
+        near_tuning="Drop D", max_string_changes=2, tunings={"DADGAD"}
+    )) == ["song 3"]
+    assert controller.filter_songs(near_tuning="Drop D", tunings={"Open G"}) == []
+    assert len(controller.sample_songs(5, near_tuning="Drop D")) == 3
+    assert controller.get_tuning_stats() == {
+        "Drop D": 2, "E Standard": 1, "DADGAD": 1, "Open G": 1
+    }
+
+
+def test_chord_searches(library_controller):
+    """Test finding songs by chord and by progression"""
+    controller = library_controller
+    notes = {
+        "Let It Be": "Verse: C G Am F\nChorus: Am G F C",
+        "Stand By Me": "A A F#m F#m D E A",
+        "Wonderwall": "Em7 G Dsus4 A7sus4",
+        "No Chords": "Practice slowly",
+    }
+    for title, text in notes.items():
+        controller.save_song(Song(title, "Artist", notes=text), is_custom=True)
+
+    assert controller.analyze_chords(limit=2) == 2
+    assert controller.analyze_chords() == 0
+    assert controller.get_song_key("Let It Be", "Artist") == "C major"
+
+    def titles(songs):
+        return sorted(song.title for song in songs)
+
+    assert titles(controller.find_songs_with_progression("I–V–vi–IV")) == [
+        "let it be"
+    ]
+    assert titles(controller.find_songs_with_progression("I vi IV V I")) == [
+        "stand by me"
+    ]
+    assert controller.find_songs_with_progression("I vi IV V vi") == []
+    assert titles(controller.find_songs_with_chord("Em")) == ["wonderwall"]
+    assert controller.find_songs_with_chord("not a chord") == []
+
+    # Edited notes are picked up by the next query
+    song = controller.get_song("No Chords", "Artist")
+    song.notes = "Intro: Em"
+    controller.update_song_info(song)
+    assert titles(controller.find_songs_with_chord("Em")) == [
+        "no chords", "wonderwall"
+    ]
+
+
+def test_tag_similarity_and_recommendations(library_controller):
+    """Test finding songs like a song and suggesting what to learn next"""
+    controller = library_controller
+    tracks = {
+        "Lithium": [("grunge", 100), ("rock", 60)],
+        "Black": [("grunge", 90), ("rock", 50)],
+        "Hurt": [("grunge", 40), ("blues", 10)],
+    }
+    for title, tags in tracks.items():
+        track_info = TrackInfo(title, "Artist", "Album", 0, tuple(tags), ())
+        with patch.object(controller, "get_track_info", return_value=track_info):
+            assert controller.save_song(Song(title, "Artist"))[0]
+    controller.save_song(
+        Song("Sunny", "Artist", genres=["Jazz"], progress="Learning"), is_custom=True
+    )
+
+    assert controller.get_tag_matrix().vector(
+        ("main", "lithium", "artist")
+    ).keys() == {"grunge", "rock"}
+    assert [s.title for s in controller.find_songs_like("Lithium", "Artist")] == [
+        "black", "hurt"
+    ]
+
+    # The matrix follows saves, edits and deletes without a rebuild
+    matrix = controller.get_tag_matrix()
+    controller.save_song(
+        Song("Autumn", "Artist", genres=["Jazz"]), is_custom=True
+    )
+    assert [s.title for s in controller.recommend_songs()] == ["autumn"]
+    song = controller.get_song("Black", "Artist")
+    song.progress = "Learning"
+    controller.update_song_info(song)
+    suggestions = [s.title for s in controller.recommend_songs()]
+    assert sorted(suggestions[:2]) == ["autumn", "lithium"]
+    assert suggestions[2:] == ["hurt"]
+    controller.delete_song("Hurt", "Artist")
+    assert [s.title for s in controller.find_songs_like("Lithium", "Artist")] == [
+        "black"
+    ]
+    assert controller.get_tag_matrix() is matrix
+
+
+def test_find_and_merge_duplicates(library_controller):
+    """Test finding duplicate songs and merging them in one transaction"""
+    controller = library_controller
+    controller.save_song(Song("Lithium", "Nirvana", notes="Verse: Em G"),
+                         is_custom=True)
+    controller.save_song(Song("Lithium (Remastered)", "Nirvana", notes="Chorus: D C",
+                              progress="Learning"), is_custom=True)
+    controller.save_song(Song("Black", "Pearl Jam"), is_custom=True)
+
+    groups = controller.find_duplicate_songs()
+    assert len(groups) == 1
+    keep, duplicate = groups[0].songs
+    assert keep.title == "lithium (remastered)"
+
+    with patch("controllers.song_controller.merge_songs",
+               side_effect=RuntimeError("disk full")):
+        assert not controller.merge_songs(keep, [duplicate])[0]
+    assert controller.get_song_count() == 3
+
+    success, _ = controller.merge_songs(keep, [duplicate])
+    assert success
+    assert sorted(song.title for song in controller.get_all_songs()) == [
+        "black", "lithium (remastered)"
+    ]
+    merged = controller.get_song("Lithium (Remastered)", "Nirvana")
+    assert merged.notes == "Chorus: D C\n\nVerse: Em G"
+    assert merged.progress == "Learning"
+    assert controller.find_duplicate_songs() == []
+    assert not controller.merge_songs(keep, [keep])[0]
+
+
+def test_enrich_pending_songs_by_album(library_controller):
+    """Test that pending songs of one album cost a single album lookup"""
+    controller = library_controller
+    controller.save_song(Song("Breed", "Nirvana", album="Nevermind"), is_custom=True)
+    for song in [Song("Lithium", "Nirvana", album="Nevermind"),
+                 Song("Polly", "Nirvana", album="nevermind", duration=1000),
+                 Song("Drain You", "Nirvana", album="Nevermind"),
+                 Song("Creep", "Radiohead"),
+                 Song("Missing", "Nobody")]:
+        assert controller.save_song(song, enrich_later=True)[0]
+    assert controller.count_pending_songs() == 5
+    assert controller.get_song("Lithium", "Nirvana").duration is None
+
+    nevermind = AlbumInfo(
+        "Nevermind", "Nirvana",
+        (("Breed", 183000), ("Lithium", 257000), ("Polly", 177000)),
+        (("grunge", 100.0),), ("cover.jpg",),
+    )
+    creep = TrackInfo("Creep", "Radiohead", "Pablo Honey", 238000, (), ())
+    with patch("controllers.song_controller.get_album",
+               return_value=nevermind) as mock_get_album, \
+            patch("controllers.song_controller.lookup_track",
+                  side_effect=lambda artist, track:
+                  creep if track == "Creep" else None) as mock_get_track, \
+            patch.object(controller, "fetch_and_cache_album_art") as mock_fetch_art, \
+            patch.object(controller, "get_cached_album_art",
+                         side_effect=[None, "cover.jpg", "cover.jpg"]):
+        assert controller.enrich_pending_songs() == (4, 2)
+
+    mock_get_album.assert_called_once_with("Nirvana", "Nevermind")
+    # Drain You isn't on the album as Last.fm knows it
+    assert sorted(call.args[1] for call in mock_get_track.call_args_list) == [
+        "Creep", "Drain You", "Missing"
+    ]
+    mock_fetch_art.assert_called_once_with("cover.jpg", "Nevermind")
+    assert controller.get_song("Breed", "Nirvana").duration == "183000"
+    assert controller.get_song("Lithium", "Nirvana").genres == ["grunge"]
+    assert controller.get_song("Polly", "Nirvana").duration == "1000"
+    assert controller.get_song("Creep", "Radiohead").album == "Pablo Honey"
+    assert get_tag_weights(controller.cursor, "Lithium", "Nirvana") == {
+        "grunge": 100.0
+    }
+
+    # Songs Last.fm doesn't know are given up on after a few attempts
+    with patch("controllers.song_controller.lookup_track", return_value=None):
+        assert controller.enrich_pending_songs() == (0, 2)
+        assert controller.enrich_pending_songs() == (0, 0)
+
+
+class FakeAsyncClient:
+    """Async client answering lookups with canned responses"""
+
+    def __init__(self, albums, tracks):
+        self.albums = albums
+        self.tracks = tracks
+        self.lookups = []
+
+    async def get_album_info(self, artist, album):
+        self.lookups.append(album)
+        return self.albums.get(album)
+
+    async def get_track_info(self, artist, track):
+        self.lookups.append(track)
+        await asyncio.sleep(0)
+        response = self.tracks.get(track, {"error": 6, "message": "Not found"})
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def test_fetch_and_apply_pending_details(library_controller):
+    """
+    Test that pending songs are looked up with an async client away from
+    the database, and that only what was found is saved.
+    """
+    controller = library_controller
+    for song in [Song("Lithium", "Nirvana", album="Nevermind"),
+                 Song("Breed", "Nirvana", album="Nevermind"),
+                 Song("Creep", "Radiohead"),
+                 Song("Missing", "Nobody"),
+                 Song("Down", "Offline")]:
+        assert controller.save_song(song, enrich_later=True)[0]
+    client = FakeAsyncClient(
+        {"Nevermind": {"album": {
+            "name": "Nevermind", "artist": "Nirvana",
+            "tracks": {"track": [{"name": "Breed", "duration": 183},
+                                 {"name": "Lithium", "duration": 257}]},
+        }}},
+        {"Creep": {"track": {"name": "Creep", "artist": {"name": "Radiohead"},
+                             "album": {"title": "Pablo Honey"},
+                             "duration": "238000"}},
+         "Down": requests.exceptions.ConnectionError("offline")},
+    )
+    details = asyncio.run(controller.fetch_pending_details(
+        client, controller.get_pending_songs()
+    ))
+    assert sorted(client.lookups) == ["Creep", "Down", "Missing", "Nevermind"]
+    assert isinstance(details["down", "offline"], requests.exceptions.ConnectionError)
+
+    # Songs queued while the lookups ran are left for the next pass
+    controller.save_song(Song("Late", "Someone"), enrich_later=True)
+    with patch.object(controller, "fetch_and_cache_album_art") as mock_fetch_art:
+        assert controller.apply_pending_details(details) == (3, 3)
+    mock_fetch_art.assert_not_called()
+    assert controller.get_song("Lithium", "Nirvana").duration == "257000"
+    assert controller.get_song("Creep", "Radiohead").album == "Pablo Honey"
+    assert sorted(
+        (song.title, attempts)
+        for song, attempts in get_pending_songs(controller.cursor)
+    ) == [("down", 0), ("late", 0), ("missing", 1)]
+
+
+def test_enrich_album_rolls_back_as_a_whole(library_controller):
+    """Test that an album that fails halfway leaves none of its songs changed"""
+    controller = library_controller
+    for title in ["Breed", "Lithium"]:
+        controller.save_song(Song(title, "Nirvana", album="Nevermind"),
+                             enrich_later=True)
+    nevermind = AlbumInfo("Nevermind", "Nirvana",
+                          (("Breed", 183000), ("Lithium", 257000)), (), ())
+    with patch("controllers.song_controller.get_album", return_value=nevermind), \
+            patch("controllers.song_controller.finish_enrichment",
+                  side_effect=[None, RuntimeError("disk full")]):
+        assert not controller.enrich_album("Nirvana", "Nevermind")[0]
+    assert controller.get_song("Breed", "Nirvana").duration is None
+    assert controller.count_pending_songs() == 2
+
+
+def test_save_song_when_lastfm_is_unavailable(library_controller):
+    """
+    Test that songs are saved for later enrichment when Last.FM fails or
+    doesn't answer within the lookup budget.
+    """
+    controller = library_controller
+    with patch("controllers.song_controller.lookup_track",
+               side_effect=CircuitOpenError("circuit open")):
+        success, message = controller.save_song(Song("Lithium", "Nirvana"))
+    assert success is True
+    assert "fetched later" in message
+    assert controller.count_pending_songs() == 1
+
+    answered = threading.Event()
+
+    def slow_lookup(artist, track):
+        answered.wait(5)
+
+    with patch("controllers.song_controller.LOOKUP_BUDGET", 0.1), \
+            patch("controllers.song_controller.lookup_track", slow_lookup):
+        start = time.perf_counter()
+        success, _ = controller.save_song(Song("Creep", "Radiohead"))
+        assert time.perf_counter() - start < 1
+        answered.set()
+    assert success is True
+    assert controller.count_pending_songs() == 2
+
+    # The pass over pending songs stops while Last.FM is unavailable
+    with patch("controllers.song_controller.lookup_track",
+               side_effect=requests.exceptions.ConnectTimeout("timeout")):
+        assert controller.enrich_pending_songs() == (0, 2)
+    assert [attempts for _, attempts in get_pending_songs(controller.cursor)] == [
+        0, 0
+    ]
@@ -0,0 +1,90 @@
+import os
+import sys
+import pytest
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.song_table import SongTable  # noqa: E402 - Import not at top of file
+from services.db import (  # noqa: E402 - Import not at top of file
+    LIBRARY_VIEW,
+    create_library_view,
+    save_song,
+)
+from models.song import Song  # noqa: E402 - Import not at top of file
+
+
+@pytest.fixture
+def song_table(db_cursor):
+    """A table built from a small in-memory library"""
+    songs = [
+        Song("Black Dog", "Led Zeppelin", tuning="E Standard", album="IV",
+             duration="296000", genres=["Rock", "Hard Rock"], progress="Mastered"),
+        Song("Rain Song", "Led Zeppelin", tuning="Open G", album="Houses",
+             duration="459000", genres=["Rock"], progress="Learning"),
+        Song("Everlong", "Foo Fighters", tuning="Drop D", album="The Colour",
+             duration="250000", genres=["Alternative"]),
+        Song("Custom", "Me"),
+    ]
+    for song in songs:
+        save_song(db_cursor, song)
+    create_library_view(db_cursor, ["main"])
+    return SongTable.from_cursor(db_cursor, LIBRARY_VIEW)
+
+
+def titles(table, mask):
+    return [song.title for song in table.to_songs(mask.nonzero()[0])]
+
+
+def test_columns_are_encoded(song_table):
+    assert len(song_table) == 4
+    assert song_table.artists[song_table.artist_codes[0]] == "led zeppelin"
+    assert song_table.artist_codes[0] == song_table.artist_codes[1]
+    assert song_table.durations.tolist() == [296000, 459000, 250000, 0]
+    matrix = song_table.genre_matrix()
+    assert matrix.shape == (4, 3)
+    assert matrix.sum(axis=1).tolist() == [2, 1, 1, 0]
+
+
+def test_stats(song_table):
+    assert song_table.progress_counts() == {
+        "Not Started": 2, "Learning": 1, "Mastered": 1
+    }
+    assert song_table.tuning_counts() == {"E Standard": 1, "Open G": 1, "Drop D": 1}
+    assert song_table.genre_counts() == {"Rock": 2, "Hard Rock": 1, "Alternative": 1}
+
+
+def test_filters(song_table):
+    assert titles(song_table, song_table.filter(artist="ZEPP")) == [
+        "black dog", "rain song"
+    ]
+    assert titles(song_table, song_table.filter(title="song")) == ["rain song"]
+    assert titles(song_table, song_table.filter(album="colour")) == ["everlong"]
+    assert titles(song_table, song_table.filter(genre="rock")) == [
+        "black dog", "rain song"
+    ]
+    assert titles(song_table, song_table.filter(tunings={"Drop D", "Open G"})) == [
+        "rain song", "everlong"
+    ]
+    assert titles(song_table, song_table.filter(
+        artist="led", exclude_mastered=True)) == ["rain song"]
+    assert not song_table.filter(title="nope").any()
+
+
+def test_to_songs_round_trip(song_table):
+    song = song_table.to_songs([0])[0]
+    assert song.genres == ["Rock", "Hard Rock"]
+    assert song.progress == "Mastered"
+    assert song.library == "main"
+
+    custom = song_table.to_songs([3])[0]
+    assert custom.tuning is None
+    assert custom.genres == []
+
+
+def test_empty_table():
+    table = SongTable([])
+    assert len(table) == 0
+    assert table.progress_counts() == {"Not Started": 0, "Learning": 0, "Mastered": 0}
+    assert table.genre_counts() == {}
+    assert not table.filter(artist="x").any()
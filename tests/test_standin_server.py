@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+
+import pytest
+import requests
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.lastfm_api import LastFmClient  # noqa: E402 - Import not at top of file
+from services.standin_server import StandInServer  # noqa: E402
+from services.transport import Recording, request_key  # noqa: E402
+
+
+def make_recording():
+    recording = Recording()
+    recording.add_json(
+        request_key("/2.0/", {"method": "track.getInfo", "artist": "Nirvana",
+                              "track": "Lithium", "format": "json"}),
+        {"track": {"name": "Lithium", "album": {"title": "Nevermind"}}},
+    )
+    recording.add("/art/cover.jpg", 200, b"\xff\xd8\xff\xe0",
+                  {"Content-Type": "image/jpeg"})
+    return recording
+
+
+def test_serves_recorded_responses():
+    """
+    Test that recorded API calls and images are served, and that unknown
+    tracks get Last.fm's not found error.
+    """
+    with StandInServer(make_recording(), latency=0.05) as server:
+        client = LastFmClient("key", api_root=server.api_root)
+        start = time.perf_counter()
+        track_info = client.get_track_info("Nirvana", "Lithium")
+        assert time.perf_counter() - start >= 0.05
+        assert track_info["track"]["album"]["title"] == "Nevermind"
+        assert client.call("track.getInfo", artist="Nirvana",
+                           track="Unknown")["error"] == 6
+        assert client.fetch_image(server.url + "/art/cover.jpg") == (
+            b"\xff\xd8\xff\xe0"
+        )
+        with pytest.raises(requests.exceptions.HTTPError):
+            client.fetch_image(server.url + "/art/missing.jpg")
+        client.close()
+        assert server.get_stats() == {"requests": 4, "replayed": 2, "missing": 2,
+                                      "errors": 0, "rate_limited": 0}
+
+
+def test_errors_and_rate_limits():
+    """
+    Test the injected server errors, 429 bursts and rate limit.
+    """
+    url = "/2.0/?method=track.getInfo&artist=Nirvana&track=Lithium&format=json"
+
+    def statuses(server, count):
+        try:
+            return [server.respond(url)[0] for _ in range(count)]
+        finally:
+            server.stop()
+
+    flaky = statuses(StandInServer(make_recording(), error_rate=0.5, seed=1), 200)
+    assert 60 < flaky.count(503) < 140
+    assert set(flaky) == {200, 503}
+    assert flaky == statuses(
+        StandInServer(make_recording(), error_rate=0.5, seed=1), 200
+    )
+
+    server = StandInServer(make_recording(), burst_every=10.0, burst_length=2.0)
+    server._started = time.monotonic() - 8.5
+    status, headers, _ = server.respond(url)
+    assert (status, headers["Retry-After"]) == (429, "2")
+    server._started = time.monotonic() - 5
+    assert statuses(server, 1) == [200]
+
+    server = StandInServer(make_recording(), rate_limit=3)
+    assert statuses(server, 5) == [200, 200, 200, 429, 429]
+    assert server.get_stats()["rate_limited"] == 2
@@ -26,6 +26,7 @@ def stats_dialog(qtbot):
 
     # Set up mock return values with actual data
     controller.get_all_songs.return_value = mock_songs
+    controller.get_song_count.return_value = len(mock_songs)
     controller.get_progress_stats.return_value = {
         "Not Started": 1,
         "Learning": 1,
@@ -0,0 +1,79 @@
+import os
+import sys
+
+import numpy as np
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.tag_vectors import TagMatrix, normalize_tag  # noqa: E402
+
+
+def build():
+    matrix = TagMatrix()
+    matrix.add("grunge", {"Grunge": 100, "rock": 60, "90s": 20})
+    matrix.add("grunge 2", {"grunge": 90, "rock": 50})
+    matrix.add("blues", {"blues": 100, "rock": 10})
+    matrix.add("jazz", {"jazz": 100})
+    return matrix
+
+
+def brute_force_cosine(matrix, a, b):
+    va, vb = matrix.vector(a), matrix.vector(b)
+    dot = sum(va[t] * vb.get(t, 0.0) for t in va)
+    return dot / (np.linalg.norm(list(va.values())) * np.linalg.norm(list(vb.values())))
+
+
+def test_normalize_tag():
+    """Test that tags match regardless of case and spacing"""
+    assert normalize_tag("  Classic   Rock ") == "classic rock"
+
+
+def test_similar_ranks_by_cosine():
+    """Test that neighbours come back closest first with exact cosines"""
+    matrix = build()
+    results = matrix.similar("grunge", limit=5)
+    assert [key for _, key in results] == ["grunge 2", "blues"]
+    for score, key in results:
+        assert np.isclose(score, brute_force_cosine(matrix, "grunge", key))
+    assert matrix.similar("jazz") == []
+    assert matrix.similar("missing") == []
+    assert len(matrix.similar("grunge", limit=1)) == 1
+
+
+def test_incremental_updates():
+    """Test adding, replacing and removing songs"""
+    matrix = build()
+    matrix.add("blues", {"grunge": 100, "rock": 60, "90s": 20})
+    assert [key for _, key in matrix.similar("grunge")][0] == "blues"
+    matrix.remove("blues")
+    assert "blues" not in matrix
+    assert [key for _, key in matrix.similar("grunge")] == ["grunge 2"]
+    matrix.add("empty", {})
+    assert "empty" not in matrix
+    assert len(matrix) == 3
+
+
+def test_recommend_only_returns_candidates():
+    """Test ranking candidates against a profile of seed songs"""
+    matrix = build()
+    results = matrix.recommend({"grunge": 1.0}, ["blues", "jazz", "grunge 2"])
+    assert [key for _, key in results] == ["grunge 2", "blues"]
+    assert matrix.recommend({}, ["blues"]) == []
+    assert matrix.recommend({"grunge": 1.0}, ["grunge 2"], limit=0) == []
+
+
+def test_bulk_load_matches_adding():
+    """Test that building from many songs at once equals adding them"""
+    songs = [
+        ("grunge", {"Grunge": 100, "rock": 60, "90s": 20}),
+        ("grunge 2", {"grunge": 90, "rock": 50}),
+        ("blues", {"blues": 100, "rock": 10}),
+        ("jazz", {"jazz": 100}),
+        ("empty", {}),
+    ]
+    bulk = TagMatrix(songs)
+    assert len(bulk) == 4
+    assert bulk.similar("grunge") == build().similar("grunge")
+    bulk.add("blues 2", {"blues": 50})
+    assert [key for _, key in bulk.similar("blues")][0] == "blues 2"
@@ -0,0 +1,113 @@
+import os
+import sys
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.lastfm_api import LastFmClient  # noqa: E402 - Import not at top of file
+from services.transport import (  # noqa: E402
+    Recording,
+    RecordingTransport,
+    ReplayTransport,
+    create_transport,
+    request_key,
+)
+
+TRACK_INFO = {"track": {
+    "name": "Lithium",
+    "album": {"title": "Nevermind", "image": [{"#text": "large.jpg"}]},
+}}
+
+
+def test_request_key_ignores_host_order_and_credentials():
+    """
+    Test that request keys match across hosts, parameter order and API keys.
+    """
+    key = request_key("https://ws.audioscrobbler.com/2.0/",
+                      {"method": "track.getInfo", "track": "Lithium",
+                       "artist": "Nirvana", "api_key": "secret"})
+    assert key == "/2.0/?artist=Nirvana&method=track.getInfo&track=Lithium"
+    assert request_key(
+        "http://127.0.0.1:8000/2.0/?track=Lithium&api_key=other"
+        "&method=track.getInfo&artist=Nirvana"
+    ) == key
+    assert request_key("https://example.com/art/cover.jpg") == "/art/cover.jpg"
+
+
+def make_response(status_code, content, headers=None):
+    response = Mock(status_code=status_code, content=content)
+    response.headers = headers or {}
+    return response
+
+
+def test_record_then_replay(tmp_path):
+    """
+    Test that responses recorded through a session replay without one, in
+    order, with binary bodies and Retry-After headers intact.
+    """
+    path = str(tmp_path / "fixtures.json")
+    session = Mock()
+    session.get.side_effect = [
+        make_response(429, b"", {"Retry-After": "2", "Set-Cookie": "x"}),
+        make_response(200, b'{"track": {"name": "Lithium"}}',
+                      {"Content-Type": "application/json"}),
+        make_response(200, b"\xff\xd8\xff\xe0"),
+    ]
+    transport = RecordingTransport(path, session=session)
+    params = {"method": "track.getInfo", "artist": "Nirvana", "track": "Lithium",
+              "api_key": "secret"}
+    transport.get("https://ws.audioscrobbler.com/2.0/", params=params, timeout=5)
+    transport.get("https://ws.audioscrobbler.com/2.0/", params=params, timeout=5)
+    transport.get("https://example.com/cover.jpg", timeout=5)
+    transport.close()
+    assert session.get.call_args_list[0].kwargs["timeout"] == 5
+    with open(path) as f:
+        assert "secret" not in f.read()
+
+    replay = ReplayTransport(path)
+    url = "http://127.0.0.1:8000/2.0/"
+    params["api_key"] = "other"
+    first = replay.get(url, params=params)
+    assert first.status_code == 429
+    assert first.headers["retry-after"] == "2"
+    assert "Set-Cookie" not in first.headers
+    for _ in range(2):
+        assert replay.get(url, params=params).json() == {"track": {"name": "Lithium"}}
+    assert replay.get("http://images/cover.jpg").content == b"\xff\xd8\xff\xe0"
+    with pytest.raises(requests.exceptions.ConnectionError):
+        replay.get(url, params={"method": "track.getInfo", "track": "Unknown"})
+    assert (replay.replayed, replay.missing) == (4, 1)
+
+
+def test_client_replays_retries(monkeypatch):
+    """
+    Test that the client runs over a replay transport, retries included.
+    """
+    monkeypatch.setattr("services.lastfm_api.time.sleep", lambda seconds: None)
+    recording = Recording()
+    key = request_key("/2.0/", {"method": "track.getInfo", "artist": "Nirvana",
+                                "track": "Lithium", "format": "json"})
+    recording.add(key, 503, b"")
+    recording.add_json(key, TRACK_INFO)
+    client = LastFmClient("key", session=ReplayTransport(recording))
+    assert client.get_track_info("Nirvana", "Lithium")["album_art_url"] == (
+        "large.jpg"
+    )
+    assert client.retries == 1
+
+
+def test_create_transport(tmp_path):
+    """
+    Test creating transports from the LASTFM_TRANSPORT setting.
+    """
+    path = str(tmp_path / "fixtures.json")
+    assert create_transport(None) is None
+    assert isinstance(create_transport(f"record:{path}"), RecordingTransport)
+    Recording().save(path)
+    assert isinstance(create_transport(f"replay:{path}"), ReplayTransport)
+    with pytest.raises(ValueError):
+        create_transport(f"proxy:{path}")
@@ -0,0 +1,69 @@
+import os
+import sys
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.song import Song  # noqa: E402 - Import not at top of file
+from models.trigram_index import (  # noqa: E402 - Import not at top of file
+    SongTextIndex,
+    TrigramIndex,
+    trigrams,
+)
+
+
+def make_song(title, artist, album=None):
+    return Song(title, artist, album=album, library="main")
+
+
+def test_trigrams():
+    """Test trigram extraction"""
+    assert trigrams("abcd") == {"abc", "bcd"}
+    assert trigrams("ab") == set()
+
+
+def test_trigram_index_verifies_candidates():
+    """Test that candidates sharing trigrams but not the substring are dropped"""
+    index = TrigramIndex()
+    index.add(1, "abcxbcd")
+    index.add(2, "abcd")
+    index.add(3, "abcd")
+    # Both values have "abc" and "bcd", only one contains "abcd"
+    assert index.search("abcd") == {2, 3}
+    assert index.search("bc") == {1, 2, 3}
+    assert index.search("zzz") == set()
+
+    index.remove(2, "abcd")
+    assert index.search("abcd") == {3}
+    index.remove(3, "abcd")
+    assert index.search("abcd") == set()
+
+
+def test_song_text_index_search():
+    """Test combined field search in insertion order"""
+    index = SongTextIndex([
+        make_song("Black Dog", "Led Zeppelin", "IV"),
+        make_song("Rock and Roll", "Led Zeppelin", "IV"),
+        make_song("Paranoid", "Black Sabbath", "Paranoid"),
+    ])
+    assert [s.title for s in index.search(artist="zeppelin")] == [
+        "Black Dog", "Rock and Roll"
+    ]
+    assert [s.title for s in index.search(title="BLACK")] == ["Black Dog"]
+    assert [s.title for s in index.search(artist="led", album="paranoid")] == []
+    assert len(index.search()) == 3
+
+
+def test_song_text_index_updates_in_place():
+    """Test that re-adding a song replaces it and keeps its position"""
+    index = SongTextIndex([
+        make_song("Black Dog", "Led Zeppelin", "IV"),
+        make_song("Paranoid", "Black Sabbath", "Paranoid"),
+    ])
+    index.add(make_song("Black Dog", "Led Zeppelin", "Four"))
+    assert index.search(album="iv") == []
+    assert [s.title for s in index.search(album="o")] == ["Black Dog", "Paranoid"]
+
+    index.remove("main", "BLACK DOG", "led zeppelin")
+    assert [s.title for s in index.search(title="black")] == []
+    assert len(index) == 1
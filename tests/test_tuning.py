@@ -0,0 +1,54 @@
+import os
+import sys
+
+# Make sure project root dir is in PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.tuning import (  # noqa: E402 - Import not at top of file
+    TuningIndex,
+    canonical_tuning_name,
+    parse_tuning,
+    STANDARD,
+)
+
+
+def test_spellings_share_a_canonical_name():
+    """Test that named and spelled-out tunings parse to the same pitches"""
+    for text in ["Drop D", "drop d", "DropD", "DADGBE", "D A D G B E", "dadgbe"]:
+        assert parse_tuning(text) == ("Drop D", (38, 45, 50, 55, 59, 64))
+    for text in ["Standard", "e standard", "EADGBE"]:
+        assert parse_tuning(text) == ("E Standard", STANDARD)
+    for text in ["Eb Standard", "E flat standard", "Half step down",
+                 "EbAbDbGbBbEb", "Eb Ab Db Gb Bb Eb"]:
+        assert canonical_tuning_name(text) == "Eb Standard"
+    assert canonical_tuning_name("CGCFAD") == "Drop C"
+    assert canonical_tuning_name("DGDGBD") == "Open G"
+    assert canonical_tuning_name("DADF#AD") == "Open D"
+    assert canonical_tuning_name("dadgad") == "DADGAD"
+
+
+def test_spelled_out_tunings():
+    """Test that a "b" is read as a flat or a B, whichever makes sense"""
+    assert parse_tuning("BEADGBE").pitches == (35, 40, 45, 50, 55, 59, 64)
+    assert canonical_tuning_name("D A D G A E") == "D A D G A E"
+
+
+def test_unparseable_tunings_keep_their_text():
+    """Test that free-form tunings are cleaned up but not parsed"""
+    assert parse_tuning("weird   tuning") == ("Weird Tuning", None)
+    assert parse_tuning("NSTD12") == ("NSTD12", None)
+    assert parse_tuning("") == ("", None)
+    assert parse_tuning(None) == ("", None)
+
+
+def test_tuning_index_distances():
+    """Test counting retuned strings against every indexed tuning"""
+    index = TuningIndex(["E Standard", "drop d", "DADGAD", "Drop C", "Custom",
+                         "E A D G"])
+    assert index.names == ["E Standard", "Drop D", "DADGAD", "Drop C", "E A D G"]
+    changes, semitones = index.distances("DADGBE")
+    assert changes.tolist() == [1, 0, 2, 6, -1]
+    assert semitones.tolist() == [2, 0, 4, 12, -1]
+    assert index.near("Drop D") == ["Drop D", "E Standard"]
+    assert index.near("Drop D", max_changes=2) == ["Drop D", "E Standard", "DADGAD"]
+    assert index.near("Custom") == []
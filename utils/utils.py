@@ -47,6 +47,11 @@ def get_default_db_path():
     return os.path.join(get_app_data_dir(), "songs.db")
 
 
+def get_response_cache_path():
+    """Get the path to the cache of Last.fm API responses"""
+    return os.path.join(get_app_data_dir(), "lastfm_cache.db")
+
+
 def get_resource_path(relative_path):
     """
     Get the absolute path to a resource file.
@@ -90,17 +95,3 @@ def get_cached_album_art(album_name, cache_dir):
 
     album_art_path = os.path.join(cache_dir, f"{album_name}.jpg")
     return album_art_path if os.path.exists(album_art_path) else None
-
-
-def save_settings(api_key, api_secret):
-    """
-    Save API settings to the settings file.
-
-    Args:
-        api_key (str): The Last.fm API key
-        api_secret (str): The Last.fm API secret
-    """
-    settings_path = get_settings_path()
-    with open(settings_path, 'w') as f:
-        f.write(f"API_KEY={api_key}\n")
-        f.write(f"API_SECRET={api_secret}\n")
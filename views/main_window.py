@@ -29,14 +29,20 @@ from PyQt6.QtWidgets import (
     QSpinBox,
     QGroupBox,
     QMenu,
+    QFileDialog,
 )
-from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtCore import Qt, QThreadPool, QTimer, pyqtSignal
 from PyQt6.QtGui import QPixmap, QAction, QColor, QBrush
 
 from controllers.song_controller import SongController
 from models.song import Song
-from utils.utils import setup_logging, get_settings_path
-from dotenv import load_dotenv
+from models.sampler import UNIFORM, BY_PROGRESS, BY_TUNING, BY_STALENESS
+from models.review import AGAIN, HARD, GOOD, EASY
+from models.tuning import canonical_tuning_name
+from services.async_bridge import AsyncBridge
+from services.async_lastfm import create_async_client
+from services.settings import API_KEY, API_SECRET, get_settings
+from utils.utils import setup_logging
 
 setup_logging()
 
@@ -46,6 +52,11 @@ class SongApp(QMainWindow):
     Main app class.
     """
 
+    # Names of changed settings, see on_settings_changed
+    settings_changed = pyqtSignal(object)
+    # Songs read off the GUI thread, see reconcile_songs
+    library_read = pyqtSignal(object)
+
     # Add progress colors as class constants
     PROGRESS_COLORS = {
         "Not Started": QColor("#808080"),  # Gray
@@ -53,6 +64,29 @@ class SongApp(QMainWindow):
         "Mastered": QColor("#32CD32"),     # Green
     }
 
+    # Choices for weighting random songs in the Select Songs dialog
+    WEIGHTING_LABELS = {
+        "At random": UNIFORM,
+        "Favor songs I'm learning": BY_PROGRESS,
+        "Favor common tunings": BY_TUNING,
+        "Favor songs I haven't played lately": BY_STALENESS,
+    }
+
+    # How a practice session went, as offered in the song context menu
+    PRACTICE_GRADES = {
+        "Forgot It": AGAIN,
+        "Hard": HARD,
+        "Good": GOOD,
+        "Easy": EASY,
+    }
+
+    # Search prefixes answered from the chord index, and the controller
+    # method for each
+    CHORD_SEARCHES = {
+        "chord": "find_songs_with_chord",
+        "progression": "find_songs_with_progression",
+    }
+
     def __init__(self):
         """
         Init main window and set up the UI.
@@ -63,16 +97,25 @@ class SongApp(QMainWindow):
         self.setMinimumSize(800, 600)
         logging.debug("Initializing main window")
 
-        # Load settings
-        settings_path = get_settings_path()
-        if os.path.exists(settings_path):
-            load_dotenv(settings_path)
-            logging.debug(f"Loaded settings from {settings_path}")
+        # Settings are parsed once and reloaded when the file changes. The
+        # reload may happen on whatever thread reads a setting, such as a
+        # Last.fm lookup thread, so changes reach the window through a
+        # signal, queued when it is emitted off the GUI thread
+        self.settings = get_settings()
+        self.settings_changed.connect(self.on_settings_changed)
+        self._notify_settings_changed = self.settings_changed.emit
+        self.settings.subscribe(self._notify_settings_changed)
 
         # Init controller
         self.controller = SongController()
+        self.library_read.connect(self.reconcile_songs)
         logging.debug("Controller initialized")
 
+        # Fetch Missing Details looks songs up on an asyncio event loop,
+        # started the first time it is used; see enrich_pending_songs
+        self.async_bridge = None
+        self._enrichment = None
+
         # Grab cache dir for album art thumbnails
         self.cache_dir = self.controller.get_cache_dir()
 
@@ -89,8 +132,10 @@ class SongApp(QMainWindow):
             'title': '',
             'album': '',
             'genre': '',
+            'near_tuning': '',
             'tunings': set(),
-            'num_songs': 0
+            'num_songs': 0,
+            'weighting': UNIFORM
         }
 
         self.setup_ui()
@@ -111,11 +156,30 @@ class SongApp(QMainWindow):
         settings_action.triggered.connect(self.show_settings_dialog)
         file_menu.addAction(settings_action)
 
+        # Add attach library action
+        attach_library_action = QAction('Attach Library...', self)
+        attach_library_action.triggered.connect(self.attach_library)
+        file_menu.addAction(attach_library_action)
+
+        # Add find duplicates action
+        duplicates_action = QAction('Find Duplicates...', self)
+        duplicates_action.triggered.connect(self.show_duplicates_dialog)
+        file_menu.addAction(duplicates_action)
+
+        # Add fetch missing details action
+        enrich_action = QAction('Fetch Missing Details', self)
+        enrich_action.triggered.connect(self.enrich_pending_songs)
+        file_menu.addAction(enrich_action)
+
         # Add statistics action
         statistics_action = QAction('Statistics', self)
         statistics_action.triggered.connect(self.show_statistics_dialog)
         view_menu.addAction(statistics_action)
 
+        # Libraries submenu, one checkable entry per library
+        self.libraries_menu = view_menu.addMenu('Libraries')
+        self.update_libraries_menu()
+
         # Add about action
         about_action = QAction('About', self)
         about_action.triggered.connect(self.show_about_dialog)
@@ -184,12 +248,22 @@ class SongApp(QMainWindow):
         self.select_songs_button.clicked.connect(self.show_select_songs_dialog)
         self.button_layout.addWidget(self.select_songs_button)
 
+        self.plan_practice_button = QPushButton("Plan Practice...")
+        self.plan_practice_button.clicked.connect(self.show_plan_practice_dialog)
+        self.button_layout.addWidget(self.plan_practice_button)
+
+        self.recommend_button = QPushButton("What to Learn Next")
+        self.recommend_button.clicked.connect(self.show_recommendations)
+        self.button_layout.addWidget(self.recommend_button)
+
         # Add button layout to main layout
         self.main_layout.addLayout(self.button_layout)
 
         # Search input
         self.search_input = QLineEdit(self)
-        self.search_input.setPlaceholderText("Search by Title or Artist")
+        self.search_input.setPlaceholderText(
+            "Search by Title or Artist, or chord: Bm, progression: I-V-vi-IV"
+        )
         self.search_input.textChanged.connect(self.on_search_text_changed)
         self.main_layout.addWidget(self.search_input)
 
@@ -206,6 +280,7 @@ class SongApp(QMainWindow):
         self.genres_label = QLabel("Genres: N/A")
         self.tuning_label = QLabel("Tuning: N/A")
         self.notes_label = QLabel("Notes: N/A")
+        self.library_label = QLabel("Library: N/A")
 
         self.metadata_layout.addWidget(self.artist_label)
         self.metadata_layout.addWidget(self.title_label)
@@ -214,6 +289,7 @@ class SongApp(QMainWindow):
         self.metadata_layout.addWidget(self.genres_label)
         self.metadata_layout.addWidget(self.tuning_label)
         self.metadata_layout.addWidget(self.notes_label)
+        self.metadata_layout.addWidget(self.library_label)
 
         self.scroll_area.setWidget(self.metadata_widget)
 
@@ -227,7 +303,7 @@ class SongApp(QMainWindow):
         self.metadata_album_layout.addWidget(self.album_art_label)
         self.main_layout.addLayout(self.metadata_album_layout)
 
-        self.load_songs()
+        self.load_initial_songs()
 
         # Status bar
         self.status_bar = self.statusBar()
@@ -244,6 +320,7 @@ class SongApp(QMainWindow):
         """
         artist = item.text(0)
         title = item.text(1)
+        library = item.data(0, Qt.ItemDataRole.UserRole)
         logging.debug("Treeview item clicked: %s by %s", title, artist)
 
         if self.last_selected_item == item:
@@ -252,7 +329,7 @@ class SongApp(QMainWindow):
             self.last_selected_item = None
             logging.debug("Deselected item")
         else:
-            song = self.controller.get_song(title, artist)
+            song = self.controller.get_song(title, artist, library)
             if song:
                 self.display_song_info(song)
                 self.last_selected_item = item
@@ -288,12 +365,13 @@ class SongApp(QMainWindow):
         self.song_tree.clear()
         for song in songs:
             item = QTreeWidgetItem(self.song_tree)
-            # Apply titlecase when displaying, handle None values
-            item.setText(0, titlecase(song.artist) if song.artist else "")
-            item.setText(1, titlecase(song.title) if song.title else "")
-            item.setText(2, titlecase(song.album) if song.album else "")
+            # Display strings are titlecased once, when the song is saved
+            item.setText(0, song.display_artist)
+            item.setText(1, song.display_title)
+            item.setText(2, song.display_album)
             item.setText(3, song.tuning if song.tuning else "")
             item.setText(4, song.progress if song.progress else "Not Started")
+            item.setData(0, Qt.ItemDataRole.UserRole, song.library)
 
             # Set color based on progress
             if song.progress in self.PROGRESS_COLORS:
@@ -324,6 +402,7 @@ class SongApp(QMainWindow):
         self.genres_label.setText(f"Genres: {genres_str}")
         self.tuning_label.setText(f"Tuning: {titlecase(song.tuning)}")
         self.notes_label.setText(f"Notes: {song.notes}")
+        self.library_label.setText(f"Library: {song.library or 'N/A'}")
 
         logging.debug(
             "Song metadata displayed: Title=%s, Artist=%s, Album=%s, Duration=%s, "
@@ -368,6 +447,7 @@ class SongApp(QMainWindow):
         self.genres_label.setText("Genres: N/A")
         self.tuning_label.setText("Tuning: N/A")
         self.notes_label.setText("Notes: N/A")
+        self.library_label.setText("Library: N/A")
         self.album_art_label.clear()
 
         logging.debug("Song display info cleared")
@@ -580,6 +660,10 @@ class SongApp(QMainWindow):
                 existing_song.genres = genres
             success, message = self.controller.update_song_info(existing_song)
         else:
+            if not self.confirm_new_song(title, artist):
+                self.show_status_message("Song not added")
+                return
+
             # Create a new song object
             song = Song(
                 title=title,
@@ -604,12 +688,42 @@ class SongApp(QMainWindow):
             else:
                 self.show_status_message(message, error=True)
 
+    def confirm_new_song(self, title, artist):
+        """
+        Ask before adding a song that looks like a misspelling of one that is
+        already in the library.
+
+        Args:
+            title (str): The title of the new song.
+            artist (str): The artist of the new song.
+
+        Returns:
+            bool: True if the song should be added.
+        """
+        similar = self.controller.find_similar_songs(title, artist, limit=3)
+        if not similar:
+            return True
+        suggestions = "\n".join(
+            f"{song.display_title} by {song.display_artist}" for song in similar
+        )
+        reply = QMessageBox.question(
+            self,
+            "Did You Mean?",
+            f"Your library already has similar songs:\n\n{suggestions}\n\n"
+            f"Add {title} by {artist} anyway?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+        )
+        return reply == QMessageBox.StandardButton.Yes
+
     def edit_song(self):
         if not self.last_selected_item:
             self.show_status_message("Please select a song to edit.", error=True)
             logging.warning("Edit attempt failed: No song selected")
             return
 
+        if self.is_read_only_selection():
+            return
+
         try:
             artist = self.last_selected_item.text(0)
             title = self.last_selected_item.text(1)
@@ -673,6 +787,9 @@ class SongApp(QMainWindow):
             self.show_status_message("Please select a song to delete.", error=True)
             return
 
+        if self.is_read_only_selection():
+            return
+
         artist = self.last_selected_item.text(0)
         title = self.last_selected_item.text(1)
 
@@ -693,11 +810,117 @@ class SongApp(QMainWindow):
             )
             logging.exception(f"Error in delete_song: {str(e)}")
 
-    def show_select_songs_dialog(self):
-        logging.debug("Opening Select Songs dialog")
-        songs = self.controller.get_all_songs()
+    def record_practice(self, quality):
+        """
+        Record a practice session of the selected song.
 
+        Args:
+            quality (int): How well it went, from 0 (forgot it) to 5 (perfect).
+        """
+        if not self.last_selected_item:
+            self.show_status_message("Please select a song to practice.", error=True)
+            return
+        if self.is_read_only_selection():
+            return
+
+        artist = self.last_selected_item.text(0)
+        title = self.last_selected_item.text(1)
+        success, message = self.controller.record_practice(title, artist, quality)
+        if success:
+            self.show_status_message(message)
+            self.update_song_list(self.controller.get_all_songs())
+        else:
+            self.show_status_message(message, error=True)
+
+    def show_songs_like(self):
+        """List the songs whose tags are most like the selected song's"""
+        if not self.last_selected_item:
+            self.show_status_message("Please select a song first.", error=True)
+            return
+
+        artist = self.last_selected_item.text(0)
+        title = self.last_selected_item.text(1)
+        library = self.last_selected_item.data(0, Qt.ItemDataRole.UserRole)
+        songs = self.controller.find_songs_like(title, artist, library=library)
         if not songs:
+            self.show_status_message(f"No songs with tags like {title}")
+            return
+        self.update_song_list(songs)
+        self.show_status_message(f"Songs like {title} by {artist}")
+
+    def show_recommendations(self):
+        """List the songs to learn next, based on the songs being learned"""
+        songs = self.controller.recommend_songs()
+        if not songs:
+            self.show_status_message(
+                "Start learning some songs to get suggestions", error=True
+            )
+            return
+        self.update_song_list(songs)
+        self.show_status_message(f"{len(songs)} songs to learn next")
+
+    def is_read_only_selection(self):
+        """
+        Check whether the selected song lives in an attached library.
+
+        Songs from attached libraries can be browsed, searched and filtered,
+        but edits and deletes only apply to the main library.
+
+        Returns:
+            bool: True if the selection can't be modified.
+        """
+        library = self.last_selected_item.data(0, Qt.ItemDataRole.UserRole)
+        if self.controller.is_attached_library(library):
+            self.show_status_message(
+                f"Songs from the '{library}' library are read-only.", error=True
+            )
+            return True
+        return False
+
+    def attach_library(self):
+        """Prompt for another song database and attach it as a library"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Attach Library", "", "Song Libraries (*.db);;All Files (*)"
+        )
+        if not path:
+            return
+
+        # Derive a schema-safe library name from the file name
+        base = os.path.splitext(os.path.basename(path))[0]
+        name = "".join(
+            c if c.isascii() and c.isalnum() else "_" for c in base
+        ).strip("_")
+        if not name or name[0].isdigit():
+            name = f"library_{name}"
+
+        success, message = self.controller.attach_library(name, path)
+        self.show_status_message(message, error=not success)
+        if success:
+            self.update_libraries_menu()
+            self.load_songs()
+
+    def update_libraries_menu(self):
+        """Rebuild the Libraries menu from the controller's libraries"""
+        self.libraries_menu.clear()
+        for name in self.controller.get_libraries():
+            action = QAction(name, self)
+            action.setCheckable(True)
+            action.setChecked(name in self.controller.active_libraries)
+            action.toggled.connect(self.on_library_toggled)
+            self.libraries_menu.addAction(action)
+
+    def on_library_toggled(self, _checked):
+        """Switch the active libraries to the checked menu entries"""
+        names = [action.text() for action in self.libraries_menu.actions()
+                 if action.isChecked()]
+        self.controller.set_active_libraries(names)
+        self.clear_song_display_info()
+        self.last_selected_item = None
+        self.load_songs()
+
+    def show_select_songs_dialog(self):
+        logging.debug("Opening Select Songs dialog")
+        if not self.controller.get_song_count():
             self.show_status_message("No songs in the database to filter")
             return
 
@@ -719,6 +942,13 @@ class SongApp(QMainWindow):
         exclude_mastered.setChecked(self.filter_settings.get('exclude_mastered', False))
         layout.addWidget(exclude_mastered)
 
+        # Limit to the spaced-repetition due queue
+        due_only = QCheckBox(
+            f"Only Songs Due for Practice ({self.controller.count_due_songs()})"
+        )
+        due_only.setChecked(self.filter_settings.get('due_only', False))
+        layout.addWidget(due_only)
+
         # Create dropdown fields
         dropdown_fields = {}
 
@@ -730,6 +960,17 @@ class SongApp(QMainWindow):
         layout.addWidget(QLabel("Genre:"))
         layout.addWidget(dropdown_fields['genre'])
 
+        # Songs playable from a tuning with at most one string retuned
+        unique_tunings = self.controller.get_unique_tunings()
+        dropdown_fields['near_tuning'] = QComboBox()
+        dropdown_fields['near_tuning'].addItem("")  # Empty option
+        dropdown_fields['near_tuning'].addItems(unique_tunings)
+        dropdown_fields['near_tuning'].setCurrentText(
+            self.filter_settings.get('near_tuning', '')
+        )
+        layout.addWidget(QLabel("Within one string change of:"))
+        layout.addWidget(dropdown_fields['near_tuning'])
+
         # Tuning selection list
         tuning_group = QGroupBox("Tunings")
         tuning_layout = QVBoxLayout()
@@ -739,7 +980,6 @@ class SongApp(QMainWindow):
 
         # Create checkboxes for each tuning
         self.tuning_checkboxes = []
-        unique_tunings = self.controller.get_unique_tunings()
         for tuning in unique_tunings:
             checkbox = QCheckBox(tuning)
             if tuning in self.filter_settings['tunings']:
@@ -754,13 +994,23 @@ class SongApp(QMainWindow):
         layout.addWidget(tuning_group)
 
         # Number of songs input
-        num_songs_label = QLabel("Number of songs (0 for all):")
+        num_songs_label = QLabel("Number of random songs (0 for all):")
         layout.addWidget(num_songs_label)
         num_songs_input = QSpinBox()
         num_songs_input.setRange(0, 1000)
         num_songs_input.setValue(self.filter_settings['num_songs'])
         layout.addWidget(num_songs_input)
 
+        # How random songs are weighted
+        weighting_input = QComboBox()
+        for label, weighting in self.WEIGHTING_LABELS.items():
+            weighting_input.addItem(label, weighting)
+        weighting_input.setCurrentIndex(
+            max(0, weighting_input.findData(self.filter_settings.get('weighting')))
+        )
+        layout.addWidget(QLabel("Pick songs:"))
+        layout.addWidget(weighting_input)
+
         # Add summary text area
         summary_text = QTextEdit()
         summary_text.setReadOnly(True)
@@ -788,6 +1038,7 @@ class SongApp(QMainWindow):
             for field in dropdown_fields.values():
                 field.setCurrentIndex(0)
             num_songs_input.setValue(0)
+            weighting_input.setCurrentIndex(0)
             summary_text.clear()
 
         clear_button.clicked.connect(clear_filters)
@@ -799,9 +1050,11 @@ class SongApp(QMainWindow):
                     summary.append(f"{field.capitalize()}: {input_widget.text()}")
             for field, dropdown in dropdown_fields.items():
                 if dropdown.currentText():
-                    summary.append(f"{field.capitalize()}: {dropdown.currentText()}")
+                    label = field.replace('_', ' ').capitalize()
+                    summary.append(f"{label}: {dropdown.currentText()}")
             if num_songs_input.value() > 0:
                 summary.append(f"Number of songs: {num_songs_input.value()}")
+                summary.append(f"Pick: {weighting_input.currentText()}")
             summary_text.setText("\n".join(summary))
 
         for input_field in input_fields.values():
@@ -809,6 +1062,7 @@ class SongApp(QMainWindow):
         for dropdown in dropdown_fields.values():
             dropdown.currentTextChanged.connect(update_summary)
         num_songs_input.valueChanged.connect(update_summary)
+        weighting_input.currentIndexChanged.connect(update_summary)
 
         # Initialize summary
         update_summary()
@@ -821,25 +1075,215 @@ class SongApp(QMainWindow):
                 'title': input_fields['title'].text(),
                 'album': input_fields['album'].text(),
                 'genre': dropdown_fields['genre'].currentText(),
+                'near_tuning': dropdown_fields['near_tuning'].currentText(),
                 'tunings': {cb.text() for cb in self.tuning_checkboxes
                             if cb.isChecked()},
                 'num_songs': num_songs_input.value(),
-                'exclude_mastered': exclude_mastered.isChecked()
+                'exclude_mastered': exclude_mastered.isChecked(),
+                'due_only': due_only.isChecked(),
+                'weighting': weighting_input.currentData() or UNIFORM
             }
-            filtered_songs = self.controller.filter_songs(
-                artist=self.filter_settings['artist'],
-                title=self.filter_settings['title'],
-                album=self.filter_settings['album'],
-                genre=self.filter_settings['genre'],
-                tunings=self.filter_settings['tunings'],
-                num_songs=self.filter_settings['num_songs'],
-                exclude_mastered=self.filter_settings['exclude_mastered']
-            )
+            filters = {
+                'artist': self.filter_settings['artist'],
+                'title': self.filter_settings['title'],
+                'album': self.filter_settings['album'],
+                'genre': self.filter_settings['genre'],
+                'tunings': self.filter_settings['tunings'],
+                'near_tuning': self.filter_settings['near_tuning'],
+                'exclude_mastered': self.filter_settings['exclude_mastered']
+            }
+            if self.filter_settings['due_only']:
+                # Most overdue songs first rather than a random pick
+                filtered_songs = self.controller.filter_songs(
+                    num_songs=self.filter_settings['num_songs'],
+                    due_only=True,
+                    **filters
+                )
+            elif self.filter_settings['num_songs'] > 0:
+                filtered_songs = self.controller.sample_songs(
+                    self.filter_settings['num_songs'],
+                    weighting=self.filter_settings['weighting'],
+                    **filters
+                )
+            else:
+                filtered_songs = self.controller.filter_songs(**filters)
             self.update_song_list(filtered_songs)
             self.show_status_message(f"Filtered to {len(filtered_songs)} songs")
         else:
             logging.debug("Select Songs dialog cancelled")
 
+    def show_plan_practice_dialog(self):
+        """Plan a practice session that fits in a given number of minutes"""
+        if not self.controller.get_song_count():
+            self.show_status_message("No songs in the database to practice")
+            return
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Plan Practice")
+        layout = QVBoxLayout(dialog)
+
+        layout.addWidget(QLabel("Minutes to practice:"))
+        minutes_input = QSpinBox()
+        minutes_input.setRange(5, 240)
+        minutes_input.setValue(30)
+        layout.addWidget(minutes_input)
+
+        exclude_mastered = QCheckBox("Exclude Mastered Songs")
+        layout.addWidget(exclude_mastered)
+
+        button_box = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel
+        )
+        button_box.accepted.connect(dialog.accept)
+        button_box.rejected.connect(dialog.reject)
+        layout.addWidget(button_box)
+
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+
+        minutes = minutes_input.value()
+        plan = self.controller.plan_practice(
+            minutes, exclude_mastered=exclude_mastered.isChecked()
+        )
+        if not plan.songs:
+            self.show_status_message(f"No songs fit in {minutes} minutes")
+            return
+
+        self.update_song_list(plan.songs)
+        lines = []
+        tuning = None
+        for number, song in enumerate(plan.songs, 1):
+            if canonical_tuning_name(song.tuning) != tuning:
+                tuning = canonical_tuning_name(song.tuning)
+                lines.append(f"\n{tuning or 'Unknown tuning'}:")
+            lines.append(f"  {number}. {song.display_title} by {song.display_artist}")
+        QMessageBox.information(
+            self,
+            "Practice Plan",
+            f"{len(plan.songs)} songs, about {plan.total_seconds // 60} minutes, "
+            f"{plan.tuning_changes} tuning changes\n" + "\n".join(lines),
+        )
+        self.show_status_message(f"Planned {len(plan.songs)} songs to practice")
+
+    def show_duplicates_dialog(self):
+        """Find songs entered more than once and merge the checked groups"""
+        groups = self.controller.find_duplicate_songs()
+        if not groups:
+            self.show_status_message("No duplicate songs found")
+            return
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Find Duplicates")
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(QLabel(
+            "Checked groups are merged into their first song, keeping the "
+            "best progress and all notes:"
+        ))
+
+        tree = QTreeWidget()
+        tree.setHeaderLabels(["Artist", "Title", "Progress"])
+        group_items = []
+        for group in groups:
+            keep = group.songs[0]
+            group_item = QTreeWidgetItem(tree, [
+                keep.display_artist, keep.display_title,
+                f"{len(group.songs)} copies, {group.score:.0%} similar",
+            ])
+            group_item.setCheckState(0, Qt.CheckState.Checked)
+            for song in group.songs:
+                QTreeWidgetItem(group_item, [
+                    song.display_artist, song.display_title, song.progress
+                ])
+            group_items.append(group_item)
+        tree.expandAll()
+        layout.addWidget(tree)
+
+        button_box = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel
+        )
+        button_box.accepted.connect(dialog.accept)
+        button_box.rejected.connect(dialog.reject)
+        layout.addWidget(button_box)
+
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+
+        merged = 0
+        for group, group_item in zip(groups, group_items):
+            if group_item.checkState(0) != Qt.CheckState.Checked:
+                continue
+            success, message = self.controller.merge_songs(
+                group.songs[0], group.songs[1:]
+            )
+            if not success:
+                self.show_status_message(message, error=True)
+                break
+            merged += 1
+        self.update_song_list(self.controller.get_all_songs())
+        if merged:
+            self.show_status_message(f"Merged {merged} groups of duplicates")
+
+    def enrich_pending_songs(self):
+        """
+        Fetch the Last.FM details of songs saved without them.
+
+        The lookups run concurrently on the asyncio event loop of an
+        AsyncBridge, so the window stays responsive, and what they find is
+        saved on the GUI thread in finish_enrichment.
+        """
+        if self._enrichment is not None:
+            self.show_status_message("Already fetching missing details")
+            return
+        if not self.controller.count_pending_songs():
+            self.show_status_message("No songs are missing details")
+            return
+        client = create_async_client()
+        if client is None:
+            # Nothing to look up without an API key, so this doesn't block
+            self.show_enrichment_result(*self.controller.enrich_pending_songs())
+            return
+        if self.async_bridge is None:
+            self.async_bridge = AsyncBridge(self)
+        pending = self.controller.get_pending_songs()
+        self.show_status_message(f"Fetching details of {len(pending)} songs...")
+        self._enrichment = self.async_bridge.submit(
+            self._fetch_pending_details(client, pending),
+            self.finish_enrichment, self.enrichment_failed,
+        )
+
+    async def _fetch_pending_details(self, client, pending):
+        """Look up pending songs, then close the client on its event loop."""
+        try:
+            return await self.controller.fetch_pending_details(client, pending)
+        finally:
+            await client.close()
+
+    def finish_enrichment(self, details):
+        """Save the details the lookups found, on the GUI thread"""
+        self._enrichment = None
+        self.show_enrichment_result(*self.controller.apply_pending_details(details))
+
+    def enrichment_failed(self, error):
+        """Report lookups of pending songs that failed as a whole"""
+        self._enrichment = None
+        logging.error(f"Error fetching missing details: {error!r}")
+        self.show_status_message("Unable to fetch missing details. Please try again.",
+                                 error=True)
+
+    def show_enrichment_result(self, enriched, pending):
+        """
+        Show the songs with their details filled in.
+
+        Args:
+            enriched (int): The songs enriched.
+            pending (int): The songs still pending.
+        """
+        self.update_song_list(self.controller.get_all_songs())
+        message = f"Fetched details of {enriched} songs"
+        if pending:
+            message += f", {pending} still pending"
+        self.show_status_message(message)
+
     def show_settings_dialog(self):
         """Show settings dialog for API configuration"""
         dialog = QDialog(self)
@@ -849,22 +1293,17 @@ class SongApp(QMainWindow):
         # API Key input
         api_key_label = QLabel("Last.fm API Key:")
         api_key_input = QLineEdit()
-        api_key_input.setText(os.getenv('API_KEY', ''))
+        api_key_input.setText(self.settings.get(API_KEY, ''))
         layout.addWidget(api_key_label)
         layout.addWidget(api_key_input)
 
         # API Secret input
         api_secret_label = QLabel("Last.fm API Secret:")
         api_secret_input = QLineEdit()
-        api_secret_input.setText(os.getenv('API_SECRET', ''))
+        api_secret_input.setText(self.settings.get(API_SECRET, ''))
         layout.addWidget(api_secret_label)
         layout.addWidget(api_secret_input)
 
-        # Info label
-        info_label = QLabel("Restart application after changing API credentials")
-        info_label.setStyleSheet("color: gray;")
-        layout.addWidget(info_label)
-
         button_box = QDialogButtonBox(
             QDialogButtonBox.StandardButton.Save |
             QDialogButtonBox.StandardButton.Cancel
@@ -875,11 +1314,11 @@ class SongApp(QMainWindow):
 
         if dialog.exec() == QDialog.DialogCode.Accepted:
             try:
-                from utils.utils import save_settings
-                save_settings(api_key_input.text(), api_secret_input.text())
-                self.show_status_message(
-                    "API settings saved. Please restart the application."
-                )
+                self.settings.save({
+                    API_KEY: api_key_input.text(),
+                    API_SECRET: api_secret_input.text(),
+                })
+                self.show_status_message("API settings saved.")
             except Exception as e:
                 logging.error(f"Failed to save settings: {str(e)}")
                 self.show_status_message(
@@ -887,6 +1326,17 @@ class SongApp(QMainWindow):
                     error=True
                 )
 
+    def on_settings_changed(self, changed):
+        """
+        Apply settings changed in the dialog or in the settings file.
+
+        Args:
+            changed (set): The names of the changed settings.
+        """
+        if changed & {API_KEY, API_SECRET}:
+            logging.info("Last.fm credentials changed, using the new ones")
+            self.show_status_message("Last.fm credentials updated")
+
     def show_about_dialog(self):
         """Show about dialog with version info"""
         from guitar_parts import __version__
@@ -927,12 +1377,86 @@ class SongApp(QMainWindow):
         self.update_song_list(songs)
         logging.debug("Songs loaded into tree view")
 
+    def load_initial_songs(self):
+        """
+        Paint the first page of songs from the startup snapshot, then read
+        the whole library on a worker thread and reconcile with it.
+        """
+        songs = self.controller.load_snapshot_page()
+        if songs is not None:
+            self.update_song_list(songs)
+            logging.debug("First page of songs loaded from snapshot")
+        QThreadPool.globalInstance().start(self.read_library)
+
+    def read_library(self):
+        """Read the main library, on a worker thread, for reconcile_songs."""
+        try:
+            library = self.controller.read_main_library()
+        except Exception as e:
+            logging.error(f"Error reading the library in the background: {str(e)}")
+            library = None
+        self.library_read.emit(library)
+
+    def reconcile_songs(self, library=None):
+        """
+        Replace the snapshot page with the full, current song list and
+        refresh the snapshot if the library changed since it was taken.
+
+        Args:
+            library (tuple, optional): What read_library read. The songs are
+                                       loaded here if it is missing or out
+                                       of date.
+        """
+        songs = library and self.controller.adopt_main_library(*library)
+        if songs is None:
+            songs = self.controller.get_all_songs()
+            self.controller.save_snapshot(songs)
+        self.update_song_list(songs)
+        logging.debug("Songs reconciled with database")
+        QTimer.singleShot(0, self.analyze_chords_step)
+
+    def analyze_chords_step(self):
+        """
+        Index the chords of one batch of songs, and schedule the next batch
+        until every song is analyzed, so the window stays responsive.
+        """
+        if self.controller.analyze_chords() > 0:
+            QTimer.singleShot(0, self.analyze_chords_step)
+        else:
+            logging.debug("Chord index is up to date")
+
+    def closeEvent(self, event):
+        """
+        Refresh the startup snapshot, stop fetching missing details and
+        close the Last.fm clients.
+        """
+        self.settings.unsubscribe(self._notify_settings_changed)
+        self.controller.save_snapshot()
+        if self.async_bridge is not None:
+            self.async_bridge.close()
+            self.async_bridge = None
+            self._enrichment = None
+        self.controller.shutdown()
+        super().closeEvent(event)
+
     def on_search_text_changed(self, text):
         """
         Handle search text changes and update the song list.
         """
-        if text:
+        prefix, _, query = text.partition(":")
+        prefix = prefix.strip().lower()
+        if query.strip() and prefix in self.CHORD_SEARCHES:
+            search = getattr(self.controller, self.CHORD_SEARCHES[prefix])
+            songs = search(query.strip())
+        elif text:
             songs = self.controller.search_songs(text)
+            if not songs:
+                # Nothing contains the text, so it may be misspelled
+                songs = self.controller.fuzzy_search_songs(text)
+                if songs:
+                    self.show_status_message(
+                        f"No exact matches for \"{text}\", showing close matches"
+                    )
         else:
             songs = self.controller.get_all_songs()
 
@@ -951,6 +1475,14 @@ class SongApp(QMainWindow):
             menu = QMenu()
             edit_action = menu.addAction("Edit Song")
             edit_action.triggered.connect(self.edit_song)
+            like_action = menu.addAction("Find Songs Like This")
+            like_action.triggered.connect(self.show_songs_like)
+            practice_menu = menu.addMenu("Record Practice")
+            for label, quality in self.PRACTICE_GRADES.items():
+                action = practice_menu.addAction(label)
+                action.triggered.connect(
+                    lambda checked=False, q=quality: self.record_practice(q)
+                )
             menu.exec(self.song_tree.viewport().mapToGlobal(position))
 
 
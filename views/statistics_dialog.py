@@ -46,7 +46,7 @@ class StatisticsDialog(QDialog):
         stats_layout = QGridLayout()
 
         # Get statistics from controller
-        total_songs = len(self.controller.get_all_songs())
+        total_songs = self.controller.get_song_count()
         progress_stats = self.controller.get_progress_stats()
 
         # Add stats to layout
@@ -79,12 +79,18 @@ class StatisticsDialog(QDialog):
         # Get progress data
         progress_data = self.controller.get_progress_history()
 
-        # Create figure with progress distribution pie chart
-        fig, ax = plt.subplots(figsize=(8, 6))
-
         # Data for pie chart
         labels = list(progress_data.keys())
         sizes = list(progress_data.values())
+
+        # A pie chart can't be drawn without any songs
+        if not any(sizes):
+            layout.addWidget(QLabel("No songs to chart yet."))
+            tab.setLayout(layout)
+            return tab
+
+        # Create figure with progress distribution pie chart
+        fig, ax = plt.subplots(figsize=(8, 6))
         colors = ['#808080', '#FFA500', '#32CD32']  # Match main window colors
 
         # Create pie chart
@@ -118,7 +124,7 @@ class StatisticsDialog(QDialog):
         try:
             tuning_stats = self.controller.get_tuning_stats()
             genre_stats = self.controller.get_genre_stats()
-            total_songs = len(self.controller.get_all_songs())
+            total_songs = self.controller.get_song_count()
             logging.info(f"Statistics loaded: {total_songs} total songs, "
                          f"{len(tuning_stats)} tunings, {len(genre_stats)} genres")
         except Exception as e: